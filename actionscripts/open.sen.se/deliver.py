@@ -1,29 +1,45 @@
-import simplejson
-import requests
+#!/usr/bin/env python3
+#
+# Post a value to open.sen.se
+#
+# Usage: deliver.py SENSE_KEY FEED_ID VALUE
+#
+# Values go through samples/python/vscp_exporter.py. Values that can not
+# be posted are kept in SPOOL and posted with the next one. The script
+# runs for each event, so it makes one attempt and spills when Sen.se
+# does not answer instead of waiting for it.
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                '..', '..', 'samples', 'python'))
+import vscp_exporter
+
+SPOOL = os.path.join(os.path.expanduser("~"), ".cache", "vscp-samples", "sense")
 
 class Sense:
-    def __init__(self, senseKey):
-        self.url        = 'http://api.sen.se'
-        self.headers    = {'Content-Type':'application/json', 'sense_key':senseKey}
+    def __init__(self, senseKey, spool=SPOOL):
+        self.exporter = vscp_exporter.Exporter(vscp_exporter.Sense(senseKey), workers=1,
+                                               spool_dir=spool, retries=0, timeout=5.0)
+
+    def post(self, feedId, value):
+        print("Now posting to Sen.se : feed %s value %s" % (feedId, value))
+        self.exporter.put(vscp_exporter.Sense.item(feedId, value, time.time()))
 
-    def post(self,feedId, value):
-        event = {
-            'feed_id'   : feedId,
-            'value'     : value
-        }
-        print "Now posting to Sen.se : %s" % event
-        r = requests.post(
-            self.url+'/events/',
-            data=simplejson.dumps(event),
-            headers=self.headers
-        )
-        if r.status_code != 200:
-            print 'Could not post event. Api responded with a %s | %s' % (r.status, r.content)
-        else:
-            print 'Event posted to Sen.se'
+    def close(self, timeout=10.0):
+        self.exporter.close(timeout, wait_spilled=False)
+        counters = self.exporter.counters.snapshot()
+        if counters["posted"]:
+            print('Posted %d values to Sen.se' % counters["posted"])
+        if counters["spilled"]:
+            print('Could not post, kept %d values for later' % counters["spilled"])
 
 if __name__ == "__main__":
-    sense = Sense('YOUR_SEN.SE_KEY')
-    sense.post(YOUR_FEED_ID, THE_VALUE)
+    if len(sys.argv) != 4:
+        sys.exit("Usage: deliver.py SENSE_KEY FEED_ID VALUE")
+    sense = Sense(sys.argv[1])
+    sense.post(int(sys.argv[2]), sys.argv[3])
+    sense.close()
     exit('Bye bye')
-    
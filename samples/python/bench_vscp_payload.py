@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+
+# bench_vscp_payload.py
+#
+# Micro-benchmark for building the MQTT payload of a measurement event.
+#
+# Compares the path used before by mqtt_bme280.py (toJSON() on a
+# vscpEventEx, add vscpNote and measurement, json.dumps) with the
+# template based builder in vscp_payload.py for all back ends that
+# are installed and for the standard VSCP binary frame.
+#
+# Usage: bench_vscp_payload.py [-n count]
+#
+# This file is part of the VSCP (https://www.vscp.org) project
+#
+# The MIT License (MIT)
+#
+# Copyright © 2000-2026 Ake Hedman, the VSCP project
+# <info@vscp.org>
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#
+
+import argparse
+import json
+import sys
+import timeit
+
+import vscp_class as vc
+import vscp_type as vt
+import vscp_payload
+
+try:
+    import vscp
+except ImportError:
+    vscp = None
+
+HEAD = 0x8060   # VSCP_HEADER16_DUMB | VSCP_PRIORITY_NORMAL
+GUID = [0xFF, 0xFF, 0xFF, 0xFF, 0xFF, 0xFF, 0xFF, 0xFE,
+        0xB8, 0x27, 0xEB, 0x0A, 0x11, 0x62, 0x00, 0x08]
+SENSORINDEX = 0
+ZONE = 0
+SUBZONE = 0
+UNIT = 1
+NOTE = "Temperature from BME280"
+
+VALUE = 21.347
+
+
+# ----------------------------------------------------------------------------
+
+def current_path(ex):
+    """The per reading work done by mqtt_bme280.py before the templates."""
+    temperature_str = "{:0.2f}".format(VALUE)
+    ex.sizedata = 4 + len(temperature_str) + 1
+    ex.data[0] = SENSORINDEX
+    ex.data[1] = ZONE
+    ex.data[2] = SUBZONE
+    ex.data[3] = UNIT
+    b = temperature_str.encode()
+    for idx in range(len(b)):
+        ex.data[idx + 4] = b[idx]
+    ex.data[4 + len(temperature_str)] = 0
+
+    j = ex.toJSON()
+    j["vscpNote"] = NOTE
+    j["measurement"] = {
+        "value": VALUE,
+        "unit": UNIT,
+        "sensorindex": SENSORINDEX,
+        "zone": ZONE,
+        "subzone": SUBZONE
+    }
+    return json.dumps(j)
+
+
+def dict_path(template):
+    """Same work as the current path on a plain dict (no vscpEventEx)."""
+    temperature_str = "{:0.2f}".format(VALUE)
+    return json.dumps(template.build(VALUE, temperature_str))
+
+
+def template_path(template):
+    temperature_str = "{:0.2f}".format(VALUE)
+    return template.dumps(VALUE, temperature_str)
+
+
+def frame_path(template):
+    temperature_str = "{:0.2f}".format(VALUE)
+    return template.frame(temperature_str)
+
+
+def run(name, fn, count, base=None):
+    t = min(timeit.repeat(fn, number=count, repeat=5))
+    us = t / count * 1e6
+    if base:
+        print("%-28s %8.2f us/event %8.2fx" % (name, us, base / us))
+    else:
+        print("%-28s %8.2f us/event" % (name, us))
+    return us
+
+
+def main():
+    parser = argparse.ArgumentParser(description="VSCP payload micro-benchmark")
+    parser.add_argument('-n', '--count', action='store', type=int, default=100000,
+                        help='Number of payloads per run (default: 100000)')
+    arg = parser.parse_args(sys.argv[1:])
+
+    print("Building %d payloads per run, best of 5" % arg.count)
+    print("-" * 60)
+
+    base = None
+    if vscp is not None:
+        ex = vscp.vscpEventEx()
+        ex.head = HEAD
+        ex.vscpclass = vc.VSCP_CLASS2_MEASUREMENT_STR
+        ex.vscptype = vt.VSCP_TYPE_MEASUREMENT_TEMPERATURE
+        for i in range(16):
+            ex.guid[i] = GUID[i]
+        base = run("toJSON + json.dumps", lambda: current_path(ex), arg.count)
+    else:
+        print("vscp module not installed, skipping the toJSON path")
+
+    template = vscp_payload.MeasurementTemplate(HEAD,
+                                                vc.VSCP_CLASS2_MEASUREMENT_STR,
+                                                vt.VSCP_TYPE_MEASUREMENT_TEMPERATURE,
+                                                GUID, SENSORINDEX, ZONE, SUBZONE,
+                                                UNIT, NOTE)
+    us = run("dict + json.dumps", lambda: dict_path(template), arg.count, base)
+    if base is None:
+        base = us
+
+    for name in ("json", "orjson", "msgpack"):
+        try:
+            backend = vscp_payload.get_backend(name)
+        except ValueError as e:
+            print("%-28s %s" % ("template " + name, e))
+            continue
+        template.backend = backend
+        run("template " + name, lambda: template_path(template), arg.count, base)
+
+    run("template binary frame", lambda: frame_path(template), arg.count, base)
+
+
+if __name__ == "__main__":
+    main()
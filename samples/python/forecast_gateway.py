@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+
+# forecast_gateway.py
+#
+# Weather forecast gateway for many locations
+#
+# Fetches the yr.no (api.met.no) forecast for every location in a
+# locations file (see vscp_forecast.py), a few at a time on a thread pool.
+# Each worker keeps its connection to api.met.no alive and responses go
+# through the HTTP cache (vscp_httpcache.py) so a cron run within the
+# lifetime of a forecast does not hit the service at all.
+#
+# For each location the forecast for the current hour is sent as
+#
+#   CLASS1.MEASUREMENT, Type=6 temperature (Celsius)
+#   CLASS1.MEASUREMENT, Type=32 wind speed (m/s)
+#   CLASS1.WEATHER_FORECAST temperature level (freezing...very hot)
+#   CLASS1.WEATHER_FORECAST wind level (none...very high)
+#
+# using the GUID, zone and subzone of the location. All events go to the
+# daemon pipelined over one connection.
+#
+# Usage: forecast_gateway.py [-h] [-l FILE] [-w WORKERS] [--host HOST] ...
+#        see -h. Without --host the events are printed.
+#
+# This file is part of the VSCP (https://www.vscp.org) project
+#
+# The MIT License (MIT)
+#
+# Copyright © 2000-2026 Ake Hedman, the VSCP project
+# <info@vscp.org>
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#
+
+import argparse
+import concurrent.futures
+import http.client
+import os
+import sys
+import time
+
+import vscp_forecast
+import vscp_httpcache
+import vscp_tcpip
+import vscp_type
+
+# api.met.no asks for at most four decimals in coordinates
+URL = "https://api.met.no/weatherapi/locationforecast/2.0/compact?lat=%.4f&lon=%.4f"
+
+UNIT_CELSIUS = 1
+UNIT_METER_PER_SECOND = 0
+
+
+def current_details(forecast, now=None):
+    """Details (air_temperature, wind_speed...) for the current hour."""
+    hour = time.strftime("%Y-%m-%dT%H:00:00Z", time.gmtime(now))
+    for entry in forecast["properties"]["timeseries"]:
+        # Times are ISO 8601 UTC so they compare as strings
+        if entry["time"] >= hour:
+            return entry["data"]["instant"]["details"]
+    raise ValueError("No forecast for the current hour")
+
+
+def location_events(loc, details):
+    events = []
+    t = details.get("air_temperature")
+    if t is not None:
+        events.append(vscp_forecast.measurement_event(loc.guid,
+                                                      vscp_type.VSCP_TYPE_MEASUREMENT_TEMPERATURE,
+                                                      t, UNIT_CELSIUS))
+    ws = details.get("wind_speed")
+    if ws is not None:
+        events.append(vscp_forecast.measurement_event(loc.guid,
+                                                      vscp_type.VSCP_TYPE_MEASUREMENT_SPEED,
+                                                      ws, UNIT_METER_PER_SECOND))
+    if t is not None:
+        events.append(vscp_forecast.forecast_event(loc.guid, vscp_forecast.temperature_level(t),
+                                                   loc.zone, loc.subzone))
+    if ws is not None:
+        events.append(vscp_forecast.forecast_event(loc.guid, vscp_forecast.wind_level(ws),
+                                                   loc.zone, loc.subzone))
+    return events
+
+
+class Gateway:
+    """Fetch forecasts for locations on a bounded thread pool."""
+
+    def __init__(self, cache, workers=4, url=URL, cache_ttl=0):
+        self.cache = cache
+        self.workers = workers
+        self.url = url
+        self.cache_ttl = cache_ttl
+
+    def fetch(self, loc):
+        # Runs on a worker thread, the cache keeps one connection per thread
+        forecast = self.cache.fetch_json(self.url % (loc.latitude, loc.longitude),
+                                         self.cache_ttl)
+        return location_events(loc, current_details(forecast))
+
+    def events(self, locations):
+        """Events for all locations in location order and the failed locations."""
+        events = []
+        failed = []
+        with concurrent.futures.ThreadPoolExecutor(max_workers=self.workers) as pool:
+            futures = [pool.submit(self.fetch, loc) for loc in locations]
+            for loc, fut in zip(locations, futures):
+                try:
+                    events.extend(fut.result())
+                except (OSError, ValueError, KeyError, http.client.HTTPException,
+                        vscp_httpcache.HttpError) as e:
+                    failed.append((loc, e))
+        return events, failed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Send yr.no forecasts for many locations to VSCP")
+    parser.add_argument('-l', '--locations',
+                        default=os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                             'forecast_locations.txt'),
+                        help='Locations file (default: forecast_locations.txt)')
+    parser.add_argument('-w', '--workers', type=int, default=4,
+                        help='Forecasts fetched at the same time (default: 4)')
+    parser.add_argument('--cache-ttl', type=int, default=1800,
+                        help='Use a cached forecast younger than this many seconds (default: 1800)')
+    parser.add_argument('--cache-dir', default=vscp_httpcache.DEFAULT_DIR, help='HTTP cache directory')
+    parser.add_argument('--host', help='VSCP daemon to send events to')
+    parser.add_argument('--port', type=int, default=vscp_tcpip.DEFAULT_PORT)
+    parser.add_argument('--user', default='admin')
+    parser.add_argument('--password', default='secret')
+    arg = parser.parse_args(sys.argv[1:])
+
+    locations = vscp_forecast.read_locations(arg.locations)
+    gateway = Gateway(vscp_httpcache.HttpCache(arg.cache_dir), arg.workers,
+                      cache_ttl=arg.cache_ttl)
+
+    t = time.monotonic()
+    events, failed = gateway.events(locations)
+    for loc, e in failed:
+        print("No forecast for %s: %s" % (loc.name, e))
+    print("%d locations in %.2f s %s" % (len(locations), time.monotonic() - t,
+                                         gateway.cache.stats))
+
+    if arg.host:
+        refused = vscp_forecast.send_events(events, arg.host, arg.port, arg.user, arg.password)
+        print("Sent %d events, %d failed" % (len(events) - refused, refused))
+    else:
+        for ev in events:
+            print(vscp_tcpip.format_event(ev))
+
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
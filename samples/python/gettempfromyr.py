@@ -1,5 +1,4 @@
-#!/usr/bin/python
-#!usr/bin/env python
+#!/usr/bin/env python3
 
 """
 // File: gettempfromyr.py
@@ -32,9 +31,10 @@
 
 import socket
 import sys
-import urllib
 import telnetlib
 
+import vscp_httpcache
+
 host = "192.168.1.7"
 port = 9598
 user = "admin"
@@ -45,10 +45,13 @@ guid = "FF:FF:FF:FF:FF:FF:FF:FE:B8:27:EB:40:59:96:00:03"
 debug = 1
 usesockets = 0
 url = "http://tinyurl.com/temperaturLos" #Url to yr.no:s rss-feed
-opener = urllib.FancyURLopener({})
-page = opener.open(url)
 
-for line in page.readlines():
+# The feed is updated hourly, cron runs more often than that so use the
+# cached copy (revalidated with a conditional GET) when it is fresh
+cache_ttl = 1800
+page = vscp_httpcache.default_cache().fetch(url, cache_ttl).decode("utf-8", "replace")
+
+for line in page.splitlines():
     if "m/s" in line:
         line = line.split(".")
         strtemp = line[1][:-5].strip()
@@ -78,18 +81,18 @@ if ( usesockets ):
     if (1 == debug):
         print(data)
 
-    s.send( "user " + user + "\r\n" )
+    s.send( ("user " + user + "\r\n").encode() )
     data = s.recv( 10000 )
     if (1 == debug):
         print(data)
 
-    s.send( "pass " + password + "\r\n" )
+    s.send( ("pass " + password + "\r\n").encode() )
     data = s.recv( 10000 )
     if (1 == debug):
         print(data)
 
     # Send temperature forecast
-    s.send( "SEND 0,10,6,,0,0," + guid + ",0x88,0," + str( temp ) + "\r\n" )
+    s.send( ("SEND 0,10,6,,0,0," + guid + ",0x88,0," + str( temp ) + "\r\n").encode() )
     data = s.recv( 10000 )
     if (1 == debug):
         print(data)
@@ -98,7 +101,7 @@ if ( usesockets ):
     # coding = 0b100 =  Normalized integer
     # unit = 0 = m/s
     # sensor = 0
-    s.send( "SEND 0,10,32,,0,0," + guid +",0x80,0," + str( wind ) + "\r\n" )
+    s.send( ("SEND 0,10,32,,0,0," + guid +",0x80,0," + str( wind ) + "\r\n").encode() )
     data = s.recv( 10000 )
     if (1 == debug):
         print(data)
@@ -111,14 +114,14 @@ else:
 
     # Connect to VSCP daemon
     tn = telnetlib.Telnet(host, 9598)
-    tn.read_until("+OK - Success.",2)
+    tn.read_until(b"+OK - Success.",2)
 
     # Login
-    tn.write("user " + user + "\n")
-    tn.read_until("+OK - Success.", 2)
+    tn.write( ("user " + user + "\n").encode() )
+    tn.read_until(b"+OK - Success.", 2)
 
-    tn.write("pass " + password + "\n")
-    tn.read_until("+OK - Success.",2)
+    tn.write( ("pass " + password + "\n").encode() )
+    tn.read_until(b"+OK - Success.",2)
 
     # *******************************************
     #            Temperature forecast
@@ -146,8 +149,8 @@ else:
             event += hex(ord(ch))
 
     if ( debug ): print("Temperature event " + event)
-    tn.write( "SEND " + event + "\n" )
-    rv = tn.read_until("+OK - Success.", 12)
+    tn.write( ("SEND " + event + "\n").encode() )
+    rv = tn.read_until(b"+OK - Success.", 12)
     if ( debug ): print(rv)
 
     # *******************************************
@@ -178,8 +181,8 @@ else:
     event += "0xff,"	# Subzone - all
 
     if ( debug ): print("Temp warning level " + event)
-    tn.write( "SEND " + event + "\r\n" )
-    rv = tn.read_until("+OK - Success.", 12)
+    tn.write( ("SEND " + event + "\r\n").encode() )
+    rv = tn.read_until(b"+OK - Success.", 12)
     if ( debug ): print(rv)
 
     # *******************************************
@@ -208,8 +211,8 @@ else:
             event += hex(ord(ch))
 
     if ( debug ): print("Wind speed forecast event " + event)
-    tn.write( "SEND " + event + "\r\n" )
-    rv = tn.read_until("+OK - Success.", 12)
+    tn.write( ("SEND " + event + "\r\n").encode() )
+    rv = tn.read_until(b"+OK - Success.", 12)
     if ( debug ): print(rv)
 
     # *******************************************
@@ -237,9 +240,9 @@ else:
     event += "0xff,"	# Subzone - all
 
     if ( debug ): print("Wind warning " + event)
-    tn.write( "SEND " + event + "\n" )
-    rv = tn.read_until("+OK - Success.", 12)
+    tn.write( ("SEND " + event + "\n").encode() )
+    rv = tn.read_until(b"+OK - Success.", 12)
     if ( debug ): print(rv)
 
-    tn.write("quit\n")
+    tn.write(b"quit\n")
 
@@ -1,24 +1,50 @@
-#!/usr/bin/env python
+#!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 """ 
-Publish some messages to queue
+Publish some VSCP events to queue
+
+Events on topics below one of the binary prefixes are sent as standard
+VSCP binary frames, all others as VSCP JSON.
 """
-import paho.mqtt.publish as publish
+import os
+import sys
 
+import paho.mqtt.publish as publish
 
-msgs = [{'topic': "vscp/yolo", 'payload': "jump"},
-        {'topic': "adult/pics", 'payload': "some photo"},
-        {'topic': "adult/news", 'payload': "extra extra"},
-        {'topic': "adult/news", 'payload': "super extra"}]
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+import vscp_payload
 
 host = "localhost"
 
+guid = "FF:FF:FF:FF:FF:FF:FF:FE:B8:27:EB:0A:11:62:00:08"
 
-if __name__ == '__main__':
-    # publish a single message
-    publish.single(topic="kids/yolo", payload="just do it", hostname=host)
+# Topic prefixes that get binary frames
+binary_prefixes = "vscp/bin/"
+
+# Temperature measurement, class 1040 (measurement string), type 6
+temperature = vscp_payload.MeasurementTemplate(0x0060, 1040, 6, guid,
+                                               unit=1, note="Demo temperature")
 
-    # publish multiple messages
+formats = vscp_payload.PayloadFormats.fromBinaryPrefixes(binary_prefixes)
+
+
+def payload(topic, value):
+    strvalue = "{:0.2f}".format(value)
+    if formats.is_binary(topic):
+        return temperature.frame(strvalue)
+    return temperature.dumps(value, strvalue)
+
+
+if __name__ == '__main__':
+    # publish a single event as VSCP JSON
+    topic = "vscp/{}/1040/6/0".format(guid)
+    publish.single(topic=topic, payload=payload(topic, 21.5), hostname=host)
+
+    # publish multiple events, the ones under vscp/bin/ as binary frames
+    msgs = []
+    for topic, value in (("vscp/{}/1040/6/0".format(guid), 21.75),
+                         ("vscp/bin/{}/1040/6/0".format(guid), 22.0)):
+        msgs.append({'topic': topic, 'payload': payload(topic, value)})
     publish.multiple(msgs, hostname=host)
 
 
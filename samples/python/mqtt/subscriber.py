@@ -1,31 +1,63 @@
-#!/usr/bin/env python
+#!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 """
 A simple VSCP demo server MQTT subscriber
+
+Payloads can be VSCP JSON (single events or arrays), standard VSCP
+binary frames or msgpack, they are all decoded to VSCP JSON events.
+Topics are routed to handlers by vscp_subscriber.py which decodes on a
+pool of workers. Message rates are printed every stats_interval seconds.
 """
+import os
+import sys
+import time
+
 import paho.mqtt.client as paho
 
-def on_message(mosq, obj, msg):
-    print("%-20s %d %s" % (msg.topic, msg.qos, msg.payload))
-    mosq.publish('pong', 'ack', 0)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+import vscp_subscriber
+
+guid = "25:00:00:00:00:00:00:00:00:00:00:00:0D:02:00:01"
+
+stats_interval = 10
 
-def on_publish(mosq, obj, mid):
-    pass
+def on_event(topic, ev):
+    print("%-20s class=%d type=%d guid=%s data=%s" %
+          (topic, ev["vscpClass"], ev["vscpType"], ev["vscpGuid"], ev.get("vscpData", [])))
+
+def on_on(topic, ev):
+    print("ON  %s" % ev["vscpGuid"])
+
+def on_off(topic, ev):
+    print("OFF %s" % ev["vscpGuid"])
 
 if __name__ == '__main__':
     client = paho.Client()
-    client.on_message = on_message
-    client.on_publish = on_publish
 
     client.username_pw_set(username="vscp", password="secret")
 
     #client.tls_set('root.ca', certfile='c1.crt', keyfile='c1.key')
-    client.connect("mqtt.vscp.org", 1883, 60)
 
-    client.subscribe("vscp/25:00:00:00:00:00:00:00:00:00:00:00:0D:02:00:01/20/3/#", 0) // ON
-    client.subscribe("vscp/25:00:00:00:00:00:00:00:00:00:00:00:0D:02:00:01/20/4/#", 0) // OFF
+    subscriber = vscp_subscriber.Subscriber(client, workers=4, queue_size=1000,
+                                            policy=vscp_subscriber.POLICY_BLOCK)
+    subscriber.route("vscp/{}/20/3/#".format(guid), on_on)     # ON
+    subscriber.route("vscp/{}/20/4/#".format(guid), on_off)    # OFF
+    subscriber.route("vscp/+/1040/#", on_event)                # Measurements
 
-    while client.loop() == 0:
-      pass
+    client.connect("mqtt.vscp.org", 1883, 60)
+    subscriber.start()
+
+    try:
+        while True:
+            time.sleep(stats_interval)
+            s = subscriber.stats()
+            print("received %d (%.1f/s) handled %d (%.1f/s) dropped %d queued %d errors %d" %
+                  (s["received"], s["received_rate"], s["handled"], s["handled_rate"],
+                   s["dropped"], s["queued"], s["decode_errors"] + s["handler_errors"]))
+    except KeyboardInterrupt:
+        pass
+
+    subscriber.stop()
+    client.disconnect()
 
 # vi: set fileencoding=utf-8 :
@@ -35,10 +35,12 @@ import smbus
 import vscp
 import vscp_class as vc
 import vscp_type as vt
+import vscp_mqtt
+import vscp_payload
 
-BMP180_CHIP_ID = 0x55 // 85
-BMP280_CHIP_ID = 0x58 // 88
-BME280_CHIP_ID = 0x60 // 96
+BMP180_CHIP_ID = 0x55  # 85
+BMP280_CHIP_ID = 0x58  # 88
+BME280_CHIP_ID = 0x60  # 96
 BME280_SOFT_RESET_VAL = 0x86
 
 DEVICE = 0x76  # Default device I2C address
@@ -84,6 +86,29 @@ password = "secret"
 #   %type% is replaced with event type
 topic = "vscp/{xguid}/{xclass}/{xtype}/{xsensorindex}"
 
+# How the events of one reading are published
+#   single    - One MQTT message per event
+#   pipelined - One MQTT message per event, sent with QoS 1 and
+#               the acknowledges collected together
+#   combined  - One MQTT message on topic_batch with all events
+#               in a JSON array
+batch = "single"
+
+# Serializer for the event payloads (see bench_vscp_payload.py)
+#   json    - Prebuilt JSON text, fastest for these payloads
+#   orjson  - orjson module if installed
+#   msgpack - msgpack encoded instead of JSON text, if installed
+#   auto    - orjson if installed otherwise json
+json_backend = "json"
+
+# MQTT topic for combined batches
+#   {xguid} is replaced with the GUID of the module
+topic_batch = "vscp/{xguid}/batch"
+
+# Comma separated topic prefixes that get events as standard VSCP
+# binary frames instead of JSON. The longest matching prefix wins.
+binary_topics = ""
+
 # Sensor index for sensors (BME280)
 # Default is to use GUID to identify sensor
 sensorindex_temperature = 0
@@ -118,6 +143,18 @@ note_dewpoint = "Dewpoint from BME280"
 # Configuration will be read from path set here
 cfgpath = ""
 
+# Keep running and publish a new reading set every
+# 'interval' seconds instead of publishing once and exit
+bDaemon = False
+
+# Seconds between readings in daemon mode
+interval = 60
+
+# Standby time in ms between measurements when the sensor
+# runs in normal mode (daemon). One of 0.5, 10, 20, 62.5,
+# 125, 250, 500, 1000
+standby = 1000
+
 # ----------------------------------------------------------------------------------------
 
 config = configparser.ConfigParser()
@@ -127,11 +164,13 @@ bus = smbus.SMBus(1)  # Rev 2 Pi, Pi 2 & Pi 3 uses bus 1
 
 
 def usage():
-    print("usage: mqtt-bm280.py -v -c <pat-to-config-file> -h ")
+    print("usage: mqtt-bm280.py -v -c <pat-to-config-file> -d -i <seconds> -h ")
     print("---------------------------------------------")
-    print("-h/--help    - This text.")
-    print("-v/--verbose - Print output also to screen.")
-    print("-c/--config  - Path to configuration file.")
+    print("-h/--help     - This text.")
+    print("-v/--verbose  - Print output also to screen.")
+    print("-c/--config   - Path to configuration file.")
+    print("-d/--daemon   - Keep running and publish readings continuously.")
+    print("-i/--interval - Seconds between readings in daemon mode.")
 
 
 def getShort(data, index):
@@ -165,28 +204,36 @@ def readBME280ID(addr=DEVICE):
   return (chip_id, chip_version)
 
 
-def readBME280All(addr=DEVICE):
-  # Register Addresses
-  REG_DATA = 0xF7
-  REG_CONTROL = 0xF4
-  REG_CONFIG = 0xF5
-
-  REG_CONTROL_HUM = 0xF2
-  REG_HUM_MSB = 0xFD
-  REG_HUM_LSB = 0xFE
-
-  # Oversample setting - page 27
-  OVERSAMPLE_TEMP = 2
-  OVERSAMPLE_PRES = 2
-  MODE = 1
-
-  # Oversample setting for humidity register - page 26
-  OVERSAMPLE_HUM = 2
-  bus.write_byte_data(addr, REG_CONTROL_HUM, OVERSAMPLE_HUM)
+# Register Addresses
+REG_DATA = 0xF7
+REG_CONTROL = 0xF4
+REG_CONFIG = 0xF5
+REG_CONTROL_HUM = 0xF2
 
-  control = OVERSAMPLE_TEMP << 5 | OVERSAMPLE_PRES << 2 | MODE
-  bus.write_byte_data(addr, REG_CONTROL, control)
+# Oversample setting - page 27
+OVERSAMPLE_TEMP = 2
+OVERSAMPLE_PRES = 2
+
+# Oversample setting for humidity register - page 26
+OVERSAMPLE_HUM = 2
+
+# Sensor modes - page 15
+MODE_SLEEP = 0
+MODE_FORCED = 1
+MODE_NORMAL = 3
+
+# Standby time in ms to t_sb register value - page 28
+STANDBY_CODES = { 0.5: 0, 62.5: 1, 125: 2, 250: 3, 500: 4, 1000: 5, 10: 6, 20: 7 }
+
+# Wait in ms (Datasheet Appendix B: Measurement time and current calculation)
+wait_time = 1.25 + (2.3 * OVERSAMPLE_TEMP) + ((2.3 *
+                    OVERSAMPLE_PRES) + 0.575) + ((2.3 * OVERSAMPLE_HUM)+0.575)
 
+# Calibration data is read once from the sensor EEPROM
+calibration = None
+
+
+def readBME280Calibration(addr=DEVICE):
   # Read blocks of calibration data from EEPROM
   # See Page 22 data sheet
   cal1 = bus.read_i2c_block_data(addr, 0x88, 24)
@@ -222,11 +269,43 @@ def readBME280All(addr=DEVICE):
 
   dig_H6 = getChar(cal3, 6)
 
-  # Wait in ms (Datasheet Appendix B: Measurement time and current calculation)
-  wait_time = 1.25 + (2.3 * OVERSAMPLE_TEMP) + ((2.3 *
-                      OVERSAMPLE_PRES) + 0.575) + ((2.3 * OVERSAMPLE_HUM)+0.575)
+  return (dig_T1, dig_T2, dig_T3,
+          dig_P1, dig_P2, dig_P3, dig_P4, dig_P5, dig_P6, dig_P7, dig_P8, dig_P9,
+          dig_H1, dig_H2, dig_H3, dig_H4, dig_H5, dig_H6)
+
+
+def setBME280Mode(addr=DEVICE, mode=MODE_FORCED, standby_ms=1000):
+  # Config can only be written reliably in sleep mode - page 27
+  if MODE_NORMAL == mode:
+    bus.write_byte_data(addr, REG_CONTROL, MODE_SLEEP)
+    bus.write_byte_data(addr, REG_CONFIG, STANDBY_CODES[standby_ms] << 5)
+
+  bus.write_byte_data(addr, REG_CONTROL_HUM, OVERSAMPLE_HUM)
+
+  control = OVERSAMPLE_TEMP << 5 | OVERSAMPLE_PRES << 2 | mode
+  bus.write_byte_data(addr, REG_CONTROL, control)
+
+
+def readBME280All(addr=DEVICE):
+  # Trigger one measurement in forced mode and read it
+  setBME280Mode(addr, MODE_FORCED)
+
   time.sleep(wait_time/1000)  # Wait the required time
 
+  return readBME280Data(addr)
+
+
+def readBME280Data(addr=DEVICE):
+  # Read the latest measurement. In normal mode the sensor keeps
+  # measuring by itself so this is all that is needed for a reading
+  global calibration
+  if calibration is None:
+    calibration = readBME280Calibration(addr)
+
+  (dig_T1, dig_T2, dig_T3,
+   dig_P1, dig_P2, dig_P3, dig_P4, dig_P5, dig_P6, dig_P7, dig_P8, dig_P9,
+   dig_H1, dig_H2, dig_H3, dig_H4, dig_H5, dig_H6) = calibration
+
   # Read temperature/pressure/humidity
   data = bus.read_i2c_block_data(addr, REG_DATA, 8)
   pres_raw = (data[0] << 12) | (data[1] << 4) | (data[2] >> 4)
@@ -276,8 +355,11 @@ def readBME280All(addr=DEVICE):
 args = sys.argv[1:]
 nargs = len(args)
 
+# Interval given on the command line overrides the configuration file
+interval_arg = None
+
 try:
-   opts, args = getopt.getopt(args, "hvc:", ["help", "verbose", "config="])
+   opts, args = getopt.getopt(args, "hvdc:i:", ["help", "verbose", "daemon", "config=", "interval="])
 except getopt.GetoptError:
    print("unrecognized format!")
    usage()
@@ -292,6 +374,10 @@ for opt, arg in opts:
       bVerbose = True
   elif opt in ("-c", "--config"):
       cfgpath = arg
+  elif opt in ("-d", "--daemon"):
+      bDaemon = True
+  elif opt in ("-i", "--interval"):
+      interval_arg = float(arg)
 
 if (len(cfgpath)):
 
@@ -305,6 +391,16 @@ if (len(cfgpath)):
 	      print('READING CONFIGURATION')
 	      print('---------------------')
 
+  if 'bDaemon' in config['GENERAL']:
+	  bDaemon = bDaemon or config.getboolean('GENERAL', 'bDaemon')
+	  if bVerbose:
+	    print("bDaemon =", bDaemon)
+
+  if 'interval' in config['GENERAL']:
+	  interval = float(config['GENERAL']['interval'])
+	  if bVerbose:
+	    print("interval =", interval)
+
 	# ----------------- VSCP -----------------
   if 'guid' in config['VSCP']:
 	  guid = config['VSCP']['guid']
@@ -418,6 +514,26 @@ if (len(cfgpath)):
 	  if bVerbose:
 	    print("topic =", password)
 
+  if 'batch' in config['MQTT']:
+	  batch = config['MQTT']['batch']
+	  if bVerbose:
+	    print("batch =", batch)
+
+  if 'json_backend' in config['MQTT']:
+	  json_backend = config['MQTT']['json_backend']
+	  if bVerbose:
+	    print("json_backend =", json_backend)
+
+  if 'topic_batch' in config['MQTT']:
+	  topic_batch = config['MQTT']['topic_batch']
+	  if bVerbose:
+	    print("topic_batch =", topic_batch)
+
+  if 'binary_topics' in config['MQTT']:
+	  binary_topics = config['MQTT']['binary_topics']
+	  if bVerbose:
+	    print("binary_topics =", binary_topics)
+
   if 'note_temperature' in config['MQTT']:
 	  note_temperature = config['MQTT']['note_temperature']
 	  if bVerbose:
@@ -473,6 +589,14 @@ if (len(cfgpath)):
 	  if bVerbose:
 	    print("height_at_location =", height_at_location)
 
+  if 'standby' in config['BME280']:
+	  standby = float(config['BME280']['standby'])
+	  if bVerbose:
+	    print("standby =", standby)
+
+if interval_arg is not None:
+  interval = interval_arg
+
 # -----------------------------------------------------------------------------
 
 # define message callback
@@ -513,234 +637,172 @@ def initEvent(ex,id,vscpClass,vscpType):
 	ex.head = vscp.VSCP_PRIORITY_NORMAL | vscp.VSCP_HEADER16_DUMB
 	g = vscp.guid()
 	if ("" == guid):
-	  g.setFromString(guid)
-	else :
 	  g.setGUIDFromMAC(id)
-	  ex.guid = g.guid
-	  ex.vscpclass = vscpClass
-	  ex.vscptype = vscpType
+	else :
+	  g.setFromString(guid)
+	ex.guid = g.guid
+	ex.vscpclass = vscpClass
+	ex.vscptype = vscpType
 	return g
 
 # -----------------------------------------------------------------------------
 
-# Read sensor id etc
-(chip_id, chip_version) = readBME280ID()
+# Topics are only formatted once for each guid/class/type/sensorindex
+topics = vscp_mqtt.TopicCache(topic)
+
+# Payloads are built from templates prepared for each measurement
+backend = vscp_payload.get_backend(json_backend)
+formats = vscp_payload.PayloadFormats.fromBinaryPrefixes(binary_topics)
+
+# A measurement holds its VSCP event and publish topic. Both are set up
+# once and reused so a new reading only fills in the value part.
+class Measurement:
+
+  def __init__(self, id, vscpType, sensorindex, unit, note, qos=0):
+    self.ex = vscp.vscpEventEx()
+    g = initEvent(self.ex, id, vc.VSCP_CLASS2_MEASUREMENT_STR, vscpType)
+    self.qos = qos
+    self.guid = g.getAsString()
+    self.topic = topics.get(self.guid, self.ex.vscpclass, self.ex.vscptype, sensorindex)
+    self.template = vscp_payload.MeasurementTemplate.fromEvent(self.ex, sensorindex, zone, subzone,
+                                                               unit, note, backend)
+
+  def publish(self, value, strvalue):
+    # Data is sensorindex, zone, subzone, unit + value string + terminating
+    # zero. The JSON payload also holds the note and extra measurement
+    # information, a binary frame only the event
+    if ( len(self.topic) ):
+      if publisher.is_binary(self.topic):
+        publisher.add(self.topic, self.template.frame(strvalue), self.qos)
+      else:
+        publisher.add(self.topic, self.template.dumps(value, strvalue), self.qos)
 
-if bVerbose :
-  print("-------------------------------------------------------------------------------")
-  print("Sending events...")
-  print( "Chip ID     : %d" % chip_id)
-  print( "Version     : %d" % chip_version)
+# -----------------------------------------------------------------------------
 
-temperature,pressure,humidity = readBME280All()
+measurement_temperature = Measurement(id_temperature, vt.VSCP_TYPE_MEASUREMENT_TEMPERATURE,
+                                      sensorindex_temperature, 1, note_temperature)      # Celsius
+measurement_humidity = Measurement(id_humidity, vt.VSCP_TYPE_MEASUREMENT_HUMIDITY,
+                                   sensorindex_humidity, 0, note_humidity)               # % of moisture
+measurement_pressure = Measurement(id_pressure, vt.VSCP_TYPE_MEASUREMENT_PRESSURE,
+                                   sensorindex_pressure, 0, note_pressure, qos=1)        # Pascal
+measurement_pressure_adj = Measurement(id_pressure_adj, vt.VSCP_TYPE_MEASUREMENT_PRESSURE,
+                                       sensorindex_pressure_adj, 0, note_pressure_adj)   # Pascal
+measurement_dewpoint = Measurement(id_dewpoint, vt.VSCP_TYPE_MEASUREMENT_DEWPOINT,
+                                   sensorindex_dewpoint, 1, note_dewpoint)               # Celsius
+
+publisher = vscp_mqtt.BatchPublisher(client, batch,
+                                     topic_batch.format(xguid=measurement_temperature.guid),
+                                     backend=backend, formats=formats)
 
-# -----------------------------------------------------------------------------
-#                           T E M P E R A T U R E
 # -----------------------------------------------------------------------------
 
-temperature_str = "{:0.2f}".format(temperature - temp_corr)
+def publishReadings(temperature, pressure, humidity):
 
-if bVerbose :
-	print( "Temperature : %0.2f C" % (temperature - temp_corr))
-
-ex = vscp.vscpEventEx()
-g = initEvent(ex, id_temperature, vc.VSCP_CLASS2_MEASUREMENT_STR, vt.VSCP_TYPE_MEASUREMENT_TEMPERATURE)
-
-# Size is predata + string length + terminating zero
-ex.sizedata = 4 + len(temperature_str) + 1
-ex.data[0] = sensorindex_temperature
-ex.data[1] = zone
-ex.data[2] = subzone
-ex.data[3] = 1  # unit is degrees Celsius
-b = temperature_str.encode()
-for idx in range(len(b)):
-  ex.data[idx + 4] = b[idx]
-ex.data[4 + len(temperature_str)] = 0  # optional terminating zero
-
-j = ex.toJSON()
-j["vscpNote"] = note_temperature
-# Add extra measurement information
-j["measurement"] = { 
-  "value" : temperature,
-  "unit" : 1,
-  "sensorindex" : sensorindex_temperature,
-  "zone" : zone,
-  "subzone" : subzone
-}
-
-ptopic = topic.format( xguid=g.getAsString(), xclass=ex.vscpclass, xtype=ex.vscptype, xsensorindex=sensorindex_temperature)
-if ( len(ptopic) ):
-  rv = client.publish(ptopic, json.dumps(j))
-  if 0 != rv[0] :
-    print("Failed to pressure rv=", rv)
+  # ---------------------------------------------------------------------------
+  #                         T E M P E R A T U R E
+  # ---------------------------------------------------------------------------
 
-# -----------------------------------------------------------------------------
-#                             H U M I D I T Y
-# -----------------------------------------------------------------------------
+  if bVerbose :
+    print( "Temperature : %0.2f C" % (temperature - temp_corr))
+
+  measurement_temperature.publish(temperature, "{:0.2f}".format(temperature - temp_corr))
+
+  # ---------------------------------------------------------------------------
+  #                           H U M I D I T Y
+  # ---------------------------------------------------------------------------
+
+  if BME280_CHIP_ID == chip_id:
+
+    if bVerbose :
+      print( "Humidity : %f%%" % humidity)
 
-if BME280_CHIP_ID == chip_id:
+    measurement_humidity.publish(humidity, "{:0.0f}".format(humidity))
 
-  humidity_str = "{:0.0f}".format(humidity)
+  # ---------------------------------------------------------------------------
+  #                           P R E S S U R E
+  # ---------------------------------------------------------------------------
 
   if bVerbose :
-	  print( "Humidity : %f%%" % humidity)
-
-  ex = vscp.vscpEventEx()
-  initEvent(ex, id_humidity, vc.VSCP_CLASS2_MEASUREMENT_STR,vt.VSCP_TYPE_MEASUREMENT_HUMIDITY)
-
-  # Size is predata + string length + terminating zero
-  ex.sizedata = 4 + len(humidity_str) + 1
-  ex.data[0] = sensorindex_humidity
-  ex.data[1] = zone
-  ex.data[2] = subzone
-  ex.data[3] = 0  # default unit % of moisture
-  b = humidity_str.encode()
-  for idx in range(len(b)):
-    ex.data[idx + 4] = b[idx]
-  ex.data[4 + len(humidity_str)] = 0  # optional terminating zero
-
-  j = ex.toJSON()
-  j["vscpNote"] = note_humidity
-  # Add extra measurement information
-  j["measurement"] = { 
-    "value" : humidity,
-    "unit" : 0,
-    "sensorindex" : sensorindex_humidity,
-    "zone" : zone,
-    "subzone" : subzone
-  }
-
-  ptopic = topic.format( xguid=g.getAsString(), xclass=ex.vscpclass, xtype=ex.vscptype, xsensorindex=sensorindex_humidity)
-  if ( len(ptopic) ):
-    rv = client.publish(ptopic, json.dumps(j))
-    if 0 != rv[0] :
-        print("Failed to pressure rv=", rv)
+    print( "Pressure : %0.2f hPa" % pressure)
 
-# -----------------------------------------------------------------------------
-#                             P R E S S U R E
-# -----------------------------------------------------------------------------
+  measurement_pressure.publish(round(pressure,2), "{:0.2f}".format(pressure))
 
-pressure = pressure
-pressure_str = "{:0.2f}".format(pressure)
+  # ---------------------------------------------------------------------------
+  #                         Adjusted Pressure
+  # ---------------------------------------------------------------------------
 
-if bVerbose :
-  print( "Pressure : %0.2f hPa" % pressure)
-  print(pressure_str)
-
-ex = vscp.vscpEventEx()
-initEvent(ex, id_pressure, vc.VSCP_CLASS2_MEASUREMENT_STR,vt.VSCP_TYPE_MEASUREMENT_PRESSURE)
-
-# Size is predata + string length + terminating zero
-ex.sizedata = 4 + len(pressure_str) + 1
-ex.data[0] = sensorindex_pressure
-ex.data[1] = zone
-ex.data[2] = subzone
-ex.data[3] = 0  # default unit Pascal
-b = pressure_str.encode()
-for idx in range(len(b)):
-  ex.data[idx + 4] = b[idx]
-ex.data[4 + len(pressure_str)] = 0  # optional terminating zero
-
-j = ex.toJSON()
-j["vscpNote"] = note_pressure
-# Add extra pressure information
-j["measurement"] = { 
-  "value" : round(pressure,2),
-  "unit" : 0,
-  "sensorindex" : sensorindex_pressure,
-  "zone" : zone,
-  "subzone" : subzone
-}
-
-ptopic = topic.format( xguid=g.getAsString(), xclass=ex.vscpclass, xtype=ex.vscptype, xsensorindex=sensorindex_pressure)
-if ( len(ptopic) ):
-  rv = client.publish(ptopic, payload=json.dumps(j), qos=1)
-  if 0 != rv[0] :
-      print("Failed to pressure rv=", rv)
+  pressure_adj_str = "{:f}".format((pressure + height_at_location/8.3))
+
+  if bVerbose :
+    print( "Adjusted pressure : %0.2f hPa" % float(pressure_adj_str))
+
+  measurement_pressure_adj.publish(round(float(pressure_adj_str),2), pressure_adj_str)
+
+  # ---------------------------------------------------------------------------
+  #                             Dewpoint
+  # ---------------------------------------------------------------------------
+
+  if BME280_CHIP_ID == chip_id:
+
+    dewpoint = temperature - ((100 - humidity) / 5)
+
+    if bVerbose :
+      print( "Dewpoint : %f C" % dewpoint)
+
+    measurement_dewpoint.publish(float(dewpoint), "{:0.2f}".format(dewpoint))
+
+  # Send whatever is left of this reading and wait for acknowledges
+  failed = publisher.flush()
+  if failed :
+    print("Failed to publish", failed, "events")
 
-# -----------------------------------------------------------------------------
-#                           Adjusted Pressure
 # -----------------------------------------------------------------------------
 
-pressure_adj_str = "{:f}".format((pressure + height_at_location/8.3))
+# Read sensor id etc
+(chip_id, chip_version) = readBME280ID()
 
 if bVerbose :
-	print( "Adjusted pressure : %0.2f hPa" % float(pressure_adj_str))
-
-ex = vscp.vscpEventEx()
-initEvent(ex, id_pressure_adj, vc.VSCP_CLASS2_MEASUREMENT_STR, vt.VSCP_TYPE_MEASUREMENT_PRESSURE)
-
-# Size is predata + string length + terminating zero
-ex.sizedata = 4 + len(pressure_adj_str) + 1
-ex.data[0] = sensorindex_pressure_adj
-ex.data[1] = zone
-ex.data[2] = subzone
-ex.data[3] = 0  # default unit Pascal
-b = pressure_adj_str.encode()
-for idx in range(len(b)):
-  ex.data[idx + 4] = b[idx]
-ex.data[4 + len(pressure_adj_str)] = 0  # optional terminating zero
-
-j = ex.toJSON()
-j["vscpNote"] = note_pressure_adj
-# Add extra pressure information
-j["measurement"] = {
-  "value" : round(float(float(pressure_adj_str)),2),
-  "unit" : 0,
-  "sensorindex" : sensorindex_pressure_adj,
-  "zone" : zone,
-  "subzone" : subzone
-}
-
-#print(json.dumps(j))
-ptopic = topic.format( xguid=g.getAsString(), xclass=ex.vscpclass, xtype=ex.vscptype, xsensorindex=sensorindex_pressure_adj)
-if ( len(ptopic) ):
-  rv = client.publish(ptopic, json.dumps(j))
-  if 0 != rv[0] :
-      print("Failed to send sea level pressure rv=", rv)
+  print("-------------------------------------------------------------------------------")
+  print("Sending events...")
+  print( "Chip ID     : %d" % chip_id)
+  print( "Version     : %d" % chip_version)
 
-# -----------------------------------------------------------------------------
-#                               Dewpoint
-# -----------------------------------------------------------------------------
+if bDaemon :
 
-if BME280_CHIP_ID == chip_id:
+  if standby not in STANDBY_CODES:
+    print("Invalid standby time", standby, "valid values are", sorted(STANDBY_CODES))
+    sys.exit(2)
 
-  dewpoint = temperature - ((100 - humidity) / 5)
-  dewpoint_str = "{:0.2f}".format(dewpoint)
+  # Let the sensor measure continuously by itself and just pick up
+  # the latest values at each interval
+  setBME280Mode(DEVICE, MODE_NORMAL, standby)
+  time.sleep(wait_time/1000)
 
   if bVerbose :
-	  print( "Dewpoint : %f C" % dewpoint)
-
-  ex = vscp.vscpEventEx()
-  initEvent(ex, id_dewpoint, vc.VSCP_CLASS2_MEASUREMENT_STR,vt.VSCP_TYPE_MEASUREMENT_DEWPOINT)
-
-  # Size is predata + string length + terminating zero
-  ex.sizedata = 4 + len(dewpoint) + 1
-  ex.data[0] = sensorindex_dewpoint
-  ex.data[1] = zone
-  ex.data[2] = subzone
-  ex.data[3] = 0  # default unit Pascal
-  b = pressure_str.encode()
-  for idx in range(len(b)):
-    ex.data[idx + 4] = b[idx]
-  ex.data[4 + len(dewpoint)] = 0  # optional terminating zero
-
-  j = ex.toJSON()
-  j["vscpNote"] = note_dewpoint
-  # Add extra pressure information
-  j["measurement"] = {
-    "value" : float(dewpoint),
-    "unit" : 0,
-    "sensorindex" : sensorindex_dewpoint,
-    "zone" : zone,
-    "subzone" : subzone
-  }
-
-  ptopic = topic.format( xguid=g.getAsString(), xclass=ex.vscpclass, xtype=ex.vscptype, xsensorindex=sensorindex_dewpoint)
-  if ( len(ptopic) ):
-    rv = client.publish(ptopic, json.dumps(j))
-    if 0 != rv[0] :
-        print("Failed to pressure rv=", rv)
+    print("Daemon mode, publishing every %0.1f s" % interval)
+
+  next_reading = time.monotonic()
+  try:
+    while True:
+      temperature,pressure,humidity = readBME280Data()
+      publishReadings(temperature, pressure, humidity)
+
+      next_reading += interval
+      delay = next_reading - time.monotonic()
+      if delay > 0:
+        time.sleep(delay)
+      else:
+        # Fell behind, don't try to catch up with a burst
+        next_reading = time.monotonic()
+  except KeyboardInterrupt:
+    pass
+
+  setBME280Mode(DEVICE, MODE_SLEEP)
+
+else :
+
+  temperature,pressure,humidity = readBME280All()
+  publishReadings(temperature, pressure, humidity)
 
 # -----------------------------------------------------------------------------
 
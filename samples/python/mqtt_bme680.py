@@ -27,6 +27,8 @@ import bme680
 import vscp
 import vscp_class as vc
 import vscp_type as vt
+import vscp_mqtt
+import vscp_payload
 
 
 try:
@@ -89,6 +91,29 @@ password = "secret"
 #   %type% is replaced with event type
 topic = "vscp/{xguid}/{xclass}/{xtype}/{xsensorindex}"
 
+# How the events of one reading are published
+#   single    - One MQTT message per event
+#   pipelined - One MQTT message per event, sent with QoS 1 and
+#               the acknowledges collected together
+#   combined  - One MQTT message on topic_batch with all events
+#               in a JSON array
+batch = "single"
+
+# Serializer for the event payloads (see bench_vscp_payload.py)
+#   json    - Prebuilt JSON text, fastest for these payloads
+#   orjson  - orjson module if installed
+#   msgpack - msgpack encoded instead of JSON text, if installed
+#   auto    - orjson if installed otherwise json
+json_backend = "json"
+
+# MQTT topic for combined batches
+#   {xguid} is replaced with the GUID of the module
+topic_batch = "vscp/{xguid}/batch"
+
+# Comma separated topic prefixes that get events as standard VSCP
+# binary frames instead of JSON. The longest matching prefix wins.
+binary_topics = ""
+
 # Sensor index for sensors (BME280)
 # Default is to use GUID to identify sensor
 sensorindex_temperature = 0
@@ -127,17 +152,26 @@ note_gas = "Gas value from BME-680"
 # Configuration will be read from path set here
 cfgpath = ""
 
+# Keep running and publish a new reading set every
+# 'interval' seconds instead of publishing once and exit
+bDaemon = False
+
+# Seconds between readings in daemon mode
+interval = 60
+
 # ----------------------------------------------------------------------------------------
 
 config = configparser.ConfigParser()
 
 
 def usage():
-    print("usage: mqtt-bm680.py -v -c <pat-to-config-file> -h ")
+    print("usage: mqtt-bm680.py -v -c <pat-to-config-file> -d -i <seconds> -h ")
     print("---------------------------------------------")
-    print("-h/--help    - This text.")
-    print("-v/--verbose - Print output also to screen.")
-    print("-c/--config  - Path to configuration file.")
+    print("-h/--help     - This text.")
+    print("-v/--verbose  - Print output also to screen.")
+    print("-c/--config   - Path to configuration file.")
+    print("-d/--daemon   - Keep running and publish readings continuously.")
+    print("-i/--interval - Seconds between readings in daemon mode.")
 
 
 # ----------------------------------------------------------------------------
@@ -145,8 +179,11 @@ def usage():
 args = sys.argv[1:]
 nargs = len(args)
 
+# Interval given on the command line overrides the configuration file
+interval_arg = None
+
 try:
-   opts, args = getopt.getopt(args, "hvc:", ["help", "verbose", "config="])
+   opts, args = getopt.getopt(args, "hvdc:i:", ["help", "verbose", "daemon", "config=", "interval="])
 except getopt.GetoptError:
    print("unrecognized format!")
    usage()
@@ -161,6 +198,10 @@ for opt, arg in opts:
       bVerbose = True
   elif opt in ("-c", "--config"):
       cfgpath = arg
+  elif opt in ("-d", "--daemon"):
+      bDaemon = True
+  elif opt in ("-i", "--interval"):
+      interval_arg = float(arg)
 
 if (len(cfgpath)):
 
@@ -174,6 +215,16 @@ if (len(cfgpath)):
 	      print('READING CONFIGURATION')
 	      print('---------------------')
 
+  if 'bDaemon' in config['GENERAL']:
+	  bDaemon = bDaemon or config.getboolean('GENERAL', 'bDaemon')
+	  if bVerbose:
+	    print("bDaemon =", bDaemon)
+
+  if 'interval' in config['GENERAL']:
+	  interval = float(config['GENERAL']['interval'])
+	  if bVerbose:
+	    print("interval =", interval)
+
 	# ----------------- VSCP -----------------
   if 'guid' in config['VSCP']:
 	  guid = config['VSCP']['guid']
@@ -287,6 +338,26 @@ if (len(cfgpath)):
 	  if bVerbose:
 	    print("topic =", password)
 
+  if 'batch' in config['MQTT']:
+	  batch = config['MQTT']['batch']
+	  if bVerbose:
+	    print("batch =", batch)
+
+  if 'json_backend' in config['MQTT']:
+	  json_backend = config['MQTT']['json_backend']
+	  if bVerbose:
+	    print("json_backend =", json_backend)
+
+  if 'topic_batch' in config['MQTT']:
+	  topic_batch = config['MQTT']['topic_batch']
+	  if bVerbose:
+	    print("topic_batch =", topic_batch)
+
+  if 'binary_topics' in config['MQTT']:
+	  binary_topics = config['MQTT']['binary_topics']
+	  if bVerbose:
+	    print("binary_topics =", binary_topics)
+
   if 'note_temperature' in config['MQTT']:
 	  note_temperature = config['MQTT']['note_temperature']
 	  if bVerbose:
@@ -342,6 +413,9 @@ if (len(cfgpath)):
 	  if bVerbose:
 	    print("height_at_location =", height_at_location)
 
+if interval_arg is not None:
+  interval = interval_arg
+
 # -----------------------------------------------------------------------------
 
 # define message callback
@@ -382,24 +456,73 @@ def initEvent(ex,id,vscpClass,vscpType):
 	ex.head = vscp.VSCP_PRIORITY_NORMAL | vscp.VSCP_HEADER16_DUMB
 	g = vscp.guid()
 	if ("" == guid):
-	  g.setFromString(guid)
-	else :
 	  g.setGUIDFromMAC(id)
-	  ex.guid = g.guid
-	  ex.vscpclass = vscpClass
-	  ex.vscptype = vscpType
+	else :
+	  g.setFromString(guid)
+	ex.guid = g.guid
+	ex.vscpclass = vscpClass
+	ex.vscptype = vscpType
 	return g
 
 # -----------------------------------------------------------------------------
 
-# Read sensor id etc
-#(chip_id, chip_version) = readBME280ID()
+# Topics are only formatted once for each guid/class/type/sensorindex
+topics = vscp_mqtt.TopicCache(topic)
+
+# Payloads are built from templates prepared for each measurement
+backend = vscp_payload.get_backend(json_backend)
+formats = vscp_payload.PayloadFormats.fromBinaryPrefixes(binary_topics)
+
+# A measurement holds its VSCP event and publish topic. Both are set up
+# once and reused so a new reading only fills in the value part.
+class Measurement:
+
+  def __init__(self, id, vscpType, sensorindex, unit, note, qos=0):
+    self.ex = vscp.vscpEventEx()
+    g = initEvent(self.ex, id, vc.VSCP_CLASS2_MEASUREMENT_STR, vscpType)
+    self.qos = qos
+    self.guid = g.getAsString()
+    self.topic = topics.get(self.guid, self.ex.vscpclass, self.ex.vscptype, sensorindex)
+    self.template = vscp_payload.MeasurementTemplate.fromEvent(self.ex, sensorindex, zone, subzone,
+                                                               unit, note, backend)
+
+  def publish(self, value, strvalue):
+    # Data is sensorindex, zone, subzone, unit + value string + terminating
+    # zero. The JSON payload also holds the note and extra measurement
+    # information, a binary frame only the event
+    if ( len(self.topic) ):
+      if publisher.is_binary(self.topic):
+        publisher.add(self.topic, self.template.frame(strvalue), self.qos)
+      else:
+        publisher.add(self.topic, self.template.dumps(value, strvalue), self.qos)
 
-if bVerbose :
-  print("-------------------------------------------------------------------------------")
-  print("Sending events...")
+# -----------------------------------------------------------------------------
+
+measurement_temperature = Measurement(id_temperature, vt.VSCP_TYPE_MEASUREMENT_TEMPERATURE,
+                                      sensorindex_temperature, 1, note_temperature)      # Celsius
+measurement_humidity = Measurement(id_humidity, vt.VSCP_TYPE_MEASUREMENT_HUMIDITY,
+                                   sensorindex_humidity, 0, note_humidity)               # % of moisture
+measurement_pressure = Measurement(id_pressure, vt.VSCP_TYPE_MEASUREMENT_PRESSURE,
+                                   sensorindex_pressure, 0, note_pressure, qos=1)        # Pascal
+measurement_pressure_adj = Measurement(id_pressure_adj, vt.VSCP_TYPE_MEASUREMENT_PRESSURE,
+                                       sensorindex_pressure_adj, 0, note_pressure_adj)   # Pascal
+measurement_dewpoint = Measurement(id_dewpoint, vt.VSCP_TYPE_MEASUREMENT_DEWPOINT,
+                                   sensorindex_dewpoint, 1, note_dewpoint)               # Celsius
+
+publisher = vscp_mqtt.BatchPublisher(client, batch,
+                                     topic_batch.format(xguid=measurement_temperature.guid),
+                                     backend=backend, formats=formats)
+
+# -----------------------------------------------------------------------------
+
+def publishReadings():
+
+  if not sensor.get_sensor_data():
+    if bVerbose :
+      print("No new data from sensor")
+    return
 
-  if sensor.get_sensor_data():
+  if bVerbose :
     output = '{0:.2f} C,{1:.2f} hPa,{2:.3f} %RH'.format(
                 sensor.data.temperature,
                 sensor.data.pressure,
@@ -410,212 +533,96 @@ if bVerbose :
         gas = sensor.data.gas_resistance
         print('Gas: {0} Ohms'.format(gas))
 
-# -----------------------------------------------------------------------------
-#                           T E M P E R A T U R E
-# -----------------------------------------------------------------------------
+  # ---------------------------------------------------------------------------
+  #                         T E M P E R A T U R E
+  # ---------------------------------------------------------------------------
 
-temperature_str = "{:0.2f}".format(sensor.data.temperature - temp_corr)
-
-if bVerbose :
-	print( "Temperature : %0.2f C" % (sensor.data.temperature - temp_corr))
-
-ex = vscp.vscpEventEx()
-g = initEvent(ex, id_temperature, vc.VSCP_CLASS2_MEASUREMENT_STR, vt.VSCP_TYPE_MEASUREMENT_TEMPERATURE)
-
-# Size is predata + string length + terminating zero
-ex.sizedata = 4 + len(temperature_str) + 1
-ex.data[0] = sensorindex_temperature
-ex.data[1] = zone
-ex.data[2] = subzone
-ex.data[3] = 1  # unit is degrees Celsius
-b = temperature_str.encode()
-for idx in range(len(b)):
-  ex.data[idx + 4] = b[idx]
-ex.data[4 + len(temperature_str)] = 0  # optional terminating zero
-
-j = ex.toJSON()
-j["vscpNote"] = note_temperature
-# Add extra measurement information
-j["measurement"] = { 
-  "value" : sensor.data.temperature,
-  "unit" : 1,
-  "sensorindex" : sensorindex_temperature,
-  "zone" : zone,
-  "subzone" : subzone
-}
-
-ptopic = topic.format( xguid=g.getAsString(), xclass=ex.vscpclass, xtype=ex.vscptype, xsensorindex=sensorindex_temperature)
-if ( len(ptopic) ):
-  rv = client.publish(ptopic, json.dumps(j))
-  if 0 != rv[0] :
-    print("Failed to pressure rv=", rv)
+  if bVerbose :
+    print( "Temperature : %0.2f C" % (sensor.data.temperature - temp_corr))
 
-# -----------------------------------------------------------------------------
-#                             H U M I D I T Y
-# -----------------------------------------------------------------------------
+  measurement_temperature.publish(sensor.data.temperature,
+                                  "{:0.2f}".format(sensor.data.temperature - temp_corr))
 
-humidity_str = "{:0.0f}".format(sensor.data.humidity)
+  # ---------------------------------------------------------------------------
+  #                           H U M I D I T Y
+  # ---------------------------------------------------------------------------
 
-if bVerbose :
+  if bVerbose :
     print( "Humidity : %f%%" % sensor.data.humidity)
 
-ex = vscp.vscpEventEx()
-initEvent(ex, id_humidity, vc.VSCP_CLASS2_MEASUREMENT_STR,vt.VSCP_TYPE_MEASUREMENT_HUMIDITY)
-
-# Size is predata + string length + terminating zero
-ex.sizedata = 4 + len(humidity_str) + 1
-ex.data[0] = sensorindex_humidity
-ex.data[1] = zone
-ex.data[2] = subzone
-ex.data[3] = 0  # default unit % of moisture
-b = humidity_str.encode()
-for idx in range(len(b)):
-    ex.data[idx + 4] = b[idx]
-ex.data[4 + len(humidity_str)] = 0  # optional terminating zero
-
-j = ex.toJSON()
-j["vscpNote"] = note_humidity
-# Add extra measurement information
-j["measurement"] = { 
-    "value" : sensor.data.humidity,
-    "unit" : 0,
-    "sensorindex" : sensorindex_humidity,
-    "zone" : zone,
-    "subzone" : subzone
-}
-
-ptopic = topic.format( xguid=g.getAsString(), xclass=ex.vscpclass, xtype=ex.vscptype, xsensorindex=sensorindex_humidity)
-if ( len(ptopic) ):
-    rv = client.publish(ptopic, json.dumps(j))
-    if 0 != rv[0] :
-        print("Failed to pressure rv=", rv)
+  measurement_humidity.publish(sensor.data.humidity, "{:0.0f}".format(sensor.data.humidity))
 
-# -----------------------------------------------------------------------------
-#                             P R E S S U R E
-# -----------------------------------------------------------------------------
+  # ---------------------------------------------------------------------------
+  #                           P R E S S U R E
+  # ---------------------------------------------------------------------------
 
-pressure = sensor.data.pressure
-pressure_str = "{:0.2f}".format(sensor.data.pressure*100) 
+  if bVerbose :
+    print( "Pressure : %0.2f hPa" % sensor.data.pressure)
 
-if bVerbose :
-  print( "Pressure : %0.2f hPa" % sensor.data.pressure)
-  #print(pressure_str)
-
-ex = vscp.vscpEventEx()
-initEvent(ex, id_pressure, vc.VSCP_CLASS2_MEASUREMENT_STR,vt.VSCP_TYPE_MEASUREMENT_PRESSURE)
-
-# Size is predata + string length + terminating zero
-ex.sizedata = 4 + len(pressure_str) + 1
-ex.data[0] = sensorindex_pressure
-ex.data[1] = zone
-ex.data[2] = subzone
-ex.data[3] = 0  # default unit Pascal
-b = pressure_str.encode()
-for idx in range(len(b)):
-  ex.data[idx + 4] = b[idx]
-ex.data[4 + len(pressure_str)] = 0  # optional terminating zero
-
-j = ex.toJSON()
-j["vscpNote"] = note_pressure
-# Add extra pressure information
-j["measurement"] = { 
-  "value" : round(sensor.data.pressure*100,2),
-  "unit" : 0,
-  "sensorindex" : sensorindex_pressure,
-  "zone" : zone,
-  "subzone" : subzone
-}
-
-ptopic = topic.format( xguid=g.getAsString(), xclass=ex.vscpclass, xtype=ex.vscptype, xsensorindex=sensorindex_pressure)
-if ( len(ptopic) ):
-  rv = client.publish(ptopic, payload=json.dumps(j), qos=1)
-  if 0 != rv[0] :
-      print("Failed to pressure rv=", rv)
+  measurement_pressure.publish(round(sensor.data.pressure*100,2),
+                               "{:0.2f}".format(sensor.data.pressure*100))
 
-# -----------------------------------------------------------------------------
-#                           Adjusted Pressure
-# -----------------------------------------------------------------------------
+  # ---------------------------------------------------------------------------
+  #                         Adjusted Pressure
+  # ---------------------------------------------------------------------------
 
-pressure_adj = (sensor.data.pressure + height_at_location/8.3)*100
-pressure_adj_str = "{:0.2f}".format(pressure_adj)
+  pressure_adj = (sensor.data.pressure + height_at_location/8.3)*100
+  pressure_adj_str = "{:0.2f}".format(pressure_adj)
 
-if bVerbose :
+  if bVerbose :
     print("Height at location : ", height_at_location)
     print( "Adjusted pressure : %0.2f hPa" % (float(pressure_adj_str)/100))
 
-ex = vscp.vscpEventEx()
-initEvent(ex, id_pressure_adj, vc.VSCP_CLASS2_MEASUREMENT_STR, vt.VSCP_TYPE_MEASUREMENT_PRESSURE)
-
-# Size is predata + string length + terminating zero
-ex.sizedata = 4 + len(pressure_adj_str) + 1
-ex.data[0] = sensorindex_pressure_adj
-ex.data[1] = zone
-ex.data[2] = subzone
-ex.data[3] = 0  # default unit Pascal
-b = pressure_adj_str.encode()
-print(len(b),ex.sizedata,pressure_str,pressure_adj_str)
-for idx in range(len(b)):
-  ex.data[idx + 4] = b[idx]
-ex.data[4 + len(pressure_adj_str)] = 0  # optional terminating zero
-
-j = ex.toJSON()
-j["vscpNote"] = note_pressure_adj
-# Add extra pressure information
-j["measurement"] = {
-  "value" : round(float(float(pressure_adj_str)),2),
-  "unit" : 0,
-  "sensorindex" : sensorindex_pressure_adj,
-  "zone" : zone,
-  "subzone" : subzone
-}
-
-#print(json.dumps(j))
-ptopic = topic.format( xguid=g.getAsString(), xclass=ex.vscpclass, xtype=ex.vscptype, xsensorindex=sensorindex_pressure_adj)
-if ( len(ptopic) ):
-  rv = client.publish(ptopic, json.dumps(j))
-  if 0 != rv[0] :
-      print("Failed to send sea level pressure rv=", rv)
+  measurement_pressure_adj.publish(round(float(pressure_adj_str),2), pressure_adj_str)
 
-# -----------------------------------------------------------------------------
-#                               Dewpoint
-# -----------------------------------------------------------------------------
+  # ---------------------------------------------------------------------------
+  #                             Dewpoint
+  # ---------------------------------------------------------------------------
 
-dewpoint = sensor.data.temperature - ((100 - sensor.data.humidity) / 5)
-dewpoint_str = "{:0.2f}".format(dewpoint)
+  dewpoint = sensor.data.temperature - ((100 - sensor.data.humidity) / 5)
 
-if bVerbose :
+  if bVerbose :
     print( "Dewpoint : %f C" % dewpoint)
 
-ex = vscp.vscpEventEx()
-initEvent(ex, id_dewpoint, vc.VSCP_CLASS2_MEASUREMENT_STR,vt.VSCP_TYPE_MEASUREMENT_DEWPOINT)
-
-# Size is predata + string length + terminating zero
-ex.sizedata = 4 + len(dewpoint_str) + 1
-ex.data[0] = sensorindex_dewpoint
-ex.data[1] = zone
-ex.data[2] = subzone
-ex.data[3] = 0  # default unit Pascal
-b = pressure_str.encode()
-for idx in range(len(b)):
-    ex.data[idx + 4] = b[idx]
-ex.data[4 + len(dewpoint_str)] = 0  # optional terminating zero
-
-j = ex.toJSON()
-j["vscpNote"] = note_dewpoint
-# Add extra pressure information
-j["measurement"] = {
-    "value" : float(dewpoint),
-    "unit" : 0,
-    "sensorindex" : sensorindex_dewpoint,
-    "zone" : zone,
-    "subzone" : subzone
-}
-
-ptopic = topic.format( xguid=g.getAsString(), xclass=ex.vscpclass, xtype=ex.vscptype, xsensorindex=sensorindex_dewpoint)
-if ( len(ptopic) ):
-    rv = client.publish(ptopic, json.dumps(j))
-    if 0 != rv[0] :
-        print("Failed to pressure rv=", rv)
+  measurement_dewpoint.publish(float(dewpoint), "{:0.2f}".format(dewpoint))
+
+  # Send whatever is left of this reading and wait for acknowledges
+  failed = publisher.flush()
+  if failed :
+    print("Failed to publish", failed, "events")
+
+# -----------------------------------------------------------------------------
+
+if bVerbose :
+  print("-------------------------------------------------------------------------------")
+  print("Sending events...")
+
+if bDaemon :
+
+  # The BME680 has no normal mode. Each reading is a forced mode
+  # measurement started by get_sensor_data() but the MQTT connection,
+  # the configuration, the events and the topics are all kept between them.
+  if bVerbose :
+    print("Daemon mode, publishing every %0.1f s" % interval)
+
+  next_reading = time.monotonic()
+  try:
+    while True:
+      publishReadings()
+
+      next_reading += interval
+      delay = next_reading - time.monotonic()
+      if delay > 0:
+        time.sleep(delay)
+      else:
+        # Fell behind, don't try to catch up with a burst
+        next_reading = time.monotonic()
+  except KeyboardInterrupt:
+    pass
+
+else :
+
+  publishReadings()
 
 # -----------------------------------------------------------------------------
 
@@ -5,6 +5,7 @@ import binascii
 import os
 import sys
 from bluepy import btle
+import vscp_ble
 
 if os.getenv('C', '1') == '0':
     ANSI_RED = ''
@@ -23,6 +24,16 @@ else:
     ANSI_OFF = ANSI_CSI + '0m'
 
 
+# Text and unit for decoded values
+LABELS = {
+    "humidity": ("Relative humidity", "%"),
+    "temperature": ("Temperature", "C"),
+    "light": ("Ambient light", "lux"),
+    "uv": ("UV index", ""),
+    "voltage": ("Battery voltage", "V")
+}
+
+
 def dump_services(dev):
     services = sorted(dev.services, key=lambda s: s.hndStart)
     for s in services:
@@ -91,34 +102,14 @@ class ScanPrint(btle.DefaultDelegate):
                 print ('\t' + desc + ': \'' + ANSI_CYAN + val + ANSI_OFF + '\'')
             else:
                 print ('\t' + desc + ': <' + val + '>')
-        print('row data: ' + val)
-        if ( 28 == len(val) and 'aa4a' == val[8:12] ):
-            # Humidity
-            low = val[12:14]
-            high = val[14:16]
-            num = float(int(high,16)*256 + int(low,16))
-            num = num/10
-            print('Relative humidity: ' + str(num) +'%')
-            #temp
-            low = val[16:18]
-            high = val[18:20]
-            num = float(int(high,16)*256 + int(low,16))
-            num = num/10
-            print('Temperature: ' + str(num) +'C')
-            # Light intensity
-            low = val[20:22]
-            high = val[22:24]
-            num = int(high,16)*256 + int(low,16)
-            num = num*2
-            print('Ambient light: ' + str(num) +'lux')
-            # UV index
-            low = val[24:26]
-            num = int(low,16)
-            print('UV index: ' + str(num) )
-            # Battery voltage
-            low = val[26:28]
-            num = float(int(low,16)) / 10
-            print('Battery voltage: ' + str(num) +'V\n')
+        decoded = vscp_ble.decode(dev.scanData)
+        if decoded is not None:
+            family, values = decoded
+            print('Detected ' + family)
+            for name, value in values:
+                label, unit = LABELS[name]
+                print(label + ': ' + str(value) + unit)
+            print('')
         else:
             print('Other data')
 
@@ -35,14 +35,27 @@
 
 from __future__ import print_function
 import argparse
+import asyncio
 import binascii
 import os
+import queue
 import sys
-from bluepy import btle
+import threading
+import time
+try:
+    from bluepy import btle
+except ImportError:
+    btle = None         # Only replay (--replay) works without bluepy
 from vscp import *
 from vscp_class import *
 from vscp_type import *
-import vscphelper
+try:
+    import vscphelper
+except ImportError:
+    vscphelper = None   # Only needed for the one-shot scan
+import vscp_ble
+import vscp_payload
+import vscp_tcpip
 
 # Credentials for the remote VSCP  Daemon
 VSCP_HOST = "192.168.1.7:9598"
@@ -102,13 +115,374 @@ def dump_services(dev):
                     break
 
 
-class ScanPrint(btle.DefaultDelegate):
+def new_event(guid, sensor, vscpclass, vscptype):
+    """Event with header, class/type and GUID set, last GUID byte is the sensor."""
+    ex = vscpEventEx()
+    ex.head = VSCP_PRIORITY_NORMAL | VSCP_HEADER16_DUMB
+    ex.obid = 0
+    ex.timestamp = 0
+    for pos in range(15):
+        ex.guid[pos] = guid[pos]
+    ex.guid[15] = sensor
+    ex.vscpclass = vscpclass
+    ex.vscptype = vscptype
+    return ex
+
+
+def set_measurement_string(ex, value):
+    """Patch the value of a string measurement event (data[0..3] stay as set)."""
+    b = value.encode()
+    ex.data[4:4 + len(b)] = b
+    ex.sizedata = 4 + len(b)
+
+
+class PuckEvents:
+    """The events of one SensorPuck.
+
+    Built the first time the puck is seen, an advertisement then only
+    patches the data bytes before the events are sent.
+    """
+
+    def __init__(self, addr):
+        # GUID based on Bluetooth MAC
+        self.guid = "FF:FF:FF:FF:FF:FF:FF:F8:" + addr.upper()
+        guid = [0xFF] * 7 + [0xF8] + [int(x, 16) for x in addr.split(':')] + [0x00]
+
+        self.rssi = new_event(guid, 0x08, VSCP_CLASS1_DATA, VSCP_TYPE_DATA_SIGNAL_QUALITY)
+        # data coding + unit (dBm) + sensor index
+        self.rssi.data[0] = VSCP_DATACODING_INTEGER + \
+            (0x02 << 3) + \
+            0x00
+        self.rssi.sizedata = 2
+
+        # Sensor index = 0, zone = 0, sub zone = 0, unit = 0 (default unit)
+        self.humidity = new_event(guid, 0x02, VSCP_CLASS2_MEASUREMENT_STR,
+                                  VSCP_TYPE_MEASUREMENT_HUMIDITY)
+        self.temperature = new_event(guid, 0x01, VSCP_CLASS2_MEASUREMENT_STR,
+                                     VSCP_TYPE_MEASUREMENT_TEMPERATURE)
+        self.light = new_event(guid, 0x03, VSCP_CLASS2_MEASUREMENT_STR,
+                               VSCP_TYPE_MEASUREMENT_ILLUMINANCE)
+        self.voltage = new_event(guid, 0x05, VSCP_CLASS2_MEASUREMENT_STR,
+                                 VSCP_TYPE_MEASUREMENT_ELECTRICAL_POTENTIAL)
+        for ex in (self.humidity, self.temperature, self.light, self.voltage):
+            for pos in range(4):
+                ex.data[pos] = 0
+
+        self.uv = new_event(guid, 0x04, VSCP_CLASS1_WEATHER, VSCP_TYPE_WEATHER_UV_INDEX)
+        self.uv.data[0] = 0     # Zone = 0
+        self.uv.data[1] = 0     # Sub Zone = 0
+        self.uv.sizedata = 3
+
+        self.events = {
+            "rssi": self.rssi,
+            "humidity": self.humidity,
+            "temperature": self.temperature,
+            "light": self.light,
+            "uv": self.uv,
+            "voltage": self.voltage
+        }
+
+    def set(self, name, value):
+        """Patch a value into its event and return the event."""
+        ex = self.events[name]
+        if "rssi" == name:
+            ex.data[1] = value & 0xff       # One byte data value
+        elif "uv" == name:
+            ex.data[2] = value              # UV Index 0-15
+        else:
+            set_measurement_string(ex, str(value))
+        return ex
+
+
+# Prebuilt events for each puck seen, keyed by MAC address
+pucks = {}
+
+def get_puck(addr):
+    puck = pucks.get(addr)
+    if puck is None:
+        puck = pucks[addr] = PuckEvents(addr)
+    return puck
+
+
+# Quantities sent for a puck, index into the change detector state
+QUANTITIES = ("rssi", "humidity", "temperature", "light", "uv", "voltage")
+QUANTITY_INDEX = dict((q, i) for i, q in enumerate(QUANTITIES))
+
+# Text and unit when shown
+LABELS = {
+    "rssi": ("RSSI", " dBm"),
+    "humidity": ("Relative humidity", "%"),
+    "temperature": ("Temperature", "C"),
+    "light": ("Ambient light", "lux"),
+    "uv": ("UV index", ""),
+    "voltage": ("Battery voltage", "V")
+}
+
+# A value is sent again when it has moved more than this since last sent
+DEADBANDS = {
+    "rssi": 5,              # dBm
+    "humidity": 1.0,        # %
+    "temperature": 0.2,     # C
+    "light": 20,            # lux
+    "uv": 0,                # any change
+    "voltage": 0.1          # V
+}
+
+
+def parse_deadbands(text):
+    """Default deadbands updated from 'quantity=value,...'."""
+    deadbands = dict(DEADBANDS)
+    for item in (text or "").split(","):
+        if not item.strip():
+            continue
+        name, _, value = item.partition("=")
+        name = name.strip()
+        if name not in deadbands:
+            raise ValueError("Unknown quantity '%s' (%s)" % (name, ", ".join(QUANTITIES)))
+        deadbands[name] = float(value)
+    return deadbands
+
+
+class ChangeFilter:
+    """Decide if a value of a puck should be sent.
+
+    A value is sent when it has moved more than its deadband since it was
+    last sent, but not more often than every min_interval seconds, and
+    always when heartbeat seconds have passed. The state is one flat
+    list per MAC address, last sent values followed by their send times.
+    """
+
+    def __init__(self, deadbands, min_interval, heartbeat):
+        self.deadbands = tuple(deadbands[q] for q in QUANTITIES)
+        self.min_interval = min_interval
+        self.heartbeat = heartbeat
+        self.state = {}
+
+    def changed(self, mac, quantity, value, now):
+        n = len(QUANTITIES)
+        st = self.state.get(mac)
+        if st is None:
+            st = self.state[mac] = [None] * n + [0.0] * n
+
+        last = st[quantity]
+        age = now - st[n + quantity]
+        if last is None or age >= self.heartbeat or \
+                (age >= self.min_interval and abs(value - last) > self.deadbands[quantity]):
+            st[quantity] = value
+            st[n + quantity] = now
+            return True
+        return False
+
+
+def send_event(ex):
+    rv = vscphelper.sendEventEx(h1, ex)
+    if VSCP_ERROR_SUCCESS != rv :
+        vscphelper.closeSession(h1)
+        raise ValueError('Command error: sendEventEx  Error code=%d' % rv )
+
+
+def scan_text(sdid, raw):
+    """Scan data value as text, the same way bluepy shows it."""
+    if sdid in [8, 9]:
+        return raw.decode('utf-8', 'replace')
+    return binascii.b2a_hex(raw).decode('ascii')
+
+
+def no_log(*args):
+    pass
+
+
+class HelperSender:
+    """Send each event right away on the vscphelper session."""
+
+    def add(self, ex):
+        send_event(ex)
+
+    def flush(self):
+        return 0
+
+    def close(self):
+        pass
+
+
+class TcpSender:
+    """Collect events and send them pipelined on one daemon connection.
+
+    Events are copied when added, the puck events are reused for the
+    next advertisement.
+    """
+
+    def __init__(self, host, port, user, password):
+        self.loop = asyncio.new_event_loop()
+        self.client = vscp_tcpip.Client(host, port, user, password)
+        self.loop.run_until_complete(self.client.connect())
+        self.connected = True
+        self.events = []
+        self.sent = 0
+        self.failed = 0
+
+    def add(self, ex):
+        self.events.append({
+            "vscpHead": ex.head,
+            "vscpClass": ex.vscpclass,
+            "vscpType": ex.vscptype,
+            "vscpGuid": vscp_payload.guid_to_string(ex.guid),
+            "vscpData": list(ex.data[:ex.sizedata])
+        })
+
+    def _reconnect(self):
+        self.loop.run_until_complete(self.client.close())
+        self.loop.run_until_complete(self.client.connect())
+        self.connected = True
+
+    def flush(self):
+        """Send the events added, the number that failed.
+
+        When the connection is lost the batch counts as failed and the
+        next flush connects again.
+        """
+        events = self.events
+        if not events:
+            return 0
+        self.events = []
+        try:
+            if not self.connected:
+                self._reconnect()
+            failed = self.loop.run_until_complete(self.client.send_many(events))
+            if self.client.reader.at_eof():
+                # send_many counts the replies lost with the connection as refused
+                print("Connection to the daemon closed")
+                self.connected = False
+        except (OSError, EOFError, asyncio.TimeoutError, vscp_tcpip.VscpTcpError) as e:
+            print("Sending to the daemon failed: %s" % e)
+            failed = len(events)
+            self.connected = False
+        self.sent += len(events) - failed
+        self.failed += failed
+        return failed
+
+    def close(self):
+        self.loop.run_until_complete(self.client.close())
+        self.loop.close()
+
+
+class ScanMetrics:
+    """Counters for the continuous scan pipeline."""
+
+    def __init__(self):
+        self.enqueued = 0
+        self.dropped = 0
+        self.max_depth = 0
+        self.processed = 0
+        self.batches = 0
+        self.errors = 0
+
+
+class ReplayDevice:
+    """The parts of a bluepy ScanEntry the delegate uses."""
+
+    addrType = "public"
+    connectable = False
+
+    def __init__(self, addr, rssi, scandata):
+        self.addr = addr
+        self.rssi = rssi
+        self.scanData = scandata
+
+
+class ReplayScanner:
+    """Feed a recording to the delegate the way btle.Scanner does.
+
+    speed 1 replays at the recorded pace, 10 ten times faster and 0 as
+    fast as the pipeline takes it. done is set at the end.
+    """
+
+    def __init__(self, path, speed=1.0):
+        self.records = vscp_ble.read_recording(path)
+        self.speed = speed
+        self.delegate = None
+        self.first = None
+        self.start_time = None
+        self.pending = None
+        self.done = False
+
+    def withDelegate(self, delegate):
+        self.delegate = delegate
+        return self
+
+    def clear(self):
+        pass
+
+    def start(self, passive=False):
+        self.start_time = time.monotonic()
+
+    def stop(self):
+        pass
+
+    def process(self, timeout=10):
+        end = time.monotonic() + timeout
+        while True:
+            if self.pending is None:
+                self.pending = next(self.records, None)
+                if self.pending is None:
+                    self.done = True
+                    return
+            t, addr, rssi, scandata = self.pending
+            if self.first is None:
+                self.first = t
+            if self.speed > 0:
+                due = self.start_time + (t - self.first) / self.speed
+                now = time.monotonic()
+                if due > end:
+                    time.sleep(max(0, end - now))
+                    return
+                if due > now:
+                    time.sleep(due - now)
+            self.pending = None
+            self.delegate.handleDiscovery(ReplayDevice(addr, rssi, scandata), False, True)
+            if self.speed <= 0 and time.monotonic() >= end:
+                return
 
-    def __init__(self, opts):
-        btle.DefaultDelegate.__init__(self)
+
+class ScanPrint(btle.DefaultDelegate if btle is not None else object):
+
+    def __init__(self, opts, sender=None, queue=None, recorder=None, block=False):
+        if btle is not None:
+            btle.DefaultDelegate.__init__(self)
         self.opts = opts
+        self.sender = sender if sender is not None else HelperSender()
+        self.queue = queue
+        self.recorder = recorder
+        self.block = block
+        self.metrics = ScanMetrics()
+        self.changes = ChangeFilter(parse_deadbands(opts.deadband),
+                                    opts.min_interval, opts.heartbeat)
 
     def handleDiscovery(self, dev, isNewDev, isNewData):
+        if self.recorder is not None:
+            self.recorder.write(dev.addr, dev.rssi, dev.scanData)
+
+        if dev.rssi < self.opts.sensitivity:
+            return
+
+        # Continuous scan, only hand the raw data over to the consumer.
+        # All advertisements are passed on, the change filter decides
+        # what is sent.
+        if self.queue is not None:
+            try:
+                if self.block:
+                    self.queue.put((dev.addr, dev.rssi, dict(dev.scanData)))
+                else:
+                    self.queue.put_nowait((dev.addr, dev.rssi, dict(dev.scanData)))
+            except queue.Full:
+                self.metrics.dropped += 1
+                return
+            self.metrics.enqueued += 1
+            depth = self.queue.qsize()
+            if depth > self.metrics.max_depth:
+                self.metrics.max_depth = depth
+            return
+
         if isNewDev:
             status = "new"
         elif isNewData:
@@ -120,9 +494,6 @@ class ScanPrint(btle.DefaultDelegate):
                 return
             status = "old"
 
-        if dev.rssi < self.opts.sensitivity:
-            return
-
         print('    Device (%s): %s (%s), %d dBm %s' %
                (status,
                    ANSI_WHITE + dev.addr + ANSI_OFF,
@@ -130,215 +501,173 @@ class ScanPrint(btle.DefaultDelegate):
                    dev.rssi,
                    ('' if dev.connectable else '(not connectable)'))
                )
-        for (sdid, desc, val) in dev.getScanData():
-            if sdid in [8, 9]:
-                print('\t' + desc + ': \'' + ANSI_CYAN + val + ANSI_OFF + '\'')
-            else:
-                print('\t' + desc + ': <' + val + '>')
-        print('\trow data: ' + val)
-        if ( 28 == len(val) and 'aa4a' == val[8:12] ):
-            ex = vscpEventEx()
-            print("\tDetected %s" % ANSI_GREEN + "SENSORPUCK" + ANSI_OFF )
-
-            # GUID based on Bluetooth MAC
-            guid_orig = "FF:FF:FF:FF:FF:FF:FF:F8:" + dev.addr.upper()
-            print('\t' + "GUID: %s" % guid_orig + ":00:00" )
-
-            # rssi
-            rssi = int(dev.rssi)
-            print('\t' + "RSSI: %d dBm" % rssi )
-            ex.head = VSCP_PRIORITY_NORMAL | VSCP_HEADER16_DUMB
-            ex.obid = 0
-            ex.timestamp = 0
-            guid_array = (guid_orig+':00:08').split(':')
-            pos = 0
-            for x in guid_array:
-                ex.guid[pos] = int(x,16)
-                pos += 1
-            ex.vscpclass = VSCP_CLASS1_DATA
-            ex.vscptype = VSCP_TYPE_DATA_SIGNAL_QUALITY
-            # data coding + unit (dBm) + sensor index
-            ex.data[0] = VSCP_DATACODING_INTEGER + \
-                (0x02 << 3) + \
-                0x00
-            ex.data[1] = rssi                      # One byte data value
-            ex.sizedata = 2
-            rv =vscphelper.sendEventEx(h1,ex)
-            if VSCP_ERROR_SUCCESS != rv :
-                vscphelper.closeSession(h1)
-                raise ValueError('Command error: sendEventEx  Error code=%d' % rv )
-            print("\t\tSent RSSI event")
-            guid_array = (guid_orig+':00:01').split(':')
-            pos = 0
-            for x in guid_array:
-                ex.guid[pos] = int(x,16)
-                pos += 1
-
-            # Humidity
-            low = val[12:14]
-            high = val[14:16]
-            humidity = float(int(high,16)*256 + int(low,16))
-            humidity = humidity/10
-            print('\t' + 'Relative humidity: ' + str(humidity) +'%')
-            ex.head = VSCP_PRIORITY_NORMAL | VSCP_HEADER16_DUMB
-            ex.obid = 0
-            ex.timestamp = 0
-            guid_array = (guid_orig+':00:02').split(':')
-            pos = 0
-            for x in guid_array:
-                ex.guid[pos] = int(x,16)
-                pos += 1
-            ex.vscpclass = VSCP_CLASS2_MEASUREMENT_STR
-            ex.vscptype = VSCP_TYPE_MEASUREMENT_HUMIDITY
-            # unit = 0, sensor index = 0
-            ex.data[0] = 0  # Sensor index
-            ex.data[1] = 0  # Zone = 0
-            ex.data[2] = 0  # Sub Zone = 0
-            ex.data[3] = 0  # Unit = 0, Relative humidity in percent
-            humstr = str(humidity)
-            pos = 0
-            for c in humstr:
-                ex.data[pos+4] = ord(humstr[pos])
-                pos += 1
-            ex.sizedata = 4 + len(humstr)
-            rv =vscphelper.sendEventEx(h1,ex)
-            if VSCP_ERROR_SUCCESS != rv :
-                vscphelper.closeSession(h1)
-                raise ValueError('Command error: sendEventEx  Error code=%d' % rv )
-            print("\t\tSent humidity event.")
-
-
-            # temperature
-            low = val[16:18]
-            high = val[18:20]
-            temp = float(int(high,16)*256 + int(low,16))
-            temp = temp/10
-            print('\t' + 'Temperature: ' + str(temp) +'C')
-            ex.head = VSCP_PRIORITY_NORMAL | VSCP_HEADER16_DUMB
-            ex.obid = 0
-            ex.timestamp = 0
-            guid_array = (guid_orig+':00:01').split(':')
-            pos = 0
-            for x in guid_array:
-                ex.guid[pos] = int(x,16)
-                pos += 1
-            ex.vscpclass = VSCP_CLASS2_MEASUREMENT_STR
-            ex.vscptype = VSCP_TYPE_MEASUREMENT_TEMPERATURE
-            # unit = 0, sensor index = 0
-            ex.data[0] = 0  # Sensor index                         
-            ex.data[1] = 0  # Zone = 0
-            ex.data[2] = 0  # Sub Zone = 0
-            ex.data[3] = 0  # Unit = 0, Relative humidity in percent
-            tempstr = str(temp)
-            pos = 0
-            for c in tempstr:
-                ex.data[pos+4] = ord(tempstr[pos])
-                pos += 1
-            ex.sizedata = 4 + len(tempstr)
-            rv =vscphelper.sendEventEx(h1,ex)
-            if VSCP_ERROR_SUCCESS != rv :
-                vscphelper.closeSession(h1)
-                raise ValueError('Command error: sendEventEx  Error code=%d' % rv )
-            print("\t\tSent temperature event")
-
-            # Light intensity
-            low = val[20:22]
-            high = val[22:24]
-            lux = int(high,16)*256 + int(low,16)
-            lux = lux*2
-            print('\t' + 'Ambient light: ' + str(lux) +'lux')
-            ex.head = VSCP_PRIORITY_NORMAL | VSCP_HEADER16_DUMB
-            ex.obid = 0
-            ex.timestamp = 0
-            guid_array = (guid_orig+':00:03').split(':')
-            pos = 0
-            for x in guid_array:
-                ex.guid[pos] = int(x,16)
-                pos += 1
-            ex.vscpclass = VSCP_CLASS2_MEASUREMENT_STR
-            ex.vscptype = VSCP_TYPE_MEASUREMENT_ILLUMINANCE
-            # unit = 0, sensor index = 0
-            ex.data[0] = 0  # Sensor index
-            ex.data[1] = 0  # Zone = 0
-            ex.data[2] = 0  # Sub Zone = 0
-            ex.data[3] = 0  # Unit = 0, Relative humidity in percent
-            luxstr = str(lux)
-            pos = 0
-            for c in luxstr:
-                ex.data[pos+4] = ord(luxstr[pos])
-                pos += 1
-            ex.sizedata = 4 + len(luxstr)
-            rv =vscphelper.sendEventEx(h1,ex)
-            if VSCP_ERROR_SUCCESS != rv :
-                vscphelper.closeSession(h1)
-                raise ValueError('Command error: sendEventEx  Error code=%d' % rv )
-            print("\t\tSent light intensity event")
-
-
-            # UV index
-            low = val[24:26]
-            uv = int(low,16)
-            print('\tUV index: ' + str(uv) )
-            ex.head = VSCP_PRIORITY_NORMAL | VSCP_HEADER16_DUMB
-            ex.obid = 0
-            ex.timestamp = 0
-            guid_array = (guid_orig+':00:04').split(':')
-            pos = 0
-            for x in guid_array:
-                ex.guid[pos] = int(x,16)
-                pos += 1
-            ex.vscpclass = VSCP_CLASS1_WEATHER
-            ex.vscptype = VSCP_TYPE_WEATHER_UV_INDEX
-            # unit = 0, sensor index = 0
-            ex.data[0] = 0   # Zone = 0
-            ex.data[1] = 0   # Sub Zone = 0
-            ex.data[2] = uv  # UV Index 0-15
-            ex.sizedata = 3
-            rv =vscphelper.sendEventEx(h1,ex)
-            if VSCP_ERROR_SUCCESS != rv :
-                pyvscphlp_closeSession(h1)
-                raise ValueError('Command error: sendEventEx  Error code=%d' % rv )
-            print("\t\tSent light intensity event")
-
-
-
-            # Battery voltage
-            low = val[26:28]
-            voltage = float(int(low,16)) / 10
-            print('\t' + 'Battery voltage: ' + str(voltage) +'V')
-            ex.head = VSCP_PRIORITY_NORMAL | VSCP_HEADER16_DUMB
-            ex.obid = 0
-            ex.timestamp = 0
-            guid_array = (guid_orig+':00:05').split(':')
-            pos = 0
-            for x in guid_array:
-                ex.guid[pos] = int(x,16)
-                pos += 1
-            ex.vscpclass = VSCP_CLASS2_MEASUREMENT_STR
-            ex.vscptype = VSCP_TYPE_MEASUREMENT_ELECTRICAL_POTENTIAL
-            # unit = 0, sensor index = 0
-            ex.data[0] = 0  # Sensor index
-            ex.data[1] = 0  # Zone = 0
-            ex.data[2] = 0  # Sub Zone = 0
-            ex.data[3] = 0  # Unit = 0, Relative humidity in percent
-            voltagestr = str(voltage)
-            pos = 0
-            for c in voltagestr:
-                ex.data[pos+4] = ord(voltagestr[pos])
-                pos += 1
-            ex.sizedata = 4 + len(voltagestr)
-            rv =vscphelper.sendEventEx(h1,ex)
-            if VSCP_ERROR_SUCCESS != rv :
-                vscphelper.closeSession(h1)
-                raise ValueError('Command error: sendEventEx  Error code=%d' % rv )
-            print("\t\tSent voltage event")
-        else:
-            print('\tUnknown data (Device unknown)')
+        self.decode(dev.addr, dev.rssi, dev.scanData, print)
 
         if not dev.scanData:
             print ('\t(no data)')
         print('')
 
+    def decode(self, addr, rssi, scandata, log=print):
+        """Decode the scan data of a device and send its events."""
+        if log is not no_log:
+            for sdid, raw in scandata.items():
+                desc = vscp_ble.AD_NAMES.get(sdid, hex(sdid))
+                if sdid in [8, 9]:
+                    log('\t' + desc + ': \'' + ANSI_CYAN + scan_text(sdid, raw) + ANSI_OFF + '\'')
+                else:
+                    log('\t' + desc + ': <' + scan_text(sdid, raw) + '>')
+
+        decoded = vscp_ble.decode(scandata)
+        if decoded is None:
+            log('\tUnknown data (Device unknown)')
+            return
+        family, values = decoded
+
+        puck = get_puck(addr)
+        log("\tDetected %s" % ANSI_GREEN + family.upper() + ANSI_OFF )
+        log('\t' + "GUID: %s" % puck.guid + ":00:00" )
+
+        changes = self.changes
+        sender = self.sender
+        now = time.monotonic()
+
+        for name, value in (("rssi", int(rssi)),) + values:
+            label, unit = LABELS[name]
+            log('\t%s: %s%s' % (label, value, unit))
+            if changes.changed(addr, QUANTITY_INDEX[name], value, now):
+                ex = puck.set(name, value)
+                sender.add(ex)
+                log("\t\tSent %s event" % label)
+
+
+class Consumer(threading.Thread):
+    """Decode queued advertisements and send their events in batches."""
+
+    def __init__(self, queue, delegate, batch, verbose):
+        threading.Thread.__init__(self, daemon=True)
+        self.queue = queue
+        self.delegate = delegate
+        self.batch = batch
+        self.log = print if verbose else no_log
+
+    def run(self):
+        q = self.queue
+        delegate = self.delegate
+        metrics = delegate.metrics
+        while True:
+            items = [q.get()]
+            while len(items) < self.batch:
+                try:
+                    items.append(q.get_nowait())
+                except queue.Empty:
+                    break
+
+            stop = False
+            for item in items:
+                if item is None:
+                    stop = True
+                    break
+                addr, rssi, scandata = item
+                self.log('    Device: %s, %d dBm' % (addr, rssi))
+                # A bad advertisement or a failed send must not stop the
+                # thread, the scanner would wait for it forever
+                try:
+                    delegate.decode(addr, rssi, scandata, self.log)
+                except Exception as e:
+                    print("Decoding advertisement from %s failed: %s" % (addr, e))
+                    metrics.errors += 1
+                metrics.processed += 1
+
+            try:
+                delegate.sender.flush()
+            except Exception as e:
+                print("Sending batch failed: %s" % e)
+                metrics.errors += 1
+            metrics.batches += 1
+            if stop:
+                break
+
+        # The sender and its event loop belong to this thread, it is
+        # closed here and not by the scanner
+        try:
+            delegate.sender.close()
+        except Exception as e:
+            print("Closing connection failed: %s" % e)
+
+
+def stop_consumer(q, consumer, timeout=5.0):
+    """Have the consumer finish what is queued, close the sender and end.
+
+    What is still queued after timeout seconds is thrown away. A consumer
+    that is still busy after that is left alone with its sender.
+    """
+    try:
+        q.put(None, timeout=timeout)
+    except queue.Full:
+        discarded = 0
+        while True:
+            try:
+                q.get_nowait()
+                discarded += 1
+            except queue.Empty:
+                break
+        print("Discarded %d queued advertisements" % discarded)
+        q.put_nowait(None)
+    consumer.join(timeout)
+    if consumer.is_alive():
+        print("Consumer did not finish in %g s" % timeout)
+
+
+def scan_continuous(arg):
+    """Scan until interrupted, decoding and sending on a consumer thread."""
+    q = queue.Queue(maxsize=arg.queue)
+    sender = TcpSender(arg.server, arg.port, arg.user, arg.password)
+    recorder = vscp_ble.Recorder(arg.record) if arg.record else None
+
+    # Replaying as fast as possible waits for the consumer instead of
+    # dropping advertisements
+    block = bool(arg.replay) and arg.speed <= 0
+    delegate = ScanPrint(arg, sender, q, recorder, block)
+    consumer = Consumer(q, delegate, arg.batch, arg.verbose)
+    consumer.start()
+
+    if arg.replay:
+        scanner = ReplayScanner(arg.replay, arg.speed).withDelegate(delegate)
+        print(ANSI_RED + "Replaying " + arg.replay + "..." + ANSI_OFF)
+    else:
+        scanner = btle.Scanner(arg.hci).withDelegate(delegate)
+        print(ANSI_RED + "Scanning for devices (continuous)..." + ANSI_OFF)
+    scanner.clear()
+    scanner.start()
+
+    metrics = delegate.metrics
+    next_stats = time.monotonic() + arg.stats
+    start = time.monotonic()
+    try:
+        while not getattr(scanner, 'done', False):
+            scanner.process(1.0)
+            if arg.stats and time.monotonic() >= next_stats:
+                next_stats += arg.stats
+                print("queue %d (max %d) enqueued %d dropped %d processed %d "
+                      "batches %d errors %d events sent %d failed %d" %
+                      (q.qsize(), metrics.max_depth, metrics.enqueued, metrics.dropped,
+                       metrics.processed, metrics.batches, metrics.errors, sender.sent,
+                       sender.failed))
+                metrics.max_depth = 0
+    except KeyboardInterrupt:
+        pass
+    finally:
+        scanner.stop()
+        stop_consumer(q, consumer)
+        if recorder is not None:
+            recorder.close()
+            print("Recorded %d advertisements to %s" % (recorder.count, arg.record))
+
+    elapsed = max(time.monotonic() - start, 1e-6)
+    print("%d advertisements (%d dropped) and %d events in %.1f s, %.0f adv/s %.0f events/s" %
+          (metrics.processed, metrics.dropped, sender.sent, elapsed,
+           metrics.processed / elapsed, sender.sent / elapsed))
+
 
 def main():
     global h1
@@ -346,7 +675,7 @@ def main():
     parser.add_argument('-i', '--hci', action='store', type=int, default=0,
             help='Interface number for scan')
     parser.add_argument('-t', '--timeout', action='store', type=int, default=4,
-            help='Scan delay, 0 for continuous')
+            help='Scan delay, 0 for continuous (decode and send on a worker thread, batched on one connection to --server)')
     parser.add_argument('-s', '--sensitivity', action='store', type=int, default=-128,
             help='dBm value for filtering far devices')
     parser.add_argument('-d', '--discover', action='store_true',
@@ -357,6 +686,13 @@ def main():
             help='Display only new adv responses, by default show new + updated')
     parser.add_argument('-v', '--verbose', action='store_true',
             help='Increase output verbosity')
+    parser.add_argument('-b', '--deadband', action='store', type=str, default='',
+            help='Change needed to send a value again, e.g. temperature=0.5,rssi=3 '
+                 '(quantities: ' + ', '.join(QUANTITIES) + ')')
+    parser.add_argument('-m', '--min-interval', action='store', type=float, default=10,
+            help='Min seconds between sends of a changed value (default: 10)')
+    parser.add_argument('-e', '--heartbeat', action='store', type=float, default=300,
+            help='Send values after this many seconds even if unchanged (default: 300)')
     parser.add_argument('-c', '--server', action='store', type=str, default='127.0.0.1',  
             help='VSCP server to connect to (default: 127.0.0.1)')
     parser.add_argument('-x', '--port', action='store', type=int, default=9598,
@@ -366,9 +702,33 @@ def main():
     parser.add_argument('-p', '--password', action='store', type=str, default='secret',
             help='Password to use for VSCP server (default: secret)')
 
+    parser.add_argument('-q', '--queue', action='store', type=int, default=1000,
+            help='Continuous scan: max advertisements waiting to be decoded (default: 1000)')
+    parser.add_argument('-k', '--batch', action='store', type=int, default=50,
+            help='Continuous scan: max advertisements per send batch (default: 50)')
+    parser.add_argument('-r', '--stats', action='store', type=int, default=60,
+            help='Continuous scan: seconds between queue statistics, 0 for none (default: 60)')
+    parser.add_argument('-w', '--record', action='store', type=str, default='',
+            help='Continuous scan: record all advertisements to this file')
+    parser.add_argument('-y', '--replay', action='store', type=str, default='',
+            help='Replay a recording instead of scanning (no Bluetooth adapter needed)')
+    parser.add_argument('-z', '--speed', action='store', type=float, default=1.0,
+            help='Replay speed, 1 as recorded, 10 ten times faster, 0 as fast as possible')
+
     arg = parser.parse_args(sys.argv[1:])
 
-    btle.Debugging = arg.verbose
+    if btle is not None:
+        btle.Debugging = arg.verbose
+    elif not arg.replay:
+        raise ValueError('bluepy is needed for scanning, only --replay works without it')
+
+    # Continuous scan sends on a connection of its own
+    if 0 == arg.timeout or arg.replay:
+        scan_continuous(arg)
+        return
+
+    if vscphelper is None:
+        raise ValueError('vscphelper is needed for the one-shot scan, use -t 0 for continuous')
 
     # New VSCP session
     h1 = vscphelper.newSession()
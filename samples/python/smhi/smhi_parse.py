@@ -1,38 +1,129 @@
-#! /usr/bin/python
+#!/usr/bin/env python3
 
 # https://forum.telldus.com/viewtopic.php?t=4135
+#
+# Print the SMHI temperature forecast for the next hours at a point
+#
+#   smhi_parse.py hours latitude longitude
+#
+# or send VSCP weather forecast events (CLASS1.WEATHER_FORECAST) for
+# several parameters and all locations in a locations file (see
+# vscp_forecast.py) in one pass. The event index is the number of hours
+# ahead.
+#
+#   smhi_parse.py hours --locations FILE [--params t,ws,pmean] [--host HOST]
+#
+# Without --host the events are printed.
 
-import urllib2
-import json
 import argparse
-from time import strftime, localtime
-from datetime import datetime, timedelta
+import os
+import sys
+from datetime import datetime, timedelta, timezone
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import vscp_forecast
+import vscp_httpcache
+import vscp_tcpip
 
 debug = True
 
+url_template = 'http://opendata-download-metfcst.smhi.se/api/category/pmp3g/version/2/geotype/point/lon/%s/lat/%s/data.json'
+
+# SMHI parameter -> forecast level
+levels = {
+    't': vscp_forecast.temperature_level,       # Air temperature (C)
+    'ws': vscp_forecast.wind_level,             # Wind speed (m/s)
+    'pmean': vscp_forecast.rain_level,          # Mean precipitation (mm/h)
+    'r': vscp_forecast.humidity_level,          # Relative humidity (%)
+    'tstm': vscp_forecast.thunder_level,        # Thunder probability (%)
+}
+
+
+def target_times(hours):
+    """validTime strings for the coming hours, validTime is UTC on the hour."""
+    start = datetime.now(timezone.utc).replace(minute=0, second=0, microsecond=0)
+    return [(start + timedelta(hours=i)).strftime("%Y-%m-%dT%H:00:00Z") for i in range(hours)]
+
+
+def index_forecast(j_obj):
+    """validTime -> {parameter name: value}."""
+    return {ts['validTime']: {p['name']: p['values'][0] for p in ts['parameters']}
+            for ts in j_obj['timeSeries']}
+
+
+def fetch_forecast(latitude, longitude, cache_ttl):
+    url = url_template % (longitude, latitude)
+    if debug:
+        print(url)
+    # SMHI updates the forecast hourly, repeated runs are served from the cache
+    return index_forecast(vscp_httpcache.default_cache().fetch_json(url, cache_ttl))
+
+
+def forecast_events(locations, params, targets, cache_ttl):
+    events = []
+    for loc in locations:
+        try:
+            index = fetch_forecast(loc.latitude, loc.longitude, cache_ttl)
+        except (OSError, ValueError, KeyError, vscp_httpcache.HttpError) as e:
+            print("No forecast for %s: %s" % (loc.name, e))
+            continue
+        for hour, t in enumerate(targets):
+            values = index.get(t)
+            if values is None:
+                continue
+            for name in params:
+                value = values.get(name)
+                if value is None:
+                    continue
+                level = levels[name](value)
+                if level is not None:
+                    events.append(vscp_forecast.forecast_event(loc.guid, level, loc.zone,
+                                                               loc.subzone, hour))
+    return events
+
+
 parser = argparse.ArgumentParser(description='Read temperature from SMHI')
 parser.add_argument('hours', type=int)
-parser.add_argument('latitude', type=float)
-parser.add_argument('longitude', type=float)
+parser.add_argument('latitude', type=float, nargs='?')
+parser.add_argument('longitude', type=float, nargs='?')
+parser.add_argument('--cache-ttl', type=int, default=1800,
+                    help='Use a cached forecast younger than this many seconds (default: 1800)')
+parser.add_argument('--locations', help='Send forecast events for the locations in this file')
+parser.add_argument('--params', default='t,ws',
+                    help='Comma separated SMHI parameters for forecast events, any of '
+                         + ','.join(sorted(levels)) + ' (default: t,ws)')
+parser.add_argument('--host', help='VSCP daemon to send forecast events to')
+parser.add_argument('--port', type=int, default=vscp_tcpip.DEFAULT_PORT)
+parser.add_argument('--user', default='admin')
+parser.add_argument('--password', default='secret')
 args = parser.parse_args()
-if debug:
-    print args.hours, args.longitude, args.latitude
 
-url = 'http://opendata-download-metfcst.smhi.se/api/category/pmp3g/version/2/geotype/point/lon/' + str(args.longitude) + '/lat/' +  str(args.latitude) + '/data.json'
-#
-#url = 'http://opendata-download-metfcst.smhi.se/api/category/pmp2g/version/1/geopoint/lat/%27+str%28args.latitude%29+%27/lon/%27+str%28args.longitude%29+%27/data.json'
-#url='http://opendata-download-metfcst.smhi.se/api/category/pmp1g/version/1/geopoint/lat/'+str(args.latitude)+'/lon/'+str(args.longitude)+'/data.json'
-if debug:
-    print url  
-j = urllib2.urlopen(url)
-j_obj = json.load(j)
-
-output = 'temperature'
-for predition_time in j_obj['timeSeries']:
-    for i in range(0, args.hours):
-        if predition_time['validTime'] == (datetime.now() + timedelta(hours=i)).strftime("%Y-%m-%dT%H:00:00Z"):
-            #output += ","+ str(predition_time['parameters'][1]['values'][0])
-            for parameter in predition_time['parameters']:
-                if parameter['name'] == 't':
-                    output += "," + str(parameter['values'][0])
-print output
+params = [p.strip() for p in args.params.split(',') if p.strip()]
+for p in params:
+    if p not in levels:
+        parser.error("Unknown parameter '%s'" % p)
+if args.locations is None and (args.latitude is None or args.longitude is None):
+    parser.error("latitude and longitude or --locations is needed")
+
+targets = target_times(args.hours)
+
+if args.locations is None:
+    if debug:
+        print(args.hours, args.longitude, args.latitude)
+    index = fetch_forecast(args.latitude, args.longitude, args.cache_ttl)
+    output = 'temperature'
+    for t in targets:
+        values = index.get(t)
+        if values is not None and 't' in values:
+            output += "," + str(values['t'])
+    print(output)
+else:
+    events = forecast_events(vscp_forecast.read_locations(args.locations), params, targets,
+                             args.cache_ttl)
+    if args.host:
+        failed = vscp_forecast.send_events(events, args.host, args.port, args.user,
+                                           args.password)
+        print("Sent %d forecast events, %d failed" % (len(events) - failed, failed))
+    else:
+        for ev in events:
+            print(vscp_tcpip.format_event(ev))
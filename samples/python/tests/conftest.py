@@ -0,0 +1,80 @@
+# Tests for the Python samples, run from samples/python with
+#
+#   python -m pytest -q tests
+#
+# The samples are plain modules in the directory above.
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import http.server
+import threading
+
+import pytest
+
+
+class Request:
+    """A request the HTTP stand-in got. Set close to drop the connection
+    after the response without telling the client."""
+
+    def __init__(self, method, path, headers, body, client):
+        self.method = method
+        self.path = path
+        self.headers = headers
+        self.body = body
+        self.client = client
+        self.close = False
+
+
+class _Handler(http.server.BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def _handle(self):
+        n = int(self.headers.get("Content-Length") or 0)
+        body = self.rfile.read(n) if n else b""
+        req = Request(self.command, self.path,
+                      dict((k.lower(), v) for k, v in self.headers.items()),
+                      body, self.client_address)
+        server = self.server
+        with server.lock:
+            server.requests.append(req)
+        status, headers, body = server.respond(req)
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+        self.wfile.flush()
+        if req.close:
+            self.close_connection = True
+
+    do_GET = do_POST = do_PUT = _handle
+
+    def log_message(self, *args):
+        pass
+
+
+class HttpStandIn(http.server.ThreadingHTTPServer):
+    """Local HTTP server, respond(request) gives (status, headers, body)."""
+
+    daemon_threads = True
+
+    def __init__(self):
+        http.server.ThreadingHTTPServer.__init__(self, ("127.0.0.1", 0), _Handler)
+        self.lock = threading.Lock()
+        self.requests = []
+        self.respond = lambda req: (200, {}, b"")
+        self.url = "http://127.0.0.1:%d" % self.server_address[1]
+
+
+@pytest.fixture
+def http_standin():
+    server = HttpStandIn()
+    thread = threading.Thread(target=server.serve_forever, args=(0.05,), daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
@@ -0,0 +1,188 @@
+import sqlite3
+import struct
+
+import pytest
+
+import vscp_alarm
+import vscp_class
+import vscp_sqlsink
+import vscp_type
+from vscp_alarm import ALARM_MAXCHANGE, ALARM_RANGE, Limits
+
+GUID = "FF:FF:FF:FF:FF:FF:FF:FF:28:9A:3C:1E:02:00:00:8B"
+SERIAL = "289A3C1E0200008B"
+
+
+def limits(lo=None, hi=None, alarm=False, maxchange=None, interval=3600, maxchange_alarm=False):
+    return Limits("kitchen", lo, hi, alarm, maxchange, interval, maxchange_alarm)
+
+
+def evaluator(**kwargs):
+    e = vscp_alarm.Evaluator()
+    e.set_limits(SERIAL, limits(**kwargs))
+    return e, e.sensors[SERIAL]
+
+
+def celsius(value, t):
+    # Integer coding, unit 1 (Celsius), zone 3 subzone 4 in MEASUREZONE
+    return {"vscpHead": 0, "vscpClass": vscp_class.VSCP_CLASS1_MEASUREZONE,
+            "vscpType": vscp_type.VSCP_TYPE_MEASUREMENT_TEMPERATURE, "vscpGuid": GUID,
+            "vscpData": [0, 3, 4, 0x60 | 1 << 3] + list(struct.pack(">h", value)),
+            "vscpTimeStamp": 0, "vscpDateTime": t}
+
+
+# ----------------------------------------------------------------------------
+#                                  R A N G E
+# ----------------------------------------------------------------------------
+
+def test_range_raised_once_and_cleared():
+    e, sensor = evaluator(lo=50, hi=80, alarm=True)
+    assert 0 == e.check(sensor, 60, 0)
+    assert vscp_alarm._BITS[ALARM_RANGE] == e.check(sensor, 85, 1)
+    # Same incident, not raised again
+    assert 0 == e.check(sensor, 90, 2)
+    assert 0 == e.check(sensor, 40, 3)
+    assert 0 == e.check(sensor, 70, 4)
+    records = e.take_records()
+    assert [(ALARM_RANGE, 85, 1, None), (ALARM_RANGE, 85, 1, 4)] == \
+        [(r.alarm_type, r.value, r.time_raised, r.time_cleared) for r in records]
+    assert [] == e.active()
+    assert [] == e.take_records()
+
+
+@pytest.mark.parametrize("lo, hi, value, raised", [
+    (50, 80, 50, False),        # Limits are in range
+    (50, 80, 80, False),
+    (50, 80, 49.9, True),
+    (None, 80, -100, False),    # Only a max
+    (None, 80, 80.1, True),
+    (50, None, 1000, False),    # Only a min
+    (50, 50, 0, False),         # min == max turns the check off
+])
+def test_range_limits(lo, hi, value, raised):
+    e, sensor = evaluator(lo=lo, hi=hi, alarm=True)
+    assert raised == bool(e.check(sensor, value, 0))
+
+
+def test_range_needs_alarm_flag():
+    e, sensor = evaluator(lo=50, hi=80)
+    assert 0 == e.check(sensor, 100, 0)
+    assert [] == e.take_records()
+
+
+# ----------------------------------------------------------------------------
+#                              M A X C H A N G E
+# ----------------------------------------------------------------------------
+
+def test_maxchange_within_interval():
+    e, sensor = evaluator(maxchange=5, interval=60, maxchange_alarm=True)
+    assert 0 == e.check(sensor, 70, 0)
+    assert 0 == e.check(sensor, 74, 30)
+    # 70 at t=0 is still in the interval
+    assert vscp_alarm._BITS[ALARM_MAXCHANGE] == e.check(sensor, 75.5, 60)
+    assert ALARM_MAXCHANGE in sensor.raised
+    # 70 and 74 are out of it, 75.5 - 76 is fine
+    assert 0 == e.check(sensor, 76, 91)
+    assert ALARM_MAXCHANGE not in sensor.raised
+
+
+def test_maxchange_is_max_minus_min_of_interval():
+    e, sensor = evaluator(maxchange=5, interval=100, maxchange_alarm=True)
+    # Goes down and up again, the drop from the max counts
+    for t, value in enumerate([70, 72, 74, 73, 71, 69.5]):
+        assert 0 == e.check(sensor, value, t)
+    assert e.check(sensor, 68.9, 6)
+    assert 74 - 68.9 == pytest.approx(sensor.change(7, 70))
+
+
+def test_maxchange_slow_drift_is_not_an_alarm():
+    e, sensor = evaluator(maxchange=5, interval=60, maxchange_alarm=True)
+    for i in range(100):
+        assert 0 == e.check(sensor, 70 + i, i * 60)
+
+
+def test_maxchange_out_of_order_counts_as_last():
+    e, sensor = evaluator(maxchange=5, interval=60, maxchange_alarm=True)
+    e.check(sensor, 70, 100)
+    # Older than the interval but taken as t=100
+    assert e.check(sensor, 80, 0)
+
+
+def test_both_alarms_in_one_event():
+    e, sensor = evaluator(lo=50, hi=80, alarm=True, maxchange=5, interval=60,
+                          maxchange_alarm=True)
+    e.check(sensor, 70, 0)
+    assert 0x03 == e.check(sensor, 90, 1)
+
+
+# ----------------------------------------------------------------------------
+#                                 E V E N T S
+# ----------------------------------------------------------------------------
+
+def test_put_compares_fahrenheit_and_sends_alarm_event():
+    e, sensor = evaluator(lo=50, hi=80, alarm=True)
+    assert e.put(celsius(20, "2026-01-02T03:04:05Z")) is None         # 68 F
+    ev = e.put(celsius(30, "2026-01-02T03:04:06Z"))                    # 86 F
+    assert vscp_class.VSCP_CLASS1_ALARM == ev["vscpClass"]
+    assert vscp_type.VSCP_TYPE_ALARM_ALARM == ev["vscpType"]
+    assert [0x01, 3, 4] == ev["vscpData"]
+    assert 86 == pytest.approx(e.take_records()[0].value)
+
+
+def test_put_unknown_sensor():
+    e, sensor = evaluator(lo=50, hi=80, alarm=True)
+    ev = dict(celsius(30, "2026-01-02T03:04:05Z"), vscpGuid="00:" * 15 + "01")
+    assert e.put(ev) is None
+    assert 1 == e.counters.snapshot()["events"]
+    assert 0 == e.counters.snapshot()["measurements"]
+
+
+# ----------------------------------------------------------------------------
+#                              D A T A B A S E
+# ----------------------------------------------------------------------------
+
+@pytest.fixture
+def db(tmp_path):
+    db = vscp_sqlsink.SqliteAdapter(str(tmp_path / "vscp.sqlite"), timeout=0.05)
+    db.execute([(sql, ()) for sql in vscp_alarm.CREATE])
+    yield db
+    db.close()
+
+
+def alarms(db):
+    return db.query("SELECT SerialNumber, alarm_type, time_cleared IS NULL "
+                    "FROM digitemp_alarms ORDER BY alarm_id")
+
+
+def test_failed_write_is_retried(tmp_path, db):
+    e, sensor = evaluator(lo=50, hi=80, alarm=True)
+    e.check(sensor, 90, 0)
+    lock = sqlite3.connect(str(tmp_path / "vscp.sqlite"))
+    lock.execute("BEGIN EXCLUSIVE")
+    with pytest.raises(db.error):
+        vscp_alarm.flush_records(db, e)
+    # Cleared while the database was locked, after the raised record
+    e.check(sensor, 70, 1)
+    lock.rollback()
+    lock.close()
+
+    assert 2 == len(vscp_alarm.flush_records(db, e))
+    assert [(SERIAL, ALARM_RANGE, 0)] == alarms(db)
+    assert [] == e.records
+
+
+def test_open_alarms_restored(db):
+    e, sensor = evaluator(lo=50, hi=80, alarm=True)
+    db.execute([("INSERT INTO digitemp_metadata (SerialNumber, name, min, max, alarm) "
+                 "VALUES (?, 'kitchen', 50, 80, 1)", (SERIAL,))])
+    e.check(sensor, 90, 0)
+    vscp_alarm.flush_records(db, e)
+
+    # After a restart the open alarm is not raised again, but cleared
+    e = vscp_alarm.Evaluator()
+    assert 1 == vscp_alarm.load_metadata(db, e)
+    sensor = e.sensors[SERIAL]
+    assert 0 == e.check(sensor, 95, 10)
+    e.check(sensor, 70, 11)
+    vscp_alarm.flush_records(db, e)
+    assert [(SERIAL, ALARM_RANGE, 0)] == alarms(db)
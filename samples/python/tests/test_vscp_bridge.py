@@ -0,0 +1,79 @@
+import asyncio
+import socket
+
+import pytest
+
+import vscp_bridge
+import vscp_tcpip
+from vscp_bridge import SIDE_MQTT, SIDE_TCP
+from vscpd_standin import StandIn
+
+GUID = "ff:ff:ff:ff:ff:ff:ff:ff:ff:ff:ff:ff:ff:ff:ff:01"
+
+
+def bridge(ttl=60.0):
+    return vscp_bridge.Bridge(None, None, None, owner_ttl=ttl)
+
+
+def test_copy_from_other_side_is_dropped():
+    b = bridge()
+    assert b._owned(GUID, SIDE_TCP, now=0)
+    assert not b._owned(GUID.upper(), SIDE_MQTT, now=1)
+    assert b._owned(GUID, SIDE_TCP, now=2)
+
+
+def test_ownership_expires():
+    b = bridge(ttl=10)
+    assert b._owned(GUID, SIDE_TCP, now=0)
+    assert not b._owned(GUID, SIDE_MQTT, now=5)
+    # Node moved to MQTT, the TCP side has not seen it for ttl
+    assert b._owned(GUID, SIDE_MQTT, now=11)
+    assert not b._owned(GUID, SIDE_TCP, now=12)
+
+
+def test_seen_on_owner_side_keeps_ownership():
+    b = bridge(ttl=10)
+    for t in range(0, 50, 5):
+        assert b._owned(GUID, SIDE_TCP, now=t)
+        assert not b._owned(GUID, SIDE_MQTT, now=t + 1)
+
+
+def test_expired_owners_are_forgotten():
+    b = bridge(ttl=10)
+    for i in range(1000):
+        b._owned("%032x" % i, SIDE_TCP, now=i * 0.001)
+    assert 1000 == len(b.origin)
+    b._owned(GUID, SIDE_MQTT, now=100)
+    assert [GUID.upper()] == list(b.origin)
+
+
+def test_failed_connect_closes_the_other_connection():
+    standin = StandIn()
+    active = set()
+
+    async def client(reader, writer):
+        active.add(writer)
+        try:
+            await standin.client(reader, writer)
+        finally:
+            active.discard(writer)
+
+    async def main():
+        server = await asyncio.start_server(client, "127.0.0.1", 0)
+        port = server.sockets[0].getsockname()[1]
+        # Nothing listens on this one
+        with socket.socket() as s:
+            s.bind(("127.0.0.1", 0))
+            closed_port = s.getsockname()[1]
+        rx = vscp_tcpip.Client("127.0.0.1", port)
+        tx = vscp_tcpip.Client("127.0.0.1", closed_port)
+        b = vscp_bridge.Bridge(None, rx, tx)
+        for _ in range(3):
+            with pytest.raises(OSError):
+                await b.run()
+            assert rx.writer is None
+        await asyncio.sleep(0.1)
+        assert not active
+        server.close()
+
+    asyncio.run(main())
@@ -0,0 +1,167 @@
+import random
+
+import pytest
+
+import vscp_dm
+from vscp_dm import ANY, DecisionMatrix, Row
+
+GUIDS = ["FF:FF:FF:FF:FF:FF:FF:FF:FF:FF:FF:FF:FF:FF:FF:%02X" % i for i in range(3)]
+
+
+def event(vscpclass, vscptype, guid=0, zone=None, subzone=None):
+    data = [0] if zone is None else [0, zone, subzone]
+    return {"vscpHead": 0, "vscpClass": vscpclass, "vscpType": vscptype,
+            "vscpGuid": GUIDS[guid].lower(), "vscpData": data}
+
+
+def brute_force(rows, ev):
+    # The rules of a node's decision matrix, row by row
+    data = ev["vscpData"]
+    zone, subzone = (data[1], data[2]) if len(data) > 2 else (0xff, 0xff)
+    return [row for row in rows
+            if (ev["vscpClass"] & row.class_mask) == row.class_filter
+            and (ev["vscpType"] & row.type_mask) == row.type_filter
+            and (row.guid is None or row.guid == ev["vscpGuid"].upper())
+            and (row.zone is None or 0xff == zone or row.zone == zone)
+            and (row.subzone is None or 0xff == subzone or row.subzone == subzone)]
+
+
+def random_row(rnd):
+    kind = rnd.choice(("exact", "exact", "class", "type", "any", "masked", "masked"))
+    vscpclass = rnd.randrange(8)
+    vscptype = rnd.randrange(8)
+    kwargs = {}
+    if "class" == kind:
+        vscptype = ANY
+    elif "type" == kind:
+        vscpclass = ANY
+    elif "any" == kind:
+        vscpclass = vscptype = ANY
+    elif "masked" == kind:
+        kwargs["class_mask"] = rnd.choice((0x06, 0xFFFE, 0xFFFF, 0))
+        kwargs["type_mask"] = rnd.choice((0x03, 0xFFF8, 0xFFFF))
+    if rnd.random() < 0.3:
+        kwargs["guid"] = rnd.choice(GUIDS)
+    if rnd.random() < 0.3:
+        kwargs["zone"] = rnd.randrange(3)
+    if rnd.random() < 0.3:
+        kwargs["subzone"] = rnd.randrange(3)
+    return Row(vscpclass, vscptype, param=kind, **kwargs)
+
+
+def random_event(rnd):
+    zone = rnd.choice((None, 0, 1, 2, 0xff))
+    return event(rnd.randrange(10), rnd.randrange(10), rnd.randrange(3), zone,
+                 None if zone is None else rnd.choice((0, 1, 2, 0xff)))
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_index_matches_brute_force(seed):
+    rnd = random.Random(seed)
+    rows = [random_row(rnd) for _ in range(200)]
+    dm = DecisionMatrix(rows, cache_size=20)
+    assert dm.other and dm.index
+    for _ in range(2000):
+        ev = random_event(rnd)
+        assert brute_force(rows, ev) == dm.match(ev)
+
+
+def test_add_and_remove_rows_clear_the_cache():
+    rnd = random.Random(7)
+    rows = [random_row(rnd) for _ in range(50)]
+    dm = DecisionMatrix(rows)
+    events = [random_event(rnd) for _ in range(500)]
+    for ev in events:
+        dm.match(ev)
+    extra = [Row(3, ANY), Row(ANY, 4), Row(2, 1, class_mask=0x02, type_mask=0x01)]
+    for row in extra:
+        dm.add(row)
+    for row in rows[::3]:
+        dm.remove(row)
+    rows = [r for r in rows + extra if r in dm.rows]
+    assert [r.order for r in dm.rows] == list(range(len(dm.rows)))
+    for ev in events:
+        assert brute_force(rows, ev) == dm.match(ev)
+
+
+def test_rows_run_in_row_order():
+    rows = [Row(ANY, ANY, param="any"), Row(10, 6, param="exact"),
+            Row(8, 0, param="masked", class_mask=0xF8, type_mask=0),
+            Row(10, ANY, param="class")]
+    dm = DecisionMatrix(rows)
+    assert ["any", "exact", "masked", "class"] == [r.param for r in dm.match(event(10, 6))]
+    assert ["any", "masked"] == [r.param for r in dm.match(event(12, 6))]
+
+
+@pytest.mark.parametrize("zone, subzone, matched", [
+    (1, 2, True),
+    (1, 3, False),
+    (2, 2, False),
+    (0xff, 3, False),
+    (0xff, 0xff, True),     # All zones
+    (None, None, True),     # No zone in the data
+])
+def test_zone_and_subzone(zone, subzone, matched):
+    dm = DecisionMatrix([Row(ANY, ANY, zone=1, subzone=2)])
+    assert matched == bool(dm.match(event(1, 2, zone=zone, subzone=subzone)))
+
+
+def test_guid_is_case_insensitive():
+    dm = DecisionMatrix([Row(1, 2, guid=GUIDS[1].lower())])
+    assert dm.match(event(1, 2, 1))
+    assert not dm.match(event(1, 2, 2))
+
+
+def test_evaluate_counts_failed_actions():
+    calls = []
+
+    def fail(ev, param):
+        raise RuntimeError(param)
+    dm = DecisionMatrix([Row(1, 2, fail, "x"), Row(1, ANY, lambda ev, p: calls.append(p), "y")])
+    assert 2 == dm.evaluate(event(1, 2))
+    assert 0 == dm.evaluate(event(2, 2))
+    assert ["y"] == calls
+    s = dm.counters.snapshot()
+    assert (2, 1, 2, 1) == (s["events"], s["matched"], s["actions"], s["errors"])
+
+
+def test_substitute():
+    ev = event(10, 6, 1, zone=3, subzone=4)
+    assert "10 6 3 4 0,3,4 " + GUIDS[1].lower() == vscp_dm.substitute(
+        "%event.class %event.type %event.zone %event.subzone %event.data %event.guid", ev)
+
+
+# ----------------------------------------------------------------------------
+#                               R O W S   F I L E
+# ----------------------------------------------------------------------------
+
+def test_read_rows(tmp_path):
+    path = tmp_path / "rows.txt"
+    path.write_text("# Alarms\n"
+                    "1 2 * * * execute ../smstools/doalarm.py 1 %event.zone   # comment\n"
+                    "\n"
+                    "  # indented comment\n"
+                    "0x14/0xfff0 * " + GUIDS[0] + " 1 * print room#3 at %event.data\n"
+                    "* 5/7 * * 2 print\n")
+    rows = vscp_dm.read_rows(str(path))
+    assert 3 == len(rows)
+    assert (1, 0xFFFF, 2, 0xFFFF, None) == \
+        (rows[0].class_filter, rows[0].class_mask, rows[0].type_filter, rows[0].type_mask,
+         rows[0].zone)
+    assert "../smstools/doalarm.py 1 %event.zone" == rows[0].param
+    assert vscp_dm._execute is rows[0].action
+    # '#' within the param is kept
+    assert "room#3 at %event.data" == rows[1].param
+    assert (0x10, 0xFFF0, GUIDS[0], 1) == \
+        (rows[1].class_filter, rows[1].class_mask, rows[1].guid, rows[1].zone)
+    assert (0, 0, 5, 7, "", 2) == \
+        (rows[2].class_filter, rows[2].class_mask, rows[2].type_filter, rows[2].type_mask,
+         rows[2].param, rows[2].subzone)
+
+
+@pytest.mark.parametrize("line", ["1 2 * * *", "1 2 * * * fly away"])
+def test_read_rows_errors(tmp_path, line):
+    path = tmp_path / "rows.txt"
+    path.write_text(line + "\n")
+    with pytest.raises(ValueError, match="rows.txt:1"):
+        vscp_dm.read_rows(str(path))
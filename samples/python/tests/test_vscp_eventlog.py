@@ -0,0 +1,288 @@
+import os
+
+import pytest
+
+import vscp_eventlog
+from vscp_eventlog import EventLog, HEADER_SIZE
+
+GUIDS = ["FF:FF:FF:FF:FF:FF:FF:FF:FF:FF:FF:FF:FF:FF:FF:%02X" % i for i in range(4)]
+T0 = 1767225600.0       # 2026-01-01 UTC
+
+
+def event(n, guid=0, vscpclass=10, vscptype=6, data=None):
+    return {"vscpHead": 0, "vscpObId": n, "vscpClass": vscpclass, "vscpType": vscptype,
+            "vscpGuid": GUIDS[guid],
+            "vscpData": data if data is not None else [0x88, 0x02, n & 0xFF, n >> 8]}
+
+
+def data_of(ev):
+    return ev["vscpData"][2] | ev["vscpData"][3] << 8
+
+
+@pytest.fixture(params=["numpy", "struct"])
+def reader(request, monkeypatch):
+    # Reads with numpy record arrays and with struct one by one
+    if "numpy" == request.param:
+        pytest.importorskip("numpy")
+    else:
+        monkeypatch.setattr(vscp_eventlog, "numpy", None)
+    return request.param
+
+
+# ----------------------------------------------------------------------------
+#                               S E G M E N T S
+# ----------------------------------------------------------------------------
+
+def test_append_and_read_back(tmp_path):
+    log = EventLog(str(tmp_path))
+    log.append(event(1, data=[1, 2, 3]), T0)
+    log.append(event(2, guid=1, data=[]), T0 + 0.5)
+    seg = log.segment(0)
+    assert 2 == len(seg)
+    first, second = seg.events()
+    assert [1, 2, 3] == first["vscpData"]
+    assert (GUIDS[0], 1, T0, "2026-01-01T00:00:00Z") == \
+        (first["vscpGuid"], first["vscpObId"], first["time"], first["vscpDateTime"])
+    assert ([], GUIDS[1], T0 + 0.5) == (second["vscpData"], second["vscpGuid"], second["time"])
+    seg.close()
+    log.close()
+
+
+def test_rotation_and_reopen(tmp_path):
+    log = EventLog(str(tmp_path), segment_records=10)
+    for n in range(25):
+        log.append(event(n, guid=n % 2), T0 + n)
+    log.close()
+    assert [0, 1, 2] == log.sequence_numbers()
+
+    log = EventLog(str(tmp_path), segment_records=10)
+    # Continues the last segment, then starts a new one
+    for n in range(25, 36):
+        log.append(event(n), T0 + n)
+    segs = log.segments()
+    assert [10, 10, 10, 6] == [len(seg) for seg in segs]
+    assert list(range(36)) == [data_of(ev) for seg in segs for ev in seg.events()]
+    assert [GUIDS[0], GUIDS[1]] == log.guids
+    for seg in segs:
+        seg.close()
+    log.close()
+
+
+def test_reopen_drops_partial_record(tmp_path):
+    log = EventLog(str(tmp_path))
+    for n in range(3):
+        log.append(event(n), T0 + n)
+    log.close()
+    path = log.segment_path(0)
+    with open(path, "ab") as f:
+        f.write(b"\x01" * 10)       # Crash in the middle of a record
+
+    log = EventLog(str(tmp_path))
+    log.append(event(3), T0 + 3)
+    log.flush()
+    assert HEADER_SIZE + 4 * log.record_size == os.path.getsize(path)
+    assert [0, 1, 2, 3] == [data_of(ev) for ev in log.segment(0).events()]
+    log.close()
+
+
+def test_data_size_of_the_log_is_kept(tmp_path):
+    log = EventLog(str(tmp_path), data_size=512)
+    log.append(event(0, data=list(range(256)) * 2), T0)
+    log.close()
+    log = EventLog(str(tmp_path))
+    assert 512 == log.data_size
+    assert list(range(256)) * 2 == next(log.segment(0).events())["vscpData"]
+    log.close()
+    with pytest.raises(ValueError):
+        EventLog(str(tmp_path), data_size=24)
+
+
+def test_oversize_data_is_refused(tmp_path):
+    log = EventLog(str(tmp_path))
+    with pytest.raises(ValueError):
+        log.append(event(0, data=list(range(25))), T0)
+    log.append(event(1), T0)
+    assert [1] == [ev["vscpObId"] for ev in log.segment(0).events()]
+    log.close()
+
+
+def test_oversize_data_is_cut_with_truncate(tmp_path):
+    log = EventLog(str(tmp_path), truncate=True)
+    log.append(event(0, data=list(range(30))), T0)
+    assert 1 == log.truncated
+    ev = next(log.segment(0).events())
+    assert list(range(24)) == ev["vscpData"]
+    # The size field is what is stored
+    assert 24 == log.segment(0).unpack(0)[6]
+    log.close()
+
+
+def test_record_array_views_the_mapped_file(tmp_path):
+    numpy = pytest.importorskip("numpy")
+    log = EventLog(str(tmp_path))
+    for n in range(100):
+        log.append(event(n, guid=n % 3, vscptype=n % 5), T0 + n)
+    seg = log.segment(0)
+    r = seg.records()
+    assert 100 == len(r)
+    assert not r.flags.owndata
+    assert (numpy.arange(100) * 1000000 + int(T0 * 1e6) == r["time"]).all()
+    assert [0, 1, 2, 0] == r["guid"][:4].tolist()
+    assert (r["size"] == 4).all()
+    assert [0x88, 0x02, 99, 0] == r["data"][99][:4].tolist()
+    del r
+    seg.close()
+    log.close()
+
+
+def test_matches(tmp_path, reader):
+    log = EventLog(str(tmp_path))
+    for n in range(100):
+        log.append(event(n, guid=n % 3, vscptype=n % 5), T0 + n)
+    seg = log.segment(0)
+    t = lambda s: int((T0 + s) * 1e6)
+    assert list(range(10, 20)) == seg.matches(0, 100, start=t(10), end=t(19))
+    assert [n for n in range(100) if 1 == n % 3 and 2 == n % 5] == \
+        seg.matches(0, 100, gid=1, vscptype=2)
+    assert [n for n in range(50, 60) if 0 == n % 3] == seg.matches(50, 60, gid=0)
+    assert [] == seg.matches(0, 100, vscpclass=20)
+    seg.close()
+    log.close()
+
+
+# ----------------------------------------------------------------------------
+#                                 I N D E X
+# ----------------------------------------------------------------------------
+
+def opened(monkeypatch):
+    """Sequence numbers of the segments the log opens."""
+    seqs = []
+    segment = EventLog.segment
+
+    def spy(self, seq):
+        seqs.append(seq)
+        return segment(self, seq)
+    monkeypatch.setattr(EventLog, "segment", spy)
+    return seqs
+
+
+def sensor_log(path):
+    # GUID 0 in every segment, GUID 1 only in segment 1, GUID 2 in 0 and 3
+    log = EventLog(path, segment_records=1000)
+    n = 0
+    for seq in range(4):
+        for i in range(1000):
+            guid = 1 if 1 == seq and i % 2 else 2 if seq in (0, 3) and i % 2 else 0
+            log.append(event(n, guid), T0 + n)
+            n += 1
+    return log
+
+
+def brute_force(log, guid, start, end):
+    return [data_of(ev) for seg in log.segments() for ev in seg.events()
+            if ev["vscpGuid"] == GUIDS[guid] and start <= ev["time"] <= end]
+
+
+def test_query_skips_segments_without_the_guid(tmp_path, monkeypatch, reader):
+    log = sensor_log(str(tmp_path))
+    seqs = opened(monkeypatch)
+    got = [data_of(ev) for ev in log.query(GUIDS[1].lower())]
+    assert brute_force(log, 1, 0, T0 + 4000) == got
+    assert 500 == len(got)
+    assert [1] == seqs
+    seqs.clear()
+    assert 1000 == len(list(log.query(GUIDS[2])))
+    assert [0, 3] == seqs
+    seqs.clear()
+    assert [] == list(log.query(GUIDS[3]))
+    assert [] == seqs
+    log.close()
+
+
+def test_query_time_range_across_rotation_and_reopen(tmp_path, monkeypatch, reader):
+    log = sensor_log(str(tmp_path))
+    log.close()
+    log = EventLog(str(tmp_path), segment_records=1000)
+    # Appended after the reopen, in a new segment
+    for n in range(4000, 4100):
+        log.append(event(n, 2), T0 + n)
+    seqs = opened(monkeypatch)
+
+    start, end = T0 + 2990.5, T0 + 4050
+    got = [data_of(ev) for ev in log.query(GUIDS[2], start, end)]
+    assert brute_force(log, 2, start, end) == got
+    assert list(range(3001, 4000, 2)) + list(range(4000, 4051)) == got
+    assert [3, 4] == seqs
+
+    seqs.clear()
+    got = [data_of(ev) for ev in log.query(None, T0 + 1500, T0 + 1510)]
+    assert list(range(1500, 1511)) == got
+    assert [1] == seqs
+    log.close()
+
+
+def test_time_range_reads_few_records(tmp_path, monkeypatch):
+    log = EventLog(str(tmp_path))
+    for n in range(10000):
+        log.append(event(n), T0 + n)
+    asked = []
+    matches = vscp_eventlog.Segment.matches
+
+    def spy(self, lo, hi, *args):
+        asked.append((lo, hi))
+        return matches(self, lo, hi, *args)
+    monkeypatch.setattr(vscp_eventlog.Segment, "matches", spy)
+    assert list(range(5000, 5010)) == [data_of(ev) for ev in log.query(None, T0 + 5000,
+                                                                      T0 + 5009)]
+    (lo, hi), = asked
+    assert lo <= 5000 and 5009 < hi and hi - lo <= 2 * vscp_eventlog.SPARSE_STEP
+    log.close()
+
+
+def test_latest_survives_checkpoint_and_reload(tmp_path, monkeypatch):
+    log = EventLog(str(tmp_path), segment_records=100)
+    for n in range(250):
+        # Sensor index in the low bits of the first byte of CLASS1.MEASUREMENT
+        log.append(event(n, n % 2, data=[0x88 | n % 3, 2, n & 0xFF, n >> 8]), T0 + n)
+    latest = dict((key, data_of(ev)) for key, ev in log.latest().items())
+    assert {(GUIDS[0], 10, 6, 0): 246, (GUIDS[0], 10, 6, 1): 244, (GUIDS[0], 10, 6, 2): 248,
+            (GUIDS[1], 10, 6, 0): 249, (GUIDS[1], 10, 6, 1): 247,
+            (GUIDS[1], 10, 6, 2): 245} == latest
+    log.close()
+
+    # Reloaded from the checkpoint, no records are read again
+    indexed = []
+    index_segment = EventLog._index_segment
+
+    def spy(self, index, seq, seg, start):
+        indexed.append((seq, start, len(seg)))
+        return index_segment(self, index, seq, seg, start)
+    monkeypatch.setattr(EventLog, "_index_segment", spy)
+    log = EventLog(str(tmp_path), segment_records=100)
+    assert all(start == count for seq, start, count in indexed)
+    assert latest == dict((key, data_of(ev)) for key, ev in log.latest().items())
+    assert {(GUIDS[1], 10, 6, 0), (GUIDS[1], 10, 6, 1), (GUIDS[1], 10, 6, 2)} == \
+        set(log.latest(GUIDS[1]))
+
+    # Appended after the checkpoint, indexed on the next open
+    log.append(event(250, 1, data=[0x88, 2, 250, 0]), T0 + 250)
+    log.flush()
+    log.guid_file.close()
+    log.f.close()
+    log = EventLog(str(tmp_path), segment_records=100)
+    assert 250 == data_of(log.latest(GUIDS[1])[(GUIDS[1], 10, 6, 0)])
+    assert brute_force(log, 1, T0 + 240, T0 + 250) == \
+        [data_of(ev) for ev in log.query(GUIDS[1], T0 + 240, T0 + 250)]
+    log.close()
+
+
+def test_index_rebuilt_when_checkpoint_does_not_match(tmp_path):
+    log = EventLog(str(tmp_path), segment_records=100)
+    for n in range(150):
+        log.append(event(n, n % 2), T0 + n)
+    log.close()
+    os.remove(log.segment_path(1))
+    log = EventLog(str(tmp_path), segment_records=100)
+    assert 50 == len(list(log.query(GUIDS[1])))
+    assert [0] == sorted(log.index.segments)
+    log.close()
@@ -0,0 +1,183 @@
+import json
+import os
+import threading
+import time
+
+import vscp_exporter
+
+
+class Batched(vscp_exporter.Service):
+    """Posts a JSON list of at most three items."""
+
+    max_batch = 3
+
+    def body(self, items):
+        return list(items)
+
+
+def exporter(server, **kwargs):
+    kwargs.setdefault("workers", 1)
+    kwargs.setdefault("backoff", 0.01)
+    return vscp_exporter.Exporter(Batched(server.url + "/events"), **kwargs)
+
+
+def posted(server):
+    return [json.loads(req.body) for req in server.requests]
+
+
+def held(server):
+    """Respond 200 once release is set."""
+    release = threading.Event()
+    first = threading.Event()
+
+    def respond(req):
+        first.set()
+        release.wait(5)
+        return 200, {}, b"{}"
+    server.respond = respond
+    return first, release
+
+
+def test_batches_up_to_max_batch(http_standin):
+    first, release = held(http_standin)
+    e = exporter(http_standin)
+    e.put(0)
+    assert first.wait(5)
+    for i in range(1, 8):
+        e.put(i)
+    release.set()
+    assert e.flush(5)
+    assert [[0], [1, 2, 3], [4, 5, 6], [7]] == posted(http_standin)
+    e.close()
+
+
+def test_sense_batch():
+    service = vscp_exporter.Sense("key", "http://127.0.0.1/events/")
+    items = [vscp_exporter.Sense.item(7, i, 1000 + i) for i in range(150)]
+    method, url, body, headers = service.request(items[:service.max_batch])
+    assert "POST" == method and "key" == headers["sense_key"]
+    assert 100 == len(json.loads(body))
+    assert {"feed_id": 7, "value": 0, "timetag": 1000} == json.loads(body)[0]
+
+
+def test_retry_after_503(http_standin):
+    def respond(req):
+        if 1 == len(http_standin.requests):
+            return 503, {"Retry-After": "1"}, b"busy"
+        return 200, {}, b"{}"
+    http_standin.respond = respond
+    # Without Retry-After the backoff would be much longer
+    e = exporter(http_standin, backoff=30, max_backoff=30)
+    t = time.monotonic()
+    e.put("a")
+    assert e.flush(5)
+    assert 1 <= time.monotonic() - t < 3
+    s = e.counters.snapshot()
+    assert (2, 1, 1) == (s["requests"], s["retries"], s["posted"])
+    e.close()
+
+
+def test_refused_is_not_retried(http_standin):
+    http_standin.respond = lambda req: (400, {}, b"bad feed")
+    e = exporter(http_standin)
+    e.put("a")
+    assert e.flush(5)
+    s = e.counters.snapshot()
+    assert (1, 0, 1, 0) == (s["requests"], s["retries"], s["failed"], s["posted"])
+    e.close()
+
+
+def test_spill_to_disk_and_reload_in_order(http_standin, tmp_path):
+    first, release = held(http_standin)
+    e = exporter(http_standin, queue_size=3, spill_size=2, spool_dir=str(tmp_path))
+    e.put(0)
+    assert first.wait(5)
+    for i in range(1, 20):
+        e.put(i)
+    assert [n for n in os.listdir(str(tmp_path)) if n.endswith(".json")]
+    release.set()
+    assert e.flush(5)
+    assert list(range(20)) == [i for body in posted(http_standin) for i in body]
+    assert 16 == e.counters.snapshot()["spilled"]
+    assert [] == os.listdir(str(tmp_path))
+    e.close()
+
+
+def test_failed_batches_are_posted_by_the_next_run_in_order(http_standin, tmp_path):
+    http_standin.respond = lambda req: (500, {}, b"down")
+    e = exporter(http_standin, retries=0, spool_dir=str(tmp_path))
+    for i in range(5):
+        e.put(i)
+    # A failed batch pauses the spill files, don't wait for them
+    t = time.monotonic()
+    e.close(5, wait_spilled=False)
+    assert time.monotonic() - t < 2
+    assert 0 == e.counters.snapshot()["posted"]
+
+    http_standin.respond = lambda req: (200, {}, b"{}")
+    del http_standin.requests[:]
+    e = exporter(http_standin, spool_dir=str(tmp_path))
+    e.put(5)
+    assert e.flush(5)
+    assert list(range(6)) == [i for body in posted(http_standin) for i in body]
+    e.close()
+
+
+def test_drops_oldest_without_spool(http_standin):
+    first, release = held(http_standin)
+    e = exporter(http_standin, queue_size=2)
+    e.put(0)
+    assert first.wait(5)
+    for i in range(1, 6):
+        e.put(i)
+    release.set()
+    assert e.flush(5)
+    assert [[0], [4, 5]] == posted(http_standin)
+    s = e.counters.snapshot()
+    assert (6, 3, 3) == (s["queued"], s["dropped"], s["posted"])
+    e.close()
+
+
+def test_keep_alive(http_standin):
+    http_standin.respond = lambda req: (200, {}, b"{}")
+    e = exporter(http_standin)
+    for i in range(3):
+        e.put(i)
+        assert e.flush(5)
+    assert 1 == len(set(req.client for req in http_standin.requests))
+    e.close()
+
+
+def test_keep_alive_closed_by_server(http_standin):
+    def respond(req):
+        # Close the first connection after answering, without saying so
+        req.close = 1 == len(http_standin.requests)
+        return 200, {}, b"{}"
+    http_standin.respond = respond
+    e = exporter(http_standin)
+    for i in range(3):
+        e.put(i)
+        assert e.flush(5)
+    clients = [req.client for req in http_standin.requests]
+    assert 3 == len(clients) and clients[0] != clients[1] == clients[2]
+    s = e.counters.snapshot()
+    assert (3, 3, 0, 0) == (s["posted"], s["requests"], s["retries"], s["failed"])
+    e.close()
+
+
+def test_close_spills_memory_before_files(http_standin, tmp_path):
+    first, release = held(http_standin)
+    e = exporter(http_standin, queue_size=3, spill_size=2, spool_dir=str(tmp_path))
+    e.put(0)
+    assert first.wait(5)
+    for i in range(1, 10):
+        e.put(i)
+    threading.Timer(0.2, release.set).start()
+    e.close(0)
+    assert [[0]] == posted(http_standin)
+
+    del http_standin.requests[:]
+    e = exporter(http_standin, spool_dir=str(tmp_path))
+    assert e.flush(5)
+    assert list(range(1, 10)) == [i for body in posted(http_standin) for i in body]
+    e.close()
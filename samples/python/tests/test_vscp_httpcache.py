@@ -0,0 +1,87 @@
+import email.utils
+import time
+
+import pytest
+
+import vscp_httpcache
+
+
+def cache(tmp_path):
+    return vscp_httpcache.HttpCache(str(tmp_path))
+
+
+def test_fresh_response_is_a_hit(http_standin, tmp_path):
+    http_standin.respond = lambda req: (200, {"Cache-Control": "max-age=60"}, b"forecast")
+    c = cache(tmp_path)
+    url = http_standin.url + "/fresh"
+    assert b"forecast" == c.fetch(url)
+    assert b"forecast" == c.fetch(url)
+    assert 1 == len(http_standin.requests)
+    assert 1 == c.stats["hit"] and 1 == c.stats["fetched"]
+
+
+def test_fresh_response_is_kept_on_disk(http_standin, tmp_path):
+    http_standin.respond = lambda req: (200, {"Cache-Control": "max-age=60"}, b"forecast")
+    url = http_standin.url + "/fresh"
+    cache(tmp_path).fetch(url)
+    assert b"forecast" == cache(tmp_path).fetch(url)
+    assert 1 == len(http_standin.requests)
+
+
+def test_revalidate_with_etag(http_standin, tmp_path):
+    def respond(req):
+        if '"v1"' == req.headers.get("if-none-match"):
+            return 304, {"ETag": '"v1"', "Cache-Control": "max-age=0"}, b""
+        return 200, {"ETag": '"v1"', "Cache-Control": "no-cache"}, b"forecast"
+    http_standin.respond = respond
+    c = cache(tmp_path)
+    url = http_standin.url + "/etag"
+    assert b"forecast" == c.fetch(url)
+    assert b"forecast" == c.fetch(url)
+    assert 2 == len(http_standin.requests)
+    assert '"v1"' == http_standin.requests[1].headers["if-none-match"]
+    assert 1 == c.stats["revalidated"]
+
+
+def test_revalidate_with_last_modified(http_standin, tmp_path):
+    modified = email.utils.formatdate(time.time() - 3600, usegmt=True)
+
+    def respond(req):
+        if modified == req.headers.get("if-modified-since"):
+            return 304, {}, b""
+        return 200, {"Last-Modified": modified}, b"forecast"
+    http_standin.respond = respond
+    c = cache(tmp_path)
+    url = http_standin.url + "/modified"
+    assert b"forecast" == c.fetch(url)
+    assert b"forecast" == c.fetch(url)
+    assert "if-none-match" not in http_standin.requests[1].headers
+    assert 1 == c.stats["revalidated"]
+
+
+@pytest.mark.parametrize("status", [429, 500, 503])
+def test_stale_copy_on_server_error(http_standin, tmp_path, status):
+    http_standin.respond = lambda req: (200, {"Cache-Control": "max-age=0"}, b"forecast")
+    c = cache(tmp_path)
+    url = http_standin.url + "/busy"
+    c.fetch(url)
+    http_standin.respond = lambda req: (status, {"Retry-After": "60"}, b"busy")
+    assert b"forecast" == c.fetch(url)
+    assert 1 == c.stats["stale"]
+
+
+def test_not_found_raises(http_standin, tmp_path):
+    http_standin.respond = lambda req: (404, {}, b"no such forecast")
+    with pytest.raises(vscp_httpcache.HttpError) as e:
+        cache(tmp_path).fetch(http_standin.url + "/missing")
+    assert 404 == e.value.status
+
+
+def test_not_found_is_not_served_stale(http_standin, tmp_path):
+    http_standin.respond = lambda req: (200, {"Cache-Control": "max-age=0"}, b"forecast")
+    c = cache(tmp_path)
+    url = http_standin.url + "/gone"
+    c.fetch(url)
+    http_standin.respond = lambda req: (404, {}, b"")
+    with pytest.raises(vscp_httpcache.HttpError):
+        c.fetch(url)
@@ -0,0 +1,120 @@
+import binascii
+import json
+
+import pytest
+
+import vscp_payload
+from vscp_payload import FRAME_HEADER_LENGTH, PayloadFormats, decode_frame, decode_payload
+
+GUID = "FF:EE:DD:CC:BB:AA:99:88:77:66:55:44:33:22:11:00"
+
+
+def event(data=(1, 2, 3), **kwargs):
+    ev = {"vscpHead": 0x60, "vscpObId": 0, "vscpDateTime": "2026-10-19T12:34:56Z",
+          "vscpTimeStamp": 123456789, "vscpClass": 1040, "vscpType": 6,
+          "vscpGuid": GUID, "vscpData": list(data)}
+    ev.update(kwargs)
+    return ev
+
+
+# ----------------------------------------------------------------------------
+#                          B I N A R Y   F R A M E S
+# ----------------------------------------------------------------------------
+
+def test_crc_is_ccitt():
+    # CRC-CCITT (0xFFFF) check value
+    assert 0x29B1 == binascii.crc_hqx(b"123456789", 0xFFFF)
+
+
+@pytest.mark.parametrize("data", [(), (1, 2, 3), tuple(range(256)) * 2])
+def test_round_trip(data):
+    ev = event(data)
+    frame = vscp_payload.encode_frame_from_json(ev)
+    assert FRAME_HEADER_LENGTH + len(data) + 2 == len(frame)
+    assert (ev, len(frame)) == decode_frame(frame)
+
+
+def test_layout():
+    frame = vscp_payload.encode_frame(0x60, 10, 6, GUID, [0xAA], 7, (2026, 1, 2, 3, 4, 5))
+    assert bytes.fromhex("00 0060 00000007 07EA 01 02 03 04 05 000A 0006") == frame[:18]
+    assert vscp_payload.guid_from_string(GUID) == frame[18:34]
+    assert b"\x00\x01\xAA" == frame[34:37]
+    assert binascii.crc_hqx(frame[1:-2], 0xFFFF) == int.from_bytes(frame[-2:], "big")
+
+
+def test_guid_not_given():
+    j, end = decode_frame(vscp_payload.encode_frame_from_json(event(vscpGuid="-")))
+    assert ":".join(["00"] * 16) == j["vscpGuid"]
+
+
+@pytest.mark.parametrize("pos", [1, 7, 14, 20, FRAME_HEADER_LENGTH, -1, -2])
+def test_corrupted_frame_is_rejected(pos):
+    frame = bytearray(vscp_payload.encode_frame_from_json(event()))
+    frame[pos] ^= 0x01
+    with pytest.raises(ValueError, match="CRC"):
+        decode_frame(bytes(frame))
+
+
+def test_short_and_unknown_frames_are_rejected():
+    frame = vscp_payload.encode_frame_from_json(event())
+    with pytest.raises(ValueError, match="short"):
+        decode_frame(frame[:FRAME_HEADER_LENGTH])
+    with pytest.raises(ValueError, match="truncated"):
+        decode_frame(frame[:-1])
+    with pytest.raises(ValueError, match="type"):
+        decode_frame(b"\x10" + frame[1:])
+
+
+def test_frames_in_a_row():
+    events = [event([n] * n) for n in range(5)]
+    payload = b"".join(vscp_payload.encode_frame_from_json(ev) for ev in events)
+    assert events == decode_payload(payload)
+    j, offset = decode_frame(payload, 0)
+    assert events[1] == decode_frame(payload, offset)[0]
+    with pytest.raises(ValueError):
+        decode_payload(payload[:-3])
+
+
+def test_template_frame_matches_encode_frame():
+    t = vscp_payload.MeasurementTemplate(0x60, 1040, 6, GUID, sensorindex=1, zone=2,
+                                         subzone=3, unit=1, timestamp=5)
+    packed = bytes.fromhex("07EA 0A 13 0C 22 38")
+    frame = t.frame("21.5", packed)
+    j, end = decode_frame(frame)
+    assert len(frame) == end
+    assert t.build(21.5, "21.5", "2026-10-19T12:34:56Z")["vscpData"] == j["vscpData"]
+    assert frame == vscp_payload.encode_frame(0x60, 1040, 6, GUID, t.data("21.5"), 5,
+                                              (2026, 10, 19, 12, 34, 56))
+
+
+def test_json_payloads():
+    ev = event()
+    assert [ev] == decode_payload(json.dumps(ev))
+    assert [ev, ev] == decode_payload((" " + json.dumps([ev, ev])).encode())
+    assert [] == decode_payload(b"")
+    with pytest.raises(ValueError):
+        decode_payload(b"hello")
+
+
+# ----------------------------------------------------------------------------
+#                   F O R M A T   P E R   T O P I C
+# ----------------------------------------------------------------------------
+
+def test_longest_prefix_wins():
+    formats = PayloadFormats({"vscp/": "binary", "vscp/json/": "json",
+                              "vscp/json/bin/": "binary"})
+    assert formats.is_binary("vscp/a/10/6")
+    assert not formats.is_binary("vscp/json/a")
+    assert formats.is_binary("vscp/json/bin/a")
+    assert not formats.is_binary("other/vscp/a")
+    # Cached answers are the same
+    assert formats.is_binary("vscp/a/10/6")
+    assert not formats.is_binary("vscp/json/a")
+
+
+def test_binary_prefixes():
+    formats = PayloadFormats.fromBinaryPrefixes(" vscp/bin/ , ,sensors/")
+    assert [("vscp/bin/", "binary"), ("sensors/", "binary")] == formats.prefixes
+    assert formats.is_binary("sensors/1")
+    assert "json" == formats.get("vscp/json/1")
+    assert not PayloadFormats.fromBinaryPrefixes("").is_binary("vscp/a")
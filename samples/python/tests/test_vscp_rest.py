@@ -0,0 +1,119 @@
+import json
+import urllib.parse
+
+import pytest
+
+import vscp_rest
+
+
+class Daemon:
+    """Enough of the daemon REST interface for the client."""
+
+    def __init__(self, server):
+        self.server = server
+        self.sessions = set()
+        self.opened = 0
+        self.variables = {"test": "Super"}
+        self.queue = []
+        server.respond = self.respond
+
+    def ops(self):
+        return [urllib.parse.parse_qs(urllib.parse.urlsplit(req.path).query)["op"][0]
+                for req in self.server.requests]
+
+    def respond(self, req):
+        q = dict((k, v[0]) for k, v in
+                 urllib.parse.parse_qs(urllib.parse.urlsplit(req.path).query,
+                                       keep_blank_values=True).items())
+        op = q["op"]
+        if "open" == op:
+            self.opened += 1
+            session = "s%d" % self.opened
+            self.sessions.add(session)
+            return self.answer({"success": True, "vscpsession": session})
+        if q.get("vscpsession") not in self.sessions:
+            return self.answer({"success": False, "code": -2, "message": "Invalid session",
+                                "description": ""})
+        if "readvar" == op:
+            if q["variable"] not in self.variables:
+                return self.answer({"success": False, "code": -1, "message": "Failure",
+                                    "description": "Variable not found"})
+            return self.answer({"success": True, "varname": q["variable"],
+                                "varvalue": self.variables[q["variable"]]})
+        if "readevent" == op:
+            events, self.queue = self.queue[:int(q["count"])], self.queue[int(q["count"]):]
+            return self.answer({"success": True, "count": len(events), "event": events})
+        if "sendevent" == op:
+            if q["vscpevent"].startswith("0,99,"):
+                return self.answer({"success": False, "code": -1, "message": "Failure",
+                                    "description": "Event refused"})
+            return self.answer({"success": True})
+        return self.answer({"success": True})
+
+    def answer(self, obj):
+        return 200, {"Content-Type": "application/json"}, json.dumps(obj).encode()
+
+
+@pytest.fixture
+def daemon(http_standin):
+    return Daemon(http_standin)
+
+
+def client(daemon, **kwargs):
+    return vscp_rest.RestClient(daemon.server.url + "/vscp/rest", **kwargs)
+
+
+def test_read_var(daemon):
+    c = client(daemon)
+    assert "Super" == c.read_var("test")
+    assert ["open", "readvar"] == daemon.ops()
+
+
+def test_application_error_does_not_reopen(daemon):
+    c = client(daemon)
+    c.open()
+    with pytest.raises(vscp_rest.RestError) as e:
+        c.read_var("missing")
+    assert not e.value.invalid_session
+    assert ["open", "readvar"] == daemon.ops()
+    assert "s1" == c.session
+
+
+def test_refused_send_does_not_reopen(daemon):
+    c = client(daemon)
+    evs = [{"vscpHead": 0, "vscpClass": cls, "vscpType": 1, "vscpGuid": "-", "vscpData": []}
+           for cls in (20, 99, 20)]
+    assert 1 == c.send_many(evs)
+    assert ["open", "sendevent", "sendevent", "sendevent"] == daemon.ops()
+
+
+def test_expired_session_is_opened_again(daemon):
+    c = client(daemon)
+    c.open()
+    daemon.sessions.clear()
+    assert "Super" == c.read_var("test")
+    assert ["open", "readvar", "open", "readvar"] == daemon.ops()
+    assert "s2" == c.session
+
+
+def test_read_events_after_expired_session(daemon):
+    c = client(daemon)
+    c.open()
+    daemon.sessions.clear()
+    daemon.queue = ["0,10,6,0,,0,-,1,35"]
+    assert [10] == [ev["vscpClass"] for ev in c.read_events()]
+    assert ["open", "readevent", "open", "readevent"] == daemon.ops()
+
+
+def test_read_events_count_adapts(daemon):
+    c = client(daemon, max_count=8)
+    daemon.queue = [{"vscpClass": 10, "vscpType": 6, "vscpData": [i]} for i in range(20)]
+    counts = [len(c.read_events()) for _ in range(6)]
+    assert [1, 2, 4, 8, 5, 0] == counts
+    assert 4 == c.count
+
+
+def test_iter_array_in_small_chunks():
+    text = '{"success":true,"count":2,"event":[{"a":"],"},{"b":[1,2]}]}'
+    chunks = iter([text[i:i + 3] for i in range(0, len(text), 3)])
+    assert [{"a": "],"}, {"b": [1, 2]}] == list(vscp_rest.iter_array(lambda: next(chunks, "")))
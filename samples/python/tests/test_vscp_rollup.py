@@ -0,0 +1,63 @@
+import vscp_rollup
+from vscp_rollup import HOUR, MINUTE, Series
+
+KEY = ("FF:FF:FF:FF:FF:FF:FF:FF:FF:FF:FF:FF:FF:FF:FF:01", 6, 0)
+T0 = 1767225600     # 2026-01-01 00:00 UTC
+
+
+def test_bucket_aggregates():
+    s = Series(MINUTE, 60)
+    for t, v in ((T0, 1.0), (T0 + 30, 3.0), (T0 + 60, 5.0)):
+        assert s.add(t, v)
+    assert [(T0, 1.0, 3.0, 2.0, 2), (T0 + 60, 5.0, 5.0, 5.0, 1)] == s.points(T0, T0 + 120)
+
+
+def test_out_of_order_within_retention_extends_back():
+    s = Series(MINUTE, 60)
+    s.add(T0 + 610, 10.0)
+    assert s.add(T0 + 605, 9.0)         # Same bucket, seconds late
+    assert s.add(T0 + 590, 8.0)         # The bucket before
+    assert s.add(T0, 1.0)               # Ten minutes before the first
+    assert T0 // MINUTE == s.start
+    assert 11 == len(s)
+    assert [(T0, 1.0, 1.0, 1.0, 1), (T0 + 540, 8.0, 8.0, 8.0, 1),
+            (T0 + 600, 9.0, 10.0, 9.5, 2)] == s.points(T0, T0 + 660)
+
+
+def test_older_than_retention_is_dropped():
+    s = Series(MINUTE, 60)
+    s.add(T0 + 3600, 10.0)
+    assert not s.add(T0 + 3600 - 60 * MINUTE, 1.0)
+    assert s.add(T0 + 3600 - 59 * MINUTE, 2.0)
+    assert 60 == len(s)
+
+
+def test_trimmed_series_keeps_retention():
+    s = Series(MINUTE, 60)
+    for m in range(200):
+        s.add(T0 + m * MINUTE, float(m))
+    newest = T0 + 199 * MINUTE
+    assert s.complete_from() <= newest - 59 * MINUTE
+    assert s.add(newest - 59 * MINUTE, 0.0)
+    # Buckets are trimmed now and then, older than those kept is dropped
+    assert not s.add(s.start * MINUTE - MINUTE, 0.0)
+    assert len(s) <= 60 + 60 // 4 + 1
+
+
+def test_rollup_counts_dropped_per_resolution():
+    rollup = vscp_rollup.Rollup(((MINUTE, 60), (HOUR, 48)))
+    rollup.add(KEY, T0 + 10 * HOUR, 20.0)
+    rollup.add(KEY, T0 + 8 * HOUR, 18.0)        # Too old for minutes, fine for hours
+    rollup.add(KEY, T0 - 40 * HOUR, 0.0)        # Too old for both
+    assert {MINUTE: 2, HOUR: 1} == rollup.dropped
+    points = rollup.chart(KEY, T0, T0 + 12 * HOUR, points=12)
+    assert [(T0 + 8 * HOUR, 18.0), (T0 + 10 * HOUR, 20.0)] == [(p[0], p[1]) for p in points]
+
+
+def test_out_of_order_load_from_event_log():
+    rollup = vscp_rollup.Rollup()
+    times = [T0 + 3600, T0 + 60, T0 + 7200, T0]
+    for i, t in enumerate(times):
+        rollup.add(KEY, t, float(i))
+    assert 4 == sum(p[4] for p in rollup.chart(KEY, T0, T0 + 3 * HOUR, points=1000))
+    assert 0 == sum(rollup.dropped.values())
@@ -0,0 +1,190 @@
+import sqlite3
+import struct
+import time
+
+import pytest
+
+import vscp_measurement
+import vscp_sqlsink
+import vscp_type
+
+GUID = "FF:FF:FF:FF:FF:FF:FF:FF:28:9A:3C:1E:02:00:00:8B"
+TEMPERATURE = vscp_type.VSCP_TYPE_MEASUREMENT_TEMPERATURE
+
+
+def event(data, vscpclass=10, vscptype=TEMPERATURE, datetime="2026-01-02T03:04:05Z"):
+    return {"vscpHead": 0, "vscpClass": vscpclass, "vscpType": vscptype,
+            "vscpObId": 0, "vscpDateTime": datetime, "vscpTimeStamp": 0,
+            "vscpGuid": GUID, "vscpData": list(data)}
+
+
+def celsius(value, sensor=0):
+    # Integer coding, unit 1 (Celsius)
+    return event([0x60 | 1 << 3 | sensor] + list(struct.pack(">h", value)))
+
+
+# ----------------------------------------------------------------------------
+#                       M E A S U R E M E N T   D E C O D I N G
+# ----------------------------------------------------------------------------
+
+@pytest.mark.parametrize("data, value, unit, sensor", [
+    ([0x68, 0x00, 0x19], 25, 1, 0),                         # integer
+    ([0x69, 0xFF, 0xF6], -10, 1, 1),                        # negative integer
+    ([0x88, 0x81, 0x00, 0xFB], 25.1, 1, 0),                 # normalized, point left
+    ([0x90, 0x02, 0x03], 300, 2, 0),                        # normalized, point right
+    ([0xA8] + list(struct.pack(">f", 21.5)), 21.5, 1, 0),   # float
+    ([0x48] + list(b"22.25"), 22.25, 1, 0),                 # string
+])
+def test_decode_measurement(data, value, unit, sensor):
+    m = vscp_measurement.decode(event(data))
+    assert value == pytest.approx(m.value)
+    assert (unit, sensor) == (m.unit, m.sensorindex)
+
+
+def test_decode_measurezone():
+    m = vscp_measurement.decode(event([2, 7, 9, 0x68, 0x00, 0x19], vscpclass=65))
+    assert (25, 1, 2, 7, 9) == (m.value, m.unit, m.sensorindex, m.zone, m.subzone)
+
+
+def test_decode_level1_over_level2():
+    m = vscp_measurement.decode(event([0] * 16 + [0x68, 0x00, 0x19], vscpclass=512 + 10))
+    assert 25 == m.value
+
+
+def test_decode_class2_float():
+    m = vscp_measurement.decode(event([3, 4, 5, 1] + list(struct.pack(">d", -3.25)),
+                                      vscpclass=1060))
+    assert (-3.25, 1, 3, 4, 5) == (m.value, m.unit, m.sensorindex, m.zone, m.subzone)
+
+
+def test_decode_other_events():
+    assert vscp_measurement.decode(event([1, 2, 3], vscpclass=20)) is None
+    assert vscp_measurement.decode(event([], vscpclass=10)) is None
+
+
+def test_event_time():
+    assert 1767323045 == vscp_measurement.event_time(event([]))
+    assert 42 == vscp_measurement.event_time(event([], datetime=""), now=42)
+
+
+# ----------------------------------------------------------------------------
+#                                  T A B L E S
+# ----------------------------------------------------------------------------
+
+def test_digitemp_row_in_fahrenheit():
+    ev = celsius(25)
+    t = vscp_measurement.event_time(ev)
+    row = vscp_sqlsink.DIGITEMP.row(ev, vscp_measurement.decode(ev), t)
+    assert (time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(t)),
+            "289A3C1E0200008B", 77.0) == row
+
+
+def test_digitemp_kelvin():
+    ev = event([0x80, 0x82, 0x75, 0x3F])     # normalized 300.15, unit 0 (Kelvin)
+    row = vscp_sqlsink.DIGITEMP.row(ev, vscp_measurement.decode(ev), 0)
+    assert 80.6 == row[2]
+
+
+def test_digitemp_only_temperatures():
+    ev = celsius(25)
+    ev["vscpType"] = vscp_type.VSCP_TYPE_MEASUREMENT_HUMIDITY
+    assert vscp_sqlsink.DIGITEMP.row(ev, vscp_measurement.decode(ev), 0) is None
+
+
+# ----------------------------------------------------------------------------
+#                                   S I N K
+# ----------------------------------------------------------------------------
+
+@pytest.fixture
+def db(tmp_path):
+    db = vscp_sqlsink.SqliteAdapter(str(tmp_path / "vscp.sqlite"), timeout=0.05)
+    yield db
+    db.close()
+
+
+def count(db, table):
+    return db.query("SELECT COUNT(*) FROM %s" % table)[0][0]
+
+
+def test_sink_flushes_full_batches(db):
+    db.create(vscp_sqlsink.MEASUREMENTS)
+    sink = vscp_sqlsink.SqlSink(db, flush_size=10, flush_interval=60)
+    for i in range(25):
+        assert sink.put(celsius(i), now=0)
+    assert 20 == count(db, "vscp_measurement")
+    assert 5 == len(sink.rows)
+    assert 5 == sink.flush()
+    assert 25 == count(db, "vscp_measurement")
+    assert 3 == sink.counters.snapshot()["flushes"]
+
+
+def test_sink_rows(db):
+    db.create(vscp_sqlsink.MEASUREMENTS)
+    sink = vscp_sqlsink.SqlSink(db, flush_size=2)
+    sink.put(celsius(21, sensor=1), now=0)
+    sink.put(celsius(22, sensor=2), now=0)
+    assert [(1767323045.0, GUID, 10, TEMPERATURE, 1, 1, 21.0),
+            (1767323045.0, GUID, 10, TEMPERATURE, 2, 1, 22.0)] == db.query(
+                "SELECT * FROM vscp_measurement ORDER BY sensorindex")
+
+
+def test_sink_flushes_on_interval(db):
+    db.create(vscp_sqlsink.MEASUREMENTS)
+    sink = vscp_sqlsink.SqlSink(db, flush_size=100, flush_interval=5)
+    sink.put(celsius(20), now=0)
+    sink.tick(now=4)
+    assert 0 == count(db, "vscp_measurement")
+    sink.tick(now=5)
+    assert 1 == count(db, "vscp_measurement")
+
+
+def test_sink_ignores_other_events(db):
+    sink = vscp_sqlsink.SqlSink(db)
+    assert not sink.put(event([1, 2], vscpclass=20), now=0)
+    assert 1 == sink.counters.snapshot()["ignored"]
+
+
+def test_sink_digitemp_table(db):
+    db.create(vscp_sqlsink.DIGITEMP)
+    sink = vscp_sqlsink.SqlSink(db, vscp_sqlsink.DIGITEMP, flush_size=1)
+    sink.put(celsius(100), now=0)
+    assert [("289A3C1E0200008B", 212)] == db.query("SELECT SerialNumber, Fahrenheit FROM digitemp")
+
+
+def test_sink_retries_locked_database(tmp_path, db):
+    db.create(vscp_sqlsink.MEASUREMENTS)
+    sink = vscp_sqlsink.SqlSink(db, flush_size=5, flush_interval=10)
+    lock = sqlite3.connect(str(tmp_path / "vscp.sqlite"))
+    lock.execute("BEGIN EXCLUSIVE")
+    for i in range(5):
+        sink.put(celsius(i), now=0)
+    s = sink.counters.snapshot()
+    assert 1 == s["errors"] and 5 == len(sink.rows)
+
+    # Not tried again before flush_interval has passed
+    sink.put(celsius(5), now=1)
+    assert 1 == sink.counters.snapshot()["errors"]
+
+    lock.rollback()
+    lock.close()
+    sink.tick(now=9)
+    assert 0 == count(db, "vscp_measurement")
+    sink.tick(now=10)
+    assert 6 == count(db, "vscp_measurement")
+    assert 0 == len(sink.rows)
+    assert [0, 1, 2, 3, 4, 5] == [r[0] for r in db.query(
+        "SELECT value FROM vscp_measurement ORDER BY rowid")]
+
+
+def test_sink_keeps_newest_when_database_is_away(tmp_path, db):
+    db.create(vscp_sqlsink.MEASUREMENTS)
+    sink = vscp_sqlsink.SqlSink(db, flush_size=1, flush_interval=1000, max_pending=3)
+    lock = sqlite3.connect(str(tmp_path / "vscp.sqlite"))
+    lock.execute("BEGIN EXCLUSIVE")
+    for i in range(10):
+        sink.put(celsius(i), now=i)
+    assert 7 == sink.counters.snapshot()["dropped"]
+    lock.rollback()
+    lock.close()
+    assert 3 == sink.flush()
+    assert [7, 8, 9] == [r[0] for r in db.query("SELECT value FROM vscp_measurement ORDER BY rowid")]
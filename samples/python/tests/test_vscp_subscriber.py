@@ -0,0 +1,202 @@
+import json
+import threading
+import time
+import zlib
+
+import pytest
+
+import vscp_subscriber
+from vscp_subscriber import POLICY_BLOCK, POLICY_DROP, Subscriber, TopicTrie
+
+
+# ----------------------------------------------------------------------------
+#                             T O P I C   T R I E
+# ----------------------------------------------------------------------------
+
+@pytest.mark.parametrize("topic_filter, topic, matched", [
+    ("vscp/a/10/6", "vscp/a/10/6", True),
+    ("vscp/a/10/6", "vscp/a/10/7", False),
+    ("vscp/a/10", "vscp/a/10/6", False),
+    ("vscp/+/10/6", "vscp/a/10/6", True),
+    ("vscp/+/+/+", "vscp/a/10/6", True),
+    ("vscp/+/+", "vscp/a/10/6", False),
+    ("vscp/+", "vscp/", True),              # '+' matches an empty level
+    ("vscp/+", "vscp", False),
+    ("vscp/#", "vscp/a/10/6", True),
+    ("vscp/#", "vscp", True),               # '#' matches the parent level
+    ("vscp/a/#", "vscp", False),
+    ("vscp/+/10/#", "vscp/a/10", True),
+    ("#", "vscp/a", True),
+    ("#", "$SYS/broker/load", False),       # No wildcards on '$' topics
+    ("+/broker/load", "$SYS/broker/load", False),
+    ("$SYS/#", "$SYS/broker/load", True),
+    ("$SYS/+/load", "$SYS/broker/load", True),
+])
+def test_match(topic_filter, topic, matched):
+    trie = TopicTrie()
+    trie.add(topic_filter, "h")
+    assert (["h"] if matched else []) == trie.match(topic)
+
+
+def test_overlapping_filters():
+    trie = TopicTrie()
+    for name, topic_filter in (("all", "#"), ("vscp", "vscp/#"), ("guid", "vscp/a/+/+"),
+                               ("exact", "vscp/a/10/6"), ("type", "vscp/+/10/6"),
+                               ("other", "vscp/b/#")):
+        trie.add(topic_filter, name)
+    assert {"all", "vscp", "guid", "exact", "type"} == set(trie.match("vscp/a/10/6"))
+    assert {"all", "vscp", "type", "other"} == set(trie.match("vscp/b/10/6"))
+    assert {"all", "vscp"} == set(trie.match("vscp"))
+
+
+def test_handler_with_overlapping_filters_once():
+    trie = TopicTrie()
+    trie.add("vscp/#", "h")
+    trie.add("vscp/+/10/6", "h")
+    trie.add("vscp/a/10/6", "h")
+    assert ["h"] == trie.match("vscp/a/10/6")
+
+
+def test_add_and_remove_clear_the_cache():
+    trie = TopicTrie(cache_size=2)
+    trie.add("vscp/#", "a")
+    assert ["a"] == trie.match("vscp/x")
+    trie.add("vscp/x", "b")
+    assert {"a", "b"} == set(trie.match("vscp/x"))
+    trie.remove("vscp/#", "a")
+    assert ["b"] == trie.match("vscp/x")
+    trie.remove("no/such/filter", "b")
+    for i in range(10):
+        trie.match("vscp/%d" % i)
+    assert len(trie.cache) <= 2
+
+
+# ----------------------------------------------------------------------------
+#                              S U B S C R I B E R
+# ----------------------------------------------------------------------------
+
+class Client:
+    """What Subscriber uses of a paho MQTT client."""
+
+    def __init__(self):
+        self.subscribed = []
+
+    def is_connected(self):
+        return True
+
+    def subscribe(self, topic, qos):
+        self.subscribed.append((topic, qos))
+
+    def loop_start(self):
+        pass
+
+    def loop_stop(self):
+        pass
+
+
+class Message:
+    def __init__(self, topic, n):
+        self.topic = topic
+        self.payload = json.dumps({"vscpHead": 0, "vscpClass": 10, "vscpType": 6,
+                                   "vscpGuid": "-", "vscpData": [n]}).encode()
+
+
+def topics_on_worker(workers, worker, count):
+    # Topics that go to the queue of one worker
+    topics = ["vscp/%d" % i for i in range(1000)
+              if zlib.crc32(("vscp/%d" % i).encode()) % workers == worker]
+    return topics[:count]
+
+
+def test_routes_and_counts():
+    client = Client()
+    sub = Subscriber(client, workers=2)
+    got = []
+    sub.route("vscp/#", lambda topic, ev: got.append((topic, ev["vscpData"][0])), qos=1)
+    sub.route("vscp/bad", lambda topic, ev: 1 / 0)
+    assert [("vscp/#", 1), ("vscp/bad", 0)] == client.subscribed
+    sub.start()
+    sub.on_message(client, None, Message("vscp/a", 1))
+    sub.on_message(client, None, Message("other", 2))
+    bad = Message("vscp/a", 3)
+    bad.payload = b"{not json"
+    sub.on_message(client, None, bad)
+    sub.on_message(client, None, Message("vscp/bad", 4))
+    sub.stop()
+    assert [("vscp/a", 1), ("vscp/bad", 4)] == got
+    s = sub.stats()
+    assert (4, 2, 1, 1, 1, 0) == (s["received"], s["handled"], s["unrouted"],
+                                  s["decode_errors"], s["handler_errors"], s["queued"])
+
+
+def test_resubscribe_on_connect():
+    client = Client()
+    sub = Subscriber(client)
+    sub.route("a/#", print)
+    sub.route("a/#", repr)
+    sub.route("b", print, qos=2)
+    client.subscribed = []
+    sub.on_connect(client, None, {}, 0)
+    assert [("a/#", 0), ("b", 2)] == client.subscribed
+
+
+def test_drop_when_worker_queue_is_full():
+    client = Client()
+    sub = Subscriber(client, workers=2, queue_size=3, policy=POLICY_DROP)
+    sub.route("#", lambda topic, ev: None)
+    full, other = topics_on_worker(2, 0, 1)[0], topics_on_worker(2, 1, 1)[0]
+    # Workers not started, nothing is taken from the queues
+    for n in range(10):
+        sub.on_message(client, None, Message(full, n))
+    sub.on_message(client, None, Message(other, 0))
+    assert 7 == sub.counters.dropped
+    assert [3, 1] == [q.qsize() for q in sub.queues]
+    sub.start()
+    sub.stop()
+    s = sub.stats()
+    assert (11, 4, 7) == (s["received"], s["handled"], s["dropped"])
+
+
+def test_block_when_worker_queue_is_full():
+    client = Client()
+    sub = Subscriber(client, workers=2, queue_size=2, policy=POLICY_BLOCK)
+    release = threading.Event()
+    got = []
+
+    def handler(topic, ev):
+        release.wait()
+        got.append(ev["vscpData"][0])
+    sub.route("#", handler)
+    sub.start()
+    topic = topics_on_worker(2, 0, 1)[0]
+
+    def network():
+        # paho's network thread
+        for n in range(10):
+            sub.on_message(client, None, Message(topic, n))
+    t = threading.Thread(target=network)
+    t.start()
+    time.sleep(0.2)
+    # One in the handler, two queued, the network thread waits
+    assert t.is_alive()
+    assert 4 == sub.counters.received
+    release.set()
+    t.join(5)
+    sub.stop()
+    assert list(range(10)) == got
+    assert 0 == sub.counters.dropped
+
+
+def test_unknown_policy():
+    with pytest.raises(ValueError):
+        Subscriber(Client(), policy="lose")
+    assert {POLICY_BLOCK, POLICY_DROP} == set(vscp_subscriber.POLICIES)
+
+
+def test_counter_rates():
+    counters = vscp_subscriber.Counters(("a", "b"))
+    counters.inc("a", 5)
+    s = counters.snapshot()
+    assert (5, 0) == (s["a"], s["b"]) and s["a_rate"] > 0
+    s = counters.snapshot()
+    assert 5 == s["a"] and 0 == s["a_rate"]
@@ -0,0 +1,157 @@
+import threading
+import time
+
+import pytest
+
+import vscp_varcache
+
+
+class Client:
+    """RestClient read_var/write_var on a dict, fails when told to."""
+
+    def __init__(self, **variables):
+        self.variables = variables
+        self.reads = 0
+        self.writes = []
+        self.fail = None
+        self.gate = None
+        self.write_gate = None
+
+    def read_var(self, name):
+        self.reads += 1
+        if self.gate is not None:
+            self.gate.wait(5)
+        if self.fail is not None:
+            error, self.fail = self.fail, None
+            raise error
+        return self.variables[name]
+
+    def write_var(self, name, value):
+        if self.write_gate is not None:
+            self.write_gate.wait(5)
+        if self.fail is not None:
+            error, self.fail = self.fail, None
+            raise error
+        self.writes.append((name, value))
+        self.variables[name] = value
+
+
+def test_hit_within_ttl():
+    client = Client(x="1")
+    cache = vscp_varcache.VariableCache(client, default_ttl=60)
+    assert "1" == cache.get("x") == cache.get("x")
+    assert 1 == client.reads
+
+
+@pytest.mark.parametrize("error", [ValueError("not JSON"), OSError("down"), KeyError("x")])
+def test_failed_read_is_read_again(error):
+    client = Client(x="1")
+    client.fail = error
+    cache = vscp_varcache.VariableCache(client, default_ttl=60)
+    with pytest.raises(type(error)):
+        cache.get("x")
+    assert "1" == cache.get("x")
+    assert 2 == client.reads
+    assert 1 == cache.counters.snapshot()["errors"]
+
+
+def test_failed_read_reaches_all_waiting():
+    client = Client(x="1")
+    client.gate = threading.Event()
+    client.fail = ValueError("not JSON")
+    cache = vscp_varcache.VariableCache(client, default_ttl=60)
+    errors = []
+
+    def get():
+        try:
+            cache.get("x")
+        except ValueError as e:
+            errors.append(e)
+    threads = [threading.Thread(target=get) for _ in range(5)]
+    for t in threads:
+        t.start()
+    while client.reads < 1:
+        time.sleep(0.01)
+    time.sleep(0.05)
+    client.gate.set()
+    for t in threads:
+        t.join(5)
+    assert 5 == len(errors)
+    assert 1 == client.reads
+    assert 4 == cache.counters.snapshot()["shared"]
+
+
+def test_wait_for_a_read_times_out():
+    client = Client(x="1")
+    client.gate = threading.Event()
+    cache = vscp_varcache.VariableCache(client, default_ttl=60, timeout=0.1)
+    reader = threading.Thread(target=cache.get, args=("x",))
+    reader.start()
+    while client.reads < 1:
+        time.sleep(0.01)
+    with pytest.raises(TimeoutError):
+        cache.get("x")
+    client.gate.set()
+    reader.join(5)
+
+
+def test_poll_survives_errors():
+    client = Client(x="1")
+    cache = vscp_varcache.VariableCache(client, default_ttl=1)
+    seen = []
+    cache.watch("x", lambda name, value: seen.append(value), interval=1)
+    client.fail = ValueError("not JSON")
+    cache.poll(now=time.monotonic() + 1)
+    client.variables["x"] = "2"
+    cache.poll(now=time.monotonic() + 2)
+    assert ["2"] == seen
+
+
+def test_writes_are_batched_and_retried():
+    client = Client(x="1")
+    cache = vscp_varcache.VariableCache(client, write_delay=0)
+    cache.set("x", "2")
+    cache.set("x", "3")
+    client.fail = ValueError("not JSON")
+    assert 1 == cache.flush()
+    assert 0 == cache.flush()
+    assert [("x", "3")] == client.writes
+
+
+def test_concurrent_flushes_one_at_a_time(capsys):
+    client = Client(x="1", y="1")
+    client.write_gate = threading.Event()
+    cache = vscp_varcache.VariableCache(client, write_delay=0)
+    cache.set("x", "2")
+    first = threading.Thread(target=cache.flush)
+    first.start()
+    time.sleep(0.1)
+    cache.set("y", "2")
+    second = threading.Thread(target=cache.flush)
+    second.start()
+    time.sleep(0.1)
+    # The second waits, what the first writes is still known as being written
+    assert second.is_alive()
+    assert {"x": "2"} == cache.writing
+    assert {"y": "2"} == cache.writes
+    client.write_gate.set()
+    first.join(5)
+    second.join(5)
+    assert [("x", "2"), ("y", "2")] == client.writes
+    assert {} == cache.writing == cache.writes
+    client.fail = OSError("down")
+    cache.set("x", "3")
+    assert 1 == cache.flush()
+    assert 1 == cache.counters.snapshot()["errors"]
+    # Counted, not printed
+    assert "" == capsys.readouterr().out
+
+
+def test_changed_since_version():
+    client = Client(x="1")
+    cache = vscp_varcache.VariableCache(client, default_ttl=0)
+    version, value = cache.changed("x")
+    assert "1" == value
+    assert cache.changed("x", version) is None
+    client.variables["x"] = "2"
+    assert (version + 1, "2") == cache.changed("x", version)
@@ -0,0 +1,193 @@
+import asyncio
+
+import pytest
+
+import vscp_ws
+from vscp_subscriber import POLICY_BLOCK, POLICY_DROP
+from vscp_ws import OP_TEXT, VscpWsError, encode_frame
+from vscpd_ws_standin import StandIn
+
+GUID = "ff:ff:ff:ff:ff:ff:ff:ff:ff:ff:ff:ff:ff:ff:ff:01"
+
+
+def event(n, vscpclass=10):
+    return {"vscpHead": 0, "vscpClass": vscpclass, "vscpType": 6, "vscpGuid": GUID,
+            "vscpData": [0x89, 0x02, n & 0xFF, n >> 8]}
+
+
+def run(standin, test, **kwargs):
+    """test(standin, client) against the stand-in on a free port."""
+    async def main():
+        server = await asyncio.start_server(standin.client, "127.0.0.1", 0)
+        port = server.sockets[0].getsockname()[1]
+        kwargs.setdefault("auth_wait", 0.2)
+        client = vscp_ws.Client("ws://127.0.0.1:%d" % port, **kwargs)
+        try:
+            await asyncio.wait_for(client.connect(), 5)
+            return await asyncio.wait_for(test(standin, client), 10)
+        finally:
+            await client.close()
+            server.close()
+    return asyncio.run(main())
+
+
+def connection(standin):
+    (conn,) = standin.connections
+    return conn
+
+
+def test_handshake_and_commands():
+    async def test(standin, client):
+        assert client.auth_sid is None
+        assert "NOOP" == await client.command("noop")
+        await client.subscribe("0,10,6," + GUID)
+        conn = connection(standin)
+        assert conn.open
+        assert conn.received[1].startswith("C;SETFILTER;0,10,6," + GUID + ";")
+        assert "C;open" == conn.received[2]
+    run(StandIn(), test)
+
+
+def test_auth():
+    async def test(standin, client):
+        assert client.auth_sid == connection(standin).sid
+        assert connection(standin).authenticated
+        assert 0 == await client.send_many([event(1)])
+    run(StandIn("admin", "secret"), test, user="admin", password="secret")
+
+
+def test_auth_bad_password():
+    async def test(standin, client):
+        pass
+    with pytest.raises(VscpWsError, match="AUTH"):
+        run(StandIn("admin", "secret"), test, user="admin", password="wrong")
+
+
+def test_compressed_both_ways():
+    async def test(standin, client):
+        assert client.deflate is not None
+        await client.subscribe()
+        # Long enough to be compressed, twice so the context is taken over
+        events = [dict(event(n), vscpData=list(range(60))) for n in range(2)]
+        assert 0 == await client.send_many(events)
+        conn = connection(standin)
+        assert 2 == conn.compressed_in
+        for ev in events:
+            await standin.broadcast(ev)
+        got = []
+        async for ev in client.events():
+            got.append(ev["vscpData"])
+            if 2 == len(got):
+                break
+        assert [list(range(60))] * 2 == got
+        assert 2 == conn.compressed_out
+    run(StandIn(), test)
+
+
+def test_no_context_takeover():
+    async def test(standin, client):
+        await client.subscribe()
+        ev = dict(event(0), vscpData=list(range(60)))
+        assert 0 == await client.send_many([ev, ev])
+        await standin.broadcast(ev)
+        await standin.broadcast(ev)
+        got = []
+        async for ev in client.events():
+            got.append(ev)
+            if 2 == len(got):
+                break
+        assert 2 == connection(standin).compressed_out
+    run(StandIn(deflate_params="server_no_context_takeover; client_no_context_takeover"),
+        test)
+
+
+def test_not_compressed_when_turned_down():
+    async def test(standin, client):
+        assert client.deflate is None
+        assert await client.send(dict(event(0), vscpData=list(range(60))))
+        assert 0 == connection(standin).compressed_in
+    run(StandIn(deflate=False), test)
+
+
+def test_send_many_replies_in_order():
+    async def test(standin, client):
+        events = [event(n, 99 if n % 3 else 10) for n in range(30)]
+        assert 20 == await client.send_many(events)
+        # Replies matched in order, the next command gets its own
+        assert "NOOP" == await client.command("noop")
+        assert 10 == standin.events
+        sent = [m for m in connection(standin).received if m.startswith("E;")]
+        assert ["E;" + vscp_ws.vscp_tcpip.format_event(ev) for ev in events] == sent
+        assert 10 == client.counters.sent
+        assert 20 == client.counters.refused
+    run(StandIn(refuse=lambda ev: 99 == ev["vscpClass"]), test)
+
+
+def test_ping_timeout():
+    async def test(standin, client):
+        await client.subscribe()
+        with pytest.raises(VscpWsError, match="ping"):
+            async for ev in client.events():
+                pass
+        with pytest.raises(VscpWsError):
+            await client.command("noop")
+    run(StandIn(answer_pings=False), test, ping_interval=0.1, ping_timeout=0.2)
+
+
+def test_pings_answered():
+    async def test(standin, client):
+        await asyncio.sleep(0.5)
+        assert client.counters.pings >= 3
+        assert "NOOP" == await client.command("noop")
+    run(StandIn(), test, ping_interval=0.1, ping_timeout=0.2)
+
+
+def test_disconnect_block():
+    async def test(standin, client):
+        await client.subscribe()
+
+        async def daemon():
+            for n in range(1000):
+                await standin.broadcast(event(n))
+            standin.disconnect()
+
+        task = asyncio.ensure_future(daemon())
+        got = []
+        with pytest.raises(VscpWsError):
+            async for ev in client.events():
+                got.append(ev["vscpData"][2] | ev["vscpData"][3] << 8)
+                if len(got) % 100 == 0:
+                    await asyncio.sleep(0.01)
+        await task
+        assert list(range(1000)) == got
+        assert 0 == client.counters.dropped
+    run(StandIn(), test, queue_size=10, policy=POLICY_BLOCK)
+
+
+def test_disconnect_drop():
+    async def test(standin, client):
+        await client.subscribe()
+        for n in range(300):
+            await standin.broadcast(event(n))
+        standin.disconnect()
+        await client.closed.wait()
+        got = []
+        with pytest.raises(VscpWsError):
+            async for ev in client.events():
+                got.append(ev["vscpData"][2])
+        assert list(range(10)) == got
+        assert 290 == client.counters.dropped
+    run(StandIn(), test, queue_size=10, policy=POLICY_DROP)
+
+
+def test_bad_compressed_frame_fails_connection():
+    async def test(standin, client):
+        await client.subscribe()
+        connection(standin).writer.write(encode_frame(OP_TEXT, b"\xff" * 8, mask=False,
+                                                      rsv1=True))
+        with pytest.raises(VscpWsError, match="error"):
+            async for ev in client.events():
+                pass
+        with pytest.raises(VscpWsError):
+            await client.send(event(0))
+    run(StandIn(), test)
@@ -0,0 +1,406 @@
+#!/usr/bin/env python3
+
+# vscp_alarm.py
+#
+# Alarms from measurement events with the digitemp/dtgraph limits
+#
+# Limits are the columns of digitemp_metadata (see
+# components/digitemp/dtgraph-0.2/SQL) per sensor
+#
+#   min, max, alarm                 value outside [min, max] when alarm = 1
+#   maxchange, maxchange_interval,  value changed more than maxchange
+#   maxchange_alarm                 within maxchange_interval seconds when
+#                                   maxchange_alarm = 1
+#
+# The sensor is the SerialNumber of the digitemp tables, the last eight
+# GUID bytes as for the 1-wire samples. Temperatures are compared in
+# Fahrenheit as dtgraph stores them, other measurements as they come.
+#
+# Sensors are kept in a dict by serial number so an event costs one
+# lookup however many sensors there are. The change within the interval
+# is max - min of the values in it, kept with a pair of monotonic queues
+# (amortized O(1) per value) instead of the SELECT max(), min() the old
+# digitempWatcher.pl ran for every reading.
+#
+# As with alarmTracker.sh an alarm is raised once per incident. A raised
+# alarm gives a CLASS1.ALARM, Type=2 (alarm occurred) event from the
+# sensor GUID with data
+#
+#   0   alarm byte, bit 0 out of range, bit 1 changing too fast
+#   1   zone
+#   2   subzone
+#
+# and raised and cleared alarms give records for the digitemp_alarms
+# table. Records are kept until they have been written, when the
+# database is locked or away they are written at a later interval.
+#
+# Usage: vscp_alarm.py [--db FILE] [--host HOST] [--send-host HOST] ...
+#
+# This file is part of the VSCP (https://www.vscp.org) project
+#
+# The MIT License (MIT)
+#
+# Copyright © 2000-2026 Ake Hedman, the VSCP project
+# <info@vscp.org>
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#
+
+import argparse
+import asyncio
+import collections
+import sys
+import time
+
+import vscp_class
+import vscp_measurement
+import vscp_tcpip
+import vscp_type
+from vscp_sqlsink import SqliteAdapter
+from vscp_subscriber import Counters
+
+# alarm_type of digitemp_alarms
+ALARM_RANGE = "range"
+ALARM_MAXCHANGE = "maxchange"
+
+# Bits of the alarm byte
+_BITS = {ALARM_RANGE: 0x01, ALARM_MAXCHANGE: 0x02}
+
+COUNTERS = ("events", "measurements", "raised", "cleared")
+
+Limits = collections.namedtuple("Limits",
+                                "name min max alarm maxchange maxchange_interval maxchange_alarm")
+
+AlarmRecord = collections.namedtuple("AlarmRecord",
+                                     "serial value time_raised time_cleared alarm_type description")
+
+# Columns as in the dtgraph SQL files
+METADATA_COLUMNS = ("SerialNumber", "name", "min", "max", "alarm",
+                    "maxchange", "maxchange_interval", "maxchange_alarm")
+
+# For SQLite, other databases use the dtgraph SQL files
+CREATE = ("CREATE TABLE IF NOT EXISTS digitemp_metadata ("
+          "SerialNumber VARCHAR(17) NOT NULL DEFAULT '' PRIMARY KEY, "
+          "name VARCHAR(15) NOT NULL DEFAULT '', description VARCHAR(255), "
+          "min FLOAT, max FLOAT, alarm TINYINT NOT NULL DEFAULT 0, "
+          "maxchange FLOAT, maxchange_interval INTEGER NOT NULL DEFAULT 3600, "
+          "maxchange_alarm TINYINT NOT NULL DEFAULT 0, "
+          "color VARCHAR(15) NOT NULL DEFAULT 'black')",
+          "CREATE TABLE IF NOT EXISTS digitemp_alarms ("
+          "alarm_id INTEGER PRIMARY KEY AUTOINCREMENT, SerialNumber VARCHAR(17) NOT NULL, "
+          "Fahrenheit DECIMAL(4,2) NOT NULL, time_raised DATETIME NOT NULL, "
+          "time_cleared DATETIME, time_updated TIMESTAMP DEFAULT CURRENT_TIMESTAMP, "
+          "alarm_type VARCHAR(15) NOT NULL, description VARCHAR(255))",
+          "CREATE INDEX IF NOT EXISTS serial_key ON digitemp_alarms (SerialNumber)",
+          "CREATE INDEX IF NOT EXISTS time_cleared_key ON digitemp_alarms (time_cleared)")
+
+
+def serial_number(guid):
+    """digitemp SerialNumber of a GUID."""
+    return guid.replace(":", "")[-16:].upper()
+
+
+def _time(t):
+    return time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(t))
+
+
+# ----------------------------------------------------------------------------
+#                               S E N S O R S
+# ----------------------------------------------------------------------------
+
+class Sensor:
+    """Limits and alarm state of one sensor."""
+
+    __slots__ = ("serial", "limits", "lows", "highs", "last", "raised")
+
+    def __init__(self, serial, limits):
+        self.serial = serial
+        self.limits = limits
+        # (time, value) with increasing values from the oldest in the
+        # interval (lows) and decreasing values (highs), the front is the
+        # min respectively max of the interval
+        self.lows = collections.deque()
+        self.highs = collections.deque()
+        self.last = None
+        self.raised = {}            # alarm_type -> AlarmRecord
+
+    def change(self, t, value):
+        """Max - min of the values within the interval up to t."""
+        if self.last is not None and t < self.last:
+            # Out of order, count it as now
+            t = self.last
+        self.last = t
+        oldest = t - self.limits.maxchange_interval
+        lows = self.lows
+        highs = self.highs
+        while lows and lows[0][0] < oldest:
+            lows.popleft()
+        while highs and highs[0][0] < oldest:
+            highs.popleft()
+        while lows and lows[-1][1] >= value:
+            lows.pop()
+        lows.append((t, value))
+        while highs and highs[-1][1] <= value:
+            highs.pop()
+        highs.append((t, value))
+        return highs[0][1] - lows[0][1]
+
+
+class Evaluator:
+    """Check measurement events against the limits of their sensor."""
+
+    def __init__(self):
+        self.sensors = {}
+        self.records = []           # Raised and cleared since take_records()
+        self.counters = Counters(COUNTERS)
+
+    def set_limits(self, serial, limits):
+        serial = serial.upper()
+        sensor = self.sensors.get(serial)
+        if sensor is None:
+            self.sensors[serial] = Sensor(serial, limits)
+        else:
+            sensor.limits = limits
+
+    def remove(self, serial):
+        self.sensors.pop(serial.upper(), None)
+
+    def load(self, rows):
+        """Limits from rows of METADATA_COLUMNS."""
+        n = 0
+        for serial, name, lo, hi, alarm, maxchange, interval, maxchange_alarm in rows:
+            self.set_limits(serial, Limits(name, lo, hi, bool(alarm), maxchange,
+                                           interval or 3600, bool(maxchange_alarm)))
+            n += 1
+        return n
+
+    def restore(self, records):
+        """Mark alarms raised before a restart so they are not raised again."""
+        for rec in records:
+            sensor = self.sensors.get(rec.serial.upper())
+            if sensor is not None:
+                sensor.raised[rec.alarm_type] = rec
+
+    def active(self):
+        return [rec for sensor in self.sensors.values() for rec in sensor.raised.values()]
+
+    def take_records(self):
+        records = self.records
+        self.records = []
+        return records
+
+    def _raise(self, sensor, alarm_type, value, t, description):
+        if alarm_type in sensor.raised:
+            return False
+        rec = AlarmRecord(sensor.serial, value, t, None, alarm_type, description)
+        sensor.raised[alarm_type] = rec
+        self.records.append(rec)
+        self.counters.inc("raised")
+        return True
+
+    def _clear(self, sensor, alarm_type, t):
+        rec = sensor.raised.pop(alarm_type, None)
+        if rec is not None:
+            self.records.append(rec._replace(time_cleared=t))
+            self.counters.inc("cleared")
+
+    def check(self, sensor, value, t):
+        """Alarm byte of the alarms raised by value."""
+        limits = sensor.limits
+        raised = 0
+
+        if limits.alarm and limits.min != limits.max:
+            if ((limits.min is not None and value < limits.min) or
+                    (limits.max is not None and value > limits.max)):
+                if self._raise(sensor, ALARM_RANGE, value, t,
+                               "%s is at %g, not in %s-%s" % (limits.name or sensor.serial,
+                                                              value, limits.min, limits.max)):
+                    raised |= _BITS[ALARM_RANGE]
+            else:
+                self._clear(sensor, ALARM_RANGE, t)
+
+        if limits.maxchange_alarm and limits.maxchange is not None:
+            change = sensor.change(t, value)
+            if change > limits.maxchange:
+                if self._raise(sensor, ALARM_MAXCHANGE, value, t,
+                               "%s is changing too fast - %g in %d seconds" %
+                               (limits.name or sensor.serial, change,
+                                limits.maxchange_interval)):
+                    raised |= _BITS[ALARM_MAXCHANGE]
+            else:
+                self._clear(sensor, ALARM_MAXCHANGE, t)
+
+        return raised
+
+    def put(self, ev, now=None):
+        """Check an event in VSCP JSON format, the alarm event if it raised one."""
+        self.counters.inc("events")
+        sensor = self.sensors.get(serial_number(ev.get("vscpGuid", "")))
+        if sensor is None:
+            return None
+        m = vscp_measurement.decode(ev)
+        if m is None:
+            return None
+        self.counters.inc("measurements")
+        value = m.value
+        if vscp_type.VSCP_TYPE_MEASUREMENT_TEMPERATURE == ev["vscpType"]:
+            value = vscp_measurement.fahrenheit(value, m.unit)
+        raised = self.check(sensor, value, vscp_measurement.event_time(ev, now))
+        if not raised:
+            return None
+        return alarm_event(ev.get("vscpGuid", "-"), raised, m.zone, m.subzone)
+
+
+def alarm_event(guid, alarm, zone=0, subzone=0):
+    """CLASS1.ALARM, Type=2 alarm occurred event."""
+    return {
+        "vscpHead": 0,
+        "vscpClass": vscp_class.VSCP_CLASS1_ALARM,
+        "vscpType": vscp_type.VSCP_TYPE_ALARM_ALARM,
+        "vscpGuid": guid,
+        "vscpData": [alarm & 0xff, zone & 0xff, subzone & 0xff],
+    }
+
+
+# ----------------------------------------------------------------------------
+#                              D A T A B A S E
+# ----------------------------------------------------------------------------
+
+def load_metadata(db, evaluator):
+    """Limits from digitemp_metadata and open alarms from digitemp_alarms."""
+    n = evaluator.load(db.query("SELECT %s FROM digitemp_metadata" % ", ".join(METADATA_COLUMNS)))
+    evaluator.restore(AlarmRecord(serial, value, raised, None, alarm_type, description)
+                      for serial, value, raised, alarm_type, description in
+                      db.query("SELECT SerialNumber, Fahrenheit, time_raised, alarm_type, "
+                               "description FROM digitemp_alarms WHERE time_cleared IS NULL"))
+    return n
+
+
+def write_records(db, records):
+    """Insert raised and update cleared alarms in digitemp_alarms, one transaction."""
+    p = db.placeholder
+    statements = []
+    for rec in records:
+        if rec.time_cleared is None:
+            statements.append(("INSERT INTO digitemp_alarms (SerialNumber, Fahrenheit, "
+                                "time_raised, alarm_type, description) VALUES (%s, %s, %s, %s, %s)"
+                                % (p, p, p, p, p),
+                                (rec.serial, round(rec.value, 2), _time(rec.time_raised),
+                                 rec.alarm_type, rec.description[:255])))
+        else:
+            statements.append(("UPDATE digitemp_alarms SET time_cleared = %s WHERE "
+                               "SerialNumber = %s AND alarm_type = %s AND time_cleared IS NULL"
+                               % (p, p, p),
+                               (_time(rec.time_cleared), rec.serial, rec.alarm_type)))
+    if statements:
+        db.execute(statements)
+
+
+def flush_records(db, evaluator):
+    """Write the records of evaluator, they are kept for the next flush if it fails."""
+    records = evaluator.take_records()
+    try:
+        write_records(db, records)
+    except db.error:
+        evaluator.records[0:0] = records
+        raise
+    return records
+
+
+# ----------------------------------------------------------------------------
+
+async def run(evaluator, db, arg):
+    client = vscp_tcpip.Client(arg.host, arg.port, arg.user, arg.password)
+    await client.connect()
+    # A connection in receive loop mode can not send
+    sender = None
+    if arg.send_host:
+        sender = vscp_tcpip.Client(arg.send_host, arg.port, arg.user, arg.password)
+        await sender.connect()
+    alarms = []
+
+    async def ticker():
+        # Alarm records and events are written once per interval
+        nonlocal alarms
+        last = time.monotonic()
+        while True:
+            await asyncio.sleep(arg.interval)
+            try:
+                records = flush_records(db, evaluator)
+            except db.error as e:
+                print("Alarm table: %s, retrying" % e)
+                records = []
+            for rec in records:
+                print("%s %s %s: %s" % ("CLEARED" if rec.time_cleared else "RAISED",
+                                        rec.serial, rec.alarm_type, rec.description))
+            events, alarms = alarms, []
+            if events and sender is not None:
+                await sender.send_many(events)
+            if arg.stats and time.monotonic() - last >= arg.stats:
+                s = evaluator.counters.snapshot()
+                print("events %d (%.1f/s) measurements %d raised %d cleared %d active %d" %
+                      (s["events"], s["events_rate"], s["measurements"], s["raised"],
+                       s["cleared"], len(evaluator.active())))
+                last = time.monotonic()
+
+    task = asyncio.ensure_future(ticker())
+    try:
+        async for ev in client.rcvloop():
+            alarm = evaluator.put(ev)
+            if alarm is not None:
+                alarms.append(alarm)
+    finally:
+        task.cancel()
+        if sender is not None:
+            await sender.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Alarms from VSCP measurements and digitemp limits")
+    parser.add_argument('--db', default='vscp.sqlite',
+                        help='SQLite database with digitemp_metadata and digitemp_alarms')
+    parser.add_argument('--host', default='localhost', help='VSCP daemon to read events from')
+    parser.add_argument('--send-host', help='VSCP daemon to send alarm events to')
+    parser.add_argument('--port', type=int, default=vscp_tcpip.DEFAULT_PORT)
+    parser.add_argument('--user', default='admin')
+    parser.add_argument('--password', default='secret')
+    parser.add_argument('--interval', type=float, default=1.0,
+                        help='Seconds between alarm table writes and alarm event sends')
+    parser.add_argument('--stats', type=int, default=0,
+                        help='Print counters every STATS seconds (0 = never)')
+    arg = parser.parse_args(sys.argv[1:])
+
+    db = SqliteAdapter(arg.db)
+    db.execute([(sql, ()) for sql in CREATE])
+    evaluator = Evaluator()
+    print("%d sensors with limits" % load_metadata(db, evaluator))
+    try:
+        asyncio.run(run(evaluator, db, arg))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        try:
+            flush_records(db, evaluator)
+        except db.error as e:
+            print("Alarm table: %s, %d records not written" % (e, len(evaluator.records)))
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
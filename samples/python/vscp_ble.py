@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# vscp_ble.py
+#
+# Decoders for BLE advertisement data of sensors
+#
+# Decoders are registered for an AD type (manufacturer specific data,
+# service data) and a signature at a fixed offset in its data, e.g. the
+# company id or service UUID. decode() finds the decoder with one dict
+# lookup per AD type and signature position in use, so adding another
+# sensor family with the same kind of signature does not add any work
+# for the advertisements of the others.
+#
+# Decoders work on the raw bytes of the AD structure and return the
+# values as ((quantity, value), ...) or None if the data is not theirs
+# after all (wrong length etc).
+#
+# Advertisements can also be recorded to a compact file and read back
+# for replay without a Bluetooth adapter, see Recorder/read_recording.
+#
+# This file is part of the VSCP (https://www.vscp.org) project
+#
+# The MIT License (MIT)
+#
+# Copyright © 2000-2026 Ake Hedman, the VSCP project
+# <info@vscp.org>
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#
+
+import struct
+import time
+
+# AD types (bluepy scan data ids)
+AD_SERVICE_DATA_16 = 0x16
+AD_MANUFACTURER = 0xFF
+
+# Names of common AD types, as bluepy shows them
+AD_NAMES = {
+    0x01: "Flags",
+    0x02: "Incomplete 16b Services",
+    0x03: "Complete 16b Services",
+    0x06: "Incomplete 128b Services",
+    0x07: "Complete 128b Services",
+    0x08: "Short Local Name",
+    0x09: "Complete Local Name",
+    0x0A: "Tx Power",
+    0x16: "16b Service Data",
+    0xFF: "Manufacturer"
+}
+
+# (ad type, offset, signature) -> (family, decoder)
+_decoders = {}
+
+# ad type -> [(offset, signature length)] in use
+_shapes = {}
+
+
+def register(adtype, signature, family, decoder, offset=0):
+    """Use decoder for adtype data with signature at offset."""
+    key = (adtype, offset, bytes(signature))
+    if key in _decoders:
+        raise ValueError("A decoder is already registered for %r" % (key,))
+    _decoders[key] = (family, decoder)
+    shapes = _shapes.setdefault(adtype, [])
+    if (offset, len(signature)) not in shapes:
+        shapes.append((offset, len(signature)))
+
+
+def decode(scandata):
+    """Decode scan data ({ad type: raw bytes}).
+
+    Returns (family, ((quantity, value), ...)) or None for unknown data.
+    """
+    for adtype, shapes in _shapes.items():
+        raw = scandata.get(adtype)
+        if raw is None:
+            continue
+        for offset, length in shapes:
+            entry = _decoders.get((adtype, offset, raw[offset:offset + length]))
+            if entry is not None:
+                values = entry[1](raw)
+                if values is not None:
+                    return entry[0], values
+    return None
+
+
+# ----------------------------------------------------------------------------
+#                              S E N S O R P U C K
+# ----------------------------------------------------------------------------
+
+# Manufacturer data, 14 bytes, 0xAA 0x4A at offset 4 then little endian
+# humidity (0.1 %), temperature (0.1 C), light (2 lux), UV index and
+# battery voltage (0.1 V)
+_sensorpuck = struct.Struct("<HhHBB")
+
+
+def decode_sensorpuck(raw):
+    if 14 != len(raw):
+        return None
+    humidity, temperature, light, uv, voltage = _sensorpuck.unpack_from(raw, 6)
+    return (("humidity", humidity / 10.0),
+            ("temperature", temperature / 10.0),
+            ("light", light * 2),
+            ("uv", uv),
+            ("voltage", voltage / 10.0))
+
+
+register(AD_MANUFACTURER, b"\xaa\x4a", "SensorPuck", decode_sensorpuck, offset=4)
+
+
+# ----------------------------------------------------------------------------
+#                          R E C O R D I N G S
+# ----------------------------------------------------------------------------
+
+# File header then one record per advertisement
+#   <d  time (seconds since the epoch)
+#   6s  address
+#   b   rssi (dBm)
+#   B   number of AD structures, each <B type, B length> + data
+RECORDING_MAGIC = b"VSCPBLE1"
+
+_record = struct.Struct("<d6sbB")
+_ad = struct.Struct("<BB")
+
+
+class Recorder:
+    """Write advertisements (addr, rssi, scan data) to a recording file."""
+
+    def __init__(self, path):
+        self.f = open(path, "wb")
+        self.f.write(RECORDING_MAGIC)
+        self.count = 0
+
+    def write(self, addr, rssi, scandata, t=None):
+        parts = [_record.pack(t if t is not None else time.time(),
+                              bytes.fromhex(addr.replace(":", "")),
+                              max(-128, min(127, rssi)),
+                              len(scandata))]
+        for adtype, raw in scandata.items():
+            parts.append(_ad.pack(adtype, len(raw)))
+            parts.append(raw)
+        self.f.write(b"".join(parts))
+        self.count += 1
+
+    def close(self):
+        self.f.close()
+
+
+def read_recording(path):
+    """Yield (time, addr, rssi, scan data) from a recording file."""
+    with open(path, "rb") as f:
+        buf = f.read()
+    if not buf.startswith(RECORDING_MAGIC):
+        raise ValueError("'%s' is not an advertisement recording" % path)
+
+    pos = len(RECORDING_MAGIC)
+    while pos < len(buf):
+        t, addr, rssi, count = _record.unpack_from(buf, pos)
+        pos += _record.size
+        scandata = {}
+        for _ in range(count):
+            adtype, length = _ad.unpack_from(buf, pos)
+            pos += _ad.size
+            scandata[adtype] = buf[pos:pos + length]
+            pos += length
+        yield t, ":".join("%02x" % b for b in addr), rssi, scandata
@@ -0,0 +1,335 @@
+#!/usr/bin/env python3
+
+# vscp_bridge.py
+#
+# Bridge between the VSCP daemon TCP/IP interface and MQTT
+#
+# Events from the daemon (read in receive loop mode) are published on
+# vscp/{guid}/{class}/{type} and events received on the subscribed MQTT
+# topics are sent to the daemon. Sends to the daemon are pipelined in
+# batches on a connection of their own (see vscp_tcpip.py).
+#
+# Loop prevention
+#   - Events the daemon echoes back from our own send connection carry
+#     its channel id as obid and are never published.
+#   - A GUID belongs to the side it was last seen on. Events with the
+#     GUID coming in from the other side are our own copies and are
+#     dropped, this also stops our MQTT publishes from coming back.
+#     Ownership expires owner_ttl seconds after the GUID was last seen
+#     on its side, so a node that moves (or a stray copy) only blocks
+#     the GUID for that long.
+#
+# Each direction has a bounded queue. With the 'block' policy the
+# reading side waits for room (back pressure on the daemon connection or
+# the MQTT network thread), with 'drop' the event is counted and dropped.
+#
+# Usage: vscp_bridge.py [-h] [options], see -h
+#
+# This file is part of the VSCP (https://www.vscp.org) project
+#
+# The MIT License (MIT)
+#
+# Copyright © 2000-2026 Ake Hedman, the VSCP project
+# <info@vscp.org>
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#
+
+import argparse
+import asyncio
+import concurrent.futures
+import collections
+import json
+import sys
+import threading
+import time
+
+import vscp_mqtt
+import vscp_payload
+import vscp_tcpip
+from vscp_subscriber import Counters, POLICIES, POLICY_BLOCK
+
+SIDE_TCP = "tcp"
+SIDE_MQTT = "mqtt"
+
+COUNTERS = ("from_tcp", "from_mqtt", "to_mqtt", "to_tcp", "looped", "dropped",
+            "decode_errors", "failed")
+
+
+class Bridge:
+    """Move events between a daemon (rx and tx connections) and an MQTT client.
+
+    The MQTT client should be set up and connected by the caller, the
+    bridge runs its network loop on the paho thread.
+    """
+
+    def __init__(self, mqtt_client, rx, tx, topic="vscp/{xguid}/{xclass}/{xtype}",
+                 subscribe="vscp/#", qos=0, queue_size=1000, policy=POLICY_BLOCK,
+                 batch=50, formats=None, owner_ttl=60.0):
+        if policy not in POLICIES:
+            raise ValueError("Unknown queue policy '%s'" % policy)
+        self.mqtt = mqtt_client
+        self.rx = rx
+        self.tx = tx
+        self.topics = vscp_mqtt.TopicCache(topic)
+        self.subscribe = subscribe
+        self.qos = qos
+        self.queue_size = queue_size
+        self.policy = policy
+        self.batch = batch
+        self.formats = formats if formats is not None else vscp_payload.PayloadFormats()
+        self.counters = Counters(COUNTERS)
+        self.owner_ttl = owner_ttl
+        self.origin = collections.OrderedDict()     # GUID -> (side, last seen), oldest first
+        self.origin_lock = threading.Lock()
+        self.chid = None
+        self.running = False
+        self.loop = None
+        self.to_mqtt = None
+        self.to_tcp = None
+
+    def _owned(self, guid, side, now=None):
+        # The side a GUID was last seen on owns it until owner_ttl has passed
+        if now is None:
+            now = time.monotonic()
+        guid = guid.upper()
+        origin = self.origin
+        with self.origin_lock:
+            # Forget the owners not seen for owner_ttl
+            while origin:
+                oldest = next(iter(origin))
+                if now - origin[oldest][1] < self.owner_ttl:
+                    break
+                del origin[oldest]
+            owner = origin.get(guid)
+            if owner is not None and owner[0] != side:
+                return False
+            origin[guid] = (side, now)
+            origin.move_to_end(guid)
+            return True
+
+    # ------------------------------------------------------------------------
+    #                          M Q T T   ->   T C P
+    # ------------------------------------------------------------------------
+
+    def on_connect(self, client, userdata, *args):
+        client.subscribe(self.subscribe, self.qos)
+
+    def on_message(self, client, userdata, msg):
+        # Runs on the paho network thread
+        try:
+            events = vscp_payload.decode_payload(msg.payload)
+        except (ValueError, KeyError):
+            self.counters.inc("decode_errors")
+            return
+
+        for ev in events:
+            self.counters.inc("from_mqtt")
+            if not self._owned(ev.get("vscpGuid", "-"), SIDE_MQTT):
+                self.counters.inc("looped")
+                continue
+            if POLICY_BLOCK == self.policy:
+                self._put_blocking(self.to_tcp, ev)
+            else:
+                self.loop.call_soon_threadsafe(self._put_nowait, self.to_tcp, ev)
+
+    def _put_blocking(self, q, ev):
+        # Wait for room but give up if the bridge stops meanwhile
+        fut = asyncio.run_coroutine_threadsafe(q.put(ev), self.loop)
+        while self.running:
+            try:
+                fut.result(0.5)
+                return
+            except concurrent.futures.TimeoutError:
+                pass
+        fut.cancel()
+
+    def _put_nowait(self, q, ev):
+        try:
+            q.put_nowait(ev)
+        except asyncio.QueueFull:
+            self.counters.inc("dropped")
+
+    async def _get_batch(self, q):
+        events = [await q.get()]
+        while len(events) < self.batch and not q.empty():
+            events.append(q.get_nowait())
+        return events
+
+    async def _tcp_writer(self):
+        while True:
+            events = await self._get_batch(self.to_tcp)
+            for ev in events:
+                ev["vscpObId"] = 0
+                ev["vscpDateTime"] = ""     # Let the daemon set it
+            failed = await self.tx.send_many(events)
+            self.counters.inc("to_tcp", len(events) - failed)
+            self.counters.inc("failed", failed)
+
+    # ------------------------------------------------------------------------
+    #                          T C P   ->   M Q T T
+    # ------------------------------------------------------------------------
+
+    async def _tcp_reader(self):
+        async for ev in self.rx.rcvloop():
+            self.counters.inc("from_tcp")
+            if ev["vscpObId"] == self.chid or not self._owned(ev["vscpGuid"], SIDE_TCP):
+                self.counters.inc("looped")
+                continue
+            if POLICY_BLOCK == self.policy:
+                await self.to_mqtt.put(ev)
+            else:
+                self._put_nowait(self.to_mqtt, ev)
+
+    async def _mqtt_writer(self):
+        while True:
+            events = await self._get_batch(self.to_mqtt)
+            for ev in events:
+                topic = self.topics.get(ev["vscpGuid"], ev["vscpClass"], ev["vscpType"])
+                if self.formats.is_binary(topic):
+                    payload = vscp_payload.encode_frame_from_json(ev)
+                else:
+                    payload = json.dumps(ev)
+                info = self.mqtt.publish(topic, payload=payload, qos=self.qos)
+                if 0 != info[0]:
+                    self.counters.inc("failed")
+                else:
+                    self.counters.inc("to_mqtt")
+
+    # ------------------------------------------------------------------------
+
+    async def run(self):
+        """Bridge until one of the connections fails."""
+        self.loop = asyncio.get_running_loop()
+        self.to_mqtt = asyncio.Queue(maxsize=self.queue_size)
+        self.to_tcp = asyncio.Queue(maxsize=self.queue_size)
+
+        tasks = []
+        try:
+            # Inside the try so a failed login does not leave the other
+            # connection open for every retry
+            await self.rx.connect()
+            await self.tx.connect()
+            self.chid = await self.tx.chid()
+
+            self.running = True
+            self.mqtt.on_connect = self.on_connect
+            self.mqtt.on_message = self.on_message
+            if self.mqtt.is_connected():
+                self.mqtt.subscribe(self.subscribe, self.qos)
+            self.mqtt.loop_start()
+
+            tasks = [asyncio.ensure_future(coro) for coro in (self._tcp_reader(),
+                                                               self._tcp_writer(),
+                                                               self._mqtt_writer())]
+            done, pending = await asyncio.wait(tasks, return_when=asyncio.FIRST_EXCEPTION)
+            for t in done:
+                t.result()
+        finally:
+            for t in tasks:
+                t.cancel()
+            if self.running:
+                self.running = False
+                self.mqtt.on_message = None
+                self.mqtt.loop_stop()
+            await self.rx.close()
+            await self.tx.close()
+
+    def stats(self):
+        s = self.counters.snapshot()
+        s["queued_mqtt"] = self.to_mqtt.qsize() if self.to_mqtt else 0
+        s["queued_tcp"] = self.to_tcp.qsize() if self.to_tcp else 0
+        return s
+
+
+# ----------------------------------------------------------------------------
+
+async def print_stats(bridge, interval):
+    while True:
+        await asyncio.sleep(interval)
+        s = bridge.stats()
+        print("tcp->mqtt %d (%.1f/s) mqtt->tcp %d (%.1f/s) looped %d dropped %d failed %d" %
+              (s["to_mqtt"], s["to_mqtt_rate"], s["to_tcp"], s["to_tcp_rate"],
+               s["looped"], s["dropped"], s["failed"]))
+
+
+async def bridge_forever(arg, client):
+    formats = vscp_payload.PayloadFormats.fromBinaryPrefixes(arg.binary_topics)
+    rx = vscp_tcpip.Client(arg.host, arg.port, arg.user, arg.password)
+    tx = vscp_tcpip.Client(arg.host, arg.port, arg.user, arg.password)
+    bridge = Bridge(client, rx, tx, arg.topic, arg.subscribe, arg.qos,
+                    arg.queue, arg.policy, arg.batch, formats, arg.owner_ttl)
+    stats = None
+    if arg.stats:
+        stats = asyncio.ensure_future(print_stats(bridge, arg.stats))
+
+    # Same bridge after a reconnect so the GUID owners are kept
+    while True:
+        try:
+            await bridge.run()
+        except (OSError, asyncio.TimeoutError, vscp_tcpip.VscpTcpError) as e:
+            print("Connection to daemon lost (%s), retrying in %d s" % (e, arg.retry))
+        await asyncio.sleep(arg.retry)
+
+
+def main():
+    import paho.mqtt.client as mqtt
+
+    parser = argparse.ArgumentParser(description="VSCP daemon TCP/IP <-> MQTT bridge")
+    parser.add_argument('--host', default='localhost', help='VSCP daemon host')
+    parser.add_argument('--port', type=int, default=vscp_tcpip.DEFAULT_PORT,
+                        help='VSCP daemon TCP/IP port')
+    parser.add_argument('--user', default='admin', help='VSCP daemon user')
+    parser.add_argument('--password', default='secret', help='VSCP daemon password')
+    parser.add_argument('--mqtt-host', default='localhost', help='MQTT broker host')
+    parser.add_argument('--mqtt-port', type=int, default=1883, help='MQTT broker port')
+    parser.add_argument('--mqtt-user', default='', help='MQTT user')
+    parser.add_argument('--mqtt-password', default='', help='MQTT password')
+    parser.add_argument('--topic', default='vscp/{xguid}/{xclass}/{xtype}',
+                        help='Publish topic for events from the daemon')
+    parser.add_argument('--subscribe', default='vscp/#',
+                        help='Topic filter for events to send to the daemon')
+    parser.add_argument('--qos', type=int, default=0, help='MQTT QoS')
+    parser.add_argument('--binary-topics', default='',
+                        help='Comma separated topic prefixes published as binary frames')
+    parser.add_argument('--queue', type=int, default=1000, help='Queue size per direction')
+    parser.add_argument('--policy', choices=POLICIES, default=POLICY_BLOCK,
+                        help='What to do when a queue is full')
+    parser.add_argument('--batch', type=int, default=50, help='Max events per batch')
+    parser.add_argument('--owner-ttl', type=float, default=60.0,
+                        help='Seconds a GUID stays owned by the side it was last seen on')
+    parser.add_argument('--retry', type=int, default=5, help='Seconds between reconnects')
+    parser.add_argument('--stats', type=int, default=0,
+                        help='Print counters every STATS seconds (0 = never)')
+    arg = parser.parse_args(sys.argv[1:])
+
+    client = mqtt.Client()
+    if arg.mqtt_user:
+        client.username_pw_set(arg.mqtt_user, arg.mqtt_password)
+    client.connect(arg.mqtt_host, arg.mqtt_port)
+
+    try:
+        asyncio.run(bridge_forever(arg, client))
+    except KeyboardInterrupt:
+        pass
+    client.disconnect()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,351 @@
+#!/usr/bin/env python3
+
+# vscp_dm.py
+#
+# Decision matrix for VSCP events, event -> action rules on the host side
+#
+# A row works as in the decision matrix of a VSCP node. It matches an
+# event when
+#
+#   (class & class_mask) == class_filter and (type & type_mask) == type_filter
+#
+# and, when given, the GUID, zone and subzone are the same (zone or
+# subzone 0xff in the event means all). All matching rows run their
+# action in row order.
+#
+# Rows are indexed on class and type when their masks are all ones or
+# all zeros (exact or don't care), the rows that can match a class/type
+# pair are looked up once and cached. An event then costs a dict lookup
+# and a check of the few rows for its class and type, however many rows
+# there are. Rows with other masks are checked for each new pair.
+#
+# Rows file, one row per line. '#' at the start of a line or after
+# whitespace starts a comment, elsewhere (e.g. in a param) it is kept
+#
+#   class type guid zone subzone action param...
+#
+# class and type are a number, '*' or filter/mask, guid, zone and
+# subzone a value or '*'. Actions are
+#
+#   execute     run param as a command (not waited for)
+#   print       print param
+#
+# with %event.class, %event.type, %event.guid, %event.zone,
+# %event.subzone, %event.data and %event (text form) in param replaced.
+# More actions can be added with register_action(). E.g. to call the
+# smstools alarm script for alarms
+#
+#   1 2 * * * execute ../smstools/doalarm.py 1 %event.zone %event.subzone 00:00 -
+#
+# Usage: vscp_dm.py ROWS [--host HOST] [--stats N] ...
+#
+# This file is part of the VSCP (https://www.vscp.org) project
+#
+# The MIT License (MIT)
+#
+# Copyright © 2000-2026 Ake Hedman, the VSCP project
+# <info@vscp.org>
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#
+
+import argparse
+import asyncio
+import re
+import shlex
+import subprocess
+import sys
+import threading
+import time
+
+import vscp_tcpip
+from vscp_subscriber import Counters
+
+COUNTERS = ("events", "matched", "actions", "errors")
+
+CLASS_MASK = 0xFFFF
+TYPE_MASK = 0xFFFF
+
+ANY = None
+
+_COMMENT = re.compile(r"(?:^|\s)#.*")
+
+
+# ----------------------------------------------------------------------------
+#                                A C T I O N S
+# ----------------------------------------------------------------------------
+
+def substitute(text, ev):
+    """param with the %event... variables of ev replaced."""
+    if "%event" not in text:
+        return text
+    data = ev.get("vscpData") or []
+    values = (("%event.class", str(ev["vscpClass"])),
+              ("%event.type", str(ev["vscpType"])),
+              ("%event.guid", ev.get("vscpGuid", "-")),
+              ("%event.zone", str(data[1]) if len(data) > 2 else "255"),
+              ("%event.subzone", str(data[2]) if len(data) > 2 else "255"),
+              ("%event.data", ",".join(str(b) for b in data)),
+              ("%event", vscp_tcpip.format_event(ev)))
+    for name, value in values:
+        text = text.replace(name, value)
+    return text
+
+
+def _execute(ev, param):
+    # The command runs on its own, events do not wait for it
+    subprocess.Popen(shlex.split(substitute(param, ev)))
+
+
+def _print(ev, param):
+    print(substitute(param, ev))
+
+
+ACTIONS = {"execute": _execute, "print": _print}
+
+
+def register_action(name, action):
+    """Make action(ev, param) available to rows as name."""
+    ACTIONS[name] = action
+
+
+# ----------------------------------------------------------------------------
+#                                  R O W S
+# ----------------------------------------------------------------------------
+
+class Row:
+    """One decision matrix row, action(ev, param) runs on a match."""
+
+    __slots__ = ("class_filter", "class_mask", "type_filter", "type_mask",
+                 "guid", "zone", "subzone", "action", "param", "order")
+
+    def __init__(self, vscpclass=ANY, vscptype=ANY, action=_print, param="%event",
+                 guid=None, zone=None, subzone=None, class_mask=None, type_mask=None):
+        # A class/type of None is don't care, a mask makes it a filter
+        if class_mask is None:
+            class_mask = 0 if vscpclass is ANY else CLASS_MASK
+        if type_mask is None:
+            type_mask = 0 if vscptype is ANY else TYPE_MASK
+        self.class_mask = class_mask
+        self.class_filter = (vscpclass or 0) & class_mask
+        self.type_mask = type_mask
+        self.type_filter = (vscptype or 0) & type_mask
+        self.guid = guid.upper() if guid else None
+        self.zone = zone
+        self.subzone = subzone
+        self.action = action
+        self.param = param
+        self.order = 0
+
+    def __repr__(self):
+        return "Row(%d/%x, %d/%x, %s, %s, %s, %r)" % (
+            self.class_filter, self.class_mask, self.type_filter, self.type_mask,
+            self.guid, self.zone, self.subzone, self.param)
+
+    def _key(self, filt, mask, full):
+        # Index key, False when the mask is neither exact nor don't care
+        if mask == full:
+            return filt
+        if 0 == mask:
+            return ANY
+        return False
+
+    def keys(self):
+        return (self._key(self.class_filter, self.class_mask, CLASS_MASK),
+                self._key(self.type_filter, self.type_mask, TYPE_MASK))
+
+    def matches_class(self, vscpclass, vscptype):
+        return ((vscpclass & self.class_mask) == self.class_filter and
+                (vscptype & self.type_mask) == self.type_filter)
+
+
+def _field(text, full=None):
+    # '*', a number (0x.. allowed) or with full given filter/mask
+    if "*" == text:
+        return ANY, None
+    if full is not None and "/" in text:
+        filt, mask = text.split("/", 1)
+        return int(filt, 0), int(mask, 0)
+    return int(text, 0), None
+
+
+def read_rows(path):
+    """Rows of a rows file."""
+    rows = []
+    with open(path) as f:
+        for lineno, line in enumerate(f, 1):
+            line = _COMMENT.sub("", line).strip()
+            if not line:
+                continue
+            fields = line.split(None, 6)
+            if len(fields) < 6:
+                raise ValueError("%s:%d: class type guid zone subzone action expected"
+                                 % (path, lineno))
+            vscpclass, class_mask = _field(fields[0], CLASS_MASK)
+            vscptype, type_mask = _field(fields[1], TYPE_MASK)
+            action = ACTIONS.get(fields[5])
+            if action is None:
+                raise ValueError("%s:%d: unknown action '%s'" % (path, lineno, fields[5]))
+            rows.append(Row(vscpclass, vscptype, action, fields[6] if len(fields) > 6 else "",
+                            None if "*" == fields[2] else fields[2],
+                            _field(fields[3])[0], _field(fields[4])[0],
+                            class_mask, type_mask))
+    return rows
+
+
+# ----------------------------------------------------------------------------
+#                                 M A T R I X
+# ----------------------------------------------------------------------------
+
+class DecisionMatrix:
+    """Rows indexed on class and type."""
+
+    def __init__(self, rows=(), cache_size=65536):
+        self.rows = []
+        self.index = {}             # (class or ANY, type or ANY) -> rows
+        self.other = []             # Rows with partial masks
+        self.cache = {}             # (class, type) -> rows that can match
+        self.cache_size = cache_size
+        self.lock = threading.Lock()
+        self.counters = Counters(COUNTERS)
+        for row in rows:
+            self.add(row)
+
+    def add(self, row):
+        with self.lock:
+            row.order = len(self.rows)
+            self.rows.append(row)
+            self._index(row)
+
+    def remove(self, row):
+        with self.lock:
+            self.rows.remove(row)
+            self.index = {}
+            self.other = []
+            for order, r in enumerate(self.rows):
+                r.order = order
+                self._index(r)
+
+    def _index(self, row):
+        keys = row.keys()
+        if False in keys:
+            self.other.append(row)
+        else:
+            self.index.setdefault(keys, []).append(row)
+        self.cache = {}
+
+    def candidates(self, vscpclass, vscptype):
+        """Rows that match class and type, in row order."""
+        try:
+            return self.cache[(vscpclass, vscptype)]
+        except KeyError:
+            pass
+
+        index = self.index
+        rows = []
+        for key in ((vscpclass, vscptype), (vscpclass, ANY), (ANY, vscptype), (ANY, ANY)):
+            rows.extend(index.get(key, ()))
+        rows.extend(r for r in self.other if r.matches_class(vscpclass, vscptype))
+        rows.sort(key=lambda r: r.order)
+        rows = tuple(rows)
+
+        cache = self.cache
+        if len(cache) >= self.cache_size:
+            cache.clear()
+        cache[(vscpclass, vscptype)] = rows
+        return rows
+
+    def match(self, ev):
+        """Rows matching an event in VSCP JSON format."""
+        rows = self.candidates(ev["vscpClass"], ev["vscpType"])
+        if not rows:
+            return ()
+        guid = None
+        zone = subzone = 0xff
+        data = ev.get("vscpData")
+        if data is not None and len(data) > 2:
+            zone = data[1]
+            subzone = data[2]
+        result = []
+        for row in rows:
+            if row.guid is not None:
+                if guid is None:
+                    guid = ev.get("vscpGuid", "").upper()
+                if row.guid != guid:
+                    continue
+            if row.zone is not None and zone != 0xff and row.zone != zone:
+                continue
+            if row.subzone is not None and subzone != 0xff and row.subzone != subzone:
+                continue
+            result.append(row)
+        return result
+
+    def evaluate(self, ev):
+        """Run the actions of the rows matching an event, the number run."""
+        self.counters.inc("events")
+        rows = self.match(ev)
+        if not rows:
+            return 0
+        self.counters.inc("matched")
+        for row in rows:
+            try:
+                row.action(ev, row.param)
+            except Exception as e:
+                self.counters.inc("errors")
+                print("Action %r failed: %s" % (row, e))
+        self.counters.inc("actions", len(rows))
+        return len(rows)
+
+
+# ----------------------------------------------------------------------------
+
+async def run(dm, arg):
+    client = vscp_tcpip.Client(arg.host, arg.port, arg.user, arg.password)
+    await client.connect()
+    last = time.monotonic()
+    async for ev in client.rcvloop():
+        dm.evaluate(ev)
+        if arg.stats and time.monotonic() - last >= arg.stats:
+            s = dm.counters.snapshot()
+            print("events %d (%.1f/s) matched %d actions %d errors %d" %
+                  (s["events"], s["events_rate"], s["matched"], s["actions"], s["errors"]))
+            last = time.monotonic()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Decision matrix for VSCP events")
+    parser.add_argument('rows', help='Rows file')
+    parser.add_argument('--host', default='localhost', help='VSCP daemon host')
+    parser.add_argument('--port', type=int, default=vscp_tcpip.DEFAULT_PORT)
+    parser.add_argument('--user', default='admin')
+    parser.add_argument('--password', default='secret')
+    parser.add_argument('--stats', type=int, default=0,
+                        help='Print counters every STATS seconds (0 = never)')
+    arg = parser.parse_args(sys.argv[1:])
+
+    dm = DecisionMatrix(read_rows(arg.rows))
+    print("%d rows" % len(dm.rows))
+    try:
+        asyncio.run(run(dm, arg))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
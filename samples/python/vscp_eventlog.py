@@ -0,0 +1,682 @@
+#!/usr/bin/env python3
+
+# vscp_eventlog.py
+#
+# Append-only log of VSCP events in fixed width record segments
+#
+# Events (VSCP JSON format, as vscp_tcpip.py and vscp_payload.py give
+# them) are appended to segment files seg-NNNNNN.vlog in a directory.
+# A segment is a header followed by records of the same size
+#
+#   <Q  time, microseconds since the epoch
+#   <I  GUID id, line number in guids.txt
+#   <I  obid
+#   <H  head
+#   <H  class
+#   <H  type
+#   <H  data size
+#   data_size bytes of data
+#
+# Data longer than data_size is refused with ValueError, a log for Level
+# II events needs a larger data_size (up to 512). With truncate the data
+# is cut instead, the size is then what is stored and the cut events are
+# counted in truncated.
+#
+# A new segment is started when the current one has segment_records
+# records. Segments are read through mmap, with numpy a segment is a
+# structured array viewing the mapped file directly (no copying or
+# parsing) so hours of traffic can be scanned at memory speed. Without
+# numpy events can still be read one by one.
+#
+# The log keeps an index, updated on every append and checkpointed to
+# index.json (on close and by checkpoint()). Opening a log loads the
+# checkpoint and indexes only the records appended after it.
+#
+#   - time index per segment, the time of every SPARSE_STEP:th record
+#     and the first/last time, so a time range is found by bisection
+#   - GUID posting lists, the segments each GUID has events in
+#   - latest event per (GUID, class, type, sensor index)
+#
+# query() and latest() answer from the index and only read the records
+# of the segments and time ranges that can match.
+#
+# Usage: vscp_eventlog.py record DIR [--data-size N] [--truncate] [--host HOST ...]
+#        vscp_eventlog.py dump DIR [-n COUNT]
+#        vscp_eventlog.py stats DIR
+#        vscp_eventlog.py query DIR [--guid GUID] [--start T] [--end T]
+#        vscp_eventlog.py latest DIR [--guid GUID]
+#
+# This file is part of the VSCP (https://www.vscp.org) project
+#
+# The MIT License (MIT)
+#
+# Copyright © 2000-2026 Ake Hedman, the VSCP project
+# <info@vscp.org>
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#
+
+import argparse
+import asyncio
+import bisect
+import datetime
+import json
+import mmap
+import os
+import struct
+import sys
+import time
+
+import vscp_class
+import vscp_tcpip
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+SEGMENT_MAGIC = b"VSCPLOG1"
+HEADER_SIZE = 64
+
+# Level I events sent over Level II carry the GUID in the data, 16 + 8 bytes
+DEFAULT_DATA_SIZE = 24
+DEFAULT_SEGMENT_RECORDS = 1 << 20
+
+GUIDS_FILE = "guids.txt"
+INDEX_FILE = "index.json"
+
+# Every SPARSE_STEP:th record time is kept in the time index
+SPARSE_STEP = 256
+
+_header = struct.Struct("<8sIId")
+
+
+def _record_struct(data_size):
+    return struct.Struct("<QIIHHHH%ds" % data_size)
+
+
+def record_dtype(data_size=DEFAULT_DATA_SIZE):
+    """numpy dtype of a record."""
+    return numpy.dtype([("time", "<u8"),
+                        ("guid", "<u4"),
+                        ("obid", "<u4"),
+                        ("head", "<u2"),
+                        ("class", "<u2"),
+                        ("type", "<u2"),
+                        ("size", "<u2"),
+                        ("data", "u1", (data_size,))])
+
+
+def _segment_name(seq):
+    return "seg-%06d.vlog" % seq
+
+
+# ----------------------------------------------------------------------------
+#                               S E G M E N T
+# ----------------------------------------------------------------------------
+
+class Segment:
+    """Read only view of a segment file, mapped when it is opened.
+
+    Records appended after the segment was opened are not seen, open it
+    again for them.
+    """
+
+    def __init__(self, path, guids):
+        self.path = path
+        self.guids = guids
+        with open(path, "rb") as f:
+            magic, self.record_size, self.data_size, self.created = \
+                _header.unpack(f.read(_header.size))
+            if SEGMENT_MAGIC != magic:
+                raise ValueError("'%s' is not an event log segment" % path)
+            size = os.fstat(f.fileno()).st_size
+            self.count = (size - HEADER_SIZE) // self.record_size
+            self.mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if self.count else None
+        self.record = _record_struct(self.data_size)
+
+    def __len__(self):
+        return self.count
+
+    def records(self):
+        """Structured numpy array over the mapped records (no copy)."""
+        if numpy is None:
+            raise ImportError("numpy is needed for record arrays")
+        dtype = record_dtype(self.data_size)
+        if not self.count:
+            return numpy.zeros(0, dtype)
+        return numpy.frombuffer(self.mm, dtype, self.count, HEADER_SIZE)
+
+    def unpack(self, i):
+        """Record i as (time, guid id, obid, head, class, type, size, data)."""
+        return self.record.unpack_from(self.mm, HEADER_SIZE + i * self.record_size)
+
+    def matches(self, lo, hi, gid=None, start=None, end=None, vscpclass=None, vscptype=None):
+        """Numbers of the records in [lo, hi) that match, None matches all."""
+        if numpy is not None:
+            r = self.records()[lo:hi]
+            mask = numpy.ones(len(r), bool)
+            if gid is not None:
+                mask &= r["guid"] == gid
+            if start is not None:
+                mask &= r["time"] >= start
+            if end is not None:
+                mask &= r["time"] <= end
+            if vscpclass is not None:
+                mask &= r["class"] == vscpclass
+            if vscptype is not None:
+                mask &= r["type"] == vscptype
+            return (numpy.flatnonzero(mask) + lo).tolist()
+
+        found = []
+        for i in range(lo, min(hi, self.count)):
+            t, g, obid, head, c, ty, size, data = self.unpack(i)
+            if ((gid is None or g == gid) and (start is None or t >= start)
+                    and (end is None or t <= end) and (vscpclass is None or c == vscpclass)
+                    and (vscptype is None or ty == vscptype)):
+                found.append(i)
+        return found
+
+    def event(self, i):
+        """Record i as an event in VSCP JSON format."""
+        t, guid, obid, head, vscpclass, vscptype, size, data = self.unpack(i)
+        return {
+            "vscpHead": head,
+            "vscpObId": obid,
+            "vscpTimeStamp": 0,
+            "vscpDateTime": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(t / 1e6)),
+            "vscpClass": vscpclass,
+            "vscpType": vscptype,
+            "vscpGuid": self.guids[guid],
+            "vscpData": list(data[:min(size, self.data_size)]),
+            "time": t / 1e6,
+        }
+
+    def events(self, start=0, stop=None):
+        for i in range(start, self.count if stop is None else min(stop, self.count)):
+            yield self.event(i)
+
+    def close(self):
+        if self.mm is not None:
+            try:
+                self.mm.close()
+            except BufferError:
+                # Record arrays still use it, it goes with the last of them
+                pass
+            self.mm = None
+
+
+# ----------------------------------------------------------------------------
+#                                 I N D E X
+# ----------------------------------------------------------------------------
+
+# Classes with the sensor index in the first data byte
+_INDEX_FIRST = (vscp_class.VSCP_CLASS1_MEASUREZONE,
+                vscp_class.VSCP_CLASS2_MEASUREMENT_STR,
+                vscp_class.VSCP_CLASS2_MEASUREMENT_FLOAT)
+
+
+def sensor_index(vscpclass, data):
+    """Sensor index of a measurement event, 0 for other events."""
+    if 512 <= vscpclass < 1024 and len(data) > 16:
+        # Level I event over Level II, data starts with the GUID
+        vscpclass -= 512
+        data = data[16:]
+    if not data:
+        return 0
+    if vscp_class.VSCP_CLASS1_MEASUREMENT == vscpclass:
+        return data[0] & 7
+    if vscpclass in _INDEX_FIRST:
+        return data[0]
+    return 0
+
+
+class SegmentIndex:
+    """Sparse time index and GUIDs of one segment."""
+
+    def __init__(self, count=0, times=None, first=None, last=None, ordered=True, guids=()):
+        self.count = count
+        self.times = times if times is not None else []
+        self.first = first
+        self.last = last
+        self.ordered = ordered
+        self.guids = set(guids)
+
+    def add(self, i, t):
+        if 0 == i % SPARSE_STEP:
+            self.times.append(t)
+        if self.first is None:
+            self.first = t
+        elif t < self.last:
+            # Written out of time order, ranges need the whole segment
+            self.ordered = False
+        if self.last is None or t > self.last:
+            self.last = t
+        if t < self.first:
+            self.first = t
+        self.count = i + 1
+
+    def overlaps(self, start, end):
+        return (self.count and (start is None or self.last >= start)
+                and (end is None or self.first <= end))
+
+    def range(self, start, end):
+        """Records [lo, hi) that can have times in [start, end]."""
+        if not self.ordered:
+            return 0, self.count
+        lo = 0
+        hi = self.count
+        if start is not None:
+            k = bisect.bisect_left(self.times, start)
+            lo = max(0, k - 1) * SPARSE_STEP
+        if end is not None:
+            k = bisect.bisect_right(self.times, end)
+            hi = min(self.count, k * SPARSE_STEP)
+        return lo, hi
+
+    def state(self):
+        return {"count": self.count, "times": self.times, "first": self.first,
+                "last": self.last, "ordered": self.ordered, "guids": sorted(self.guids)}
+
+
+class EventIndex:
+    """Time index per segment, GUID posting lists and latest events."""
+
+    def __init__(self):
+        self.segments = {}
+        self.postings = {}
+        self.latest = {}
+
+    def add(self, seq, i, t, gid, vscpclass, vscptype, data):
+        seg = self.segments.get(seq)
+        if seg is None:
+            seg = self.segments[seq] = SegmentIndex()
+        seg.add(i, t)
+        if gid not in seg.guids:
+            seg.guids.add(gid)
+            self.postings.setdefault(gid, []).append(seq)
+        key = (gid, vscpclass, vscptype, sensor_index(vscpclass, data))
+        latest = self.latest.get(key)
+        if latest is None or t >= latest[0]:
+            self.latest[key] = (t, seq, i)
+
+    def save(self, path):
+        state = {"segments": dict((str(seq), seg.state()) for seq, seg in self.segments.items()),
+                 "latest": [list(key) + list(value) for key, value in self.latest.items()]}
+        tmp = path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(state, f)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path):
+        index = cls()
+        with open(path) as f:
+            state = json.load(f)
+        for seq, seg in state["segments"].items():
+            seq = int(seq)
+            index.segments[seq] = SegmentIndex(**seg)
+            for gid in seg["guids"]:
+                index.postings.setdefault(gid, []).append(seq)
+        for postings in index.postings.values():
+            postings.sort()
+        for gid, vscpclass, vscptype, sensor, t, seq, i in state["latest"]:
+            index.latest[(gid, vscpclass, vscptype, sensor)] = (t, seq, i)
+        return index
+
+
+# ----------------------------------------------------------------------------
+#                              E V E N T   L O G
+# ----------------------------------------------------------------------------
+
+class EventLog:
+    """Segments and GUID table in directory. Appends go to the last segment."""
+
+    def __init__(self, directory, data_size=None, segment_records=DEFAULT_SEGMENT_RECORDS,
+                 truncate=False):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.segment_records = segment_records
+        self.truncate = truncate
+        self.truncated = 0          # Events with data cut to data_size
+        self.f = None
+        self.seq = -1
+        self.count = 0
+
+        # data_size None is that of the log, DEFAULT_DATA_SIZE for a new one
+        seqs = self.sequence_numbers()
+        if seqs:
+            last = Segment(self.segment_path(seqs[-1]), [])
+            last.close()
+            if data_size is not None and last.data_size != data_size:
+                raise ValueError("Log in '%s' has data size %d" % (directory, last.data_size))
+            data_size = last.data_size
+            self.seq = seqs[-1]
+        self.data_size = data_size or DEFAULT_DATA_SIZE
+        self.record = _record_struct(self.data_size)
+        self.record_size = self.record.size
+
+        # GUID table, id is the line number
+        self.guids = []
+        self.guid_ids = {}
+        path = os.path.join(directory, GUIDS_FILE)
+        if os.path.exists(path):
+            with open(path) as f:
+                for line in f:
+                    self._add_guid(line.strip())
+        self.guid_file = open(path, "a")
+
+        self.index = self._load_index()
+
+    def _load_index(self):
+        # Checkpoint plus what was appended after it, or everything
+        path = os.path.join(self.directory, INDEX_FILE)
+        seqs = self.sequence_numbers()
+        try:
+            index = EventIndex.load(path)
+        except (OSError, ValueError, KeyError, TypeError):
+            index = EventIndex()
+        for seq in seqs:
+            seg = Segment(self.segment_path(seq), self.guids)
+            sidx = index.segments.get(seq)
+            covered = sidx.count if sidx is not None else 0
+            if covered > len(seg) or not set(index.segments) <= set(seqs):
+                # Checkpoint does not match the segments
+                seg.close()
+                index = EventIndex()
+                for seq in seqs:
+                    seg = Segment(self.segment_path(seq), self.guids)
+                    self._index_segment(index, seq, seg, 0)
+                    seg.close()
+                return index
+            self._index_segment(index, seq, seg, covered)
+            seg.close()
+        return index
+
+    def _index_segment(self, index, seq, seg, start):
+        for i in range(start, len(seg)):
+            t, gid, obid, head, vscpclass, vscptype, size, data = seg.unpack(i)
+            index.add(seq, i, t, gid, vscpclass, vscptype, data[:min(size, seg.data_size)])
+
+    def _add_guid(self, guid):
+        gid = self.guid_ids[guid] = len(self.guids)
+        self.guids.append(guid)
+        return gid
+
+    def guid_id(self, guid):
+        gid = self.guid_ids.get(guid)
+        if gid is None:
+            gid = self._add_guid(guid)
+            self.guid_file.write(guid + "\n")
+            self.guid_file.flush()
+        return gid
+
+    def sequence_numbers(self):
+        return sorted(int(name[4:10]) for name in os.listdir(self.directory)
+                      if name.startswith("seg-") and name.endswith(".vlog"))
+
+    def segment_path(self, seq):
+        return os.path.join(self.directory, _segment_name(seq))
+
+    # ------------------------------------------------------------------------
+    #                                W R I T E
+    # ------------------------------------------------------------------------
+
+    def _open_segment(self):
+        path = self.segment_path(self.seq) if self.seq >= 0 else None
+        if path is not None and os.path.exists(path):
+            size = os.path.getsize(path)
+            self.count = (size - HEADER_SIZE) // self.record_size
+            if self.count < self.segment_records:
+                self.f = open(path, "r+b")
+                # Drop a record cut short by a crash
+                self.f.truncate(HEADER_SIZE + self.count * self.record_size)
+                self.f.seek(0, os.SEEK_END)
+                return
+        self._rotate()
+
+    def _rotate(self):
+        if self.f is not None:
+            self.f.close()
+        self.seq += 1
+        self.f = open(self.segment_path(self.seq), "wb")
+        self.f.write(_header.pack(SEGMENT_MAGIC, self.record_size, self.data_size,
+                                  time.time()).ljust(HEADER_SIZE, b"\0"))
+        self.count = 0
+
+    def append(self, ev, t=None):
+        """Append an event in VSCP JSON format, t is seconds since the epoch.
+
+        Raises ValueError if the data does not fit and truncate is off.
+        """
+        data = bytes(ev.get("vscpData") or b"")
+        if len(data) > self.data_size:
+            if not self.truncate:
+                raise ValueError("%d bytes of data, the log has room for %d"
+                                 % (len(data), self.data_size))
+            data = data[:self.data_size]
+            self.truncated += 1
+        if self.f is None:
+            self._open_segment()
+        elif self.count >= self.segment_records:
+            self._rotate()
+        t = int((time.time() if t is None else t) * 1e6)
+        gid = self.guid_id((ev.get("vscpGuid") or "-").upper())
+        self.f.write(self.record.pack(t, gid,
+                                      ev.get("vscpObId", 0) & 0xffffffff,
+                                      ev.get("vscpHead", 0),
+                                      ev["vscpClass"],
+                                      ev["vscpType"],
+                                      len(data),
+                                      data))
+        self.index.add(self.seq, self.count, t, gid, ev["vscpClass"], ev["vscpType"], data)
+        self.count += 1
+
+    def append_many(self, events, t=None):
+        if t is None:
+            t = time.time()
+        for ev in events:
+            self.append(ev, t)
+
+    def flush(self):
+        if self.f is not None:
+            self.f.flush()
+
+    def checkpoint(self):
+        """Save the index so the next open does not have to rebuild it."""
+        self.flush()
+        self.index.save(os.path.join(self.directory, INDEX_FILE))
+
+    def close(self):
+        self.checkpoint()
+        if self.f is not None:
+            self.f.close()
+            self.f = None
+        self.guid_file.close()
+
+    # ------------------------------------------------------------------------
+    #                                 R E A D
+    # ------------------------------------------------------------------------
+
+    def segment(self, seq):
+        self.flush()
+        return Segment(self.segment_path(seq), self.guids)
+
+    def segments(self):
+        """Open all segments, oldest first."""
+        self.flush()
+        return [Segment(self.segment_path(seq), self.guids) for seq in self.sequence_numbers()]
+
+    def query(self, guid=None, start=None, end=None, vscpclass=None, vscptype=None):
+        """Events between start and end (seconds since the epoch), by segment.
+
+        None matches everything. Only segments with events of the GUID
+        and records in the time range are read.
+        """
+        self.flush()
+        start = None if start is None else int(start * 1e6)
+        end = None if end is None else int(end * 1e6)
+        gid = None
+        if guid is not None:
+            gid = self.guid_ids.get(guid.upper())
+            if gid is None:
+                return
+            seqs = self.index.postings.get(gid, [])
+        else:
+            seqs = sorted(self.index.segments)
+
+        for seq in seqs:
+            sidx = self.index.segments[seq]
+            if not sidx.overlaps(start, end):
+                continue
+            lo, hi = sidx.range(start, end)
+            seg = self.segment(seq)
+            try:
+                for i in seg.matches(lo, hi, gid, start, end, vscpclass, vscptype):
+                    yield seg.event(i)
+            finally:
+                seg.close()
+
+    def latest(self, guid=None):
+        """Latest event per (GUID, class, type, sensor index) as {key: event}."""
+        self.flush()
+        gid = None
+        if guid is not None:
+            gid = self.guid_ids.get(guid.upper())
+            if gid is None:
+                return {}
+
+        # Read each segment once
+        wanted = {}
+        for key, (t, seq, i) in self.index.latest.items():
+            if gid is None or key[0] == gid:
+                wanted.setdefault(seq, []).append((key, i))
+
+        result = {}
+        for seq, items in wanted.items():
+            seg = self.segment(seq)
+            for (g, vscpclass, vscptype, sensor), i in items:
+                result[(self.guids[g], vscpclass, vscptype, sensor)] = seg.event(i)
+            seg.close()
+        return result
+
+
+# ----------------------------------------------------------------------------
+
+async def record(log, arg):
+    client = vscp_tcpip.Client(arg.host, arg.port, arg.user, arg.password)
+    await client.connect()
+    last = last_checkpoint = time.monotonic()
+    async for ev in client.rcvloop():
+        try:
+            log.append(ev)
+        except ValueError as e:
+            print("Event %d,%d not logged: %s" % (ev["vscpClass"], ev["vscpType"], e))
+        now = time.monotonic()
+        if now - last >= 1:
+            log.flush()
+            last = now
+        if now - last_checkpoint >= arg.checkpoint:
+            log.checkpoint()
+            last_checkpoint = now
+
+
+def _time_arg(text):
+    # Seconds since the epoch or ISO 8601 local time
+    try:
+        return float(text)
+    except ValueError:
+        return datetime.datetime.fromisoformat(text).timestamp()
+
+
+def _print_event(ev):
+    print("%.6f %d,%d %s %s" % (ev["time"], ev["vscpClass"], ev["vscpType"],
+                                ev["vscpGuid"], ev["vscpData"]))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="VSCP event log")
+    parser.add_argument('command', choices=('record', 'dump', 'stats', 'query', 'latest'))
+    parser.add_argument('directory', help='Log directory')
+    parser.add_argument('--host', default='localhost', help='VSCP daemon host (record)')
+    parser.add_argument('--port', type=int, default=vscp_tcpip.DEFAULT_PORT, help='VSCP daemon port (record)')
+    parser.add_argument('--user', default='admin')
+    parser.add_argument('--password', default='secret')
+    parser.add_argument('--segment-records', type=int, default=DEFAULT_SEGMENT_RECORDS,
+                        help='Records per segment')
+    parser.add_argument('--data-size', type=int,
+                        help='Data bytes per record of a new log (default: %d, 512 for '
+                        'all Level II events)' % DEFAULT_DATA_SIZE)
+    parser.add_argument('--truncate', action='store_true',
+                        help='Cut data longer than the data size instead of leaving '
+                        'the event out (record)')
+    parser.add_argument('--checkpoint', type=int, default=60,
+                        help='Seconds between index checkpoints (record)')
+    parser.add_argument('-n', '--count', type=int, default=20, help='Events to dump')
+    parser.add_argument('--guid', help='Only events of this GUID (query, latest)')
+    parser.add_argument('--start', type=_time_arg, help='Events from this time (query)')
+    parser.add_argument('--end', type=_time_arg, help='Events up to this time (query)')
+    parser.add_argument('--vscpclass', type=int, help='Only events of this class (query)')
+    parser.add_argument('--vscptype', type=int, help='Only events of this type (query)')
+    arg = parser.parse_args(sys.argv[1:])
+
+    log = EventLog(arg.directory, arg.data_size, arg.segment_records, arg.truncate)
+
+    if 'record' == arg.command:
+        try:
+            asyncio.run(record(log, arg))
+        except KeyboardInterrupt:
+            pass
+        if log.truncated:
+            print("%d events had their data cut to %d bytes" % (log.truncated, log.data_size))
+    elif 'dump' == arg.command:
+        left = arg.count
+        for seg in log.segments():
+            for ev in seg.events(0, left):
+                _print_event(ev)
+            left -= min(left, len(seg))
+            seg.close()
+            if not left:
+                break
+    elif 'query' == arg.command:
+        for ev in log.query(arg.guid, arg.start, arg.end, arg.vscpclass, arg.vscptype):
+            _print_event(ev)
+    elif 'latest' == arg.command:
+        for key, ev in sorted(log.latest(arg.guid).items()):
+            print("sensor %d" % key[3], end=" ")
+            _print_event(ev)
+    else:
+        t = time.monotonic()
+        total = 0
+        for seg in log.segments():
+            line = "%s %d records" % (os.path.basename(seg.path), len(seg))
+            if numpy is not None and len(seg):
+                r = seg.records()
+                line += " %s - %s, %d classes" % (
+                    time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(r["time"][0] / 1e6)),
+                    time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(r["time"][-1] / 1e6)),
+                    len(numpy.unique(r["class"])))
+            print(line)
+            total += len(seg)
+        print("%d events, %d GUIDs, %.3f s" % (total, len(log.guids), time.monotonic() - t))
+    log.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,465 @@
+#!/usr/bin/env python3
+
+# vscp_exporter.py
+#
+# Deliver values to web services (open.sen.se, Xively/Cosm...) in batches
+#
+# put() only queues a value, worker threads post them. Each worker
+# keeps its connection alive between requests and takes as many queued
+# values as the service accepts in one request (Service.max_batch).
+#
+# A failed request (network error, 429 or 5xx) is retried after 1, 2,
+# 4... seconds (at most max_backoff, Retry-After is honoured). Other
+# errors (bad key, bad feed) are not retried.
+#
+# The queue holds at most queue_size values in memory. With a spool
+# directory values beyond that are written to files there in order and
+# read back when there is room, and so is whatever is queued at close().
+# A batch that still failed after all retries goes back to the head of
+# the queue and nothing is posted for max_backoff seconds. Without a
+# spool directory the oldest values are dropped and failed batches are
+# counted as failed.
+#
+# Usage: vscp_exporter.py sense KEY --feed GUID=FEED ... [--host HOST]
+#        vscp_exporter.py xively KEY --xively-feed N --feed GUID=STREAM ...
+#
+# This file is part of the VSCP (https://www.vscp.org) project
+#
+# The MIT License (MIT)
+#
+# Copyright © 2000-2026 Ake Hedman, the VSCP project
+# <info@vscp.org>
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#
+
+import argparse
+import asyncio
+import collections
+import http.client
+import json
+import os
+import random
+import sys
+import threading
+import time
+import urllib.parse
+
+import vscp_measurement
+import vscp_tcpip
+from vscp_httpcache import USER_AGENT
+from vscp_subscriber import Counters
+
+COUNTERS = ("queued", "posted", "requests", "retries", "failed", "dropped", "spilled")
+
+
+class PostError(Exception):
+    """A request the service refused."""
+
+    def __init__(self, status, reason="", retry_after=None):
+        Exception.__init__(self, "HTTP %d %s" % (status, reason))
+        self.status = status
+        self.retry_after = retry_after
+
+    @property
+    def retry(self):
+        return 429 == self.status or self.status >= 500
+
+
+# ----------------------------------------------------------------------------
+#                              S E R V I C E S
+# ----------------------------------------------------------------------------
+
+class Service:
+    """Turns a batch of values into one request."""
+
+    method = "POST"
+    max_batch = 1
+
+    def __init__(self, url, headers=None):
+        self.url = url
+        self.headers = {"Content-Type": "application/json"}
+        self.headers.update(headers or {})
+
+    def body(self, items):
+        return items[0]
+
+    def request(self, items):
+        """(method, url, body, headers) for items."""
+        return self.method, self.url, json.dumps(self.body(items)).encode(), self.headers
+
+
+class Sense(Service):
+    """open.sen.se, items are {"feed_id": id, "value": value}."""
+
+    # The events resource takes a list of events
+    max_batch = 100
+
+    def __init__(self, key, url="http://api.sen.se/events/"):
+        Service.__init__(self, url, {"sense_key": key})
+
+    def body(self, items):
+        return list(items)
+
+    @staticmethod
+    def item(feed, value, t=None):
+        event = {"feed_id": feed, "value": value}
+        if t is not None:
+            event["timetag"] = int(t)
+        return event
+
+
+class Xively(Service):
+    """Xively (formerly Cosm) feed, items are (datastream, value, time)."""
+
+    method = "PUT"
+    max_batch = 500
+
+    def __init__(self, key, feed, url="https://api.xively.com/v2/feeds/%s.json"):
+        Service.__init__(self, url % feed, {"X-ApiKey": key})
+
+    def body(self, items):
+        # One feed update carries datapoints for all its datastreams
+        streams = collections.OrderedDict()
+        for stream, value, t in items:
+            streams.setdefault(stream, []).append({
+                "at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(t)),
+                "value": str(value)})
+        return {"version": "1.0.0",
+                "datastreams": [{"id": s, "datapoints": p} for s, p in streams.items()]}
+
+    @staticmethod
+    def item(stream, value, t=None):
+        return [stream, value, time.time() if t is None else t]
+
+
+# ----------------------------------------------------------------------------
+#                              E X P O R T E R
+# ----------------------------------------------------------------------------
+
+class Exporter:
+    """Queue values for service and post them in batches on worker threads."""
+
+    def __init__(self, service, queue_size=10000, workers=2, spool_dir=None, retries=5,
+                 backoff=1.0, max_backoff=60.0, timeout=10.0, spill_size=1000):
+        self.service = service
+        self.queue_size = queue_size
+        self.spool_dir = spool_dir
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.timeout = timeout
+        self.spill_size = spill_size
+        self.items = collections.deque()
+        self.overflow = []          # Newer than the spill files, not written yet
+        self.spilled = []           # Spill files, oldest first
+        self.inflight = 0
+        self.resume_at = 0          # Nothing is posted before this
+        self.cond = threading.Condition()
+        self.stopping = threading.Event()
+        self.local = threading.local()
+        self.counters = Counters(COUNTERS)
+        if spool_dir is not None:
+            os.makedirs(spool_dir, exist_ok=True)
+            self.spilled = sorted(os.path.join(spool_dir, name)
+                                  for name in os.listdir(spool_dir) if name.endswith(".json"))
+        self.threads = [threading.Thread(target=self._worker, daemon=True)
+                        for _ in range(workers)]
+        for t in self.threads:
+            t.start()
+
+    # ------------------------------------------------------------------------
+    #                               Q U E U E
+    # ------------------------------------------------------------------------
+
+    def put(self, item):
+        """Queue an item for the service (JSON serializable)."""
+        with self.cond:
+            self.counters.inc("queued")
+            if self.spool_dir is not None and (self.spilled or self.overflow or
+                                               len(self.items) >= self.queue_size):
+                # Behind what is already spilled, to keep the order
+                self.overflow.append(item)
+                if len(self.overflow) >= self.spill_size:
+                    self._spill(self.overflow)
+                    self.overflow = []
+                self.cond.notify()
+                return
+            if len(self.items) >= self.queue_size:
+                self.items.popleft()
+                self.counters.inc("dropped")
+            self.items.append(item)
+            self.cond.notify()
+
+    def _spill(self, items, first=False):
+        # Called with the lock held. first is for the items in memory,
+        # they are older than the spill files
+        if first and self.spilled:
+            n = int(os.path.basename(self.spilled[0])[:20]) - 1
+        else:
+            n = time.time_ns()
+        path = os.path.join(self.spool_dir, "%020d.json" % n)
+        tmp = path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(items, f)
+        os.replace(tmp, path)
+        if first:
+            self.spilled.insert(0, path)
+        else:
+            self.spilled.append(path)
+        self.counters.inc("spilled", len(items))
+
+    def _refill(self):
+        # Called with the lock held, spilled items back when there is room
+        if time.monotonic() < self.resume_at:
+            # A batch has just failed, give the service time
+            return
+        while self.spilled and (not self.items or
+                                len(self.items) + self.spill_size <= self.queue_size):
+            path = self.spilled.pop(0)
+            try:
+                with open(path) as f:
+                    self.items.extend(json.load(f))
+                os.unlink(path)
+            except (OSError, ValueError) as e:
+                print("Exporter: skipping %s: %s" % (path, e))
+        if not self.spilled and self.overflow and \
+                len(self.items) + len(self.overflow) <= self.queue_size:
+            self.items.extend(self.overflow)
+            self.overflow = []
+
+    def _take(self):
+        with self.cond:
+            while True:
+                self._refill()
+                if self.stopping.is_set():
+                    return []
+                # After a failed batch wait for resume_at
+                wait = self.resume_at - time.monotonic()
+                if self.items and wait <= 0:
+                    break
+                self.cond.wait(min(wait, 1.0) if wait > 0 else 1.0)
+            n = min(len(self.items), self.service.max_batch)
+            batch = [self.items.popleft() for _ in range(n)]
+            if batch:
+                self.inflight += 1
+            return batch
+
+    # ------------------------------------------------------------------------
+    #                                H T T P
+    # ------------------------------------------------------------------------
+
+    def _connection(self, scheme, netloc, fresh=False):
+        conn = getattr(self.local, "conn", None)
+        if conn is not None and (fresh or self.local.key != (scheme, netloc)):
+            conn.close()
+            conn = None
+        if conn is None:
+            if "https" == scheme:
+                conn = http.client.HTTPSConnection(netloc, timeout=self.timeout)
+            else:
+                conn = http.client.HTTPConnection(netloc, timeout=self.timeout)
+            self.local.conn = conn
+            self.local.key = (scheme, netloc)
+        return conn
+
+    def _post(self, items):
+        method, url, body, headers = self.service.request(items)
+        headers = dict(headers, **{"User-Agent": USER_AGENT})
+        u = urllib.parse.urlsplit(url)
+        target = u.path or "/"
+        if u.query:
+            target += "?" + u.query
+        # A kept alive connection may have been closed by the server,
+        # then try once more on a new one
+        for attempt in (0, 1):
+            conn = self._connection(u.scheme, u.netloc, fresh=attempt > 0)
+            try:
+                conn.request(method, target, body, headers)
+                resp = conn.getresponse()
+                resp.read()
+                break
+            except (http.client.RemoteDisconnected, ConnectionResetError,
+                    BrokenPipeError, http.client.CannotSendRequest):
+                conn.close()
+                if attempt:
+                    raise
+        if not 200 <= resp.status < 300:
+            retry_after = resp.getheader("Retry-After")
+            raise PostError(resp.status, resp.reason,
+                            float(retry_after) if retry_after and retry_after.isdigit() else None)
+
+    def _deliver(self, batch):
+        """False if the batch should be tried again later."""
+        for attempt in range(self.retries + 1):
+            try:
+                self.counters.inc("requests")
+                self._post(batch)
+                self.counters.inc("posted", len(batch))
+                return True
+            except PostError as e:
+                if not e.retry:
+                    print("Exporter: %s, %d values not delivered" % (e, len(batch)))
+                    self.counters.inc("failed", len(batch))
+                    return True
+                delay = e.retry_after
+            except (OSError, http.client.HTTPException) as e:
+                conn = getattr(self.local, "conn", None)
+                if conn is not None:
+                    conn.close()
+                delay = None
+            if attempt == self.retries:
+                break
+            if delay is None:
+                delay = min(self.max_backoff, self.backoff * 2 ** attempt)
+                # Spread retries of many workers and processes
+                delay *= random.uniform(0.5, 1.0)
+            self.counters.inc("retries")
+            if self.stopping.wait(delay):
+                break
+        return False
+
+    def _worker(self):
+        while True:
+            batch = self._take()
+            if not batch:
+                return
+            done = self._deliver(batch)
+            with self.cond:
+                if not done:
+                    if self.spool_dir is not None:
+                        # Back first in line, in order
+                        self.items.extendleft(reversed(batch))
+                        self.resume_at = time.monotonic() + self.max_backoff
+                    else:
+                        self.counters.inc("failed", len(batch))
+                self.inflight -= 1
+                self.cond.notify_all()
+
+    # ------------------------------------------------------------------------
+
+    def _waiting(self, wait_spilled):
+        # Called with the lock held
+        if self.inflight:
+            return True
+        if not wait_spilled and time.monotonic() < self.resume_at:
+            # A batch has failed, the rest waits for resume_at
+            return False
+        return bool(self.items or self.overflow or self.spilled)
+
+    def flush(self, timeout=None, wait_spilled=True):
+        """Wait until everything queued has been posted, False on timeout.
+
+        With wait_spilled False it returns once a batch has failed,
+        instead of waiting for the service to come back. close() then
+        spills what is left.
+        """
+        end = None if timeout is None else time.monotonic() + timeout
+        with self.cond:
+            while self._waiting(wait_spilled):
+                left = None if end is None else end - time.monotonic()
+                if left is not None and left <= 0:
+                    return False
+                self.cond.wait(1.0 if left is None else min(left, 1.0))
+        return True
+
+    def close(self, timeout=10.0, wait_spilled=True):
+        """Post what is queued for at most timeout seconds, spill the rest.
+
+        See flush() for wait_spilled.
+        """
+        self.flush(timeout, wait_spilled)
+        self.stopping.set()
+        with self.cond:
+            self.cond.notify_all()
+        for t in self.threads:
+            t.join()
+        with self.cond:
+            items = list(self.items)
+            overflow = self.overflow
+            self.items.clear()
+            self.overflow = []
+            if self.spool_dir is None:
+                self.counters.inc("dropped", len(items) + len(overflow))
+                return
+            if items:
+                self._spill(items, first=True)
+            if overflow:
+                self._spill(overflow)
+
+
+# ----------------------------------------------------------------------------
+
+def _feed_arg(text):
+    guid, _, feed = text.rpartition("=")
+    if not guid:
+        raise argparse.ArgumentTypeError("GUID=FEED expected")
+    return guid.upper(), feed
+
+
+async def run(exporter, feeds, item, arg):
+    client = vscp_tcpip.Client(arg.host, arg.port, arg.user, arg.password)
+    await client.connect()
+    last = time.monotonic()
+    async for ev in client.rcvloop():
+        feed = feeds.get(ev.get("vscpGuid", "").upper())
+        if feed is not None:
+            m = vscp_measurement.decode(ev)
+            if m is not None:
+                exporter.put(item(feed, m.value, vscp_measurement.event_time(ev)))
+        if arg.stats and time.monotonic() - last >= arg.stats:
+            print(exporter.counters.snapshot())
+            last = time.monotonic()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Post VSCP measurements to a web service")
+    parser.add_argument('service', choices=('sense', 'xively'))
+    parser.add_argument('key', help='API key')
+    parser.add_argument('--feed', type=_feed_arg, action='append', default=[],
+                        help='GUID=FEED, feed id (sense) or datastream (xively) of a GUID')
+    parser.add_argument('--xively-feed', help='Xively feed id')
+    parser.add_argument('--spool', help='Directory for values that can not be posted yet')
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--host', default='localhost', help='VSCP daemon host')
+    parser.add_argument('--port', type=int, default=vscp_tcpip.DEFAULT_PORT)
+    parser.add_argument('--user', default='admin')
+    parser.add_argument('--password', default='secret')
+    parser.add_argument('--stats', type=int, default=0,
+                        help='Print counters every STATS seconds (0 = never)')
+    arg = parser.parse_args(sys.argv[1:])
+
+    if 'sense' == arg.service:
+        service = Sense(arg.key)
+    else:
+        if not arg.xively_feed:
+            parser.error("--xively-feed is needed for xively")
+        service = Xively(arg.key, arg.xively_feed)
+    exporter = Exporter(service, workers=arg.workers, spool_dir=arg.spool)
+    try:
+        asyncio.run(run(exporter, dict(arg.feed), service.item, arg))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        exporter.close()
+        print(exporter.counters.snapshot())
+
+
+if __name__ == "__main__":
+    main()
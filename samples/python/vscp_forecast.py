@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+
+# vscp_forecast.py
+#
+# Helpers for the weather forecast samples
+#
+# Forecast values are turned into VSCP events in VSCP JSON format (same
+# dict as vscp_payload.py and vscp_tcpip.py use)
+#
+#   CLASS1.WEATHER_FORECAST     levels for temperature, wind, rain...
+#                               data = index, zone, subzone
+#   CLASS1.MEASUREMENT          values in string format
+#
+# Locations are read from a file with one location per line
+#
+#   name,latitude,longitude,guid[,zone[,subzone]]
+#
+# Empty lines and lines starting with # are skipped.
+#
+# This file is part of the VSCP (https://www.vscp.org) project
+#
+# The MIT License (MIT)
+#
+# Copyright © 2000-2026 Ake Hedman, the VSCP project
+# <info@vscp.org>
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#
+
+import asyncio
+import collections
+
+import vscp_class
+import vscp_tcpip
+import vscp_type
+
+Location = collections.namedtuple("Location", "name latitude longitude guid zone subzone")
+
+
+def _byte(text):
+    # Decimal or 0x hex
+    if text[:2] in ("0x", "0X"):
+        return int(text, 16) & 0xff
+    return int(text) & 0xff
+
+
+def read_locations(path):
+    """List of Location from a locations file."""
+    locations = []
+    with open(path) as f:
+        for lineno, line in enumerate(f, 1):
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            fields = [x.strip() for x in line.split(",")]
+            if len(fields) < 4:
+                raise ValueError("%s:%d: expected name,latitude,longitude,guid[,zone[,subzone]]"
+                                 % (path, lineno))
+            locations.append(Location(fields[0], float(fields[1]), float(fields[2]),
+                                      fields[3].upper(),
+                                      _byte(fields[4]) if len(fields) > 4 else 0xff,
+                                      _byte(fields[5]) if len(fields) > 5 else 0xff))
+    return locations
+
+
+# ----------------------------------------------------------------------------
+#                                L E V E L S
+# ----------------------------------------------------------------------------
+
+def temperature_level(t):
+    """Forecast type for a temperature in degrees Celsius."""
+    if t <= -20:
+        return vscp_type.VSCP_TYPE_WEATHER_FORECAST_AIR_FREEZING
+    if t <= -15:
+        return vscp_type.VSCP_TYPE_WEATHER_FORECAST_AIR_VERY_COLD
+    if t <= 0:
+        return vscp_type.VSCP_TYPE_WEATHER_FORECAST_AIR_COLD
+    if t < 20:
+        return vscp_type.VSCP_TYPE_WEATHER_FORECAST_AIR_NORMAL
+    if t < 30:
+        return vscp_type.VSCP_TYPE_WEATHER_FORECAST_AIR_HOT
+    return vscp_type.VSCP_TYPE_WEATHER_FORECAST_AIR_VERY_HOT
+
+
+def wind_level(ws):
+    """Forecast type for a wind speed in m/s."""
+    if ws < 0.5:
+        return vscp_type.VSCP_TYPE_WEATHER_FORECAST_WIND_NONE
+    if ws <= 5:
+        return vscp_type.VSCP_TYPE_WEATHER_FORECAST_WIND_LOW
+    if ws <= 10:
+        return vscp_type.VSCP_TYPE_WEATHER_FORECAST_WIND_MEDIUM
+    if ws <= 15:
+        return vscp_type.VSCP_TYPE_WEATHER_FORECAST_WIND_HIGH
+    return vscp_type.VSCP_TYPE_WEATHER_FORECAST_WIND_VERY_HIGH
+
+
+def rain_level(mm):
+    """Forecast type for precipitation in mm/h."""
+    if mm < 0.1:
+        return vscp_type.VSCP_TYPE_WEATHER_FORECAST_RAIN_NONE
+    if mm < 2.5:
+        return vscp_type.VSCP_TYPE_WEATHER_FORECAST_RAIN_LIGHT
+    if mm < 10:
+        return vscp_type.VSCP_TYPE_WEATHER_FORECAST_RAIN_HEAVY
+    return vscp_type.VSCP_TYPE_WEATHER_FORECAST_RAIN_VERY_HEAVY
+
+
+def humidity_level(rh):
+    """Forecast type for relative humidity in %, None when normal."""
+    if rh >= 90:
+        return vscp_type.VSCP_TYPE_WEATHER_FORECAST_AIR_HUMID
+    if rh <= 30:
+        return vscp_type.VSCP_TYPE_WEATHER_FORECAST_AIR_DRY
+    return None
+
+
+def thunder_level(probability):
+    """Forecast type for thunder probability in %, None when unlikely."""
+    if probability >= 50:
+        return vscp_type.VSCP_TYPE_WEATHER_FORECAST_LIGHTNING
+    return None
+
+
+# ----------------------------------------------------------------------------
+#                                E V E N T S
+# ----------------------------------------------------------------------------
+
+def forecast_event(guid, vscptype, zone=0xff, subzone=0xff, index=0):
+    """CLASS1.WEATHER_FORECAST event."""
+    return {
+        "vscpHead": 0,
+        "vscpClass": vscp_class.VSCP_CLASS1_WEATHER_FORECAST,
+        "vscpType": vscptype,
+        "vscpGuid": guid,
+        "vscpData": [index & 0xff, zone & 0xff, subzone & 0xff],
+    }
+
+
+def measurement_event(guid, vscptype, value, unit=0, sensor=0):
+    """CLASS1.MEASUREMENT event with the value in string format.
+
+    At most seven characters of the value fit in the event.
+    """
+    strvalue = ("%g" % value if isinstance(value, float) else str(value))[:7]
+    datacoding = 0x40 | ((unit & 3) << 3) | (sensor & 7)
+    return {
+        "vscpHead": 0,
+        "vscpClass": vscp_class.VSCP_CLASS1_MEASUREMENT,
+        "vscpType": vscptype,
+        "vscpGuid": guid,
+        "vscpData": [datacoding] + list(strvalue.encode()),
+    }
+
+
+async def _send(events, host, port, user, password):
+    client = vscp_tcpip.Client(host, port, user, password)
+    await client.connect()
+    try:
+        return await client.send_many(events)
+    finally:
+        await client.close()
+
+
+def send_events(events, host="localhost", port=vscp_tcpip.DEFAULT_PORT, user="admin",
+                password="secret"):
+    """Send events pipelined over one daemon connection.
+
+    Returns the number of events the daemon refused.
+    """
+    return asyncio.run(_send(events, host, port, user, password))
@@ -0,0 +1,309 @@
+#!/usr/bin/env python3
+
+# vscp_httpcache.py
+#
+# HTTP fetcher with an on-disk response cache for the forecast samples
+#
+# Forecast sources update about once an hour but are polled from cron
+# for many locations. Responses are kept on disk together with their
+# ETag/Last-Modified and expiry time (Cache-Control max-age or Expires,
+# at least min_ttl seconds). A fresh response is served from the cache,
+# a stale one is revalidated with a conditional GET (If-None-Match /
+# If-Modified-Since) and a 304 answer just extends its life. If the
+# server is rate limiting (429) or failing (5xx) a stale copy is served.
+#
+# Connections are kept alive and reused per thread and host.
+#
+# Try it against a local stand-in, python's http.server answers
+# If-Modified-Since with 304:
+#
+#   python3 -m http.server 8000
+#   python3 vscp_httpcache.py http://localhost:8000/README.md
+#
+# This file is part of the VSCP (https://www.vscp.org) project
+#
+# The MIT License (MIT)
+#
+# Copyright © 2000-2026 Ake Hedman, the VSCP project
+# <info@vscp.org>
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#
+
+import argparse
+import email.utils
+import gzip
+import hashlib
+import http.client
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+import urllib.parse
+
+DEFAULT_DIR = os.path.join(os.path.expanduser("~"), ".cache", "vscp-samples")
+
+# Some services (api.met.no) want clients to identify themselves
+USER_AGENT = "vscp-samples/1.0 https://github.com/grodansparadis/vscp-samples"
+
+MAX_REDIRECTS = 5
+
+
+class HttpError(Exception):
+    """Request failed and there is nothing cached to fall back on."""
+
+    def __init__(self, url, status, reason=""):
+        Exception.__init__(self, "%s: %s %s" % (url, status, reason))
+        self.url = url
+        self.status = status
+
+
+def _http_date(text):
+    try:
+        return email.utils.parsedate_to_datetime(text).timestamp()
+    except (TypeError, ValueError, IndexError):
+        return None
+
+
+def expiry(headers, now, min_ttl=0):
+    """Time a response stops being fresh, None if it must not be stored."""
+    directives = {}
+    for d in headers.get("cache-control", "").lower().split(","):
+        name, _, value = d.strip().partition("=")
+        if name:
+            directives[name] = value.strip('"')
+
+    if "no-store" in directives:
+        return None
+
+    ttl = 0
+    if "no-cache" in directives:
+        ttl = 0
+    elif "max-age" in directives:
+        try:
+            ttl = int(directives["max-age"]) - int(headers.get("age", 0))
+        except ValueError:
+            ttl = 0
+    elif "expires" in headers:
+        expires = _http_date(headers["expires"])
+        date = _http_date(headers.get("date", "")) or now
+        if expires is not None:
+            ttl = expires - date
+    return now + max(ttl, min_ttl)
+
+
+class HttpCache:
+    """Fetch URLs through the on-disk cache in directory."""
+
+    def __init__(self, directory=DEFAULT_DIR, min_ttl=0, timeout=10.0, user_agent=USER_AGENT):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.min_ttl = min_ttl
+        self.timeout = timeout
+        self.user_agent = user_agent
+        self.memory = {}
+        self.local = threading.local()
+        self.lock = threading.Lock()
+        self.stats = {"hit": 0, "revalidated": 0, "fetched": 0, "stale": 0}
+
+    # ------------------------------------------------------------------------
+    #                                C A C H E
+    # ------------------------------------------------------------------------
+
+    def _path(self, url):
+        return os.path.join(self.directory, hashlib.sha1(url.encode()).hexdigest())
+
+    def _load(self, url):
+        entry = self.memory.get(url)
+        if entry is not None:
+            return entry
+        path = self._path(url)
+        try:
+            with open(path + ".json") as f:
+                meta = json.load(f)
+            with open(path + ".body", "rb") as f:
+                body = f.read()
+        except (OSError, ValueError):
+            return None
+        entry = self.memory[url] = (meta, body)
+        return entry
+
+    def _write(self, path, data):
+        # Write to a temporary file and rename so readers never see half a file
+        fd, tmp = tempfile.mkstemp(dir=self.directory)
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+
+    def _store(self, url, meta, body=None):
+        path = self._path(url)
+        if body is not None:
+            self._write(path + ".body", body)
+        else:
+            body = self.memory[url][1]
+        self._write(path + ".json", json.dumps(meta).encode())
+        self.memory[url] = (meta, body)
+
+    def _count(self, name):
+        with self.lock:
+            self.stats[name] += 1
+
+    # ------------------------------------------------------------------------
+    #                                 H T T P
+    # ------------------------------------------------------------------------
+
+    def _connection(self, scheme, netloc, fresh=False):
+        conns = getattr(self.local, "conns", None)
+        if conns is None:
+            conns = self.local.conns = {}
+        key = (scheme, netloc)
+        conn = conns.get(key)
+        if conn is not None and fresh:
+            conn.close()
+            conn = None
+        if conn is None:
+            if "https" == scheme:
+                conn = http.client.HTTPSConnection(netloc, timeout=self.timeout)
+            else:
+                conn = http.client.HTTPConnection(netloc, timeout=self.timeout)
+            conns[key] = conn
+        return conn
+
+    def _request(self, url, headers):
+        """GET following redirects. Returns (status, reason, headers, body)."""
+        for _ in range(MAX_REDIRECTS + 1):
+            u = urllib.parse.urlsplit(url)
+            target = u.path or "/"
+            if u.query:
+                target += "?" + u.query
+
+            # A kept alive connection may have been closed by the server,
+            # then try once more on a new one
+            for attempt in (0, 1):
+                conn = self._connection(u.scheme, u.netloc, fresh=attempt > 0)
+                try:
+                    conn.request("GET", target, headers=headers)
+                    resp = conn.getresponse()
+                    body = resp.read()
+                    break
+                except (http.client.RemoteDisconnected, ConnectionResetError,
+                        BrokenPipeError, http.client.CannotSendRequest):
+                    conn.close()
+                    if attempt:
+                        raise
+
+            rheaders = dict((k.lower(), v) for k, v in resp.getheaders())
+            if resp.status in (301, 302, 303, 307, 308) and "location" in rheaders:
+                url = urllib.parse.urljoin(url, rheaders["location"])
+                continue
+            if "gzip" == rheaders.get("content-encoding"):
+                body = gzip.decompress(body)
+            return resp.status, resp.reason, rheaders, body
+        raise HttpError(url, 310, "Too many redirects")
+
+    # ------------------------------------------------------------------------
+
+    def fetch(self, url, min_ttl=None):
+        """Body of url, from the cache when it is fresh."""
+        now = time.time()
+        if min_ttl is None:
+            min_ttl = self.min_ttl
+
+        entry = self._load(url)
+        if entry is not None and entry[0]["expires"] > now:
+            self._count("hit")
+            return entry[1]
+
+        headers = {"User-Agent": self.user_agent, "Accept-Encoding": "gzip"}
+        if entry is not None:
+            meta = entry[0]
+            if meta.get("etag"):
+                headers["If-None-Match"] = meta["etag"]
+            if meta.get("last_modified"):
+                headers["If-Modified-Since"] = meta["last_modified"]
+
+        try:
+            status, reason, rheaders, body = self._request(url, headers)
+        except (OSError, http.client.HTTPException):
+            if entry is not None:
+                self._count("stale")
+                return entry[1]
+            raise
+
+        if 304 == status and entry is not None:
+            meta = dict(entry[0])
+            expires = expiry(rheaders, now, min_ttl)
+            meta["expires"] = expires if expires is not None else now
+            if rheaders.get("etag"):
+                meta["etag"] = rheaders["etag"]
+            self._store(url, meta)
+            self._count("revalidated")
+            return entry[1]
+
+        if 200 != status:
+            if entry is not None and (429 == status or status >= 500):
+                self._count("stale")
+                return entry[1]
+            raise HttpError(url, status, reason)
+
+        self._count("fetched")
+        expires = expiry(rheaders, now, min_ttl)
+        if expires is not None:
+            self._store(url, {"url": url,
+                              "etag": rheaders.get("etag", ""),
+                              "last_modified": rheaders.get("last-modified", ""),
+                              "expires": expires}, body)
+        return body
+
+    def fetch_json(self, url, min_ttl=None):
+        return json.loads(self.fetch(url, min_ttl))
+
+
+# Shared by the samples, created on first use
+_default = None
+
+def default_cache():
+    global _default
+    if _default is None:
+        _default = HttpCache()
+    return _default
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fetch URLs through the VSCP samples HTTP cache")
+    parser.add_argument('url', nargs='+', help='URL to fetch')
+    parser.add_argument('-d', '--dir', default=DEFAULT_DIR, help='Cache directory')
+    parser.add_argument('-t', '--ttl', type=int, default=0,
+                        help='Keep responses at least this many seconds')
+    parser.add_argument('-n', '--count', type=int, default=2, help='Fetch each URL this many times')
+    arg = parser.parse_args(sys.argv[1:])
+
+    cache = HttpCache(arg.dir, arg.ttl)
+    for url in arg.url:
+        for _ in range(arg.count):
+            t = time.monotonic()
+            body = cache.fetch(url)
+            print("%s %d bytes in %.1f ms" % (url, len(body), (time.monotonic() - t) * 1000))
+    print(cache.stats)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+
+# vscp_measurement.py
+#
+# Values of measurement events
+#
+# decode() gives the value, unit, sensor index, zone and subzone of an
+# event in VSCP JSON format for
+#
+#   CLASS1.MEASUREMENT (10)         datacoding byte + value
+#   CLASS1.MEASUREZONE (65)         index, zone, subzone, datacoding + value
+#   CLASS2.LEVEL1.* (512 + above)   the same after the 16 GUID bytes
+#   CLASS2.MEASUREMENT_STR (1040)   index, zone, subzone, unit, string
+#   CLASS2.MEASUREMENT_FLOAT (1060) index, zone, subzone, unit, double
+#
+# Datacoding is the standard VSCP one, bits 7-5 value format (string,
+# integer, normalized integer, float), bits 4-3 unit, bits 2-0 sensor
+# index.
+#
+# This file is part of the VSCP (https://www.vscp.org) project
+#
+# The MIT License (MIT)
+#
+# Copyright © 2000-2026 Ake Hedman, the VSCP project
+# <info@vscp.org>
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#
+
+import calendar
+import collections
+import struct
+import time
+
+import vscp_class
+
+Measurement = collections.namedtuple("Measurement", "value unit sensorindex zone subzone")
+
+# Datacoding value formats (bits 7-5)
+CODING_BITS = 0x00
+CODING_BYTE = 0x20
+CODING_STRING = 0x40
+CODING_INTEGER = 0x60
+CODING_NORMALIZED = 0x80
+CODING_FLOAT = 0xA0
+
+# Temperature units
+UNIT_KELVIN = 0
+UNIT_CELSIUS = 1
+UNIT_FAHRENHEIT = 2
+
+
+def _int(b):
+    return int.from_bytes(b, "big", signed=True) if b else 0
+
+
+def coded_value(data):
+    """(value, unit, sensor index) of datacoding + value bytes, None if unknown."""
+    if not data:
+        return None
+    coding = data[0] & 0xE0
+    unit = (data[0] >> 3) & 3
+    sensor = data[0] & 7
+    b = bytes(data[1:])
+
+    if CODING_STRING == coding:
+        try:
+            value = float(b.split(b"\0", 1)[0].decode("ascii"))
+        except ValueError:
+            return None
+    elif CODING_INTEGER == coding:
+        value = _int(b)
+    elif CODING_NORMALIZED == coding:
+        if len(b) < 2:
+            return None
+        # Bit 7 of the exponent byte moves the decimal point left
+        exp = b[0] & 0x1F
+        value = _int(b[1:])
+        value = value / 10 ** exp if b[0] & 0x80 else value * 10 ** exp
+    elif CODING_FLOAT == coding:
+        if len(b) < 4:
+            return None
+        value = struct.unpack(">f", b[:4])[0]
+    elif coding in (CODING_BITS, CODING_BYTE):
+        value = int.from_bytes(b, "big")
+    else:
+        return None
+    return value, unit, sensor
+
+
+def decode(ev):
+    """Measurement of an event in VSCP JSON format, None for other events."""
+    vscpclass = ev["vscpClass"]
+    data = ev.get("vscpData") or []
+
+    if 512 <= vscpclass < 1024:
+        # Level I event over Level II, data starts with the GUID
+        vscpclass -= 512
+        data = data[16:]
+
+    if vscp_class.VSCP_CLASS1_MEASUREMENT == vscpclass:
+        v = coded_value(data)
+        return Measurement(v[0], v[1], v[2], 0, 0) if v is not None else None
+
+    if vscp_class.VSCP_CLASS1_MEASUREZONE == vscpclass:
+        if len(data) < 4:
+            return None
+        v = coded_value(data[3:])
+        return Measurement(v[0], v[1], data[0], data[1], data[2]) if v is not None else None
+
+    if vscp_class.VSCP_CLASS2_MEASUREMENT_STR == vscpclass:
+        if len(data) < 5:
+            return None
+        try:
+            value = float(bytes(data[4:]).split(b"\0", 1)[0].decode("ascii"))
+        except ValueError:
+            return None
+        return Measurement(value, data[3], data[0], data[1], data[2])
+
+    if vscp_class.VSCP_CLASS2_MEASUREMENT_FLOAT == vscpclass:
+        if len(data) < 12:
+            return None
+        return Measurement(struct.unpack(">d", bytes(data[4:12]))[0],
+                           data[3], data[0], data[1], data[2])
+
+    return None
+
+
+def event_time(ev, now=None):
+    """Seconds since the epoch from vscpDateTime (UTC), now if not set."""
+    text = ev.get("vscpDateTime")
+    if text:
+        try:
+            return calendar.timegm((int(text[0:4]), int(text[5:7]), int(text[8:10]),
+                                    int(text[11:13]), int(text[14:16]), int(text[17:19])))
+        except ValueError:
+            pass
+    return time.time() if now is None else now
+
+
+def fahrenheit(value, unit):
+    """Temperature in Fahrenheit from a temperature measurement value."""
+    if UNIT_CELSIUS == unit:
+        return value * 9 / 5 + 32
+    if UNIT_KELVIN == unit:
+        return (value - 273.15) * 9 / 5 + 32
+    return value
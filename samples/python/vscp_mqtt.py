@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+
+# vscp_mqtt.py
+#
+# Helpers for publishing VSCP events on MQTT
+#
+# This file is part of the VSCP (https://www.vscp.org) project
+#
+# The MIT License (MIT)
+#
+# Copyright © 2000-2026 Ake Hedman, the VSCP project
+# <info@vscp.org>
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#
+
+import vscp_payload
+
+# Publish modes for a reading cycle
+#   single    - One publish per event, no waiting (default)
+#   pipelined - One publish per event, all sent at once with QoS >= 1
+#               and the acknowledges collected together at flush
+#   combined  - All events of the cycle in one array published
+#               on the batch topic
+BATCH_SINGLE = "single"
+BATCH_PIPELINED = "pipelined"
+BATCH_COMBINED = "combined"
+
+BATCH_MODES = (BATCH_SINGLE, BATCH_PIPELINED, BATCH_COMBINED)
+
+
+class TopicCache:
+    """Publish topics formatted once per (guid, class, type, sensorindex)."""
+
+    def __init__(self, template):
+        self.template = template
+        self.topics = {}
+
+    def get(self, guid, vscpclass, vscptype, sensorindex=0):
+        key = (guid, vscpclass, vscptype, sensorindex)
+        try:
+            return self.topics[key]
+        except KeyError:
+            topic = self.template.format(xguid=guid,
+                                         xclass=vscpclass,
+                                         xtype=vscptype,
+                                         xsensorindex=sensorindex)
+            self.topics[key] = topic
+            return topic
+
+
+class BatchPublisher:
+    """Publish the events of one reading cycle in the selected batch mode.
+
+    Events are handed over already serialized (see vscp_payload.py)
+    with add() and the cycle is ended with flush() which returns the
+    number of events that failed to be delivered. The backend is used
+    to join the events of a combined batch into one array.
+
+    formats (vscp_payload.PayloadFormats) tells which topics take binary
+    frames, ask is_binary() for the topic before serializing an event.
+    """
+
+    def __init__(self, client, mode=BATCH_SINGLE, batch_topic="", qos=1, timeout=5.0,
+                 backend=None, formats=None):
+        if mode not in BATCH_MODES:
+            raise ValueError("Unknown batch mode '%s'" % mode)
+        if BATCH_COMBINED == mode and not batch_topic:
+            raise ValueError("A batch topic is needed for combined mode")
+        self.client = client
+        self.mode = mode
+        self.batch_topic = batch_topic
+        self.qos = qos
+        self.timeout = timeout
+        self.backend = backend if backend is not None else vscp_payload.JsonBackend()
+        self.formats = formats if formats is not None else vscp_payload.PayloadFormats()
+        self.batch_binary = bool(batch_topic) and self.formats.is_binary(batch_topic)
+        self.pending = []
+        self.events = []
+        self.failed = 0
+
+    def is_binary(self, topic):
+        """True if an event for topic should be added as a binary frame."""
+        if BATCH_COMBINED == self.mode:
+            return self.batch_binary
+        return self.formats.is_binary(topic)
+
+    def add(self, topic, payload, qos=0):
+        if BATCH_COMBINED == self.mode:
+            self.events.append(payload)
+            return
+
+        if BATCH_PIPELINED == self.mode:
+            qos = max(qos, self.qos)
+
+        info = self.client.publish(topic, payload=payload, qos=qos)
+        if 0 != info[0]:
+            self.failed += 1
+        elif BATCH_PIPELINED == self.mode:
+            self.pending.append((info, 1))
+
+    def flush(self):
+        if BATCH_COMBINED == self.mode and len(self.events):
+            if self.batch_binary:
+                payload = b"".join(self.events)
+            else:
+                payload = self.backend.join(self.events)
+            info = self.client.publish(self.batch_topic, payload=payload, qos=self.qos)
+            if 0 != info[0]:
+                self.failed += len(self.events)
+            elif self.qos:
+                self.pending.append((info, len(self.events)))
+            self.events = []
+
+        # All messages are on their way, now collect the acknowledges
+        for info, count in self.pending:
+            info.wait_for_publish(self.timeout)
+            if not info.is_published():
+                self.failed += count
+        self.pending = []
+
+        failed = self.failed
+        self.failed = 0
+        return failed
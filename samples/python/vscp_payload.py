@@ -0,0 +1,470 @@
+#!/usr/bin/env python3
+
+# vscp_payload.py
+#
+# Build MQTT payloads for VSCP events
+#
+# The VSCP JSON event format is produced directly from templates that
+# are prepared once per measurement so only the value part has to be
+# filled in for each new reading. The result is the same as calling
+# toJSON() on the event, adding vscpNote and measurement and dumping
+# it with json.dumps().
+#
+# The serializer is picked at runtime
+#   json    - Standard library, fast path from prebuilt text fragments
+#   orjson  - https://github.com/ijl/orjson if installed
+#   msgpack - https://msgpack.org if installed (binary, same schema)
+#   auto    - orjson if installed otherwise json
+#
+# Events can also be sent as the compact standard VSCP binary frame
+# (the same frame used for UDP/multicast) for topics selected by prefix,
+# see PayloadFormats. decode_payload() takes any of the formats and
+# gives back events in VSCP JSON format.
+#
+# This file is part of the VSCP (https://www.vscp.org) project
+#
+# The MIT License (MIT)
+#
+# Copyright © 2000-2026 Ake Hedman, the VSCP project
+# <info@vscp.org>
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#
+
+import binascii
+import json
+import math
+import struct
+import time
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+# Binary frame layout
+#   0      Packet type (high nibble) + encryption (low nibble)
+#   1-2    head
+#   3-6    timestamp
+#   7-13   year (2), month, day, hour, minute, second
+#   14-15  class
+#   16-17  type
+#   18-33  GUID
+#   34-35  data size
+#   36-    data
+#   len-2  CRC-CCITT over byte 1 to end of data
+FRAME_PKTTYPE_EVENT = 0x00
+FRAME_HEADER_LENGTH = 36
+FRAME_CRC_LENGTH = 2
+
+_frame_header = struct.Struct(">BHIHBBBBBHH16sH")
+_frame_crc = struct.Struct(">H")
+
+PAYLOAD_JSON = "json"
+PAYLOAD_BINARY = "binary"
+
+# Decimal text for all byte values
+_BYTE_STR = [str(i) for i in range(256)]
+
+_json_dumps = json.dumps
+
+
+def guid_to_string(guid):
+    """Format 16 GUID bytes as 'FF:FF:...:00:01'."""
+    return ":".join("%02X" % b for b in guid[:16])
+
+
+class _DateTime:
+    """VSCP date/time for now, converted at most once per second."""
+
+    def __init__(self):
+        self.second = -1
+        self.text = ""
+        self.packed = b""
+
+    def _update(self):
+        second = int(time.time())
+        if second != self.second:
+            t = time.gmtime(second)
+            self.text = time.strftime("%Y-%m-%dT%H:%M:%SZ", t)
+            self.packed = struct.pack(">HBBBBB", t.tm_year, t.tm_mon, t.tm_mday,
+                                      t.tm_hour, t.tm_min, t.tm_sec)
+            self.second = second
+
+    def now(self):
+        self._update()
+        return self.text
+
+    def now_packed(self):
+        self._update()
+        return self.packed
+
+
+_datetime = _DateTime()
+
+
+# ----------------------------------------------------------------------------
+#                              B A C K E N D S
+# ----------------------------------------------------------------------------
+
+class JsonBackend:
+    """Standard library json. Payloads are str."""
+
+    name = "json"
+    binary = False
+
+    def dumps(self, obj):
+        return _json_dumps(obj)
+
+    def join(self, payloads):
+        return "[" + ",".join(payloads) + "]"
+
+
+class OrjsonBackend:
+    """orjson. Payloads are UTF-8 bytes."""
+
+    name = "orjson"
+    binary = False
+
+    def dumps(self, obj):
+        return orjson.dumps(obj)
+
+    def join(self, payloads):
+        return b"[" + b",".join(payloads) + b"]"
+
+
+class MsgpackBackend:
+    """msgpack. Same schema as the JSON format but msgpack encoded."""
+
+    name = "msgpack"
+    binary = True
+
+    def dumps(self, obj):
+        return msgpack.packb(obj, use_bin_type=True)
+
+    def join(self, payloads):
+        # array 32 header followed by the already packed objects
+        return b"\xdd" + len(payloads).to_bytes(4, "big") + b"".join(payloads)
+
+
+class BinaryBackend:
+    """Standard VSCP binary frames. Frames carry their own size so a
+    batch is just the frames one after the other."""
+
+    name = PAYLOAD_BINARY
+    binary = True
+
+    def dumps(self, obj):
+        return encode_frame_from_json(obj)
+
+    def join(self, payloads):
+        return b"".join(payloads)
+
+
+def get_backend(name="auto"):
+    """Return serializer backend 'json', 'orjson', 'msgpack', 'binary' or 'auto'."""
+    if "auto" == name:
+        name = "orjson" if orjson is not None else "json"
+    if "json" == name:
+        return JsonBackend()
+    if "orjson" == name:
+        if orjson is None:
+            raise ValueError("orjson is not installed")
+        return OrjsonBackend()
+    if "msgpack" == name:
+        if msgpack is None:
+            raise ValueError("msgpack is not installed")
+        return MsgpackBackend()
+    if PAYLOAD_BINARY == name:
+        return BinaryBackend()
+    raise ValueError("Unknown payload backend '%s'" % name)
+
+
+# ----------------------------------------------------------------------------
+#                             T E M P L A T E S
+# ----------------------------------------------------------------------------
+
+class MeasurementTemplate:
+    """VSCP JSON event for a string measurement (CLASS2.MEASUREMENT_STR).
+
+    Everything except date/time and the value is prepared when the
+    template is created. Data is sensorindex, zone, subzone, unit
+    followed by the value string and optionally a terminating zero.
+    """
+
+    def __init__(self, head, vscpclass, vscptype, guid,
+                 sensorindex=0, zone=0, subzone=0, unit=0, note="",
+                 obid=0, timestamp=0, zero_terminate=True, backend=None):
+        self.backend = backend if backend is not None else JsonBackend()
+        self.guid = guid_to_string(guid) if not isinstance(guid, str) else guid
+        self.predata = [sensorindex, zone, subzone, unit]
+        self.zero_terminate = zero_terminate
+        self.note = note
+
+        # The parts that never change for the dict based back ends
+        self.head = {
+            "vscpHead": head,
+            "vscpObId": obid,
+            "vscpDateTime": "",
+            "vscpTimeStamp": timestamp,
+            "vscpClass": vscpclass,
+            "vscpType": vscptype,
+            "vscpGuid": self.guid,
+        }
+        self.measurement = {
+            "unit": unit,
+            "sensorindex": sensorindex,
+            "zone": zone,
+            "subzone": subzone
+        }
+
+        # ... and as prebuilt JSON text for the json fast path
+        self.text_prefix = '{"vscpHead": %d, "vscpObId": %d, "vscpDateTime": "' % (head, obid)
+        self.text_data = ('", "vscpTimeStamp": %d, "vscpClass": %d, "vscpType": %d, '
+                          '"vscpGuid": %s, "vscpData": [%s' %
+                          (timestamp, vscpclass, vscptype, _json_dumps(self.guid),
+                           ", ".join(_BYTE_STR[b] for b in self.predata)))
+        self.text_note = '], "vscpNote": %s, "measurement": {"value": ' % _json_dumps(note)
+        self.text_suffix = (', "unit": %d, "sensorindex": %d, "zone": %d, "subzone": %d}}' %
+                            (unit, sensorindex, zone, subzone))
+
+        # ... and as binary frame parts
+        self.frame_prefix = struct.pack(">BHI", FRAME_PKTTYPE_EVENT, head, timestamp)
+        self.frame_id = struct.pack(">HH16s", vscpclass, vscptype, guid_from_string(self.guid))
+        self.frame_predata = bytes(self.predata)
+
+    @classmethod
+    def fromEvent(cls, ex, sensorindex=0, zone=0, subzone=0, unit=0, note="", backend=None):
+        """Create a template from the header of a vscpEventEx."""
+        return cls(ex.head, ex.vscpclass, ex.vscptype, list(ex.guid),
+                   sensorindex, zone, subzone, unit, note,
+                   obid=ex.obid, timestamp=ex.timestamp, backend=backend)
+
+    def data(self, strvalue):
+        """Event data bytes for a value string."""
+        b = strvalue.encode()
+        if self.zero_terminate:
+            b += b"\x00"
+        return bytes(self.predata) + b
+
+    def build(self, value, strvalue, datetime=None):
+        """The event as a dict in VSCP JSON format."""
+        j = dict(self.head)
+        j["vscpDateTime"] = datetime if datetime is not None else _datetime.now()
+        j["vscpData"] = list(self.data(strvalue))
+        j["vscpNote"] = self.note
+        measurement = {"value": value}
+        measurement.update(self.measurement)
+        j["measurement"] = measurement
+        return j
+
+    def dumps(self, value, strvalue, datetime=None):
+        """The event serialized with the selected back end."""
+        if "json" != self.backend.name:
+            return self.backend.dumps(self.build(value, strvalue, datetime))
+
+        # Value string bytes follow the four predata bytes
+        text = "".join([", " + _BYTE_STR[c] for c in strvalue.encode()])
+        if self.zero_terminate:
+            text += ", 0"
+
+        # float repr is what json uses for finite values
+        if type(value) is float and math.isfinite(value):
+            strval = float.__repr__(value)
+        else:
+            strval = _json_dumps(value)
+
+        return "".join((self.text_prefix,
+                        datetime if datetime is not None else _datetime.now(),
+                        self.text_data, text,
+                        self.text_note, strval,
+                        self.text_suffix))
+
+    def frame(self, strvalue, datetime=None):
+        """The event as a standard VSCP binary frame.
+
+        datetime is the packed date/time (year, month, day, hour, minute,
+        second) or None for now.
+        """
+        data = strvalue.encode()
+        if self.zero_terminate:
+            data += b"\x00"
+        body = b"".join((self.frame_prefix,
+                         datetime if datetime is not None else _datetime.now_packed(),
+                         self.frame_id,
+                         _frame_crc.pack(4 + len(data)),
+                         self.frame_predata, data))
+        return body + _frame_crc.pack(binascii.crc_hqx(body[1:], 0xFFFF))
+
+
+# ----------------------------------------------------------------------------
+#                          B I N A R Y   F R A M E S
+# ----------------------------------------------------------------------------
+
+def guid_from_string(guid):
+    """16 GUID bytes from 'FF:FF:...:00:01', '-' (not given) is all zeros."""
+    if "-" == guid:
+        return bytes(16)
+    b = bytes.fromhex(guid.replace(":", ""))
+    if 16 != len(b):
+        raise ValueError("Invalid GUID '%s'" % guid)
+    return b
+
+
+def _parse_datetime(text):
+    # "2021-01-01T10:00:00Z" (or without Z) -> (y, m, d, h, m, s)
+    if not text:
+        return (0, 0, 0, 0, 0, 0)
+    return (int(text[0:4]), int(text[5:7]), int(text[8:10]),
+            int(text[11:13]), int(text[14:16]), int(text[17:19]))
+
+
+def encode_frame(head, vscpclass, vscptype, guid, data=b"", timestamp=0, datetime=None):
+    """Standard VSCP binary frame for an event.
+
+    guid is 16 bytes or a GUID string, datetime a (year, month, day,
+    hour, minute, second) tuple or None for now. The frame has no obid.
+    """
+    if isinstance(guid, str):
+        guid = guid_from_string(guid)
+    if datetime is None:
+        t = time.gmtime()
+        datetime = (t.tm_year, t.tm_mon, t.tm_mday, t.tm_hour, t.tm_min, t.tm_sec)
+    data = bytes(data)
+    body = _frame_header.pack(FRAME_PKTTYPE_EVENT, head, timestamp, *datetime,
+                              vscpclass, vscptype, bytes(guid), len(data)) + data
+    return body + _frame_crc.pack(binascii.crc_hqx(body[1:], 0xFFFF))
+
+
+def encode_frame_from_json(j):
+    """Standard VSCP binary frame for an event in VSCP JSON format."""
+    return encode_frame(j.get("vscpHead", 0), j["vscpClass"], j["vscpType"],
+                        j["vscpGuid"], j.get("vscpData", []),
+                        j.get("vscpTimeStamp", 0),
+                        _parse_datetime(j.get("vscpDateTime", "")))
+
+
+def decode_frame(buf, offset=0):
+    """Decode the frame at offset.
+
+    Returns (event, next offset) where event is in VSCP JSON format.
+    Raises ValueError for unsupported or damaged frames.
+    """
+    if len(buf) - offset < FRAME_HEADER_LENGTH + FRAME_CRC_LENGTH:
+        raise ValueError("Frame too short")
+    (pkttype, head, timestamp, year, month, day, hour, minute, second,
+     vscpclass, vscptype, guid, size) = _frame_header.unpack_from(buf, offset)
+    if FRAME_PKTTYPE_EVENT != pkttype:
+        raise ValueError("Unsupported frame packet type 0x%02X" % pkttype)
+    end = offset + FRAME_HEADER_LENGTH + size
+    if len(buf) < end + FRAME_CRC_LENGTH:
+        raise ValueError("Frame data truncated")
+    (crc,) = _frame_crc.unpack_from(buf, end)
+    if crc != binascii.crc_hqx(memoryview(buf)[offset + 1:end], 0xFFFF):
+        raise ValueError("Frame CRC error")
+    j = {
+        "vscpHead": head,
+        "vscpObId": 0,
+        "vscpDateTime": "%04d-%02d-%02dT%02d:%02d:%02dZ" % (year, month, day,
+                                                            hour, minute, second),
+        "vscpTimeStamp": timestamp,
+        "vscpClass": vscpclass,
+        "vscpType": vscptype,
+        "vscpGuid": guid_to_string(guid),
+        "vscpData": list(buf[offset + FRAME_HEADER_LENGTH:end]),
+    }
+    return j, end + FRAME_CRC_LENGTH
+
+
+def decode_payload(payload):
+    """Decode an MQTT payload in any of the supported formats.
+
+    JSON text (one event or an array), binary frames (one or more) and,
+    if msgpack is installed, msgpack. Returns a list of events in VSCP
+    JSON format.
+    """
+    if not payload:
+        return []
+    first = payload[0]
+    if isinstance(first, str):
+        first = ord(first)
+
+    # JSON text starts with '{' or '[' possibly after white space
+    if first in (0x7B, 0x5B, 0x20, 0x09, 0x0A, 0x0D):
+        j = json.loads(payload)
+        return j if isinstance(j, list) else [j]
+
+    # Binary frames have packet type + encryption in the first byte
+    if first < 0x10:
+        events = []
+        offset = 0
+        while offset < len(payload):
+            j, offset = decode_frame(payload, offset)
+            events.append(j)
+        return events
+
+    # msgpack map or array
+    if msgpack is not None and (0x80 <= first <= 0x9F or first in (0xDC, 0xDD, 0xDE, 0xDF)):
+        j = msgpack.unpackb(payload, raw=False)
+        return j if isinstance(j, list) else [j]
+
+    raise ValueError("Unknown payload format")
+
+
+# ----------------------------------------------------------------------------
+#                   F O R M A T   P E R   T O P I C
+# ----------------------------------------------------------------------------
+
+class PayloadFormats:
+    """Payload format for a topic, selected by the longest matching prefix.
+
+    prefixes is a dict with topic prefix -> 'json' or 'binary'. Topics
+    that match no prefix use the default format.
+    """
+
+    def __init__(self, prefixes=None, default=PAYLOAD_JSON):
+        self.prefixes = sorted((prefixes or {}).items(), key=lambda p: -len(p[0]))
+        self.default = default
+        self.cache = {}
+
+    @classmethod
+    def fromBinaryPrefixes(cls, text):
+        """From a comma separated list of prefixes that should use binary."""
+        prefixes = [p.strip() for p in text.split(",") if p.strip()]
+        return cls(dict.fromkeys(prefixes, PAYLOAD_BINARY))
+
+    def get(self, topic):
+        try:
+            return self.cache[topic]
+        except KeyError:
+            fmt = self.default
+            for prefix, f in self.prefixes:
+                if topic.startswith(prefix):
+                    fmt = f
+                    break
+            self.cache[topic] = fmt
+            return fmt
+
+    def is_binary(self, topic):
+        return PAYLOAD_BINARY == self.get(topic)
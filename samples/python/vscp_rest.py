@@ -0,0 +1,397 @@
+#!/usr/bin/env python3
+
+# vscp_rest.py
+#
+# Client for the VSCP daemon REST interface
+#
+# See samples/rest/webcalls.txt for the calls. One session is opened and
+# all requests go over one kept alive HTTP connection, a session the
+# daemon has dropped is opened again.
+#
+# read_events() asks for count events at a time. count doubles (up to
+# max_count) when the daemon had as many as asked for and halves when it
+# had fewer, so a deep queue is emptied in a few requests and an idle one
+# is polled with small ones.
+#
+# readevent responses are parsed as they arrive, one event object at a
+# time from the "event" array, instead of the whole body first. Events
+# are given in VSCP JSON format, the same dicts as vscp_tcpip.py.
+#
+# Usage: vscp_rest.py [--url URL] [--user USER] [--secret SECRET] read|send|var ...
+#
+# This file is part of the VSCP (https://www.vscp.org) project
+#
+# The MIT License (MIT)
+#
+# Copyright © 2000-2026 Ake Hedman, the VSCP project
+# <info@vscp.org>
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#
+
+import argparse
+import codecs
+import http.client
+import json
+import re
+import sys
+import time
+import urllib.parse
+
+import vscp_tcpip
+
+DEFAULT_URL = "http://localhost:8080/vscp/rest"
+
+# format=json
+FORMAT_JSON = 3
+
+# Error code of a session the daemon does not know (timed out)
+ERROR_INVALID_SESSION = -2
+
+# Bytes read from the connection at a time
+CHUNK_SIZE = 8192
+
+_EVENT_ARRAY = re.compile(r'"event"\s*:\s*\[')
+_SEPARATORS = " \t\r\n,"
+
+
+class RestError(Exception):
+    """The daemon answered with success false."""
+
+    def __init__(self, op, response):
+        Exception.__init__(self, "%s: %s %s" % (op, response.get("message", ""),
+                                                response.get("description", "")))
+        self.op = op
+        self.response = response
+
+    @property
+    def invalid_session(self):
+        """The session has timed out or is not known to the daemon."""
+        if ERROR_INVALID_SESSION == self.response.get("code"):
+            return True
+        text = ("%s %s" % (self.response.get("message", ""),
+                           self.response.get("description", ""))).lower()
+        return "invalid session" in text
+
+
+def _get(obj, *names, default=None):
+    for name in names:
+        if name in obj:
+            return obj[name]
+    return default
+
+
+def rest_event(obj):
+    """Event in VSCP JSON format from an event of a readevent response."""
+    if isinstance(obj, str):
+        return vscp_tcpip.parse_event(obj)
+    data = _get(obj, "vscpData", "data", default=[])
+    if isinstance(data, str):
+        data = [int(d, 0) for d in data.split(",") if d.strip()]
+    return {
+        "vscpHead": int(_get(obj, "vscpHead", "head", default=0)),
+        "vscpObId": int(_get(obj, "vscpObId", "obid", default=0)),
+        "vscpDateTime": _get(obj, "vscpDateTime", "datetime", "dateTime", default=""),
+        "vscpTimeStamp": int(_get(obj, "vscpTimeStamp", "timestamp", default=0)),
+        "vscpClass": int(_get(obj, "vscpClass", "vscpclass", "class")),
+        "vscpType": int(_get(obj, "vscpType", "vscptype", "type")),
+        "vscpGuid": _get(obj, "vscpGuid", "guid", default="-").upper(),
+        "vscpData": list(data),
+    }
+
+
+def iter_array(read, pattern=_EVENT_ARRAY):
+    """Items of the JSON array pattern leads to, parsed as read() gives text.
+
+    Gives the whole response instead if it has no such array (an error
+    response or no events).
+    """
+    decoder = json.JSONDecoder()
+    buf = ""
+    pos = None
+    while pos is None:
+        chunk = read()
+        if not chunk:
+            # No array, give the whole response
+            yield json.loads(buf) if buf.strip() else {}
+            return
+        buf += chunk
+        m = pattern.search(buf)
+        if m is not None:
+            pos = m.end()
+    while True:
+        while True:
+            while pos < len(buf) and buf[pos] in _SEPARATORS:
+                pos += 1
+            if pos < len(buf):
+                break
+            chunk = read()
+            if not chunk:
+                return
+            buf = buf[pos:] + chunk
+            pos = 0
+        if "]" == buf[pos]:
+            return
+        try:
+            item, end = decoder.raw_decode(buf, pos)
+        except ValueError:
+            # The item is not all here yet
+            chunk = read()
+            if not chunk:
+                raise
+            buf = buf[pos:] + chunk
+            pos = 0
+            continue
+        yield item
+        # Drop what has been parsed now and then
+        if end > CHUNK_SIZE:
+            buf = buf[end:]
+            pos = 0
+        else:
+            pos = end
+
+
+class RestClient:
+    """A session on the daemon REST interface over one kept alive connection."""
+
+    def __init__(self, url=DEFAULT_URL, user="admin", secret="secret", timeout=10.0,
+                 min_count=1, max_count=1000):
+        u = urllib.parse.urlsplit(url)
+        self.scheme = u.scheme
+        self.netloc = u.netloc
+        self.path = u.path or "/"
+        self.user = user
+        self.secret = secret
+        self.timeout = timeout
+        self.min_count = min_count
+        self.max_count = max_count
+        self.count = min_count
+        self.session = None
+        self.conn = None
+
+    # ------------------------------------------------------------------------
+    #                                H T T P
+    # ------------------------------------------------------------------------
+
+    def _connection(self, fresh=False):
+        if self.conn is not None and fresh:
+            self.conn.close()
+            self.conn = None
+        if self.conn is None:
+            if "https" == self.scheme:
+                self.conn = http.client.HTTPSConnection(self.netloc, timeout=self.timeout)
+            else:
+                self.conn = http.client.HTTPConnection(self.netloc, timeout=self.timeout)
+        return self.conn
+
+    def _request(self, params):
+        """Response of a GET with params, to be read by the caller."""
+        target = self.path + "?" + urllib.parse.urlencode(params)
+        # A kept alive connection may have been closed by the daemon,
+        # then try once more on a new one
+        for attempt in (0, 1):
+            conn = self._connection(fresh=attempt > 0)
+            try:
+                conn.request("GET", target)
+                resp = conn.getresponse()
+                break
+            except (http.client.RemoteDisconnected, ConnectionResetError,
+                    BrokenPipeError, http.client.CannotSendRequest):
+                conn.close()
+                if attempt:
+                    raise
+        if 200 != resp.status:
+            resp.read()
+            raise http.client.HTTPException("HTTP %d %s" % (resp.status, resp.reason))
+        return resp
+
+    def _call(self, op, **params):
+        """Response dict of a call in the session, opened when needed."""
+        for attempt in (0, 1):
+            if self.session is None:
+                self.open()
+            resp = self._request(dict(params, vscpsession=self.session, format=FORMAT_JSON,
+                                      op=op))
+            response = json.loads(resp.read().decode("utf-8", "replace") or "{}")
+            if response.get("success"):
+                return response
+            error = RestError(op, response)
+            if attempt or not error.invalid_session:
+                raise error
+            # The session has timed out in the daemon, open a new one
+            self.session = None
+
+    # ------------------------------------------------------------------------
+
+    def open(self):
+        resp = self._request({"vscpuser": self.user, "vscpsecret": self.secret,
+                              "format": FORMAT_JSON, "op": "open"})
+        response = json.loads(resp.read().decode("utf-8", "replace") or "{}")
+        if not response.get("success"):
+            raise RestError("open", response)
+        self.session = response["vscpsession"]
+        return response
+
+    def close(self):
+        if self.session is not None:
+            try:
+                self._request({"vscpsession": self.session, "format": FORMAT_JSON,
+                               "op": "close"}).read()
+            except (OSError, http.client.HTTPException):
+                pass
+            self.session = None
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
+
+    def status(self):
+        return self._call("status")
+
+    def read_events(self):
+        """Events waiting in the session queue, at most count of them."""
+        for attempt in (0, 1):
+            if self.session is None:
+                self.open()
+            asked = self.count
+            resp = self._request({"vscpsession": self.session, "format": FORMAT_JSON,
+                                  "op": "readevent", "count": asked})
+            events = []
+            error = None
+            for item in iter_array(_text_reader(resp)):
+                if isinstance(item, dict) and "success" in item:
+                    # The response had no event array
+                    if not item["success"]:
+                        error = item
+                    break
+                events.append(rest_event(item))
+            # Read the rest so the connection can be used again
+            resp.read()
+            if error is None:
+                break
+            error = RestError("readevent", error)
+            if attempt or not error.invalid_session:
+                raise error
+            # The session has timed out in the daemon, open a new one
+            self.session = None
+
+        if len(events) >= asked:
+            self.count = min(self.max_count, asked * 2)
+        elif len(events) < asked // 2:
+            self.count = max(self.min_count, asked // 2)
+        return events
+
+    def events(self, interval=1.0):
+        """Events as they come, waits interval seconds when there are none."""
+        while True:
+            events = self.read_events()
+            if not events:
+                time.sleep(interval)
+            for ev in events:
+                yield ev
+
+    def send(self, ev):
+        """Send an event in VSCP JSON format."""
+        self._call("sendevent", vscpevent=vscp_tcpip.format_event(ev))
+
+    def send_many(self, events):
+        """Send events over the kept alive connection, the number that failed.
+
+        The interface takes one event per request.
+        """
+        failed = 0
+        for ev in events:
+            try:
+                self.send(ev)
+            except RestError:
+                failed += 1
+        return failed
+
+    def set_filter(self, vscpfilter, vscpmask):
+        """Filter and mask as 'priority,class,type,GUID'."""
+        self._call("setfilter", vscpfilter=vscpfilter, vscpmask=vscpmask)
+
+    def clear_queue(self):
+        self._call("clearqueue")
+
+    def read_var(self, name):
+        """Value of a remote variable as the daemon gives it."""
+        return self.read_var_info(name).get("varvalue")
+
+    def read_var_info(self, name):
+        """readvar response (varname, varvalue, vartype, vartypecode...)."""
+        return self._call("readvar", variable=name)
+
+    def write_var(self, name, value):
+        self._call("writevar", variable=name, value=value)
+
+    def create_var(self, name, value, vartype="STRING", persistent=False, note=""):
+        self._call("createvar", variable=name, value=value, type=vartype,
+                   persistent="true" if persistent else "false", note=note)
+
+
+def _text_reader(resp):
+    # Text of a response in chunks as they arrive
+    decoder = codecs.getincrementaldecoder("utf-8")("replace")
+
+    def read():
+        while True:
+            data = resp.read1(CHUNK_SIZE)
+            if not data:
+                return decoder.decode(b"", final=True)
+            text = decoder.decode(data)
+            if text:
+                return text
+    return read
+
+
+# ----------------------------------------------------------------------------
+
+def main():
+    parser = argparse.ArgumentParser(description="VSCP daemon REST interface client")
+    parser.add_argument('command', choices=('read', 'send', 'var', 'setvar'))
+    parser.add_argument('args', nargs='*',
+                        help='send: event lines, var: name, setvar: name value')
+    parser.add_argument('--url', default=DEFAULT_URL)
+    parser.add_argument('--user', default='admin')
+    parser.add_argument('--secret', default='secret', help='vscpsecret as the daemon wants it')
+    parser.add_argument('--interval', type=float, default=1.0,
+                        help='Seconds between reads of an empty queue (read)')
+    arg = parser.parse_args(sys.argv[1:])
+
+    client = RestClient(arg.url, arg.user, arg.secret)
+    try:
+        if 'read' == arg.command:
+            for ev in client.events(arg.interval):
+                print(vscp_tcpip.format_event(ev))
+        elif 'send' == arg.command:
+            failed = client.send_many([vscp_tcpip.parse_event(line) for line in arg.args])
+            print("Sent %d events, %d failed" % (len(arg.args) - failed, failed))
+        elif 'var' == arg.command:
+            for name in arg.args:
+                print("%s = %s" % (name, client.read_var(name)))
+        else:
+            client.write_var(arg.args[0], arg.args[1])
+    except KeyboardInterrupt:
+        pass
+    finally:
+        client.close()
+
+
+if __name__ == "__main__":
+    main()
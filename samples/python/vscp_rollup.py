@@ -0,0 +1,338 @@
+#!/usr/bin/env python3
+
+# vscp_rollup.py
+#
+# Minute, hour and day aggregates of measurements for charts
+#
+# Every measurement value (see vscp_measurement.py) updates the minute,
+# hour and day bucket of its sensor (GUID, type, sensor index) with
+# min, max, sum and count. Buckets of a sensor and resolution are kept
+# in arrays (array module) indexed from the first bucket, so an update
+# is a few array stores and a sensor with a year of days costs a few
+# kilobytes. Buckets older than the retention of a resolution are
+# dropped (minutes 2 days, hours 90 days, days 10 years by default).
+# Values that come out of order are added as long as they are within the
+# retention, older ones are counted in dropped and left out.
+#
+# chart() answers from the coarsest resolution that still gives the
+# requested number of points for the time range, merging neighbouring
+# buckets down to that number, instead of reading raw rows.
+#
+# Buckets are in UTC, days start at midnight UTC.
+#
+# Usage: vscp_rollup.py record STATE [--host HOST ...]
+#        vscp_rollup.py build STATE --db FILE (vscp_sqlsink.py database)
+#        vscp_rollup.py chart STATE --guid GUID --type TYPE [--sensor N]
+#                       [--start T] [--end T] [--points N]
+#
+# This file is part of the VSCP (https://www.vscp.org) project
+#
+# The MIT License (MIT)
+#
+# Copyright © 2000-2026 Ake Hedman, the VSCP project
+# <info@vscp.org>
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#
+
+import argparse
+import array
+import asyncio
+import datetime
+import os
+import pickle
+import sqlite3
+import sys
+import time
+
+import vscp_measurement
+import vscp_tcpip
+
+MINUTE = 60
+HOUR = 3600
+DAY = 86400
+
+# Resolution (seconds) -> buckets kept
+DEFAULT_RETENTION = ((MINUTE, 2 * 24 * 60), (HOUR, 90 * 24), (DAY, 10 * 366))
+
+
+class Series:
+    """Buckets of one sensor at one resolution."""
+
+    __slots__ = ("resolution", "retention", "start", "trimmed", "count", "sum", "min", "max")
+
+    def __init__(self, resolution, retention):
+        self.resolution = resolution
+        self.retention = retention
+        self.start = None           # Bucket number of index 0
+        self.trimmed = False        # Older buckets have been dropped
+        self.count = array.array("L")
+        self.sum = array.array("d")
+        self.min = array.array("d")
+        self.max = array.array("d")
+
+    def __len__(self):
+        return len(self.count)
+
+    def _extend(self, n):
+        self.count.extend(array.array("L", [0]) * n)
+        zeros = array.array("d", [0.0]) * n
+        self.sum.extend(zeros)
+        self.min.extend(zeros)
+        self.max.extend(zeros)
+
+    def _prepend(self, n):
+        self.count[0:0] = array.array("L", [0]) * n
+        zeros = array.array("d", [0.0]) * n
+        self.sum[0:0] = zeros
+        self.min[0:0] = zeros
+        self.max[0:0] = zeros
+        self.start -= n
+
+    def _trim(self, n):
+        del self.count[:n]
+        del self.sum[:n]
+        del self.min[:n]
+        del self.max[:n]
+        self.start += n
+        self.trimmed = True
+
+    def add(self, t, value):
+        """Add a value, False if it is older than the retention."""
+        bucket = int(t // self.resolution)
+        if self.start is None:
+            self.start = bucket
+        i = bucket - self.start
+        if i < 0:
+            # Out of order, extend the series back while it is within
+            # the retention of the newest bucket
+            if self.start + len(self.count) - 1 - bucket >= self.retention:
+                return False
+            self._prepend(-i)
+            i = 0
+        if i - len(self.count) >= self.retention:
+            # Silent for longer than the retention, start over
+            self._trim(len(self.count))
+            self.start = bucket
+            i = 0
+        if i >= len(self.count):
+            self._extend(i + 1 - len(self.count))
+            # Trim now and then, not on every new bucket
+            if len(self.count) > self.retention + self.retention // 4 + 1:
+                drop = len(self.count) - self.retention
+                self._trim(drop)
+                i -= drop
+
+        c = self.count[i]
+        if c:
+            if value < self.min[i]:
+                self.min[i] = value
+            if value > self.max[i]:
+                self.max[i] = value
+            self.sum[i] += value
+        else:
+            self.min[i] = self.max[i] = self.sum[i] = value
+        self.count[i] = c + 1
+        return True
+
+    def complete_from(self):
+        """Time from which all values are in the buckets."""
+        return self.start * self.resolution if self.trimmed else float("-inf")
+
+    def buckets(self, start, end):
+        """Index range [lo, hi) of the buckets in [start, end)."""
+        if self.start is None:
+            return 0, 0
+        lo = max(0, int(start // self.resolution) - self.start)
+        hi = min(len(self.count), -int(-end // self.resolution) - self.start)
+        return lo, max(lo, hi)
+
+    def points(self, start, end, group=1):
+        """(time, min, max, mean, count) of groups of buckets with values."""
+        lo, hi = self.buckets(start, end)
+        result = []
+        for g in range(lo, hi, group):
+            n = 0
+            total = 0.0
+            mn = mx = None
+            for i in range(g, min(g + group, hi)):
+                c = self.count[i]
+                if not c:
+                    continue
+                n += c
+                total += self.sum[i]
+                if mn is None or self.min[i] < mn:
+                    mn = self.min[i]
+                if mx is None or self.max[i] > mx:
+                    mx = self.max[i]
+            if n:
+                result.append(((self.start + g) * self.resolution, mn, mx, total / n, n))
+        return result
+
+
+class Rollup:
+    """Series per sensor (GUID, type, sensor index) and resolution."""
+
+    def __init__(self, retention=DEFAULT_RETENTION):
+        self.retention = tuple(sorted(retention))
+        self.sensors = {}
+        self.position = 0           # Where build() left off in the database
+        self.dropped = dict((res, 0) for res, keep in self.retention)
+
+    def add(self, key, t, value):
+        series = self.sensors.get(key)
+        if series is None:
+            series = self.sensors[key] = [Series(res, keep) for res, keep in self.retention]
+        for s in series:
+            if not s.add(t, value):
+                # Too old for this resolution
+                self.dropped[s.resolution] += 1
+
+    def put(self, ev, now=None):
+        """Add a measurement event in VSCP JSON format, False for other events."""
+        m = vscp_measurement.decode(ev)
+        if m is None:
+            return False
+        self.add((ev.get("vscpGuid", "-").upper(), ev["vscpType"], m.sensorindex),
+                 vscp_measurement.event_time(ev, now), m.value)
+        return True
+
+    def chart(self, key, start, end, points=200):
+        """At most points (time, min, max, mean, count) for key in [start, end).
+
+        Uses the coarsest resolution with at least points buckets in the
+        range, of those that still have the data from the start of it.
+        """
+        series = self.sensors.get(key)
+        if not series or end <= start:
+            return []
+        covering = [s for s in series if s.complete_from() <= start]
+        if not covering:
+            # None goes back that far, the coarsest is kept the longest
+            covering = [min(series, key=lambda s: s.complete_from())]
+        chosen = covering[0]
+        for s in covering:
+            if (end - start) / s.resolution >= points:
+                chosen = s
+        lo, hi = chosen.buckets(start, end)
+        group = max(1, -(-(hi - lo) // points))
+        return chosen.points(start, end, group)
+
+    # ------------------------------------------------------------------------
+
+    def save(self, path):
+        tmp = path + ".tmp"
+        with open(tmp, "wb") as f:
+            pickle.dump((self.retention, self.position, self.sensors), f,
+                        pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "rb") as f:
+            retention, position, sensors = pickle.load(f)
+        rollup = cls(retention)
+        rollup.position = position
+        rollup.sensors = sensors
+        return rollup
+
+    def build(self, db):
+        """Add the rows of a vscp_sqlsink.py measurement table not seen yet."""
+        conn = sqlite3.connect(db)
+        rows = conn.execute("SELECT rowid, time, guid, vscptype, sensorindex, value "
+                            "FROM vscp_measurement WHERE rowid > ? ORDER BY rowid",
+                            (self.position,))
+        n = 0
+        for rowid, t, guid, vscptype, sensor, value in rows:
+            self.add((guid.upper(), vscptype, sensor), t, value)
+            self.position = rowid
+            n += 1
+        conn.close()
+        return n
+
+
+# ----------------------------------------------------------------------------
+
+def _time_arg(text):
+    # Seconds since the epoch or ISO 8601 local time
+    try:
+        return float(text)
+    except ValueError:
+        return datetime.datetime.fromisoformat(text).timestamp()
+
+
+async def record(rollup, arg):
+    client = vscp_tcpip.Client(arg.host, arg.port, arg.user, arg.password)
+    await client.connect()
+    last = time.monotonic()
+    async for ev in client.rcvloop():
+        rollup.put(ev)
+        if time.monotonic() - last >= arg.checkpoint:
+            rollup.save(arg.state)
+            last = time.monotonic()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measurement rollups for charts")
+    parser.add_argument('command', choices=('record', 'build', 'chart'))
+    parser.add_argument('state', help='Rollup state file')
+    parser.add_argument('--host', default='localhost', help='VSCP daemon host (record)')
+    parser.add_argument('--port', type=int, default=vscp_tcpip.DEFAULT_PORT)
+    parser.add_argument('--user', default='admin')
+    parser.add_argument('--password', default='secret')
+    parser.add_argument('--checkpoint', type=int, default=60,
+                        help='Seconds between saves of the state (record)')
+    parser.add_argument('--db', default='vscp.sqlite', help='vscp_sqlsink.py database (build)')
+    parser.add_argument('--guid', help='Sensor GUID (chart)')
+    parser.add_argument('--type', type=int, default=6, help='Measurement type (chart)')
+    parser.add_argument('--sensor', type=int, default=0, help='Sensor index (chart)')
+    parser.add_argument('--start', type=_time_arg, help='Chart from (default: a day ago)')
+    parser.add_argument('--end', type=_time_arg, help='Chart to (default: now)')
+    parser.add_argument('--points', type=int, default=200, help='Max points in the chart')
+    arg = parser.parse_args(sys.argv[1:])
+
+    rollup = Rollup.load(arg.state) if os.path.exists(arg.state) else Rollup()
+
+    if 'record' == arg.command:
+        try:
+            asyncio.run(record(rollup, arg))
+        except KeyboardInterrupt:
+            pass
+        rollup.save(arg.state)
+    elif 'build' == arg.command:
+        n = rollup.build(arg.db)
+        rollup.save(arg.state)
+        print("%d rows added, %d sensors" % (n, len(rollup.sensors)))
+        for res, dropped in sorted(rollup.dropped.items()):
+            if dropped:
+                print("%d values older than the %d s buckets kept" % (dropped, res))
+    else:
+        if not arg.guid:
+            parser.error("--guid is needed for chart")
+        end = arg.end if arg.end is not None else time.time()
+        start = arg.start if arg.start is not None else end - DAY
+        print("time,min,max,mean,count")
+        for t, mn, mx, mean, n in rollup.chart((arg.guid.upper(), arg.type, arg.sensor),
+                                               start, end, arg.points):
+            print("%s,%g,%g,%g,%d" % (time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(t)),
+                                      mn, mx, mean, n))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,397 @@
+#!/usr/bin/env python3
+
+# vscp_sqlsink.py
+#
+# Write VSCP measurement events to an SQL database in batches
+#
+# Measurement events (see vscp_measurement.py) are turned into rows and
+# buffered. The buffer is written when it has flush_size rows or is
+# flush_interval seconds old, with parameterized multi-row INSERTs
+#
+#   INSERT INTO t (a, b) VALUES (?, ?), (?, ?), ...
+#
+# in one transaction on a connection taken from a small pool, so a
+# batch costs a few statements instead of a connection and a statement
+# per value. If the database is away rows are kept (at most max_pending,
+# the oldest are dropped) and written on a later flush.
+#
+# SQLite (standard library) is built in. Any other DB-API 2 module
+# (MySQLdb, pymysql, psycopg2...) is used through DbApiAdapter, e.g.
+#
+#   db = DbApiAdapter.fromModule(MySQLdb, host="localhost", user="vscp",
+#                                passwd="secret", db="digitemp")
+#   sink = SqlSink(db, DIGITEMP)
+#
+# Tables
+#   vscp_measurement    time, guid, class, type, sensor index, unit, value
+#   digitemp            the dtgraph/digitemp table (time, SerialNumber,
+#                       Fahrenheit) for temperature events, the serial
+#                       number is the last eight GUID bytes as for the
+#                       1-wire samples
+#
+# Usage: vscp_sqlsink.py [-h] [--db FILE] [--table T] [--host HOST] ...
+#
+# This file is part of the VSCP (https://www.vscp.org) project
+#
+# The MIT License (MIT)
+#
+# Copyright © 2000-2026 Ake Hedman, the VSCP project
+# <info@vscp.org>
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#
+
+import argparse
+import asyncio
+import collections
+import queue
+import sqlite3
+import sys
+import threading
+import time
+
+import vscp_measurement
+import vscp_tcpip
+import vscp_type
+from vscp_subscriber import Counters
+
+COUNTERS = ("events", "ignored", "rows", "flushes", "errors", "dropped")
+
+_PLACEHOLDERS = {"qmark": "?", "format": "%s", "pyformat": "%s"}
+
+
+# ----------------------------------------------------------------------------
+#                              D A T A B A S E
+# ----------------------------------------------------------------------------
+
+class ConnectionPool:
+    """At most size open connections, kept open between uses."""
+
+    def __init__(self, connect, size=1):
+        self.connect = connect
+        self.size = size
+        self.idle = queue.LifoQueue()
+        self.opened = 0
+        self.lock = threading.Lock()
+
+    def get(self):
+        try:
+            return self.idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self.lock:
+            if self.opened < self.size:
+                self.opened += 1
+                try:
+                    return self.connect()
+                except Exception:
+                    self.opened -= 1
+                    raise
+        return self.idle.get()
+
+    def put(self, conn, broken=False):
+        if broken:
+            # Open a new one next time
+            try:
+                conn.close()
+            except Exception:
+                pass
+            with self.lock:
+                self.opened -= 1
+        else:
+            self.idle.put(conn)
+
+    def close(self):
+        while True:
+            try:
+                conn = self.idle.get_nowait()
+            except queue.Empty:
+                break
+            conn.close()
+            with self.lock:
+                self.opened -= 1
+
+
+class DbApiAdapter:
+    """A database reached through a DB-API 2 module.
+
+    connect() opens a new connection, error is the module's Error class.
+    max_params limits the parameters of one statement.
+    """
+
+    def __init__(self, connect, paramstyle="format", error=Exception, pool_size=1,
+                 max_params=65535):
+        if paramstyle not in _PLACEHOLDERS:
+            raise ValueError("Unsupported paramstyle '%s'" % paramstyle)
+        self.pool = ConnectionPool(connect, pool_size)
+        self.placeholder = _PLACEHOLDERS[paramstyle]
+        self.error = error
+        self.max_params = max_params
+        self.statements = {}
+
+    @classmethod
+    def fromModule(cls, module, pool_size=1, **kwargs):
+        """Adapter for a DB-API 2 module, kwargs go to module.connect()."""
+        return cls(lambda: module.connect(**kwargs), module.paramstyle, module.Error,
+                   pool_size)
+
+    def _statement(self, table, nrows):
+        key = (table.name, nrows)
+        sql = self.statements.get(key)
+        if sql is None:
+            row = "(" + ", ".join([self.placeholder] * len(table.columns)) + ")"
+            sql = self.statements[key] = "INSERT INTO %s (%s) VALUES %s" % (
+                table.name, ", ".join(table.columns), ", ".join([row] * nrows))
+        return sql
+
+    def execute(self, statements):
+        """Run statements (sql, params) in one transaction."""
+        conn = self.pool.get()
+        broken = True
+        try:
+            cur = conn.cursor()
+            for sql, params in statements:
+                cur.execute(sql, params)
+            conn.commit()
+            broken = False
+        finally:
+            # A failed transaction goes with its connection
+            self.pool.put(conn, broken)
+
+    def query(self, sql, params=()):
+        """Rows of a SELECT."""
+        conn = self.pool.get()
+        broken = True
+        try:
+            cur = conn.cursor()
+            cur.execute(sql, params)
+            rows = cur.fetchall()
+            conn.commit()
+            broken = False
+            return rows
+        finally:
+            self.pool.put(conn, broken)
+
+    def insert(self, table, rows):
+        """Insert rows with as few multi-row statements as the limits allow."""
+        per_statement = max(1, self.max_params // len(table.columns))
+        statements = []
+        for i in range(0, len(rows), per_statement):
+            chunk = rows[i:i + per_statement]
+            statements.append((self._statement(table, len(chunk)),
+                               [v for row in chunk for v in row]))
+        self.execute(statements)
+
+    def create(self, table):
+        """Create the table if needed. The statements are for SQLite, for
+        other databases create it with their own DDL (for digitemp the
+        dtgraph SQL files)."""
+        self.execute([(sql, ()) for sql in table.create])
+
+    def close(self):
+        self.pool.close()
+
+
+class SqliteAdapter(DbApiAdapter):
+    """SQLite database in path (':memory:' is one database per connection).
+
+    timeout is how long a statement waits for a locked database.
+    """
+
+    def __init__(self, path, pool_size=1, timeout=5.0):
+        def connect():
+            conn = sqlite3.connect(path, timeout=timeout, check_same_thread=False)
+            if ":memory:" != path:
+                conn.execute("PRAGMA journal_mode=WAL")
+            return conn
+        # Older SQLite versions allow 999 parameters per statement
+        DbApiAdapter.__init__(self, connect, sqlite3.paramstyle, sqlite3.Error, pool_size, 999)
+
+
+# ----------------------------------------------------------------------------
+#                                 T A B L E S
+# ----------------------------------------------------------------------------
+
+Table = collections.namedtuple("Table", "name columns row create")
+
+
+def _measurement_row(ev, m, t):
+    return (t, ev.get("vscpGuid", "-"), ev["vscpClass"], ev["vscpType"],
+            m.sensorindex, m.unit, m.value)
+
+
+def _digitemp_row(ev, m, t):
+    if vscp_type.VSCP_TYPE_MEASUREMENT_TEMPERATURE != ev["vscpType"]:
+        return None
+    return (time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(t)),
+            ev.get("vscpGuid", "").replace(":", "")[-16:],
+            round(vscp_measurement.fahrenheit(m.value, m.unit), 2))
+
+
+MEASUREMENTS = Table("vscp_measurement",
+                     ("time", "guid", "vscpclass", "vscptype", "sensorindex", "unit", "value"),
+                     _measurement_row,
+                     ("CREATE TABLE IF NOT EXISTS vscp_measurement ("
+                      "time REAL NOT NULL, guid VARCHAR(47) NOT NULL, vscpclass INTEGER, "
+                      "vscptype INTEGER, sensorindex INTEGER, unit INTEGER, value REAL)",
+                      "CREATE INDEX IF NOT EXISTS vscp_measurement_guid_time "
+                      "ON vscp_measurement (guid, time)"))
+
+# Same columns as components/digitemp/dtgraph-0.2/SQL/mysql_create_digitemp.sql
+DIGITEMP = Table("digitemp",
+                 ("time", "SerialNumber", "Fahrenheit"),
+                 _digitemp_row,
+                 ("CREATE TABLE IF NOT EXISTS digitemp ("
+                  "dtKey INTEGER PRIMARY KEY AUTOINCREMENT, time TIMESTAMP NOT NULL, "
+                  "SerialNumber VARCHAR(17) NOT NULL DEFAULT '', "
+                  "Fahrenheit DECIMAL(4,2) NOT NULL DEFAULT '0.00')",
+                  "CREATE INDEX IF NOT EXISTS serial_key ON digitemp (SerialNumber)",
+                  "CREATE INDEX IF NOT EXISTS time_key ON digitemp (time)"))
+
+TABLES = {"vscp_measurement": MEASUREMENTS, "digitemp": DIGITEMP}
+
+
+# ----------------------------------------------------------------------------
+#                                  S I N K
+# ----------------------------------------------------------------------------
+
+class SqlSink:
+    """Buffer measurement events as rows of table and write them in batches.
+
+    Call tick() now and then so rows are written when events stop coming.
+    """
+
+    def __init__(self, db, table=MEASUREMENTS, flush_size=500, flush_interval=5.0,
+                 max_pending=50000):
+        self.db = db
+        self.table = table
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.rows = collections.deque(maxlen=max_pending)
+        self.oldest = None
+        self.retry_at = 0
+        self.counters = Counters(COUNTERS)
+
+    def put(self, ev, now=None):
+        """Buffer an event in VSCP JSON format. Returns False if it is not for the table."""
+        self.counters.inc("events")
+        m = vscp_measurement.decode(ev)
+        row = self.table.row(ev, m, vscp_measurement.event_time(ev)) if m is not None else None
+        if row is None:
+            self.counters.inc("ignored")
+            return False
+        if now is None:
+            now = time.monotonic()
+        if not self.rows:
+            self.oldest = now
+        elif len(self.rows) == self.max_pending:
+            # Database away for long, the append drops the oldest
+            self.counters.inc("dropped")
+        self.rows.append(row)
+        if ((len(self.rows) >= self.flush_size or now - self.oldest >= self.flush_interval)
+                and now >= self.retry_at):
+            self.flush(now)
+        return True
+
+    def tick(self, now=None):
+        if now is None:
+            now = time.monotonic()
+        if self.rows and now - self.oldest >= self.flush_interval and now >= self.retry_at:
+            self.flush(now)
+
+    def flush(self, now=None):
+        """Write the buffered rows, they are kept if the database fails."""
+        if not self.rows:
+            return 0
+        rows = list(self.rows)
+        try:
+            self.db.insert(self.table, rows)
+        except self.db.error as e:
+            self.counters.inc("errors")
+            # Not again before another interval
+            self.retry_at = (time.monotonic() if now is None else now) + self.flush_interval
+            print("SQL sink: %s, %d rows pending" % (e, len(rows)))
+            return 0
+        self.rows.clear()
+        self.counters.inc("rows", len(rows))
+        self.counters.inc("flushes")
+        return len(rows)
+
+    def close(self):
+        self.flush()
+        self.db.close()
+
+
+# ----------------------------------------------------------------------------
+
+async def run(sink, arg):
+    client = vscp_tcpip.Client(arg.host, arg.port, arg.user, arg.password)
+    await client.connect()
+
+    async def ticker():
+        # Writes rows when events stop coming
+        last = time.monotonic()
+        while True:
+            await asyncio.sleep(1)
+            sink.tick()
+            if arg.stats and time.monotonic() - last >= arg.stats:
+                s = sink.counters.snapshot()
+                print("events %d (%.1f/s) rows %d flushes %d errors %d dropped %d" %
+                      (s["events"], s["events_rate"], s["rows"], s["flushes"],
+                       s["errors"], s["dropped"]))
+                last = time.monotonic()
+
+    task = asyncio.ensure_future(ticker())
+    try:
+        async for ev in client.rcvloop():
+            sink.put(ev)
+    finally:
+        task.cancel()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Write VSCP measurements to an SQL database")
+    parser.add_argument('--db', default='vscp.sqlite', help='SQLite database file')
+    parser.add_argument('--table', choices=sorted(TABLES), default='vscp_measurement')
+    parser.add_argument('--flush-size', type=int, default=500, help='Rows per batch')
+    parser.add_argument('--flush-interval', type=float, default=5.0,
+                        help='Max seconds a row waits to be written')
+    parser.add_argument('--host', default='localhost', help='VSCP daemon host')
+    parser.add_argument('--port', type=int, default=vscp_tcpip.DEFAULT_PORT, help='VSCP daemon port')
+    parser.add_argument('--user', default='admin')
+    parser.add_argument('--password', default='secret')
+    parser.add_argument('--stats', type=int, default=0,
+                        help='Print counters every STATS seconds (0 = never)')
+    arg = parser.parse_args(sys.argv[1:])
+
+    db = SqliteAdapter(arg.db)
+    table = TABLES[arg.table]
+    db.create(table)
+    sink = SqlSink(db, table, arg.flush_size, arg.flush_interval)
+    try:
+        asyncio.run(run(sink, arg))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        sink.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,285 @@
+#!/usr/bin/env python3
+
+# vscp_subscriber.py
+#
+# MQTT subscriber runtime for VSCP events
+#
+# Incoming messages are routed on their topic through a topic trie that
+# knows the MQTT wildcards (+ and #), decoded on a pool of worker threads
+# and handed to the handlers as VSCP JSON events (see vscp_payload.py).
+#
+# Messages for the same topic always go to the same worker so events from
+# one sensor are handled in order. Each worker has a bounded queue, when
+# the handlers fall behind the MQTT network thread is either blocked
+# (policy 'block', the broker then holds back on the TCP connection) or
+# the message is dropped and counted (policy 'drop').
+#
+# This file is part of the VSCP (https://www.vscp.org) project
+#
+# The MIT License (MIT)
+#
+# Copyright © 2000-2026 Ake Hedman, the VSCP project
+# <info@vscp.org>
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#
+
+import queue
+import threading
+import time
+import zlib
+
+import vscp_payload
+
+# What to do when a worker queue is full
+#   block - Wait for room, this stops reading from the broker
+#   drop  - Drop the message and count it
+POLICY_BLOCK = "block"
+POLICY_DROP = "drop"
+
+POLICIES = (POLICY_BLOCK, POLICY_DROP)
+
+
+# ----------------------------------------------------------------------------
+#                             T O P I C   T R I E
+# ----------------------------------------------------------------------------
+
+class _Node:
+    __slots__ = ("children", "handlers")
+
+    def __init__(self):
+        self.children = {}
+        self.handlers = []
+
+
+class TopicTrie:
+    """Handlers stored by MQTT topic filter.
+
+    match() gives all handlers whose filter matches a topic, each once. The
+    result is cached per topic, sensors publish on the same topics over and
+    over.
+    """
+
+    def __init__(self, cache_size=10000):
+        self.root = _Node()
+        self.cache = {}
+        self.cache_size = cache_size
+        self.lock = threading.Lock()
+
+    def add(self, topic_filter, handler):
+        with self.lock:
+            node = self.root
+            for level in topic_filter.split("/"):
+                node = node.children.setdefault(level, _Node())
+            node.handlers.append(handler)
+            self.cache = {}
+
+    def remove(self, topic_filter, handler):
+        with self.lock:
+            node = self.root
+            for level in topic_filter.split("/"):
+                node = node.children.get(level)
+                if node is None:
+                    return
+            if handler in node.handlers:
+                node.handlers.remove(handler)
+            self.cache = {}
+
+    def match(self, topic):
+        try:
+            return self.cache[topic]
+        except KeyError:
+            pass
+
+        handlers = []
+        self._match(self.root, topic.split("/"), 0, handlers)
+        if len(handlers) > 1:
+            # A handler routed with overlapping filters is called once
+            handlers = list(dict.fromkeys(handlers))
+
+        cache = self.cache
+        if len(cache) >= self.cache_size:
+            cache.clear()
+        cache[topic] = handlers
+        return handlers
+
+    def _match(self, node, levels, pos, handlers):
+        # Topics starting with '$' are not matched by wildcards at the top
+        if 0 == pos and levels[0].startswith("$"):
+            child = node.children.get(levels[0])
+            if child is not None:
+                self._match(child, levels, 1, handlers)
+            return
+
+        # '#' also matches the parent level ("a/#" matches "a")
+        multi = node.children.get("#")
+        if multi is not None:
+            handlers.extend(multi.handlers)
+
+        if pos == len(levels):
+            handlers.extend(node.handlers)
+            return
+
+        child = node.children.get(levels[pos])
+        if child is not None:
+            self._match(child, levels, pos + 1, handlers)
+        child = node.children.get("+")
+        if child is not None:
+            self._match(child, levels, pos + 1, handlers)
+
+
+# ----------------------------------------------------------------------------
+#                           R A T E   C O U N T E R S
+# ----------------------------------------------------------------------------
+
+class Counters:
+    """Message counters with rates since the previous snapshot."""
+
+    NAMES = ("received", "handled", "dropped", "unrouted",
+             "decode_errors", "handler_errors")
+
+    def __init__(self, names=None):
+        self.names = tuple(names) if names is not None else self.NAMES
+        self.lock = threading.Lock()
+        for name in self.names:
+            setattr(self, name, 0)
+        self.last = dict.fromkeys(self.names, 0)
+        self.last_time = time.monotonic()
+
+    def inc(self, name, count=1):
+        with self.lock:
+            setattr(self, name, getattr(self, name) + count)
+
+    def snapshot(self):
+        """Totals and per second rates since the last snapshot."""
+        with self.lock:
+            now = time.monotonic()
+            elapsed = max(now - self.last_time, 1e-9)
+            result = {}
+            for name in self.names:
+                value = getattr(self, name)
+                result[name] = value
+                result[name + "_rate"] = (value - self.last[name]) / elapsed
+                self.last[name] = value
+            self.last_time = now
+        return result
+
+
+# ----------------------------------------------------------------------------
+#                              S U B S C R I B E R
+# ----------------------------------------------------------------------------
+
+class Subscriber:
+    """Route VSCP events from an MQTT client to handlers.
+
+    Handlers are called as handler(topic, event) on a worker thread with
+    the event in VSCP JSON format. A payload holding an array of events
+    calls the handlers once per event.
+    """
+
+    def __init__(self, client, workers=4, queue_size=1000, policy=POLICY_BLOCK):
+        if policy not in POLICIES:
+            raise ValueError("Unknown queue policy '%s'" % policy)
+        self.client = client
+        self.policy = policy
+        self.trie = TopicTrie()
+        self.subscriptions = {}
+        self.counters = Counters()
+        self.queues = [queue.Queue(maxsize=queue_size) for _ in range(workers)]
+        self.threads = []
+        self.running = False
+
+        client.on_message = self.on_message
+        client.on_connect = self.on_connect
+
+    def route(self, topic_filter, handler, qos=0):
+        """Call handler for events on topics matching topic_filter."""
+        self.trie.add(topic_filter, handler)
+        if topic_filter not in self.subscriptions:
+            self.subscriptions[topic_filter] = qos
+            if self.client.is_connected():
+                self.client.subscribe(topic_filter, qos)
+
+    def on_connect(self, client, userdata, *args):
+        # Subscribe again after each (re)connect
+        for topic_filter, qos in self.subscriptions.items():
+            client.subscribe(topic_filter, qos)
+
+    def on_message(self, client, userdata, msg):
+        self.counters.inc("received")
+        q = self.queues[zlib.crc32(msg.topic.encode()) % len(self.queues)]
+        item = (msg.topic, msg.payload)
+        if POLICY_BLOCK == self.policy:
+            q.put(item)
+        else:
+            try:
+                q.put_nowait(item)
+            except queue.Full:
+                self.counters.inc("dropped")
+
+    def _worker(self, q):
+        counters = self.counters
+        while True:
+            item = q.get()
+            if item is None:
+                return
+            topic, payload = item
+
+            handlers = self.trie.match(topic)
+            if not handlers:
+                counters.inc("unrouted")
+                continue
+
+            try:
+                events = vscp_payload.decode_payload(payload)
+            except ValueError:
+                counters.inc("decode_errors")
+                continue
+
+            for event in events:
+                for handler in handlers:
+                    try:
+                        handler(topic, event)
+                    except Exception:
+                        counters.inc("handler_errors")
+            counters.inc("handled", len(events))
+
+    def start(self):
+        """Start the workers and the MQTT network thread."""
+        self.running = True
+        for q in self.queues:
+            t = threading.Thread(target=self._worker, args=(q,), daemon=True)
+            t.start()
+            self.threads.append(t)
+        self.client.loop_start()
+
+    def stop(self):
+        """Stop reading from the broker and let the workers drain their queues."""
+        self.running = False
+        self.client.loop_stop()
+        for q in self.queues:
+            q.put(None)
+        for t in self.threads:
+            t.join()
+        self.threads = []
+
+    def stats(self):
+        s = self.counters.snapshot()
+        s["queued"] = sum(q.qsize() for q in self.queues)
+        return s
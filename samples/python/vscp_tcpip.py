@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+
+# vscp_tcpip.py
+#
+# asyncio client for the VSCP daemon TCP/IP interface
+#
+# Events are handled in VSCP JSON format (same dict as vscp_payload.py
+# gives) and written/read as the text form the daemon uses
+#
+#   head,class,type,obid,datetime,timestamp,GUID,data1,data2,...
+#
+# send_many() pipelines commands, all send lines are written before the
+# replies are read so a batch costs one round trip instead of one per
+# event. rcvloop() reads the event stream of a connection put in
+# receive loop mode.
+#
+# This file is part of the VSCP (https://www.vscp.org) project
+#
+# The MIT License (MIT)
+#
+# Copyright © 2000-2026 Ake Hedman, the VSCP project
+# <info@vscp.org>
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#
+
+import asyncio
+
+DEFAULT_PORT = 9598
+
+
+class VscpTcpError(Exception):
+    """The daemon answered -OK or something unexpected."""
+
+
+# ----------------------------------------------------------------------------
+#                           E V E N T   T E X T
+# ----------------------------------------------------------------------------
+
+def _int(text):
+    # Decimal or 0x hex, leading zeros allowed
+    text = text.strip()
+    if text[:2] in ("0x", "0X"):
+        return int(text, 16)
+    return int(text or "0")
+
+
+def parse_event(line):
+    """Event in VSCP JSON format from a daemon event line.
+
+    Also takes the older form without date/time
+    (head,class,type,obid,timestamp,GUID,data...).
+    """
+    f = line.strip().split(",")
+    if len(f) < 6:
+        raise ValueError("Invalid event line '%s'" % line)
+
+    if ":" in f[5]:
+        # head,class,type,obid,timestamp,GUID,data
+        datetime = ""
+        timestamp = f[4]
+        guid = f[5]
+        data = f[6:]
+    else:
+        if len(f) < 7:
+            raise ValueError("Invalid event line '%s'" % line)
+        datetime = f[4]
+        timestamp = f[5]
+        guid = f[6]
+        data = f[7:]
+
+    return {
+        "vscpHead": _int(f[0]),
+        "vscpObId": _int(f[3]),
+        "vscpDateTime": datetime,
+        "vscpTimeStamp": _int(timestamp),
+        "vscpClass": _int(f[1]),
+        "vscpType": _int(f[2]),
+        "vscpGuid": guid.upper(),
+        "vscpData": [_int(d) for d in data if d.strip()],
+    }
+
+
+def format_event(ev):
+    """Daemon event line for an event in VSCP JSON format.
+
+    An empty date/time lets the daemon set it, GUID '-' means the
+    interface GUID.
+    """
+    text = "%d,%d,%d,%d,%s,%d,%s" % (ev.get("vscpHead", 0),
+                                     ev["vscpClass"],
+                                     ev["vscpType"],
+                                     ev.get("vscpObId", 0),
+                                     ev.get("vscpDateTime", ""),
+                                     ev.get("vscpTimeStamp", 0),
+                                     ev.get("vscpGuid") or "-")
+    data = ev.get("vscpData")
+    if data:
+        text += "," + ",".join(map(str, data))
+    return text
+
+
+# ----------------------------------------------------------------------------
+#                               C L I E N T
+# ----------------------------------------------------------------------------
+
+class Client:
+    """One connection to the VSCP daemon TCP/IP interface."""
+
+    def __init__(self, host="localhost", port=DEFAULT_PORT, user="admin", password="secret",
+                 timeout=5.0):
+        self.host = host
+        self.port = port
+        self.user = user
+        self.password = password
+        self.timeout = timeout
+        self.reader = None
+        self.writer = None
+
+    async def connect(self):
+        self.reader, self.writer = await asyncio.wait_for(
+            asyncio.open_connection(self.host, self.port), self.timeout)
+        await self._reply()     # Welcome message
+        await self.command("user " + self.user)
+        await self.command("pass " + self.password)
+
+    async def close(self):
+        if self.writer is None:
+            return
+        try:
+            self.writer.write(b"quit\r\n")
+            await self.writer.drain()
+        except OSError:
+            pass
+        self.writer.close()
+        self.writer = None
+        self.reader = None
+
+    async def _readline(self):
+        line = await asyncio.wait_for(self.reader.readline(), self.timeout)
+        if not line:
+            raise VscpTcpError("Connection closed by daemon")
+        return line.decode(errors="replace").rstrip("\r\n")
+
+    async def _reply(self):
+        """Lines up to +OK. Raises VscpTcpError on -OK."""
+        lines = []
+        while True:
+            line = await self._readline()
+            if line.startswith("+OK"):
+                return lines
+            if line.startswith("-OK"):
+                raise VscpTcpError(line)
+            lines.append(line)
+
+    async def command(self, cmd):
+        """Run a command and return the lines of the reply."""
+        self.writer.write(cmd.encode() + b"\r\n")
+        await self.writer.drain()
+        return await self._reply()
+
+    async def send(self, ev):
+        await self.command("send " + format_event(ev))
+
+    async def send_many(self, events):
+        """Send events pipelined. Returns the number the daemon refused."""
+        if not events:
+            return 0
+        self.writer.write(b"".join(b"send " + format_event(ev).encode() + b"\r\n"
+                                   for ev in events))
+        await self.writer.drain()
+        failed = 0
+        for _ in events:
+            try:
+                await self._reply()
+            except VscpTcpError:
+                failed += 1
+        return failed
+
+    async def chid(self):
+        """Channel id of this connection, the daemon uses it as obid."""
+        lines = await self.command("chid")
+        return int(lines[0].strip()) if lines else 0
+
+    async def rcvloop(self):
+        """Put the connection in receive loop mode and yield its events.
+
+        No other commands can be used on the connection after this.
+        """
+        await self.command("rcvloop")
+        while True:
+            line = await self.reader.readline()
+            if not line:
+                raise VscpTcpError("Connection closed by daemon")
+            line = line.decode(errors="replace").strip()
+            # The daemon sends +OK now and then as a keep alive
+            if not line or line.startswith("+OK"):
+                continue
+            if line.startswith("-OK"):
+                raise VscpTcpError(line)
+            try:
+                yield parse_event(line)
+            except ValueError:
+                continue
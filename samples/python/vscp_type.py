@@ -660,6 +660,7 @@ VSCP_TYPE_WEATHER_WARNING_LEVEL3             =       48
 VSCP_TYPE_WEATHER_WARNING_LEVEL4             =       49
 VSCP_TYPE_WEATHER_WARNING_LEVEL5             =       50
 VSCP_TYPE_WEATHER_ARMAGEDON                  =       51
+VSCP_TYPE_WEATHER_UV_INDEX                   =       52
 
 # class 95 (0x5F) -- WATHER FORECAST
 VSCP_TYPE_WEATHER_FORECAST_GENERAL           =       0
@@ -899,7 +900,7 @@ VSCP2_TYPE_PROTOCOL_READ_WRITE_RESPONSE      =       3
 VSCP2_TYPE_PROTOCOL_HIGH_END_SERVER_CAPS     =       20
 
 # Level II Control functionality Class=1025 (0x401)
-VSCP2_TYPE_CONTROL_GENERAL                          0
+VSCP2_TYPE_CONTROL_GENERAL                   =       0
 
 # Level II Information functionality Class=1026 (0x402)
 VSCP2_TYPE_INFORMATION_GENERAL               =       0
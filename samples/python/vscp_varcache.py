@@ -0,0 +1,311 @@
+#!/usr/bin/env python3
+
+# vscp_varcache.py
+#
+# Cache for VSCP daemon remote variables read over the REST interface
+#
+# Dashboards read the same variables over and over. VariableCache
+#
+#   - answers get() from the cache while the value is younger than the
+#     TTL of the variable (set per variable, default_ttl for the rest)
+#   - lets concurrent get() of a variable that has to be read share one
+#     readvar request
+#   - keeps set() values and writes them with writevar after
+#     write_delay seconds, only the last value of a variable is written
+#   - numbers every change of a value, changed(name, since) answers "has
+#     it changed since version N" from the cache like If-Modified-Since
+#   - polls watched variables from one thread and calls the watchers
+#     when a value has changed, however many watch the same variable
+#
+# The REST interface takes one variable per request, requests go one at a
+# time over the kept alive connection of vscp_rest.RestClient.
+#
+# Usage: vscp_varcache.py VARIABLE... [--url URL] [--interval SECONDS]
+#        prints the variables when they change
+#
+# This file is part of the VSCP (https://www.vscp.org) project
+#
+# The MIT License (MIT)
+#
+# Copyright © 2000-2026 Ake Hedman, the VSCP project
+# <info@vscp.org>
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#
+
+import argparse
+import concurrent.futures
+import sys
+import threading
+import time
+
+import vscp_rest
+from vscp_subscriber import Counters
+
+COUNTERS = ("hits", "misses", "shared", "reads", "writes", "written", "errors")
+
+
+class _Variable:
+    __slots__ = ("value", "read_at", "version", "ttl", "pending", "watchers", "interval",
+                 "polled_at")
+
+    def __init__(self, ttl):
+        self.value = None
+        self.read_at = None         # monotonic time of the last read
+        self.version = 0            # Incremented when the value changes
+        self.ttl = ttl
+        self.pending = None         # Future of a read in progress
+        self.watchers = []
+        self.interval = None
+        self.polled_at = 0
+
+
+class VariableCache:
+    """Remote variables of a vscp_rest.RestClient with TTLs and batched writes."""
+
+    def __init__(self, client, default_ttl=5.0, ttls=None, write_delay=0.5, timeout=30.0):
+        self.client = client
+        self.timeout = timeout      # Max wait for a read by another thread
+        self.default_ttl = default_ttl
+        self.ttls = dict(ttls or {})
+        self.write_delay = write_delay
+        self.variables = {}
+        self.writes = {}            # name -> value not written yet
+        self.writing = {}           # name -> value being written
+        self.write_at = None
+        self.lock = threading.Lock()
+        # One flush() at a time, writing is what that one writes
+        self.flush_lock = threading.Lock()
+        # The client has one connection, one request at a time
+        self.request_lock = threading.Lock()
+        self.counters = Counters(COUNTERS)
+        self.stopping = threading.Event()
+        self.thread = None
+
+    def _variable(self, name):
+        # Called with the lock held
+        var = self.variables.get(name)
+        if var is None:
+            var = self.variables[name] = _Variable(self.ttls.get(name, self.default_ttl))
+        return var
+
+    def set_ttl(self, name, ttl):
+        with self.lock:
+            self.ttls[name] = ttl
+            self._variable(name).ttl = ttl
+
+    def _store(self, var, value, now):
+        # Called with the lock held, True if the value changed
+        var.read_at = now
+        if var.version and value == var.value:
+            return False
+        var.value = value
+        var.version += 1
+        return True
+
+    # ------------------------------------------------------------------------
+    #                                R E A D
+    # ------------------------------------------------------------------------
+
+    def _read(self, name, var, fut):
+        try:
+            with self.request_lock:
+                self.counters.inc("reads")
+                value = self.client.read_var(name)
+        except Exception as e:
+            # Whatever it is, the threads waiting for the read get it and
+            # the next get() reads again
+            self.counters.inc("errors")
+            with self.lock:
+                var.pending = None
+            fut.set_exception(e)
+            return
+        with self.lock:
+            # A value set but not written yet is newer
+            value = self.writes.get(name, self.writing.get(name, value))
+            changed = self._store(var, value, time.monotonic())
+            var.pending = None
+            watchers = list(var.watchers) if changed else ()
+        fut.set_result(value)
+        for watcher in watchers:
+            watcher(name, value)
+
+    def get(self, name, max_age=None):
+        """Value of a variable, read when the cached one is older than its TTL."""
+        with self.lock:
+            var = self._variable(name)
+            ttl = var.ttl if max_age is None else max_age
+            if var.read_at is not None and time.monotonic() - var.read_at < ttl:
+                self.counters.inc("hits")
+                return var.value
+            fut = var.pending
+            read = fut is None
+            if read:
+                self.counters.inc("misses")
+                fut = var.pending = concurrent.futures.Future()
+            else:
+                # Being read by another thread
+                self.counters.inc("shared")
+        if read:
+            self._read(name, var, fut)
+        return fut.result(self.timeout)
+
+    def changed(self, name, since=0):
+        """(version, value) if the variable has changed after version since, else None.
+
+        Reads the variable when its cached value is older than its TTL.
+        """
+        value = self.get(name)
+        with self.lock:
+            version = self.variables[name].version
+        return (version, value) if version > since else None
+
+    # ------------------------------------------------------------------------
+    #                               W R I T E
+    # ------------------------------------------------------------------------
+
+    def set(self, name, value):
+        """Set a variable, it is written by poll() after write_delay seconds
+        or by flush()."""
+        with self.lock:
+            var = self._variable(name)
+            changed = self._store(var, value, time.monotonic())
+            if not self.writes:
+                self.write_at = time.monotonic() + self.write_delay
+            self.writes[name] = value
+            self.counters.inc("writes")
+            watchers = list(var.watchers) if changed else ()
+        for watcher in watchers:
+            watcher(name, value)
+
+    def flush(self):
+        """Write the variables set, the number of failed writes.
+
+        Failed writes are counted in errors and tried again by the next flush.
+        """
+        with self.flush_lock:
+            with self.lock:
+                writes = self.writing = self.writes
+                self.writes = {}
+                self.write_at = None
+            failed = 0
+            for name, value in writes.items():
+                try:
+                    with self.request_lock:
+                        self.client.write_var(name, value)
+                    self.counters.inc("written")
+                except Exception:
+                    self.counters.inc("errors")
+                    failed += 1
+                    with self.lock:
+                        # Try again unless it has been set again since
+                        self.writes.setdefault(name, value)
+                        if self.write_at is None:
+                            self.write_at = time.monotonic() + self.write_delay
+            with self.lock:
+                self.writing = {}
+            return failed
+
+    # ------------------------------------------------------------------------
+    #                               W A T C H
+    # ------------------------------------------------------------------------
+
+    def watch(self, name, watcher, interval=None):
+        """Call watcher(name, value) when the variable changes.
+
+        It is read every interval seconds (default its TTL) while start()ed.
+        """
+        with self.lock:
+            var = self._variable(name)
+            var.watchers.append(watcher)
+            interval = var.ttl if interval is None else interval
+            var.interval = interval if var.interval is None else min(var.interval, interval)
+
+    def unwatch(self, name, watcher):
+        with self.lock:
+            var = self.variables.get(name)
+            if var is not None and watcher in var.watchers:
+                var.watchers.remove(watcher)
+                if not var.watchers:
+                    var.interval = None
+
+    def poll(self, now=None):
+        """Read the watched variables that are due and write what is set."""
+        if now is None:
+            now = time.monotonic()
+        with self.lock:
+            due = [name for name, var in self.variables.items()
+                   if var.interval is not None and now - var.polled_at >= var.interval]
+            for name in due:
+                self.variables[name].polled_at = now
+            write = self.write_at is not None and now >= self.write_at
+        if write:
+            self.flush()
+        for name in due:
+            try:
+                self.get(name, max_age=0)
+            except Exception:
+                # Counted in errors, polled again next interval
+                pass
+
+    def _run(self):
+        while not self.stopping.wait(0.1):
+            self.poll()
+
+    def start(self):
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.stopping.set()
+        if self.thread is not None:
+            self.thread.join()
+        self.flush()
+
+
+# ----------------------------------------------------------------------------
+
+def main():
+    parser = argparse.ArgumentParser(description="Watch VSCP daemon remote variables")
+    parser.add_argument('variables', nargs='+')
+    parser.add_argument('--url', default=vscp_rest.DEFAULT_URL)
+    parser.add_argument('--user', default='admin')
+    parser.add_argument('--secret', default='secret', help='vscpsecret as the daemon wants it')
+    parser.add_argument('--interval', type=float, default=5.0,
+                        help='Seconds between reads of a variable')
+    arg = parser.parse_args(sys.argv[1:])
+
+    client = vscp_rest.RestClient(arg.url, arg.user, arg.secret)
+    cache = VariableCache(client, arg.interval)
+    for name in arg.variables:
+        cache.watch(name, lambda name, value: print("%s %s = %s" % (
+            time.strftime("%H:%M:%S"), name, value)))
+    cache.start()
+    try:
+        while True:
+            time.sleep(60)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        cache.stop()
+        client.close()
+
+
+if __name__ == "__main__":
+    main()
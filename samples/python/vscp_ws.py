@@ -0,0 +1,529 @@
+#!/usr/bin/env python3
+
+# vscp_ws.py
+#
+# asyncio client for the VSCP daemon websocket interface
+#
+# The same interface samples/websockets/vscp_testapplet.html uses from a
+# browser, subprotocol very-simple-control-protocol with text messages
+#
+#   C;command           command, answered with +;command... or -;command...
+#   E;event             event in the daemon text form (vscp_tcpip.py)
+#
+# The websocket protocol (RFC 6455) is done here on asyncio streams, no
+# extra modules are needed. permessage-deflate (RFC 7692) is offered and
+# used when the daemon agrees. The client pings the daemon every
+# ping_interval seconds and closes the connection when nothing has come
+# back for ping_timeout seconds.
+#
+# Events received after subscribe() go to a bounded queue read with
+# events(). When it is full the client either stops reading the
+# connection until there is room (policy 'block', the daemon then holds
+# back on TCP) or drops the event and counts it (policy 'drop').
+#
+# send_many() writes all events before it waits for the replies, a batch
+# costs one round trip.
+#
+# Authentication: when the daemon starts with +;AUTH0;sid the client
+# answers C;AUTH;user;hash, hash by auth_hash() or the function given.
+#
+# Usage: vscp_ws.py [--url ws://localhost:8080] [--user USER] ... [listen|send EVENT...]
+#
+# This file is part of the VSCP (https://www.vscp.org) project
+#
+# The MIT License (MIT)
+#
+# Copyright © 2000-2026 Ake Hedman, the VSCP project
+# <info@vscp.org>
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#
+
+import argparse
+import asyncio
+import base64
+import collections
+import hashlib
+import os
+import ssl
+import struct
+import sys
+import time
+import urllib.parse
+import zlib
+
+import vscp_tcpip
+from vscp_subscriber import Counters, POLICIES, POLICY_BLOCK
+
+SUBPROTOCOL = "very-simple-control-protocol"
+
+COUNTERS = ("received", "dropped", "sent", "refused", "pings")
+
+_GUID = b"258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+
+OP_CONTINUATION = 0x0
+OP_TEXT = 0x1
+OP_BINARY = 0x2
+OP_CLOSE = 0x8
+OP_PING = 0x9
+OP_PONG = 0xA
+
+# Messages shorter than this are not worth compressing
+DEFLATE_MIN = 64
+
+_DEFLATE_TAIL = b"\x00\x00\xff\xff"
+
+
+class VscpWsError(Exception):
+    """Negative reply or a broken connection."""
+
+
+def auth_hash(user, password, sid):
+    """Hash for C;AUTH, MD5 of user:password:sid."""
+    return hashlib.md5(("%s:%s:%s" % (user, password, sid)).encode()).hexdigest()
+
+
+# ----------------------------------------------------------------------------
+#                               F R A M E S
+# ----------------------------------------------------------------------------
+
+def _mask(key, data):
+    # XOR with the repeated four byte key, as one big integer
+    n = len(data)
+    if not n:
+        return data
+    k = (key * (n // 4 + 1))[:n]
+    return (int.from_bytes(data, "big") ^ int.from_bytes(k, "big")).to_bytes(n, "big")
+
+
+def encode_frame(opcode, payload, mask=True, rsv1=False, fin=True):
+    """A websocket frame, clients mask what they send."""
+    head = bytearray([(0x80 if fin else 0) | (0x40 if rsv1 else 0) | opcode])
+    bit = 0x80 if mask else 0
+    n = len(payload)
+    if n < 126:
+        head.append(bit | n)
+    elif n < 65536:
+        head.append(bit | 126)
+        head += struct.pack(">H", n)
+    else:
+        head.append(bit | 127)
+        head += struct.pack(">Q", n)
+    if mask:
+        key = os.urandom(4)
+        return bytes(head) + key + _mask(key, payload)
+    return bytes(head) + payload
+
+
+async def read_frame(reader, max_size=1 << 24):
+    """(fin, rsv1, opcode, payload) of the next frame."""
+    b0, b1 = await reader.readexactly(2)
+    n = b1 & 0x7F
+    if 126 == n:
+        n = struct.unpack(">H", await reader.readexactly(2))[0]
+    elif 127 == n:
+        n = struct.unpack(">Q", await reader.readexactly(8))[0]
+    if n > max_size:
+        raise VscpWsError("Frame of %d bytes is too large" % n)
+    key = await reader.readexactly(4) if b1 & 0x80 else None
+    payload = await reader.readexactly(n)
+    if key is not None:
+        payload = _mask(key, payload)
+    return bool(b0 & 0x80), bool(b0 & 0x40), b0 & 0x0F, payload
+
+
+class Deflate:
+    """permessage-deflate of one direction pair, as agreed in the handshake.
+
+    Compresses what the client sends and decompresses what the server
+    sends, the other way around with server True.
+    """
+
+    def __init__(self, params, server=False):
+        self.params = params
+        server_takeover = "server_no_context_takeover" not in params
+        client_takeover = "client_no_context_takeover" not in params
+        server_bits = int(params.get("server_max_window_bits") or 15)
+        client_bits = int(params.get("client_max_window_bits") or 15)
+        if server:
+            self.send_takeover, self.send_bits = server_takeover, server_bits
+            self.receive_takeover, self.receive_bits = client_takeover, client_bits
+        else:
+            self.send_takeover, self.send_bits = client_takeover, client_bits
+            self.receive_takeover, self.receive_bits = server_takeover, server_bits
+        self.compressor = None
+        self.decompressor = None
+
+    @classmethod
+    def parse(cls, header, server=False):
+        """Deflate for a Sec-WebSocket-Extensions header, None if not agreed."""
+        for ext in (header or "").split(","):
+            parts = [p.strip() for p in ext.split(";")]
+            if "permessage-deflate" != parts[0]:
+                continue
+            params = {}
+            for p in parts[1:]:
+                name, _, value = p.partition("=")
+                params[name.strip()] = value.strip().strip('"') or None
+            return cls(params, server)
+        return None
+
+    def compress(self, data):
+        if self.compressor is None or not self.send_takeover:
+            self.compressor = zlib.compressobj(zlib.Z_DEFAULT_COMPRESSION, zlib.DEFLATED,
+                                               -self.send_bits)
+        data = self.compressor.compress(data) + self.compressor.flush(zlib.Z_SYNC_FLUSH)
+        return data[:-4] if data.endswith(_DEFLATE_TAIL) else data
+
+    def decompress(self, data):
+        if self.decompressor is None or not self.receive_takeover:
+            self.decompressor = zlib.decompressobj(-self.receive_bits)
+        return self.decompressor.decompress(data + _DEFLATE_TAIL)
+
+
+# ----------------------------------------------------------------------------
+#                               C L I E N T
+# ----------------------------------------------------------------------------
+
+class Client:
+    """One websocket connection to the VSCP daemon."""
+
+    def __init__(self, url="ws://localhost:8080", user="admin", password="secret",
+                 queue_size=1000, policy=POLICY_BLOCK, deflate=True, ping_interval=20.0,
+                 ping_timeout=10.0, timeout=5.0, auth=auth_hash, auth_wait=0.5):
+        if policy not in POLICIES:
+            raise ValueError("Unknown queue policy '%s'" % policy)
+        u = urllib.parse.urlsplit(url)
+        self.secure = "wss" == u.scheme
+        self.host = u.hostname or "localhost"
+        self.port = u.port or (443 if self.secure else 80)
+        self.path = u.path or "/"
+        self.user = user
+        self.password = password
+        self.policy = policy
+        self.offer_deflate = deflate
+        self.ping_interval = ping_interval
+        self.ping_timeout = ping_timeout
+        self.timeout = timeout
+        self.auth = auth
+        self.auth_wait = auth_wait
+        self.queue = asyncio.Queue(maxsize=queue_size)
+        self.replies = collections.deque()      # Futures of commands sent
+        self.auth_sid = None
+        self.auth_requested = asyncio.Event()
+        self.deflate = None
+        self.reader = None
+        self.writer = None
+        self.tasks = []
+        self.last_seen = 0
+        self.error = None
+        self.closed = asyncio.Event()
+        self.counters = Counters(COUNTERS)
+
+    # ------------------------------------------------------------------------
+
+    async def connect(self):
+        context = ssl.create_default_context() if self.secure else None
+        self.reader, self.writer = await asyncio.wait_for(
+            asyncio.open_connection(self.host, self.port, ssl=context), self.timeout)
+        await asyncio.wait_for(self._handshake(), self.timeout)
+        self.last_seen = time.monotonic()
+        self.tasks = [asyncio.ensure_future(self._read_loop())]
+        if self.ping_interval:
+            self.tasks.append(asyncio.ensure_future(self._ping_loop()))
+        await self._authenticate()
+
+    async def _handshake(self):
+        key = base64.b64encode(os.urandom(16)).decode()
+        lines = ["GET %s HTTP/1.1" % self.path,
+                 "Host: %s:%d" % (self.host, self.port),
+                 "Upgrade: websocket",
+                 "Connection: Upgrade",
+                 "Sec-WebSocket-Key: " + key,
+                 "Sec-WebSocket-Version: 13",
+                 "Sec-WebSocket-Protocol: " + SUBPROTOCOL]
+        if self.offer_deflate:
+            lines.append("Sec-WebSocket-Extensions: permessage-deflate; client_max_window_bits")
+        self.writer.write(("\r\n".join(lines) + "\r\n\r\n").encode())
+        await self.writer.drain()
+
+        head = await self.reader.readuntil(b"\r\n\r\n")
+        status, *header_lines = head.decode("latin-1").split("\r\n")
+        if " 101 " not in status + " ":
+            raise VscpWsError("Websocket handshake refused: " + status)
+        headers = {}
+        for line in header_lines:
+            name, _, value = line.partition(":")
+            headers[name.strip().lower()] = value.strip()
+        accept = base64.b64encode(hashlib.sha1(key.encode() + _GUID).digest()).decode()
+        if headers.get("sec-websocket-accept") != accept:
+            raise VscpWsError("Bad Sec-WebSocket-Accept")
+        if self.offer_deflate:
+            self.deflate = Deflate.parse(headers.get("sec-websocket-extensions"))
+
+    async def _authenticate(self):
+        # The daemon sends +;AUTH0;sid first if it wants a login, wait
+        # auth_wait seconds for it
+        try:
+            await asyncio.wait_for(self.auth_requested.wait(), self.auth_wait)
+        except asyncio.TimeoutError:
+            return
+        await self.command("AUTH;%s;%s" % (self.user, self.auth(self.user, self.password,
+                                                                 self.auth_sid)))
+
+    async def close(self):
+        if self.writer is None:
+            return
+        for task in self.tasks:
+            task.cancel()
+        if self.error is None:
+            try:
+                self.writer.write(encode_frame(OP_CLOSE, struct.pack(">H", 1000)))
+                await self.writer.drain()
+            except OSError:
+                pass
+        self._fail(VscpWsError("Connection closed"))
+        self.writer = None
+
+    def _fail(self, error):
+        # Wake everyone waiting on the connection, events() gives what
+        # is queued first
+        if self.error is None:
+            self.error = error
+        while self.replies:
+            fut = self.replies.popleft()
+            if not fut.done():
+                fut.set_exception(error)
+        if self.writer is not None:
+            self.writer.close()
+        self.closed.set()
+
+    # ------------------------------------------------------------------------
+    #                              R E A D I N G
+    # ------------------------------------------------------------------------
+
+    async def _messages(self):
+        """Text of complete messages, control frames handled on the way."""
+        parts = []
+        compressed = False
+        while True:
+            fin, rsv1, opcode, payload = await read_frame(self.reader)
+            self.last_seen = time.monotonic()
+            if OP_PING == opcode:
+                self.writer.write(encode_frame(OP_PONG, payload))
+                continue
+            if OP_PONG == opcode:
+                continue
+            if OP_CLOSE == opcode:
+                raise VscpWsError("Closed by daemon")
+            if OP_CONTINUATION != opcode:
+                parts = []
+                compressed = rsv1
+            parts.append(payload)
+            if not fin:
+                continue
+            data = b"".join(parts)
+            if compressed:
+                if self.deflate is None:
+                    raise VscpWsError("Compressed message without permessage-deflate")
+                data = self.deflate.decompress(data)
+            yield data.decode("utf-8", "replace")
+
+    async def _read_loop(self):
+        try:
+            async for msg in self._messages():
+                kind, _, rest = msg.partition(";")
+                if "E" == kind:
+                    try:
+                        ev = vscp_tcpip.parse_event(rest)
+                    except ValueError:
+                        continue
+                    self.counters.inc("received")
+                    if POLICY_BLOCK == self.policy:
+                        # Not reading on makes the daemon wait
+                        await self.queue.put(ev)
+                        self.last_seen = time.monotonic()
+                    else:
+                        try:
+                            self.queue.put_nowait(ev)
+                        except asyncio.QueueFull:
+                            self.counters.inc("dropped")
+                elif kind in ("+", "-"):
+                    if rest.startswith("AUTH0;") and self.auth_sid is None:
+                        # Login request, not a reply
+                        self.auth_sid = rest[6:]
+                        self.auth_requested.set()
+                        continue
+                    if self.replies:
+                        fut = self.replies.popleft()
+                        if not fut.done():
+                            if "+" == kind:
+                                fut.set_result(rest)
+                            else:
+                                fut.set_exception(VscpWsError(msg))
+        except Exception as e:
+            # Connection lost, a bad frame or a bad compressed message
+            self._fail(e if isinstance(e, VscpWsError) else
+                       VscpWsError("%s: %s" % (type(e).__name__, e)))
+
+    async def _ping_loop(self):
+        while self.error is None:
+            await asyncio.sleep(self.ping_interval)
+            if self.queue.full():
+                # The reader waits for room, it is not the daemon that is slow
+                continue
+            if time.monotonic() - self.last_seen > self.ping_interval + self.ping_timeout:
+                self._fail(VscpWsError("No answer to ping"))
+                return
+            self.counters.inc("pings")
+            try:
+                self.writer.write(encode_frame(OP_PING, b"vscp"))
+                await self.writer.drain()
+            except OSError as e:
+                self._fail(VscpWsError(str(e)))
+
+    # ------------------------------------------------------------------------
+    #                              W R I T I N G
+    # ------------------------------------------------------------------------
+
+    def _frame(self, text):
+        data = text.encode()
+        if self.deflate is not None and len(data) >= DEFLATE_MIN:
+            return encode_frame(OP_TEXT, self.deflate.compress(data), rsv1=True)
+        return encode_frame(OP_TEXT, data)
+
+    def _write(self, messages):
+        # Futures for the replies of messages, in order
+        if self.error is not None:
+            raise self.error
+        loop = asyncio.get_event_loop()
+        futures = []
+        for _ in messages:
+            fut = loop.create_future()
+            self.replies.append(fut)
+            futures.append(fut)
+        self.writer.write(b"".join(self._frame(m) for m in messages))
+        return futures
+
+    async def command(self, cmd):
+        """Run a command, the reply after '+;'. Raises VscpWsError on '-;'."""
+        fut = self._write(["C;" + cmd])[0]
+        await self.writer.drain()
+        return await asyncio.wait_for(fut, self.timeout)
+
+    async def subscribe(self, vscpfilter=None, vscpmask=None):
+        """Start receiving events, filter and mask as 'priority,class,type,GUID'."""
+        if vscpfilter is not None:
+            await self.command("SETFILTER;%s;%s" % (vscpfilter, vscpmask or "0,0,0," + "00:" * 15 + "00"))
+        await self.command("open")
+
+    async def send(self, ev):
+        return await self.send_many([ev]) == 0
+
+    async def send_many(self, events):
+        """Send events, all written before the replies are read.
+
+        Returns the number the daemon refused. Raises VscpWsError if the
+        connection is lost before all replies are in.
+        """
+        if not events:
+            return 0
+        futures = self._write(["E;" + vscp_tcpip.format_event(ev) for ev in events])
+        await self.writer.drain()
+        failed = 0
+        for fut in futures:
+            try:
+                await asyncio.wait_for(fut, self.timeout)
+            except VscpWsError:
+                failed += 1
+        if self.error is not None:
+            raise self.error
+        self.counters.inc("sent", len(events) - failed)
+        self.counters.inc("refused", failed)
+        return failed
+
+    async def events(self):
+        """Events in VSCP JSON format as they come, after subscribe().
+
+        Raises VscpWsError when the connection is lost and the events
+        received before are taken.
+        """
+        queue = self.queue
+        while True:
+            try:
+                ev = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                if self.error is not None:
+                    raise self.error
+                ev = await self._wait_event()
+                if ev is None:
+                    continue
+            yield ev
+
+    async def _wait_event(self):
+        # Next event, None if the connection goes first
+        get = asyncio.ensure_future(self.queue.get())
+        closed = asyncio.ensure_future(self.closed.wait())
+        try:
+            await asyncio.wait((get, closed), return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            closed.cancel()
+            if not get.done():
+                get.cancel()
+        if get.done() and not get.cancelled():
+            return get.result()
+        return None
+
+
+# ----------------------------------------------------------------------------
+
+async def run(arg):
+    client = Client(arg.url, arg.user, arg.password, deflate=not arg.no_deflate)
+    await client.connect()
+    try:
+        if 'send' == arg.command:
+            failed = await client.send_many([vscp_tcpip.parse_event(e) for e in arg.events])
+            print("Sent %d events, %d refused" % (len(arg.events) - failed, failed))
+            return
+        await client.subscribe(arg.filter, arg.mask)
+        async for ev in client.events():
+            print(vscp_tcpip.format_event(ev))
+    finally:
+        await client.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="VSCP daemon websocket client")
+    parser.add_argument('command', nargs='?', choices=('listen', 'send'), default='listen')
+    parser.add_argument('events', nargs='*', help='Events to send (send)')
+    parser.add_argument('--url', default='ws://localhost:8080')
+    parser.add_argument('--user', default='admin')
+    parser.add_argument('--password', default='secret')
+    parser.add_argument('--filter', help="Filter 'priority,class,type,GUID' (listen)")
+    parser.add_argument('--mask', help="Mask 'priority,class,type,GUID' (listen)")
+    parser.add_argument('--no-deflate', action='store_true', help='Do not offer compression')
+    arg = parser.parse_args(sys.argv[1:])
+    try:
+        asyncio.run(run(arg))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+
+# vscpd_standin.py
+#
+# Local stand-in for the VSCP daemon TCP/IP interface
+#
+# Answers the commands the samples use (user, pass, send, chid, noop,
+# rcvloop, quitloop, quit) so senders like sensorpuck_vscp.py (--replay)
+# and vscp_bridge.py can be run, profiled and load tested without a real
+# daemon. Events sent by one client go to the clients in receive loop
+# mode. Event rates are printed every --stats seconds.
+#
+# Usage: vscpd_standin.py [-h] [--host HOST] [--port PORT] [--stats S] [-v]
+#
+# This file is part of the VSCP (https://www.vscp.org) project
+#
+# The MIT License (MIT)
+#
+# Copyright © 2000-2026 Ake Hedman, the VSCP project
+# <info@vscp.org>
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#
+
+import argparse
+import asyncio
+import sys
+import time
+
+import vscp_tcpip
+
+OK = b"+OK - Success.\r\n"
+
+
+class StandIn:
+
+    def __init__(self, verbose=False):
+        self.verbose = verbose
+        self.next_chid = 1
+        self.loops = set()
+        self.events = 0
+        self.last_events = 0
+        self.last_time = time.monotonic()
+
+    async def client(self, reader, writer):
+        chid = self.next_chid
+        self.next_chid += 1
+        writer.write(b"+OK - Welcome to the VSCP daemon stand-in.\r\n")
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                line = line.decode(errors="replace").strip()
+                cmd, _, rest = line.partition(" ")
+                cmd = cmd.lower()
+
+                if "send" == cmd:
+                    try:
+                        ev = vscp_tcpip.parse_event(rest)
+                    except ValueError:
+                        writer.write(b"-OK - Invalid event.\r\n")
+                        continue
+                    self.events += 1
+                    if self.verbose:
+                        print("[%d] %s" % (chid, rest))
+                    ev["vscpObId"] = chid
+                    text = (vscp_tcpip.format_event(ev) + "\r\n").encode()
+                    for w in self.loops:
+                        if w is not writer:
+                            w.write(text)
+                    writer.write(OK)
+                elif "chid" == cmd:
+                    writer.write(b"%d\r\n" % chid + OK)
+                elif "rcvloop" == cmd:
+                    self.loops.add(writer)
+                    writer.write(OK)
+                elif "quitloop" == cmd:
+                    self.loops.discard(writer)
+                    writer.write(OK)
+                elif "quit" == cmd:
+                    writer.write(OK)
+                    break
+                else:
+                    # user, pass, noop and the rest are just accepted
+                    writer.write(OK)
+
+                # Only wait for the client when it is slow to read
+                if writer.transport.get_write_buffer_size() > 65536:
+                    await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            self.loops.discard(writer)
+            writer.close()
+
+    async def keepalive(self):
+        # Clients in receive loop mode get +OK now and then
+        while True:
+            await asyncio.sleep(1)
+            for w in list(self.loops):
+                w.write(OK)
+
+    async def stats(self, interval):
+        while True:
+            await asyncio.sleep(interval)
+            now = time.monotonic()
+            rate = (self.events - self.last_events) / (now - self.last_time)
+            print("events %d (%.0f/s) receive loops %d" % (self.events, rate, len(self.loops)))
+            self.last_events = self.events
+            self.last_time = now
+
+
+async def serve(arg):
+    standin = StandIn(arg.verbose)
+    server = await asyncio.start_server(standin.client, arg.host, arg.port)
+    print("VSCP daemon stand-in on %s:%d" % (arg.host, arg.port))
+    tasks = [asyncio.ensure_future(standin.keepalive())]
+    if arg.stats:
+        tasks.append(asyncio.ensure_future(standin.stats(arg.stats)))
+    async with server:
+        await server.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="VSCP daemon TCP/IP interface stand-in")
+    parser.add_argument('--host', default='127.0.0.1', help='Address to listen on')
+    parser.add_argument('--port', type=int, default=vscp_tcpip.DEFAULT_PORT,
+                        help='Port to listen on (default: 9598)')
+    parser.add_argument('--stats', type=int, default=5,
+                        help='Seconds between event rates, 0 for none (default: 5)')
+    parser.add_argument('-v', '--verbose', action='store_true', help='Print all events')
+    arg = parser.parse_args(sys.argv[1:])
+
+    try:
+        asyncio.run(serve(arg))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
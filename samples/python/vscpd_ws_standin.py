@@ -0,0 +1,274 @@
+#!/usr/bin/env python3
+
+# vscpd_ws_standin.py
+#
+# Local stand-in for the VSCP daemon websocket interface
+#
+# Speaks the protocol of samples/websockets and vscp_ws.py: the
+# very-simple-control-protocol subprotocol, C;command and E;event text
+# messages answered with +;... or -;..., permessage-deflate when the
+# client offers it and pongs to pings. With --user a client has to log
+# in first (+;AUTH0;sid, C;AUTH;user;hash). Events sent by one client go
+# to the clients that have opened their channel (C;open).
+#
+# Usage: vscpd_ws_standin.py [-h] [--host HOST] [--port PORT] [--user USER]
+#                            [--password PASSWORD] [--no-deflate] [--stats S] [-v]
+#
+# This file is part of the VSCP (https://www.vscp.org) project
+#
+# The MIT License (MIT)
+#
+# Copyright © 2000-2026 Ake Hedman, the VSCP project
+# <info@vscp.org>
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#
+
+import argparse
+import asyncio
+import base64
+import hashlib
+import os
+import sys
+import time
+
+import vscp_tcpip
+import vscp_ws
+from vscp_ws import (OP_CLOSE, OP_CONTINUATION, OP_PING, OP_PONG, OP_TEXT, encode_frame,
+                     read_frame)
+
+
+class Connection:
+    """One websocket client of the stand-in."""
+
+    def __init__(self, standin, reader, writer, chid):
+        self.standin = standin
+        self.reader = reader
+        self.writer = writer
+        self.chid = chid
+        self.deflate = None
+        self.sid = None
+        self.authenticated = standin.user is None
+        self.open = False
+        self.received = []          # Messages from the client
+        self.compressed_in = 0
+        self.compressed_out = 0
+
+    async def handshake(self):
+        head = await self.reader.readuntil(b"\r\n\r\n")
+        headers = {}
+        for line in head.decode("latin-1").split("\r\n")[1:]:
+            name, _, value = line.partition(":")
+            headers[name.strip().lower()] = value.strip()
+        key = headers.get("sec-websocket-key")
+        if key is None or "websocket" != headers.get("upgrade", "").lower():
+            self.writer.write(b"HTTP/1.1 400 Bad Request\r\nContent-Length: 0\r\n\r\n")
+            return False
+        accept = base64.b64encode(hashlib.sha1(key.encode() + vscp_ws._GUID).digest())
+        lines = ["HTTP/1.1 101 Switching Protocols",
+                 "Upgrade: websocket",
+                 "Connection: Upgrade",
+                 "Sec-WebSocket-Accept: " + accept.decode()]
+        if vscp_ws.SUBPROTOCOL in headers.get("sec-websocket-protocol", ""):
+            lines.append("Sec-WebSocket-Protocol: " + vscp_ws.SUBPROTOCOL)
+        if self.standin.deflate and \
+                "permessage-deflate" in headers.get("sec-websocket-extensions", ""):
+            extension = "permessage-deflate; " + self.standin.deflate_params
+            lines.append("Sec-WebSocket-Extensions: " + extension.rstrip("; "))
+            self.deflate = vscp_ws.Deflate.parse(extension, server=True)
+        self.writer.write(("\r\n".join(lines) + "\r\n\r\n").encode())
+        return True
+
+    def send(self, text):
+        data = text.encode()
+        if self.deflate is not None and len(data) >= vscp_ws.DEFLATE_MIN:
+            self.compressed_out += 1
+            self.writer.write(encode_frame(OP_TEXT, self.deflate.compress(data), mask=False,
+                                           rsv1=True))
+        else:
+            self.writer.write(encode_frame(OP_TEXT, data, mask=False))
+
+    async def drain(self):
+        # Only wait for the client when it is slow to read
+        if self.writer.transport.get_write_buffer_size() > 65536:
+            await self.writer.drain()
+
+    async def messages(self):
+        parts = []
+        compressed = False
+        while True:
+            fin, rsv1, opcode, payload = await read_frame(self.reader)
+            if OP_PING == opcode:
+                if self.standin.answer_pings:
+                    self.writer.write(encode_frame(OP_PONG, payload, mask=False))
+                continue
+            if OP_PONG == opcode:
+                continue
+            if OP_CLOSE == opcode:
+                self.writer.write(encode_frame(OP_CLOSE, payload[:2], mask=False))
+                return
+            if OP_CONTINUATION != opcode:
+                parts = []
+                compressed = rsv1
+            parts.append(payload)
+            if not fin:
+                continue
+            data = b"".join(parts)
+            if compressed:
+                self.compressed_in += 1
+                data = self.deflate.decompress(data)
+            yield data.decode("utf-8", "replace")
+
+    def command(self, text):
+        cmd, _, args = text.partition(";")
+        cmd = cmd.upper()
+        if "AUTH" == cmd:
+            user, _, digest = args.partition(";")
+            if user == self.standin.user and digest == self.standin.auth(
+                    user, self.standin.password, self.sid):
+                self.authenticated = True
+                return "+;AUTH1"
+            return "-;AUTH;Invalid user or password"
+        if not self.authenticated:
+            return "-;%s;Not authorised" % cmd
+        if "OPEN" == cmd:
+            self.open = True
+        elif "CLOSE" == cmd:
+            self.open = False
+        # SETFILTER, CLRQUEUE, NOOP... are just accepted
+        return "+;" + cmd
+
+    async def run(self):
+        if not await self.handshake():
+            return
+        if self.standin.user is not None:
+            self.sid = os.urandom(16).hex()
+            self.send("+;AUTH0;" + self.sid)
+        async for msg in self.messages():
+            self.received.append(msg)
+            kind, _, rest = msg.partition(";")
+            if "C" == kind:
+                self.send(self.command(rest))
+            elif "E" == kind:
+                if not self.authenticated:
+                    self.send("-;EVENT;Not authorised")
+                    continue
+                try:
+                    ev = vscp_tcpip.parse_event(rest)
+                except ValueError:
+                    self.send("-;EVENT;Invalid event")
+                    continue
+                if self.standin.refuse is not None and self.standin.refuse(ev):
+                    self.send("-;EVENT;Refused")
+                    continue
+                self.standin.events += 1
+                if self.standin.verbose:
+                    print("[%d] %s" % (self.chid, rest))
+                ev["vscpObId"] = self.chid
+                self.send("+;EVENT")
+                await self.standin.broadcast(ev, self)
+            else:
+                self.send("-;%s;Unknown message" % kind)
+            await self.drain()
+
+
+class StandIn:
+    """The daemon side, refuse(ev) True makes an event get -;EVENT."""
+
+    def __init__(self, user=None, password=None, deflate=True, deflate_params="",
+                 answer_pings=True, refuse=None, verbose=False, auth=vscp_ws.auth_hash):
+        self.user = user
+        self.password = password
+        self.deflate = deflate
+        self.deflate_params = deflate_params
+        self.answer_pings = answer_pings
+        self.refuse = refuse
+        self.verbose = verbose
+        self.auth = auth
+        self.next_chid = 1
+        self.connections = set()
+        self.events = 0
+        self.last_events = 0
+        self.last_time = time.monotonic()
+
+    async def client(self, reader, writer):
+        conn = Connection(self, reader, writer, self.next_chid)
+        self.next_chid += 1
+        self.connections.add(conn)
+        try:
+            await conn.run()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            self.connections.discard(conn)
+            writer.close()
+
+    async def broadcast(self, ev, source=None):
+        """Send an event to the clients that have opened their channel."""
+        text = "E;" + vscp_tcpip.format_event(ev)
+        for conn in list(self.connections):
+            if conn is not source and conn.open:
+                conn.send(text)
+                await conn.drain()
+
+    def disconnect(self):
+        """Drop all clients, what is written is still sent."""
+        for conn in list(self.connections):
+            conn.writer.close()
+
+    async def stats(self, interval):
+        while True:
+            await asyncio.sleep(interval)
+            now = time.monotonic()
+            rate = (self.events - self.last_events) / (now - self.last_time)
+            print("events %d (%.0f/s) clients %d" % (self.events, rate, len(self.connections)))
+            self.last_events = self.events
+            self.last_time = now
+
+
+async def serve(arg):
+    standin = StandIn(arg.user, arg.password, not arg.no_deflate, verbose=arg.verbose)
+    server = await asyncio.start_server(standin.client, arg.host, arg.port)
+    print("VSCP daemon websocket stand-in on ws://%s:%d" % (arg.host, arg.port))
+    if arg.stats:
+        asyncio.ensure_future(standin.stats(arg.stats))
+    async with server:
+        await server.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="VSCP daemon websocket interface stand-in")
+    parser.add_argument('--host', default='127.0.0.1', help='Address to listen on')
+    parser.add_argument('--port', type=int, default=8080, help='Port to listen on (default: 8080)')
+    parser.add_argument('--user', help='User clients log in as (default: no login)')
+    parser.add_argument('--password', default='secret', help='Password of --user')
+    parser.add_argument('--no-deflate', action='store_true', help='Turn down permessage-deflate')
+    parser.add_argument('--stats', type=int, default=5,
+                        help='Seconds between event rates, 0 for none (default: 5)')
+    parser.add_argument('-v', '--verbose', action='store_true', help='Print all events')
+    arg = parser.parse_args(sys.argv[1:])
+
+    try:
+        asyncio.run(serve(arg))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -1,20 +1,32 @@
-#!//usr/bin/python
+#!/usr/bin/env python3
 # Copyright 2018 Ake Hedman, Grodans Paradis AB
 # for the VSCP project (https://www.vscp.org)
 #
-# Arguments: #tones zone subzone time date
+# Arguments: #tones zone subzone time date [text]
 # where #tones is number of voicecall tone repeats.
+#
+# Messages go through sms_spool.py, written to TMPDIR and renamed into
+# OUTDIR. An alarm for a zone/subzone already sent within WINDOW seconds
+# is not sent again, it is counted in the next message.
 
 
+import os
 import sys
-import uuid
 
-filename_voice = str(uuid.uuid4())
-filename_sms = str(uuid.uuid4())
+import sms_spool
 
 # Dir that holds outgoing SMS messages
 OUTDIR="/var/spool/sms/outgoing"
 
+# Dir files are written to before they are moved to OUTDIR (same file system)
+TMPDIR="/var/spool/sms/tmp"
+
+# Seconds before an alarm for the same zone/subzone is sent again
+WINDOW=600
+
+# Remembers what was sent when for WINDOW
+STATE=os.path.join(TMPDIR, "doalarm.json")
+
 # Voicel recipients (comma separated list, empty for non)
 VOICE_RECEIVERS="4673232323232323,4612332323232"
 
@@ -29,36 +41,14 @@ SMS_TEXT="An alarm condition has occured!"
 
 # -----------------------------------------------------------------------------
 
-voicetone="5 "
-for x in range(0, int( sys.argv[1] ) ):
-    voicetone = voicetone + "1,"
-
-voiceRcvList = VOICE_RECEIVERS.split(",")
-
-cnt=0
-
-# Send SMS
-SMSRcvList = SMS_RECEIVERS.split(",")
+notifier = sms_spool.Notifier(SMS_RECEIVERS.split(","), VOICE_RECEIVERS.split(","),
+                              OUTDIR, TMPDIR, WINDOW, delay=0, tones=int(sys.argv[1]),
+                              flash=bflash, text=SMS_TEXT, state=STATE)
 
-if SMS_RECEIVERS != "" :
-    for receiver in SMSRcvList:
-        print( OUTDIR + "/" + filename_voice + str(cnt) )
-        with open( OUTDIR + "/" + filename_voice + str(cnt), "w") as text_file:
-            text_file.write( "To: {0}\n".format(receiver) )
-            if bflash:
-                text_file.write( "Flash: yes\n" )
-            text_file.write( "\n\n" )
-            text_file.write( SMS_TEXT+"\n" )
-            text_file.write( "Zone={0} SubZone={1} Time={2} Date={3}\n".format(sys.argv[1],sys.argv[2],sys.argv[3],sys.argv[4] ) )
-            text_file.write( "{0}".format(sys.argv[5]) )        
-        cnt = cnt + 1
+text = "Time={0} Date={1}".format(sys.argv[4], sys.argv[5])
+if len(sys.argv) > 6:
+    text += " " + sys.argv[6]
 
-# Voice calls
-if VOICE_RECEIVERS != "" :
-    for receiver in voiceRcvList:
-        print( OUTDIR + "/" + filename_voice + str(cnt) )
-        with open( OUTDIR + "/" + filename_voice + str(cnt), "w") as text_file:
-            text_file.write( "To: {0}\n".format(receiver) )
-            text_file.write( "Voicecall: yes\n\n" )
-            text_file.write( voicetone )
-        cnt = cnt + 1
+if notifier.alarm(int(sys.argv[2]), int(sys.argv[3]), text):
+    for path in notifier.flush():
+        print(path)
@@ -0,0 +1,279 @@
+#!/usr/bin/env python3
+
+# sms_spool.py
+#
+# SMS and voice call alarms through the smstools spool
+#
+# Messages are written to a temporary directory on the same file system
+# as the outgoing spool directory and then renamed into it, so smsd never
+# sees a half written file.
+#
+# An alarm storm should not become thousands of messages. Notifier
+#
+#   - sends an alarm for a zone/subzone at most once per window, repeats
+#     within the window are counted and told in the next message
+#   - collects the alarms arriving within delay seconds of the first one
+#     into one summary message per recipient
+#
+# It takes alarms from alarm() or as CLASS1.ALARM events from put() (the
+# VSCP daemon receive loop of main()). doalarm.py uses it for a single
+# alarm from the command line, keeping the window in a state file.
+#
+# Usage: sms_spool.py [--host HOST] [--sms N1,N2] [--voice N1,N2] ...
+#
+# This file is part of the VSCP (https://www.vscp.org) project
+#
+# The MIT License (MIT)
+#
+# Copyright © 2000-2026 Ake Hedman, the VSCP project
+# <info@vscp.org>
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'python'))
+import vscp_class
+import vscp_tcpip
+
+# Dir that holds outgoing SMS messages
+OUTDIR = "/var/spool/sms/outgoing"
+
+# Messages are written here first, must be on the same file system
+TMPDIR = "/var/spool/sms/tmp"
+
+SMS_TEXT = "An alarm condition has occured!"
+
+# Zone/subzone lines in one summary message
+MAX_LINES = 8
+
+
+def spool(text, headers=(), outdir=OUTDIR, tmpdir=TMPDIR):
+    """Write a message file to the spool directory atomically, its path."""
+    fd, tmp = tempfile.mkstemp(prefix="vscp-", dir=tmpdir)
+    try:
+        with os.fdopen(fd, "w") as f:
+            for header in headers:
+                f.write(header + "\n")
+            f.write("\n")
+            f.write(text)
+            f.flush()
+            os.fsync(f.fileno())
+        # mkstemp gives 0600, smsd may run as another user
+        os.chmod(tmp, 0o644)
+        path = os.path.join(outdir, os.path.basename(tmp))
+        os.rename(tmp, path)
+    except BaseException:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        raise
+    return path
+
+
+def voicetone(tones):
+    return "5 " + "1," * tones
+
+
+class Notifier:
+    """Deduplicate and coalesce alarms into spooled SMS and voice calls.
+
+    Call tick() now and then so collected alarms are sent.
+    """
+
+    def __init__(self, sms=(), voice=(), outdir=OUTDIR, tmpdir=TMPDIR, window=600,
+                 delay=10, tones=1, flash=False, text=SMS_TEXT, state=None):
+        self.sms = [r for r in sms if r]
+        self.voice = [r for r in voice if r]
+        self.outdir = outdir
+        self.tmpdir = tmpdir
+        self.window = window
+        self.delay = delay
+        self.tones = tones
+        self.flash = flash
+        self.text = text
+        self.state = state
+        self.sent = {}              # (zone, subzone) -> time of last message
+        self.repeats = {}           # (zone, subzone) -> alarms not sent
+        self.pending = {}           # (zone, subzone) -> [count, first time, text]
+        self.first = None
+        self.files = 0
+        if state is not None and os.path.exists(state):
+            self._load()
+
+    def _load(self):
+        with open(self.state) as f:
+            saved = json.load(f)
+        for key, t in saved.get("sent", {}).items():
+            zone, subzone = key.split("/")
+            self.sent[(int(zone), int(subzone))] = t
+        for key, n in saved.get("repeats", {}).items():
+            zone, subzone = key.split("/")
+            self.repeats[(int(zone), int(subzone))] = n
+
+    def _save(self, now):
+        # Entries older than the window are of no use
+        sent = {"%d/%d" % k: t for k, t in self.sent.items() if now - t < self.window}
+        repeats = {"%d/%d" % k: n for k, n in self.repeats.items() if "%d/%d" % k in sent}
+        tmp = self.state + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump({"sent": sent, "repeats": repeats}, f)
+        os.replace(tmp, self.state)
+
+    def alarm(self, zone, subzone, text="", now=None):
+        """Note an alarm, False if it is a repeat within the window."""
+        if now is None:
+            now = time.time()
+        key = (zone, subzone)
+        last = self.sent.get(key)
+        if last is not None and now - last < self.window:
+            self.repeats[key] = self.repeats.get(key, 0) + 1
+            if self.state is not None:
+                self._save(now)
+            return False
+        entry = self.pending.get(key)
+        if entry is None:
+            self.pending[key] = [1, now, text]
+        else:
+            entry[0] += 1
+        if self.first is None:
+            self.first = now
+        return True
+
+    def put(self, ev, now=None):
+        """Note a CLASS1.ALARM event in VSCP JSON format, False for others."""
+        if vscp_class.VSCP_CLASS1_ALARM != ev["vscpClass"]:
+            return False
+        data = ev.get("vscpData") or []
+        if len(data) < 3:
+            return False
+        return self.alarm(data[1], data[2], "type %d from %s" % (ev["vscpType"],
+                                                                 ev.get("vscpGuid", "-")), now)
+
+    def tick(self, now=None):
+        """Spool the collected alarms once delay has passed, the files written."""
+        if now is None:
+            now = time.time()
+        if self.first is not None and now - self.first >= self.delay:
+            return self.flush(now)
+        return []
+
+    def message(self, now):
+        """Summary text of the pending alarms."""
+        lines = [self.text, time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(now))]
+        keys = sorted(self.pending, key=lambda k: self.pending[k][1])
+        for key in keys[:MAX_LINES]:
+            count, t, text = self.pending[key]
+            line = "Zone=%d SubZone=%d" % key
+            repeats = count - 1 + self.repeats.get(key, 0)
+            if repeats:
+                line += " (+%d)" % repeats
+            if text:
+                line += " " + text
+            lines.append(line)
+        if len(keys) > MAX_LINES:
+            lines.append("and %d more zones" % (len(keys) - MAX_LINES))
+        return "\n".join(lines) + "\n"
+
+    def flush(self, now=None):
+        """Spool one message per recipient for the pending alarms."""
+        if not self.pending:
+            return []
+        if now is None:
+            now = time.time()
+        paths = []
+        text = self.message(now)
+        for receiver in self.sms:
+            headers = ["To: %s" % receiver]
+            if self.flash:
+                headers.append("Flash: yes")
+            paths.append(spool(text, headers, self.outdir, self.tmpdir))
+        for receiver in self.voice:
+            paths.append(spool(voicetone(self.tones), ["To: %s" % receiver, "Voicecall: yes"],
+                               self.outdir, self.tmpdir))
+        for key in self.pending:
+            self.sent[key] = now
+            self.repeats.pop(key, None)
+        self.pending = {}
+        self.first = None
+        self.files += len(paths)
+        if self.state is not None:
+            self._save(now)
+        return paths
+
+
+# ----------------------------------------------------------------------------
+
+async def run(notifier, arg):
+    client = vscp_tcpip.Client(arg.host, arg.port, arg.user, arg.password)
+    await client.connect()
+
+    async def ticker():
+        while True:
+            await asyncio.sleep(1)
+            for path in notifier.tick():
+                print(path)
+
+    task = asyncio.ensure_future(ticker())
+    try:
+        async for ev in client.rcvloop():
+            notifier.put(ev)
+    finally:
+        task.cancel()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="SMS alarms for VSCP alarm events through smstools")
+    parser.add_argument('--sms', default='', help='SMS recipients (comma separated)')
+    parser.add_argument('--voice', default='', help='Voice call recipients (comma separated)')
+    parser.add_argument('--tones', type=int, default=1, help='Voice call tone repeats')
+    parser.add_argument('--flash', action='store_true', help='Send flash SMS')
+    parser.add_argument('--window', type=int, default=600,
+                        help='Seconds an alarm for a zone/subzone is not sent again')
+    parser.add_argument('--delay', type=int, default=10,
+                        help='Seconds alarms are collected into one message')
+    parser.add_argument('--outdir', default=OUTDIR, help='smstools outgoing directory')
+    parser.add_argument('--tmpdir', default=TMPDIR,
+                        help='Directory for files being written (same file system as outdir)')
+    parser.add_argument('--host', default='localhost', help='VSCP daemon host')
+    parser.add_argument('--port', type=int, default=vscp_tcpip.DEFAULT_PORT)
+    parser.add_argument('--user', default='admin')
+    parser.add_argument('--password', default='secret')
+    arg = parser.parse_args(sys.argv[1:])
+
+    notifier = Notifier(arg.sms.split(","), arg.voice.split(","), arg.outdir, arg.tmpdir,
+                        arg.window, arg.delay, arg.tones, arg.flash)
+    try:
+        asyncio.run(run(notifier, arg))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        notifier.flush()
+
+
+if __name__ == "__main__":
+    main()